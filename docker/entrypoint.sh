@@ -0,0 +1,45 @@
+#!/bin/bash
+# Write the MID server settings passed in by the ECS task definition (see
+# MIDServerDeployer._get_environment_variables) into config.xml and run the
+# MID server in the foreground.
+set -euo pipefail
+
+CONFIG=/opt/snc_mid_server/agent/config.xml
+WRAPPER_OVERRIDE=/opt/snc_mid_server/agent/conf/wrapper-override.conf
+
+: "${MID_INSTANCE_URL:?MID_INSTANCE_URL is required}"
+: "${MID_INSTANCE_USERNAME:?MID_INSTANCE_USERNAME is required}"
+: "${MID_INSTANCE_PASSWORD:?MID_INSTANCE_PASSWORD is required}"
+: "${MID_SERVER_NAME:?MID_SERVER_NAME is required}"
+
+set_param() {
+    xmlstarlet ed --inplace -u "//parameter[@name='$1']/@value" -v "$2" "$CONFIG"
+}
+
+set_param url "$MID_INSTANCE_URL"
+set_param mid.instance.username "$MID_INSTANCE_USERNAME"
+set_param mid.instance.password "$MID_INSTANCE_PASSWORD"
+set_param name "$MID_SERVER_NAME"
+
+if [ -n "${MID_PROXY_HOST:-}" ]; then
+    set_param mid.proxy.use_proxy true
+    set_param mid.proxy.host "$MID_PROXY_HOST"
+    set_param mid.proxy.port "${MID_PROXY_PORT:-3128}"
+fi
+
+# ECS stops a task (including a Fargate Spot interruption, which gives two
+# minutes' notice) with SIGTERM and sends SIGKILL after the container's
+# stopTimeout (120s in the task definition). mid.sh shuts the agent down
+# cleanly on SIGTERM, letting running jobs finish and marking the MID server
+# down on the instance; give that most of the window before the wrapper
+# kills the JVM itself.
+set_wrapper() {
+    touch "$WRAPPER_OVERRIDE"
+    sed -i "/^$1=/d" "$WRAPPER_OVERRIDE"
+    echo "$1=$2" >> "$WRAPPER_OVERRIDE"
+}
+
+set_wrapper wrapper.shutdown.timeout "${MID_SHUTDOWN_TIMEOUT:-110}"
+set_wrapper wrapper.jvm_exit.timeout "${MID_SHUTDOWN_TIMEOUT:-110}"
+
+exec /opt/snc_mid_server/agent/bin/mid.sh console
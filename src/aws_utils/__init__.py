@@ -1,26 +1,126 @@
 import boto3
 from botocore.exceptions import ClientError
 import logging
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, Iterator, Optional
+from .cancellation import check_cancelled
+from .latency import LatencyRecorder, latency_recorder
+from .projection import ProjectionSpec, as_projection, paginator_config
+from .tracing import Tracer, tracer as default_tracer
+from .transport import PoolMetrics, TransportProfile
+from .credentials import CredentialProvider
+
+# Operation prefixes that never modify AWS resources
+READ_ONLY_PREFIXES = ("describe_", "get_", "list_")
+
+
+def error_code(error: ClientError) -> str:
+    """Return the AWS error code of a ClientError, e.g. 'NoSuchEntity'."""
+    return error.response.get("Error", {}).get("Code", "")
 
 
 class AWSUtils:
-    def __init__(self, profile_name: Optional[str] = None):
-        self.session = boto3.Session(profile_name=profile_name)
+    def __init__(
+        self,
+        profile_name: Optional[str] = None,
+        latencies: Optional[LatencyRecorder] = None,
+        read_only: bool = False,
+        tracer: Optional[Tracer] = None,
+        backend: Optional[Any] = None,
+        transport: Optional[TransportProfile] = None,
+        credentials: Optional[CredentialProvider] = None,
+        rate_limiter: Optional[Any] = None,
+    ):
+        self.profile_name = profile_name
+        self.credentials = credentials or CredentialProvider.for_profile(profile_name)
+        self.transport = transport or TransportProfile()
+        self.backend = backend
         self.logger = logging.getLogger(__name__)
+        self.latencies = latencies if latencies is not None else latency_recorder
+        self.read_only = read_only
+        self.tracer = tracer if tracer is not None else default_tracer
+        self.rate_limiter = rate_limiter
+
+    @property
+    def session(self) -> boto3.Session:
+        """
+        The boto3 session shared by all utils using the same credential
+        provider. It is created on first use so that utils driven entirely by
+        a backend (e.g. a replaying Cassette) never resolve credentials.
+        """
+        return self.credentials.session
+
+    @session.setter
+    def session(self, session: boto3.Session) -> None:
+        self.credentials = CredentialProvider(self.profile_name, session=session)
+
+    @property
+    def pool_metrics(self) -> PoolMetrics:
+        """Connection pool usage for the clients this instance uses."""
+        return self.credentials.pool_metrics(self.transport)
+
+    @property
+    def cache_scope(self) -> str:
+        """
+        The account and region calls go to, e.g. '123456789012/us-east-1'.
+        Local caches of AWS state (parameters, sync state, fleet status) are
+        keyed by it so a file shared between profiles never serves another
+        account's or region's data. The account comes from the cached caller
+        identity.
+        """
+        identity = self.credentials.identity(lambda: self.aws_cmd("sts", "get_caller_identity"))
+        return f"{identity['Account']}/{self.transport.region_name or self.session.region_name}"
+
+    def client(self, service: str) -> Any:
+        """
+        Get a boto3 client for a service, configured from the transport
+        profile. Clients are shared with every other AWSUtils instance using
+        the same credential provider and transport profile.
 
-    def aws_cmd(self, service: str, operation: str, **kwargs: Any) -> Dict[str, Any]:
+        :param service: AWS service (e.g., 'ec2', 's3', 'ecs')
+        :return: boto3 client
+        """
+        return self.credentials.client(service, self.transport)
+
+    def aws_cmd(self, service: str, operation: str, /, **kwargs: Any) -> Dict[str, Any]:
         """
         Execute an AWS CLI command using boto3.
 
+        If a backend is configured, the call is handed to
+        ``backend.call(service, operation, params, invoke)``, where ``invoke``
+        performs the real boto3 call. This is how cassettes record and replay
+        responses. No call is made once the current cancel scope (see
+        cancellation.py) is cancelled or past its deadline. With a rate
+        limiter (e.g. ratelimit.SharedRateLimiter), each call first waits
+        for ``rate_limiter.acquire(service)`` to admit it.
+
         :param service: AWS service (e.g., 'ec2', 's3', 'ecs')
         :param operation: Operation to perform (e.g., 'describe_instances')
         :param kwargs: Additional arguments for the operation
         :return: Response from AWS
         """
+        if self.read_only and not operation.startswith(READ_ONLY_PREFIXES):
+            raise PermissionError(
+                f"Refusing to call {service}:{operation} in read-only mode"
+            )
+        check_cancelled()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(service)
         try:
-            client = self.session.client(service)
-            response = getattr(client, operation)(**kwargs)
+            with self.tracer.span(
+                f"{service}.{operation}", **{"aws.service": service, "aws.operation": operation}
+            ) as span, self.pool_metrics.slot(service):
+                start = time.perf_counter()
+                if self.backend is not None:
+                    response = self.backend.call(
+                        service, operation, kwargs, lambda: getattr(self.client(service), operation)(**kwargs)
+                    )
+                else:
+                    response = getattr(self.client(service), operation)(**kwargs)
+                self.latencies.record(service, operation, time.perf_counter() - start)
+                span.set_attribute(
+                    "aws.request_id", response.get("ResponseMetadata", {}).get("RequestId", "")
+                )
             return response
         except ClientError as e:
             self.logger.error(f"AWS operation failed: {e}")
@@ -30,6 +130,42 @@ class AWSUtils:
                 )
             raise
 
+    def paginate(
+        self,
+        service: str,
+        operation: str,
+        projection: Optional[ProjectionSpec] = None,
+        page_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Iterator[Any]:
+        """
+        Yield the items of every page of a paginated operation.
+
+        Each page is fetched through aws_cmd (so backends, tracing and
+        cancellation apply) and its items are projected as it arrives, so
+        only the projected fields outlive the page.
+
+        :param service: AWS service (e.g., 'ec2')
+        :param operation: Paginated operation (e.g., 'describe_subnets')
+        :param projection: JMESPath expression or field list (see projection.Projection)
+        :param page_size: Items per call, if the operation has a limit parameter
+        :param kwargs: Arguments for the operation
+        :return: Iterator of items (or projected records)
+        """
+        config = paginator_config(service, operation)
+        project = as_projection(projection)
+        params = dict(kwargs)
+        if page_size and "limit_key" in config:
+            params[config["limit_key"]] = page_size
+        while True:
+            response = self.aws_cmd(service, operation, **params)
+            for item in response.get(config["result_key"], []):
+                yield project(item) if project else item
+            token = response.get(config["output_token"])
+            if not token or ("more_results" in config and not response.get(config["more_results"])):
+                return
+            params[config["input_token"]] = token
+
     def select_profile(self) -> str:
         """
         Allow user to select an AWS profile.
@@ -56,9 +192,12 @@ class AWSUtils:
     def check_sso_login(self) -> None:
         """
         Check SSO login status and prompt for login if necessary.
+
+        The caller identity is cached per profile until shortly before the
+        credentials expire, so repeated checks don't call STS.
         """
         try:
-            self.aws_cmd("sts", "get_caller_identity")
+            self.credentials.identity(lambda: self.aws_cmd("sts", "get_caller_identity"))
             print("SSO session is valid.")
         except ClientError as e:
             if "ExpiredToken" in str(e):
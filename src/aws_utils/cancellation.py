@@ -0,0 +1,186 @@
+import contextvars
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+
+class Cancelled(Exception):
+    """Raised inside a cancel scope once it has been cancelled."""
+
+
+class DeadlineExceeded(Cancelled):
+    """Raised inside a cancel scope once its deadline has passed."""
+
+
+class CancelScope:
+    """
+    A cancellable region of work with an optional deadline.
+
+    Scopes nest: a scope is cancelled when its parent is, and its deadline
+    is never later than its parent's. Cancellation is cooperative. AWSUtils
+    checks the current scope before every call and ``sleep`` wakes as soon
+    as the scope is cancelled, so polling loops stop promptly; a call that
+    is already in flight finishes (it is bounded by the transport's read
+    timeout) before the next check raises.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        parent: Optional["CancelScope"] = None,
+        name: str = "",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param timeout: Seconds until the scope's deadline, or None for no deadline
+        :param parent: Enclosing scope
+        :param name: Used in error messages, e.g. the step name
+        :param clock: Time source, for tests
+        """
+        self.parent = parent
+        self.name = name
+        self.timeout = timeout
+        self.clock = clock
+        self.deadline = clock() + timeout if timeout is not None else None
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._children: List["CancelScope"] = []
+        self._lock = threading.Lock()
+        if parent is not None:
+            parent._add_child(self)
+
+    def _add_child(self, child: "CancelScope") -> None:
+        with self._lock:
+            self._children.append(child)
+        if self._event.is_set():
+            child.cancel(self.reason or "cancelled")
+
+    def _remove_child(self, child: "CancelScope") -> None:
+        with self._lock:
+            if child in self._children:
+                self._children.remove(child)
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Cancel this scope and every scope nested in it."""
+        if self.reason is None:
+            self.reason = reason
+        self._event.set()
+        with self._lock:
+            children = list(self._children)
+        for child in children:
+            child.cancel(reason)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the nearest deadline of this scope or its parents, or None."""
+        remaining = self.deadline - self.clock() if self.deadline is not None else None
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None and (remaining is None or parent_remaining < remaining):
+                return parent_remaining
+        return remaining
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """Raise Cancelled or DeadlineExceeded if the scope should stop."""
+        if self._event.is_set():
+            raise Cancelled(f"{self._label()}{self.reason}")
+        scope: Optional[CancelScope] = self
+        while scope is not None:
+            if scope.deadline is not None and scope.clock() >= scope.deadline:
+                raise DeadlineExceeded(f"{scope._label()}deadline of {scope.timeout:g}s exceeded")
+            scope = scope.parent
+
+    def wait(self, seconds: float) -> None:
+        """Sleep up to ``seconds``, waking early (and raising) on cancellation or the deadline."""
+        self.check()
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            self._event.wait(max(remaining, 0))
+        else:
+            self._event.wait(seconds)
+        self.check()
+
+    def _label(self) -> str:
+        return f"{self.name}: " if self.name else ""
+
+
+_current: "contextvars.ContextVar[Optional[CancelScope]]" = contextvars.ContextVar("cancel_scope", default=None)
+
+
+def current_scope() -> Optional[CancelScope]:
+    return _current.get()
+
+
+@contextmanager
+def scope(timeout: Optional[float] = None, name: str = "", root: Optional[CancelScope] = None) -> Iterator[CancelScope]:
+    """
+    Run a block in a new scope nested in the current one (or use ``root``).
+
+    Threads started with tracing.propagate() inherit the scope.
+    """
+    parent = current_scope()
+    new_scope = root if root is not None else CancelScope(timeout, parent=parent, name=name)
+    token = _current.set(new_scope)
+    try:
+        yield new_scope
+    finally:
+        _current.reset(token)
+        if root is None and parent is not None:
+            parent._remove_child(new_scope)
+
+
+@contextmanager
+def shield() -> Iterator[None]:
+    """Run a block (e.g. cleanup after a cancellation) outside any cancel scope."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def check_cancelled() -> None:
+    """Raise if the current scope has been cancelled or its deadline has passed."""
+    current = current_scope()
+    if current is not None:
+        current.check()
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep that wakes early and raises when the current scope is cancelled."""
+    current = current_scope()
+    if current is None:
+        time.sleep(seconds)
+    else:
+        current.wait(seconds)
+
+
+@contextmanager
+def cancel_on_signals(
+    root: CancelScope, signals: tuple = (signal.SIGINT, signal.SIGTERM)
+) -> Iterator[CancelScope]:
+    """
+    Turn the first SIGINT/SIGTERM into a cancellation of ``root`` (and make
+    it the current scope); a second signal interrupts immediately. Must be
+    used from the main thread.
+    """
+    previous = {}
+
+    def handler(signum, frame):
+        if root.cancelled:
+            raise KeyboardInterrupt
+        root.cancel(f"interrupted by {signal.Signals(signum).name}")
+
+    for signum in signals:
+        previous[signum] = signal.signal(signum, handler)
+    try:
+        with scope(root=root):
+            yield root
+    finally:
+        for signum, old in previous.items():
+            signal.signal(signum, old)
@@ -0,0 +1,173 @@
+import base64
+import datetime
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from botocore.exceptions import ClientError
+
+
+class CassetteMiss(LookupError):
+    """Raised when a replaying cassette has no recorded response for a call."""
+
+
+class Cassette:
+    """
+    Record/replay backend for AWSUtils.aws_cmd.
+
+    In ``record`` mode every call is made against AWS and the response (or
+    ClientError) is stored. In ``replay`` mode responses are served from the
+    recording without a boto3 session, in the order they were recorded for
+    each distinct (service, operation, params) call; once a call's
+    recordings are used up its last response keeps being returned, which
+    suits status polling. ``once`` replays if the file exists and records
+    otherwise.
+
+    Cassettes are stored as JSON Lines, one interaction per line, with
+    ResponseMetadata stripped.
+    """
+
+    MODES = ("record", "replay", "once")
+
+    def __init__(self, path: str, mode: str = "replay", ignore_params: Iterable[str] = ()):
+        """
+        :param path: Cassette file (.jsonl)
+        :param mode: 'record', 'replay' or 'once'
+        :param ignore_params: Request parameters that don't take part in matching
+            (e.g. idempotency tokens)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid cassette mode: {mode}. Must be one of {self.MODES}")
+        if mode == "once":
+            mode = "replay" if os.path.exists(path) else "record"
+        self.path = path
+        self.mode = mode
+        self.ignore_params = set(ignore_params)
+        self._lock = threading.Lock()
+        self._recorded: List[Dict[str, Any]] = []
+        self._queues: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        self._last: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.played: List[Tuple[str, str]] = []
+        if mode == "replay":
+            self._load()
+
+    def call(
+        self, service: str, operation: str, params: Dict[str, Any], invoke: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Backend hook used by AWSUtils.aws_cmd."""
+        if self.mode == "record":
+            return self._record(service, operation, params, invoke)
+        return self._replay(service, operation, params)
+
+    def save(self) -> None:
+        """Write recorded interactions to the cassette file."""
+        if self.mode != "record":
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, "w") as f:
+            for interaction in self._recorded:
+                f.write(json.dumps(interaction, sort_keys=True, separators=(",", ":")) + "\n")
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.save()
+
+    def _key(self, service: str, operation: str, params: Dict[str, Any]) -> Tuple[str, str, str]:
+        matched = {k: v for k, v in params.items() if k not in self.ignore_params}
+        return service, operation, json.dumps(_encode(matched), sort_keys=True)
+
+    def _record(
+        self, service: str, operation: str, params: Dict[str, Any], invoke: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        interaction: Dict[str, Any] = {
+            "service": service,
+            "operation": operation,
+            "params": _encode(params),
+        }
+        with self._lock:
+            self.played.append((service, operation))
+        try:
+            response = invoke()
+        except ClientError as e:
+            interaction["error"] = {
+                "Code": e.response.get("Error", {}).get("Code", ""),
+                "Message": e.response.get("Error", {}).get("Message", ""),
+                "HTTPStatusCode": e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 400),
+            }
+            with self._lock:
+                self._recorded.append(interaction)
+            raise
+        body = {k: v for k, v in response.items() if k != "ResponseMetadata"}
+        interaction["response"] = _encode(body)
+        with self._lock:
+            self._recorded.append(interaction)
+        return response
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                interaction = json.loads(line)
+                key = self._key(
+                    interaction["service"], interaction["operation"], _decode(interaction["params"])
+                )
+                self._queues.setdefault(key, []).append(interaction)
+
+    def _replay(self, service: str, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = self._key(service, operation, params)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                interaction = queue.pop(0)
+                self._last[key] = interaction
+            elif key in self._last:
+                interaction = self._last[key]
+            else:
+                raise CassetteMiss(
+                    f"No recorded response in {self.path} for {service}:{operation} with params {key[2]}"
+                )
+            self.played.append((service, operation))
+        if "error" in interaction:
+            error = interaction["error"]
+            raise ClientError(
+                {
+                    "Error": {"Code": error["Code"], "Message": error["Message"]},
+                    "ResponseMetadata": {"HTTPStatusCode": error.get("HTTPStatusCode", 400)},
+                },
+                _api_name(operation),
+            )
+        return _decode(interaction["response"])
+
+
+def _api_name(operation: str) -> str:
+    return "".join(part.capitalize() for part in operation.split("_"))
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and "$datetime" in value:
+            return datetime.datetime.fromisoformat(value["$datetime"])
+        if len(value) == 1 and "$bytes" in value:
+            return base64.b64decode(value["$bytes"])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
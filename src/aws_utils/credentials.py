@@ -0,0 +1,187 @@
+import datetime
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+import boto3
+from .tracing import tracer
+from .transport import PoolMetrics, TransportProfile
+
+
+class CredentialProvider:
+    """
+    Resolves credentials for one AWS profile and shares the result.
+
+    Every AWSUtils instance for the same profile uses the same provider (see
+    for_profile), so the boto3 session, service clients, connection pools
+    and caller identity are resolved once per profile rather than once per
+    util class. For expiring credentials (SSO, assume-role) a background
+    thread refreshes them ``refresh_margin`` seconds before they expire, so
+    callers never block on STS or the SSO token cache mid-deploy.
+    """
+
+    _registry: Dict[Optional[str], "CredentialProvider"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        profile_name: Optional[str] = None,
+        session: Optional[boto3.Session] = None,
+        refresh_margin: float = 600,
+        identity_ttl: float = 3600,
+        auto_refresh: bool = True,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        :param profile_name: AWS profile to resolve credentials for
+        :param session: Use this session instead of creating one for the profile
+        :param refresh_margin: Seconds before expiry to refresh credentials and identity
+        :param identity_ttl: Maximum seconds to cache the caller identity
+        :param auto_refresh: Start a background refresh thread for expiring credentials
+        :param clock: Time source, for tests
+        """
+        self.profile_name = profile_name
+        self.refresh_margin = refresh_margin
+        self.identity_ttl = identity_ttl
+        self.auto_refresh = auto_refresh
+        self.clock = clock
+        self.logger = logging.getLogger(__name__)
+        self._session = session
+        self._lock = threading.RLock()
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._pools: Dict[str, PoolMetrics] = {}
+        self._identity: Optional[Dict[str, Any]] = None
+        self._identity_expires = 0.0
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def for_profile(cls, profile_name: Optional[str] = None) -> "CredentialProvider":
+        """Get the process-wide provider for a profile, creating it on first use."""
+        with cls._registry_lock:
+            provider = cls._registry.get(profile_name)
+            if provider is None:
+                provider = cls._registry[profile_name] = cls(profile_name)
+            return provider
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forget all shared providers, stopping their refresh threads."""
+        with cls._registry_lock:
+            for provider in cls._registry.values():
+                provider.stop()
+            cls._registry.clear()
+
+    @property
+    def session(self) -> boto3.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    with tracer.span("session_setup", profile=self.profile_name or "default"):
+                        self._session = boto3.Session(profile_name=self.profile_name)
+        return self._session
+
+    def client(self, service: str, transport: TransportProfile) -> Any:
+        """
+        Get a shared client for a service and transport profile. Creating
+        clients from one session isn't thread-safe, so creation is serialized.
+        """
+        key = (service, repr(transport))
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    with tracer.span("session_setup", client=service):
+                        client = self.session.client(service, **transport.client_kwargs(service))
+                    self._clients[key] = client
+        return client
+
+    def pool_metrics(self, transport: TransportProfile) -> PoolMetrics:
+        """The connection gate shared by every client built with this transport profile."""
+        key = repr(transport)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = PoolMetrics(transport.max_pool_connections)
+            return pool
+
+    def expiry(self) -> Optional[float]:
+        """
+        Expiry of the current credentials as a Unix timestamp, or None for
+        credentials that don't expire (e.g. static access keys).
+        """
+        credentials = self.session.get_credentials()
+        expiry_time = getattr(credentials, "_expiry_time", None)
+        if isinstance(expiry_time, datetime.datetime):
+            return expiry_time.timestamp()
+        return None
+
+    def refresh(self) -> None:
+        """
+        Refresh expiring credentials now and drop the cached identity.
+        Refreshable botocore credentials renew themselves when read close to
+        expiry, so reading them is enough.
+        """
+        credentials = self.session.get_credentials()
+        if credentials is not None:
+            credentials.get_frozen_credentials()
+        with self._lock:
+            self._identity = None
+            self._identity_expires = 0.0
+
+    def identity(self, fetch: Optional[Callable[[], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Get the caller identity (sts:GetCallerIdentity), cached until shortly
+        before the credentials expire or ``identity_ttl`` passes.
+
+        :param fetch: Call that returns the identity; defaults to calling STS directly
+        :return: The GetCallerIdentity response
+        """
+        now = self.clock()
+        with self._lock:
+            if self._identity is not None and now < self._identity_expires:
+                return self._identity
+            if fetch is None:
+                fetch = self.client("sts", TransportProfile()).get_caller_identity
+            identity = fetch()
+            expires = now + self.identity_ttl
+            expiry = self.expiry()
+            if expiry is not None:
+                expires = min(expires, expiry - self.refresh_margin)
+            self._identity = identity
+            self._identity_expires = expires
+        if self.auto_refresh and expiry is not None:
+            self._ensure_refresher()
+        return identity
+
+    def stop(self) -> None:
+        """Stop the background refresh thread, if one is running."""
+        self._stop.set()
+
+    def _ensure_refresher(self) -> None:
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name=f"credential-refresh-{self.profile_name}", daemon=True
+            )
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            expiry = self.expiry()
+            if expiry is None:
+                return
+            delay = max(expiry - self.refresh_margin - self.clock(), 1.0)
+            if self._stop.wait(delay):
+                return
+            try:
+                self.refresh()
+                self.logger.debug(f"Refreshed credentials for profile {self.profile_name}")
+            except Exception as e:
+                # Leave it to the next foreground call to surface the error.
+                self.logger.warning(f"Background credential refresh failed: {e}")
+                if self._stop.wait(30):
+                    return
@@ -1,11 +1,15 @@
 from . import AWSUtils
-from typing import List, Dict, Any
+from .projection import ProjectionSpec
+from typing import List, Dict, Any, Optional
 
 
 class EC2Utils(AWSUtils):
-    def __init__(self, profile_name=None):
-        super().__init__(profile_name)
-        self.ec2_client = self.session.client("ec2")
+    def __init__(self, profile_name=None, **kwargs):
+        super().__init__(profile_name, **kwargs)
+
+    @property
+    def ec2_client(self):
+        return self.client("ec2")
 
     def describe_vpcs(self, filters: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -17,6 +21,19 @@ class EC2Utils(AWSUtils):
         kwargs = {"Filters": filters} if filters else {}
         return self.aws_cmd("ec2", "describe_vpcs", **kwargs)
 
+    def describe_vpc_records(
+        self, filters: List[Dict[str, Any]] = None, projection: Optional[ProjectionSpec] = None
+    ) -> List[Any]:
+        """
+        Describe VPCs with optional filters, reading every page.
+
+        :param filters: List of filters to apply
+        :param projection: Fields to keep (JMESPath or field list)
+        :return: List of VPC descriptions, or projected records
+        """
+        kwargs = {"Filters": filters} if filters else {}
+        return list(self.paginate("ec2", "describe_vpcs", projection, **kwargs))
+
     def describe_subnets(self, vpc_id: str) -> Dict[str, Any]:
         """
         Describe subnets for a given VPC.
@@ -24,8 +41,41 @@ class EC2Utils(AWSUtils):
         :param vpc_id: ID of the VPC
         :return: Dictionary containing subnet information
         """
+        return self.aws_cmd("ec2", "describe_subnets", Filters=[{"Name": "vpc-id", "Values": [vpc_id]}])
+
+    def describe_subnet_records(self, vpc_id: str, projection: Optional[ProjectionSpec] = None) -> List[Any]:
+        """
+        Describe the subnets of a VPC, reading every page.
+
+        :param vpc_id: ID of the VPC
+        :param projection: Fields to keep (JMESPath or field list)
+        :return: List of subnet descriptions, or projected records
+        """
         filters = [{"Name": "vpc-id", "Values": [vpc_id]}]
-        return self.aws_cmd("ec2", "describe_subnets", Filters=filters)
+        return list(self.paginate("ec2", "describe_subnets", projection, Filters=filters))
+
+    def describe_security_groups(
+        self, group_names: List[str] = None, vpc_id: str = None, group_ids: List[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Describe security groups, optionally filtered by name, VPC and ID.
+
+        :param group_names: Names of the security groups to look up
+        :param vpc_id: ID of the VPC the security groups belong to
+        :param group_ids: IDs of the security groups to look up; unlike GroupIds, missing ones are left out
+        :return: List of security group descriptions
+        """
+        filters = []
+        if group_names:
+            filters.append({"Name": "group-name", "Values": group_names})
+        if group_ids:
+            filters.append({"Name": "group-id", "Values": group_ids})
+        if vpc_id:
+            filters.append({"Name": "vpc-id", "Values": [vpc_id]})
+        kwargs = {"Filters": filters} if filters else {}
+        return self.aws_cmd("ec2", "describe_security_groups", **kwargs)[
+            "SecurityGroups"
+        ]
 
     def create_security_group(
         self, group_name: str, description: str, vpc_id: str
@@ -47,6 +97,15 @@ class EC2Utils(AWSUtils):
         )
         return response["GroupId"]
 
+    def delete_security_group(self, group_id: str) -> None:
+        """
+        Delete a security group. Fails with DependencyViolation while network
+        interfaces (e.g. of stopping tasks) still use it.
+
+        :param group_id: ID of the security group
+        """
+        self.aws_cmd("ec2", "delete_security_group", GroupId=group_id)
+
     def authorize_security_group_ingress(
         self, group_id: str, ip_permissions: List[Dict[str, Any]]
     ) -> None:
@@ -0,0 +1,79 @@
+from . import AWSUtils, error_code
+from botocore.exceptions import ClientError
+from typing import Dict, Any, Optional, Tuple
+
+
+def parse_repository_uri(uri: str) -> Tuple[Optional[str], str]:
+    """
+    Split an ECR repository URI into registry ID and repository name, e.g.
+    '123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver' ->
+    ('123456789012', 'midserver'). A bare name has no registry ID.
+    """
+    host, sep, name = uri.partition("/")
+    if sep and ".dkr.ecr." in host:
+        return host.split(".", 1)[0], name
+    return None, uri
+
+
+class ECRUtils(AWSUtils):
+    def __init__(self, profile_name=None, **kwargs):
+        super().__init__(profile_name, **kwargs)
+
+    @property
+    def ecr_client(self):
+        return self.client("ecr")
+
+    def describe_image(self, repository_uri: str, tag: str) -> Optional[Dict[str, Any]]:
+        """
+        Describe one tagged image.
+
+        :param repository_uri: Repository URI or name
+        :param tag: Image tag
+        :return: Image details (including imageDigest), or None if the tag or repository doesn't exist
+        """
+        registry_id, repository_name = parse_repository_uri(repository_uri)
+        kwargs: Dict[str, Any] = {"repositoryName": repository_name, "imageIds": [{"imageTag": tag}]}
+        if registry_id:
+            kwargs["registryId"] = registry_id
+        try:
+            images = self.aws_cmd("ecr", "describe_images", **kwargs)["imageDetails"]
+        except ClientError as e:
+            if error_code(e) in ("ImageNotFoundException", "RepositoryNotFoundException"):
+                return None
+            raise
+        return images[0] if images else None
+
+    def tag_image(self, repository_uri: str, digest: str, tag: str) -> bool:
+        """
+        Point a tag at an image already in the repository, without pulling
+        or pushing it: the image's manifest is read and put again under the
+        tag.
+
+        :param repository_uri: Repository URI or name
+        :param digest: Digest of the image to tag
+        :param tag: Tag to move, e.g. 'latest'
+        :return: False if the tag already pointed at the image
+        """
+        registry_id, repository_name = parse_repository_uri(repository_uri)
+        kwargs: Dict[str, Any] = {"repositoryName": repository_name}
+        if registry_id:
+            kwargs["registryId"] = registry_id
+        images = self.aws_cmd("ecr", "batch_get_image", imageIds=[{"imageDigest": digest}], **kwargs)["images"]
+        if not images:
+            raise ValueError(f"Image not found: {repository_uri}@{digest}")
+        image = images[0]
+        try:
+            self.aws_cmd(
+                "ecr",
+                "put_image",
+                imageManifest=image["imageManifest"],
+                imageManifestMediaType=image["imageManifestMediaType"],
+                imageTag=tag,
+                imageDigest=digest,
+                **kwargs,
+            )
+        except ClientError as e:
+            if error_code(e) == "ImageAlreadyExistsException":
+                return False
+            raise
+        return True
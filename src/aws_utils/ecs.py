@@ -1,11 +1,16 @@
-from . import AWSUtils
+from . import AWSUtils, error_code
+from botocore.exceptions import ClientError
 from typing import List, Dict, Any, Optional
+from .projection import ProjectionSpec, as_projection
 
 
 class ECSUtils(AWSUtils):
-    def __init__(self, profile_name=None):
-        super().__init__(profile_name)
-        self.ecs_client = self.session.client("ecs")
+    def __init__(self, profile_name=None, **kwargs):
+        super().__init__(profile_name, **kwargs)
+
+    @property
+    def ecs_client(self):
+        return self.client("ecs")
 
     def list_clusters(self) -> List[str]:
         """
@@ -16,14 +21,89 @@ class ECSUtils(AWSUtils):
         response = self.aws_cmd("ecs", "list_clusters")
         return response["clusterArns"]
 
-    def create_cluster(self, cluster_name: str) -> Dict[str, Any]:
+    def create_cluster(
+        self,
+        cluster_name: str,
+        capacity_providers: Optional[List[str]] = None,
+        default_capacity_provider_strategy: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
         """
-        Create a new ECS cluster.
+        Create a new ECS cluster. An existing cluster is returned unchanged.
 
         :param cluster_name: Name of the cluster to create
+        :param capacity_providers: Optional capacity providers, e.g. ["FARGATE", "FARGATE_SPOT"]
+        :param default_capacity_provider_strategy: Optional strategy for services that don't set one
         :return: Dictionary containing cluster information
         """
-        return self.aws_cmd("ecs", "create_cluster", clusterName=cluster_name)
+        kwargs: Dict[str, Any] = {"clusterName": cluster_name}
+        if capacity_providers:
+            kwargs["capacityProviders"] = capacity_providers
+        if default_capacity_provider_strategy:
+            kwargs["defaultCapacityProviderStrategy"] = default_capacity_provider_strategy
+        return self.aws_cmd("ecs", "create_cluster", **kwargs)
+
+    def put_cluster_capacity_providers(
+        self,
+        cluster: str,
+        capacity_providers: List[str],
+        default_capacity_provider_strategy: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Set the capacity providers of an existing cluster.
+
+        :param cluster: Name of the ECS cluster
+        :param capacity_providers: Capacity providers, e.g. ["FARGATE", "FARGATE_SPOT"]
+        :param default_capacity_provider_strategy: Strategy for services that don't set one
+        :return: Dictionary containing cluster information
+        """
+        return self.aws_cmd(
+            "ecs",
+            "put_cluster_capacity_providers",
+            cluster=cluster,
+            capacityProviders=capacity_providers,
+            defaultCapacityProviderStrategy=default_capacity_provider_strategy,
+        )
+
+    def delete_cluster(self, cluster: str) -> bool:
+        """
+        Delete an ECS cluster. It must have no services or tasks left.
+
+        :param cluster: Name or ARN of the cluster
+        :return: False if the cluster doesn't exist
+        """
+        try:
+            self.aws_cmd("ecs", "delete_cluster", cluster=cluster)
+            return True
+        except ClientError as e:
+            if error_code(e) == "ClusterNotFoundException":
+                return False
+            raise
+
+    def describe_clusters(self, clusters: List[str]) -> List[Dict[str, Any]]:
+        """
+        Describe ECS clusters.
+
+        :param clusters: List of cluster names or ARNs
+        :return: List of cluster descriptions
+        """
+        return self.aws_cmd("ecs", "describe_clusters", clusters=clusters)["clusters"]
+
+    def describe_task_definition(self, task_definition: str) -> Optional[Dict[str, Any]]:
+        """
+        Describe a task definition.
+
+        :param task_definition: Family, family:revision or ARN of the task definition
+        :return: Dictionary containing the task definition, or None if it doesn't exist
+        """
+        try:
+            response = self.aws_cmd(
+                "ecs", "describe_task_definition", taskDefinition=task_definition
+            )
+            return response["taskDefinition"]
+        except ClientError as e:
+            if error_code(e) == "ClientException":
+                return None
+            raise
 
     def register_task_definition(
         self,
@@ -54,6 +134,38 @@ class ECSUtils(AWSUtils):
             memory="512",
         )
 
+    def list_task_definitions(self, family: str, status: str = "ACTIVE") -> List[str]:
+        """
+        List the revisions of a task definition family, following pagination.
+
+        :param family: Task definition family
+        :param status: ACTIVE, INACTIVE or DELETE_IN_PROGRESS
+        :return: List of task definition ARNs
+        """
+        return list(self.paginate("ecs", "list_task_definitions", familyPrefix=family, status=status))
+
+    def deregister_task_definition(self, task_definition: str) -> Dict[str, Any]:
+        """
+        Deregister a task definition revision, making it INACTIVE. Running tasks are unaffected.
+
+        :param task_definition: Task definition ARN or family:revision
+        :return: Dictionary describing the task definition
+        """
+        return self.aws_cmd("ecs", "deregister_task_definition", taskDefinition=task_definition)["taskDefinition"]
+
+    def delete_task_definitions(self, task_definitions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Delete INACTIVE task definition revisions, 10 per call.
+
+        :param task_definitions: Task definition ARNs or family:revision
+        :return: Failures, each with an arn and a reason
+        """
+        failures: List[Dict[str, Any]] = []
+        for i in range(0, len(task_definitions), 10):
+            response = self.aws_cmd("ecs", "delete_task_definitions", taskDefinitions=task_definitions[i:i + 10])
+            failures.extend(response.get("failures", []))
+        return failures
+
     def create_service(
         self,
         cluster: str,
@@ -62,47 +174,318 @@ class ECSUtils(AWSUtils):
         desired_count: int,
         subnets: List[str],
         security_groups: List[str],
+        deployment_configuration: Optional[Dict[str, Any]] = None,
+        deployment_controller: Optional[Dict[str, str]] = None,
+        capacity_provider_strategy: Optional[List[Dict[str, Any]]] = None,
     ) -> Dict[str, Any]:
         """
         Create a new ECS service.
 
+        Services using the EXTERNAL deployment controller carry their task
+        definition, network configuration and capacity provider strategy on
+        task sets instead, so those arguments are only sent for
+        ECS-controlled services.
+
         :param cluster: Name of the ECS cluster
         :param service_name: Name of the service to create
         :param task_definition: ARN of the task definition
         :param desired_count: Desired number of tasks
         :param subnets: List of subnet IDs
         :param security_groups: List of security group IDs
+        :param deployment_configuration: Optional maximumPercent/minimumHealthyPercent/circuit breaker settings
+        :param deployment_controller: Optional deployment controller, e.g. {"type": "EXTERNAL"}
+        :param capacity_provider_strategy: Optional capacity providers to run the tasks on, instead of
+            the FARGATE launch type
         :return: Dictionary containing service information
         """
-        return self.aws_cmd(
-            "ecs",
-            "create_service",
-            cluster=cluster,
-            serviceName=service_name,
-            taskDefinition=task_definition,
-            desiredCount=desired_count,
-            launchType="FARGATE",
-            networkConfiguration={
-                "awsvpcConfiguration": {
-                    "subnets": subnets,
-                    "securityGroups": security_groups,
-                    "assignPublicIp": "ENABLED",
-                }
-            },
-        )
+        kwargs: Dict[str, Any] = {
+            "cluster": cluster,
+            "serviceName": service_name,
+            "desiredCount": desired_count,
+        }
+        if deployment_controller and deployment_controller.get("type") == "EXTERNAL":
+            kwargs["deploymentController"] = deployment_controller
+        else:
+            kwargs.update(
+                taskDefinition=task_definition,
+                networkConfiguration=_network_configuration(subnets, security_groups),
+                **_placement(capacity_provider_strategy),
+            )
+            if deployment_controller:
+                kwargs["deploymentController"] = deployment_controller
+        if deployment_configuration:
+            kwargs["deploymentConfiguration"] = deployment_configuration
+        return self.aws_cmd("ecs", "create_service", **kwargs)
+
+    def update_service(
+        self,
+        cluster: str,
+        service: str,
+        task_definition: Optional[str] = None,
+        desired_count: Optional[int] = None,
+        subnets: Optional[List[str]] = None,
+        security_groups: Optional[List[str]] = None,
+        deployment_configuration: Optional[Dict[str, Any]] = None,
+        capacity_provider_strategy: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Update an existing ECS service. Only the supplied settings are changed.
+
+        :param cluster: Name of the ECS cluster
+        :param service: Name or ARN of the service to update
+        :param task_definition: ARN of the task definition to roll out
+        :param desired_count: Desired number of tasks
+        :param subnets: List of subnet IDs
+        :param security_groups: List of security group IDs
+        :param deployment_configuration: Optional maximumPercent/minimumHealthyPercent/circuit breaker settings
+        :param capacity_provider_strategy: Optional new capacity provider strategy; changing it
+            (or moving off the launch type) forces a new deployment
+        :return: Dictionary containing service information
+        """
+        kwargs: Dict[str, Any] = {"cluster": cluster, "service": service}
+        if capacity_provider_strategy:
+            kwargs["capacityProviderStrategy"] = capacity_provider_strategy
+            kwargs["forceNewDeployment"] = True
+        if task_definition is not None:
+            kwargs["taskDefinition"] = task_definition
+        if desired_count is not None:
+            kwargs["desiredCount"] = desired_count
+        if subnets is not None:
+            kwargs["networkConfiguration"] = _network_configuration(
+                subnets, security_groups or []
+            )
+        if deployment_configuration:
+            kwargs["deploymentConfiguration"] = deployment_configuration
+        return self.aws_cmd("ecs", "update_service", **kwargs)
+
+    def delete_service(self, cluster: str, service: str, force: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Delete an ECS service. It is DRAINING until its tasks have stopped, then INACTIVE.
+
+        :param cluster: Name of the ECS cluster
+        :param service: Name or ARN of the service
+        :param force: Delete the service (and its task sets) without scaling it to zero first
+        :return: Dictionary describing the service, or None if the service (or cluster) doesn't exist or
+            is already inactive
+        """
+        try:
+            return self.aws_cmd("ecs", "delete_service", cluster=cluster, service=service, force=force)["service"]
+        except ClientError as e:
+            if error_code(e) in ("ServiceNotFoundException", "ServiceNotActiveException", "ClusterNotFoundException"):
+                return None
+            raise
 
     def describe_services(self, cluster: str, services: List[str]) -> Dict[str, Any]:
         """
         Describe ECS services.
 
         :param cluster: Name of the ECS cluster
-        :param services: List of service names or ARNs
+        :param services: List of service names or ARNs (at most 10)
         :return: Dictionary containing service descriptions
         """
         return self.aws_cmd(
             "ecs", "describe_services", cluster=cluster, services=services
         )
 
+    def describe_service_records(
+        self, cluster: str, services: List[str], projection: Optional[ProjectionSpec] = None
+    ) -> List[Any]:
+        """
+        Describe any number of ECS services, 10 per call.
+
+        :param cluster: Name of the ECS cluster
+        :param services: List of service names or ARNs
+        :param projection: Fields to keep (JMESPath or field list)
+        :return: List of service descriptions, or projected records
+        """
+        project = as_projection(projection)
+        records = []
+        for i in range(0, len(services), 10):
+            response = self.aws_cmd("ecs", "describe_services", cluster=cluster, services=services[i:i + 10])
+            records.extend(project(service) if project else service for service in response["services"])
+        return records
+
+    def list_services(self, cluster: str) -> List[str]:
+        """
+        List all services in a cluster, following pagination.
+
+        :param cluster: Name of the ECS cluster
+        :return: List of service ARNs
+        """
+        arns: List[str] = []
+        kwargs: Dict[str, Any] = {"cluster": cluster, "maxResults": 100}
+        while True:
+            response = self.aws_cmd("ecs", "list_services", **kwargs)
+            arns.extend(response["serviceArns"])
+            if not response.get("nextToken"):
+                return arns
+            kwargs["nextToken"] = response["nextToken"]
+
+    def list_tasks(self, cluster: str, desired_status: str = "RUNNING") -> List[str]:
+        """
+        List all tasks in a cluster, following pagination.
+
+        :param cluster: Name of the ECS cluster
+        :param desired_status: RUNNING, PENDING or STOPPED
+        :return: List of task ARNs
+        """
+        arns: List[str] = []
+        kwargs: Dict[str, Any] = {"cluster": cluster, "desiredStatus": desired_status, "maxResults": 100}
+        while True:
+            response = self.aws_cmd("ecs", "list_tasks", **kwargs)
+            arns.extend(response["taskArns"])
+            if not response.get("nextToken"):
+                return arns
+            kwargs["nextToken"] = response["nextToken"]
+
+    def describe_tasks(
+        self, cluster: str, tasks: List[str], projection: Optional[ProjectionSpec] = None
+    ) -> List[Any]:
+        """
+        Describe ECS tasks (up to 100 per call).
+
+        :param cluster: Name of the ECS cluster
+        :param tasks: List of task ARNs or IDs
+        :param projection: Fields to keep (JMESPath or field list)
+        :return: List of task descriptions, or projected records
+        """
+        described = self.aws_cmd("ecs", "describe_tasks", cluster=cluster, tasks=tasks)["tasks"]
+        project = as_projection(projection)
+        return [project(task) for task in described] if project else described
+
+    def create_task_set(
+        self,
+        cluster: str,
+        service: str,
+        task_definition: str,
+        subnets: List[str],
+        security_groups: List[str],
+        scale_percent: float = 100.0,
+        external_id: Optional[str] = None,
+        capacity_provider_strategy: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Create a task set in a service that uses the EXTERNAL deployment controller.
+
+        :param cluster: Name of the ECS cluster
+        :param service: Name or ARN of the service
+        :param task_definition: ARN of the task definition for the task set
+        :param subnets: List of subnet IDs
+        :param security_groups: List of security group IDs
+        :param scale_percent: Percentage of the service desired count to run in this task set
+        :param external_id: Optional identifier stored on the task set
+        :param capacity_provider_strategy: Optional capacity providers to run the tasks on, instead of
+            the FARGATE launch type
+        :return: Dictionary describing the created task set
+        """
+        kwargs: Dict[str, Any] = {
+            "cluster": cluster,
+            "service": service,
+            "taskDefinition": task_definition,
+            "networkConfiguration": _network_configuration(subnets, security_groups),
+            "scale": {"unit": "PERCENT", "value": scale_percent},
+            **_placement(capacity_provider_strategy),
+        }
+        if external_id:
+            kwargs["externalId"] = external_id
+        return self.aws_cmd("ecs", "create_task_set", **kwargs)["taskSet"]
+
+    def describe_task_sets(
+        self, cluster: str, service: str, task_sets: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Describe the task sets of a service.
+
+        :param cluster: Name of the ECS cluster
+        :param service: Name or ARN of the service
+        :param task_sets: Optional list of task set IDs or ARNs to restrict the result to
+        :return: List of task set descriptions
+        """
+        kwargs: Dict[str, Any] = {"cluster": cluster, "service": service}
+        if task_sets:
+            kwargs["taskSets"] = task_sets
+        return self.aws_cmd("ecs", "describe_task_sets", **kwargs)["taskSets"]
+
+    def update_service_primary_task_set(
+        self, cluster: str, service: str, primary_task_set: str
+    ) -> Dict[str, Any]:
+        """
+        Promote a task set to be the primary task set of a service.
+
+        :param cluster: Name of the ECS cluster
+        :param service: Name or ARN of the service
+        :param primary_task_set: ID or ARN of the task set to promote
+        :return: Dictionary describing the promoted task set
+        """
+        return self.aws_cmd(
+            "ecs",
+            "update_service_primary_task_set",
+            cluster=cluster,
+            service=service,
+            primaryTaskSet=primary_task_set,
+        )["taskSet"]
+
+    def update_task_set(
+        self, cluster: str, service: str, task_set: str, scale_percent: float
+    ) -> Dict[str, Any]:
+        """
+        Scale a task set.
+
+        :param cluster: Name of the ECS cluster
+        :param service: Name or ARN of the service
+        :param task_set: ID or ARN of the task set to scale
+        :param scale_percent: Percentage of the service desired count to run in this task set
+        :return: Dictionary describing the updated task set
+        """
+        return self.aws_cmd(
+            "ecs",
+            "update_task_set",
+            cluster=cluster,
+            service=service,
+            taskSet=task_set,
+            scale={"unit": "PERCENT", "value": scale_percent},
+        )["taskSet"]
+
+    def delete_task_set(
+        self, cluster: str, service: str, task_set: str, force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Delete a task set, draining its tasks.
+
+        :param cluster: Name of the ECS cluster
+        :param service: Name or ARN of the service
+        :param task_set: ID or ARN of the task set to delete
+        :param force: Delete the task set even if it has not been scaled down to zero
+        :return: Dictionary describing the deleted task set
+        """
+        return self.aws_cmd(
+            "ecs",
+            "delete_task_set",
+            cluster=cluster,
+            service=service,
+            taskSet=task_set,
+            force=force,
+        )["taskSet"]
+
+
+def _network_configuration(
+    subnets: List[str], security_groups: List[str]
+) -> Dict[str, Any]:
+    return {
+        "awsvpcConfiguration": {
+            "subnets": subnets,
+            "securityGroups": security_groups,
+            "assignPublicIp": "ENABLED",
+        }
+    }
+
+
+def _placement(capacity_provider_strategy: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    # ECS rejects a request that sets both a launch type and a capacity provider strategy.
+    if capacity_provider_strategy:
+        return {"capacityProviderStrategy": capacity_provider_strategy}
+    return {"launchType": "FARGATE"}
+
 
 # Example usage
 if __name__ == "__main__":
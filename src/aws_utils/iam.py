@@ -1,11 +1,16 @@
-from . import AWSUtils
+from . import AWSUtils, error_code
+from botocore.exceptions import ClientError
 from typing import Dict, Any, List, Optional
+from .projection import ProjectionSpec
 
 
 class IAMUtils(AWSUtils):
-    def __init__(self, profile_name=None):
-        super().__init__(profile_name)
-        self.iam_client = self.session.client("iam")
+    def __init__(self, profile_name=None, **kwargs):
+        super().__init__(profile_name, **kwargs)
+
+    @property
+    def iam_client(self):
+        return self.client("iam")
 
     def create_role(
         self, role_name: str, assume_role_policy_document: str
@@ -35,6 +40,30 @@ class IAMUtils(AWSUtils):
             "iam", "attach_role_policy", RoleName=role_name, PolicyArn=policy_arn
         )
 
+    def detach_role_policy(self, role_name: str, policy_arn: str) -> None:
+        """
+        Detach a managed policy from an IAM role.
+
+        :param role_name: Name of the role
+        :param policy_arn: ARN of the policy to detach
+        """
+        self.aws_cmd("iam", "detach_role_policy", RoleName=role_name, PolicyArn=policy_arn)
+
+    def delete_role(self, role_name: str) -> bool:
+        """
+        Delete an IAM role. Its managed policies must be detached first.
+
+        :param role_name: Name of the role
+        :return: False if the role doesn't exist
+        """
+        try:
+            self.aws_cmd("iam", "delete_role", RoleName=role_name)
+            return True
+        except ClientError as e:
+            if error_code(e) == "NoSuchEntity":
+                return False
+            raise
+
     def create_policy(self, policy_name: str, policy_document: str) -> Dict[str, Any]:
         """
         Create an IAM policy.
@@ -59,20 +88,22 @@ class IAMUtils(AWSUtils):
         """
         try:
             return self.aws_cmd("iam", "get_role", RoleName=role_name)
-        except self.iam_client.exceptions.NoSuchEntityException:
-            return None
-
-    def list_attached_role_policies(self, role_name: str) -> List[Dict[str, str]]:
+        except ClientError as e:
+            if error_code(e) == "NoSuchEntity":
+                return None
+            raise
+
+    def list_attached_role_policies(
+        self, role_name: str, projection: Optional[ProjectionSpec] = None
+    ) -> List[Any]:
         """
-        List policies attached to an IAM role.
+        List policies attached to an IAM role, following pagination.
 
         :param role_name: Name of the role
-        :return: List of dictionaries containing policy information
+        :param projection: Fields to keep (JMESPath or field list)
+        :return: List of dictionaries containing policy information, or projected records
         """
-        response = self.aws_cmd(
-            "iam", "list_attached_role_policies", RoleName=role_name
-        )
-        return response["AttachedPolicies"]
+        return list(self.paginate("iam", "list_attached_role_policies", projection, RoleName=role_name))
 
 
 # Example usage
@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class LatencyRecorder:
+    """
+    Thread-safe running averages of AWS API call latencies, keyed by
+    service and operation. Used to predict how long a deployment will take.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    def record(self, service: str, operation: str, seconds: float) -> None:
+        """
+        Record the duration of one API call.
+
+        :param service: AWS service (e.g., 'ecs')
+        :param operation: Operation that was called (e.g., 'describe_services')
+        :param seconds: Wall-clock duration of the call
+        """
+        key = (service, operation)
+        with self._lock:
+            count, total = self._stats.get(key, (0, 0.0))
+            self._stats[key] = (count + 1, total + seconds)
+
+    def mean(self, service: str, operation: str) -> Optional[float]:
+        """
+        Get the average latency of an operation.
+
+        :return: Average latency in seconds, or None if the operation was never recorded
+        """
+        with self._lock:
+            count, total = self._stats.get((service, operation), (0, 0.0))
+        return total / count if count else None
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                f"{service}:{operation}": {"count": count, "total": total}
+                for (service, operation), (count, total) in sorted(self._stats.items())
+            }
+
+    def merge(self, data: Dict[str, Dict[str, float]]) -> None:
+        """Merge statistics in the format produced by to_dict."""
+        with self._lock:
+            for key, stats in data.items():
+                service, operation = key.split(":", 1)
+                count, total = self._stats.get((service, operation), (0, 0.0))
+                self._stats[(service, operation)] = (
+                    count + int(stats["count"]),
+                    total + float(stats["total"]),
+                )
+
+    def load(self, path: str) -> None:
+        """Merge previously saved statistics from a JSON file, if it exists."""
+        if os.path.exists(path):
+            with open(path) as f:
+                self.merge(json.load(f))
+
+    def save(self, path: str) -> None:
+        """Write the statistics to a JSON file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+# Shared by every AWSUtils instance that isn't given its own recorder
+latency_recorder = LatencyRecorder()
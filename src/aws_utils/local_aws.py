@@ -0,0 +1,404 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from botocore.exceptions import ClientError
+
+# Mean latency in seconds of a call to each service, roughly what us-east-1
+# shows from inside the region
+DEFAULT_LATENCIES = {"ec2": 0.08, "ecs": 0.06, "ecr": 0.05, "iam": 0.12, "ssm": 0.03, "sts": 0.04}
+
+# Calls per second each service allows an account before throttling, about
+# the default request quotas for the control-plane calls a deploy makes
+DEFAULT_QUOTAS = {"ec2": 100.0, "ecs": 40.0, "ecr": 20.0, "iam": 20.0, "ssm": 40.0, "sts": 100.0}
+
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+
+
+class LocalAWS:
+    """
+    In-memory stand-in for the AWS APIs a MID server deploy uses, as a
+    backend for AWSUtils.aws_cmd.
+
+    Unlike a Cassette it keeps state, so any number of deployers can create
+    and update their own security groups, roles, clusters and services, and
+    it behaves like a loaded endpoint: every call takes a random
+    (log-normal) latency, each service has a per-account token bucket, and
+    calls over quota are throttled and retried with botocore's standard
+    backoff before failing with ThrottlingException. Services finish their
+    rollout ``rollout_seconds`` after they are created or updated; with
+    ``on_event``, an 'ECS Deployment State Change' event is passed to it at
+    that moment, as EventBridge would deliver it.
+
+    All delays are multiplied by ``time_scale`` so a load test can compress
+    minutes of deploys into seconds. ``calls``, ``throttles`` and
+    ``latencies`` (seconds per call, including throttling retries) record
+    what the endpoint saw.
+    """
+
+    def __init__(
+        self,
+        latencies: Optional[Dict[str, float]] = None,
+        quotas: Optional[Dict[str, float]] = None,
+        jitter: float = 0.5,
+        max_attempts: int = 3,
+        rollout_seconds: float = 30.0,
+        time_scale: float = 1.0,
+        seed: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        """
+        :param latencies: Mean call latency per service, in seconds
+        :param quotas: Calls per second per service before throttling (also the burst size)
+        :param jitter: Sigma of the log-normal latency distribution; 0 for fixed latencies
+        :param max_attempts: Attempts per call, including the first, as in botocore's retry config
+        :param rollout_seconds: Time from create/update_service until the rollout completes
+        :param time_scale: Factor applied to every delay
+        :param seed: Seed for latencies and backoff, for repeatable runs
+        :param on_event: Called with ECS events, e.g. LocalEventQueue.publish
+        """
+        self.mean_latencies = dict(DEFAULT_LATENCIES, **(latencies or {}))
+        self.quotas = dict(DEFAULT_QUOTAS, **(quotas or {}))
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.rollout_seconds = rollout_seconds
+        self.time_scale = time_scale
+        self.sleep = sleep
+        self.clock = clock
+        self.on_event = on_event
+        self.random = random.Random(seed)
+        self.calls: Counter = Counter()
+        self.throttles: Counter = Counter()
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[float]] = {}
+        self._vpcs = [{"VpcId": "vpc-0local", "CidrBlock": "10.0.0.0/16", "IsDefault": True}]
+        self._subnets = [
+            {"SubnetId": f"subnet-0local{i}", "VpcId": "vpc-0local", "CidrBlock": f"10.0.{i}.0/24"} for i in range(2)
+        ]
+        self._security_groups: Dict[str, Dict[str, Any]] = {}
+        self._roles: Dict[str, Dict[str, Any]] = {}
+        self._attached: Dict[str, List[str]] = {}
+        self._clusters: Dict[str, Dict[str, Any]] = {}
+        self._task_definitions: Dict[str, Dict[str, Any]] = {}
+        self._revisions: Counter = Counter()
+        self._services: Dict[tuple, Dict[str, Any]] = {}
+        self._parameters: Dict[str, Dict[str, Any]] = {}
+
+    def put_parameter(self, name: str, value: str) -> None:
+        """Seed an SSM parameter (not counted as a call)."""
+        with self._lock:
+            version = self._parameters.get(name, {}).get("Version", 0) + 1
+            self._parameters[name] = {"Name": name, "Value": value, "Version": version, "Type": "SecureString"}
+
+    def call(
+        self, service: str, operation: str, params: Dict[str, Any], invoke: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Backend hook used by AWSUtils.aws_cmd; ``invoke`` is never called."""
+        handler = getattr(self, f"_{service}_{operation}", None)
+        if handler is None:
+            raise _error(operation, "InvalidAction", f"{service}:{operation} is not supported by LocalAWS")
+        start = time.perf_counter()
+        for attempt in range(1, self.max_attempts + 1):
+            if self._admit(service):
+                break
+            with self._lock:
+                self.throttles[service] += 1
+            if attempt == self.max_attempts:
+                with self._lock:
+                    self._record(service, operation, start)
+                raise _error(operation, "ThrottlingException", "Rate exceeded")
+            # botocore standard retry mode: random backoff up to 2^attempt seconds
+            self.sleep(self.random.random() * min(20, 2 ** attempt) * self.time_scale)
+        self.sleep(self._latency(service))
+        with self._lock:
+            try:
+                return handler(params)
+            finally:
+                self._record(service, operation, start)
+
+    def _admit(self, service: str) -> bool:
+        rate = self.quotas.get(service)
+        if not rate:
+            return True
+        # Quotas are per real second, so compressing time raises the rate.
+        rate /= self.time_scale
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.setdefault(service, [rate, now])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    def _latency(self, service: str) -> float:
+        mean = self.mean_latencies.get(service, 0.05)
+        if self.jitter:
+            mean = self.random.lognormvariate(math.log(mean) - self.jitter ** 2 / 2, self.jitter)
+        return mean * self.time_scale
+
+    def _record(self, service: str, operation: str, start: float) -> None:
+        # Called with the lock held.
+        self.calls[f"{service}:{operation}"] += 1
+        self.latencies.append(time.perf_counter() - start)
+
+    # EC2
+
+    def _ec2_describe_vpcs(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"Vpcs": [dict(vpc) for vpc in self._vpcs]}
+
+    def _ec2_describe_subnets(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        vpc_ids = _filter_values(params, "vpc-id")
+        return {"Subnets": [dict(s) for s in self._subnets if vpc_ids is None or s["VpcId"] in vpc_ids]}
+
+    def _ec2_describe_security_groups(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        names, vpc_ids = _filter_values(params, "group-name"), _filter_values(params, "vpc-id")
+        return {
+            "SecurityGroups": [
+                dict(group)
+                for group in self._security_groups.values()
+                if (names is None or group["GroupName"] in names) and (vpc_ids is None or group["VpcId"] in vpc_ids)
+            ]
+        }
+
+    def _ec2_create_security_group(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params["GroupName"]
+        if name in self._security_groups:
+            raise _error("CreateSecurityGroup", "InvalidGroup.Duplicate", f"The security group '{name}' already exists")
+        group_id = f"sg-{_digest(name)[:17]}"
+        self._security_groups[name] = {
+            "GroupId": group_id, "GroupName": name, "VpcId": params["VpcId"], "IpPermissions": []
+        }
+        return {"GroupId": group_id}
+
+    def _ec2_authorize_security_group_ingress(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        for group in self._security_groups.values():
+            if group["GroupId"] == params["GroupId"]:
+                group["IpPermissions"].extend(params["IpPermissions"])
+                return {"Return": True}
+        raise _error("AuthorizeSecurityGroupIngress", "InvalidGroup.NotFound", params["GroupId"])
+
+    # IAM
+
+    def _iam_get_role(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        role = self._roles.get(params["RoleName"])
+        if role is None:
+            raise _error("GetRole", "NoSuchEntity", f"The role with name {params['RoleName']} cannot be found.")
+        return {"Role": dict(role)}
+
+    def _iam_create_role(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params["RoleName"]
+        if name in self._roles:
+            raise _error("CreateRole", "EntityAlreadyExists", f"Role with name {name} already exists.")
+        self._roles[name] = {"RoleName": name, "Arn": f"arn:aws:iam::{ACCOUNT_ID}:role/{name}"}
+        return {"Role": dict(self._roles[name])}
+
+    def _iam_attach_role_policy(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if params["RoleName"] not in self._roles:
+            raise _error("AttachRolePolicy", "NoSuchEntity", params["RoleName"])
+        attached = self._attached.setdefault(params["RoleName"], [])
+        if params["PolicyArn"] not in attached:
+            attached.append(params["PolicyArn"])
+        return {}
+
+    def _iam_list_attached_role_policies(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        arns = self._attached.get(params["RoleName"], [])
+        return {
+            "AttachedPolicies": [{"PolicyArn": arn, "PolicyName": arn.rsplit("/", 1)[-1]} for arn in arns],
+            "IsTruncated": False,
+        }
+
+    # ECR and SSM
+
+    def _ecr_describe_images(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        tag = params["imageIds"][0]["imageTag"]
+        return {
+            "imageDetails": [
+                {
+                    "repositoryName": params["repositoryName"],
+                    "imageDigest": f"sha256:{_digest(params['repositoryName'] + ':' + tag)}",
+                    "imageTags": [tag],
+                }
+            ]
+        }
+
+    def _ssm_get_parameter(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        parameter = self._parameters.get(params["Name"])
+        if parameter is None:
+            raise _error("GetParameter", "ParameterNotFound", params["Name"])
+        return {"Parameter": dict(parameter)}
+
+    def _sts_get_caller_identity(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"Account": ACCOUNT_ID, "Arn": f"arn:aws:iam::{ACCOUNT_ID}:user/local", "UserId": "LOCAL"}
+
+    # ECS
+
+    def _ecs_create_cluster(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params["clusterName"]
+        cluster = self._clusters.setdefault(name, {
+            "clusterName": name,
+            "clusterArn": f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:cluster/{name}",
+            "status": "ACTIVE",
+            "capacityProviders": params.get("capacityProviders", []),
+            "defaultCapacityProviderStrategy": params.get("defaultCapacityProviderStrategy", []),
+        })
+        return {"cluster": dict(cluster)}
+
+    def _ecs_put_cluster_capacity_providers(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if params["cluster"] not in self._clusters:
+            raise _error("PutClusterCapacityProviders", "ClusterNotFoundException", "Cluster not found.")
+        cluster = self._clusters[params["cluster"]]
+        cluster.update(
+            capacityProviders=params["capacityProviders"],
+            defaultCapacityProviderStrategy=params["defaultCapacityProviderStrategy"],
+        )
+        return {"cluster": dict(cluster)}
+
+    def _ecs_describe_clusters(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        names = [cluster.rsplit("/", 1)[-1] for cluster in params["clusters"]]
+        return {"clusters": [dict(self._clusters[name]) for name in names if name in self._clusters]}
+
+    def _ecs_list_clusters(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"clusterArns": [cluster["clusterArn"] for cluster in self._clusters.values()]}
+
+    def _ecs_register_task_definition(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        family = params["family"]
+        self._revisions[family] += 1
+        arn = f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:task-definition/{family}:{self._revisions[family]}"
+        task_definition = dict(params, taskDefinitionArn=arn, revision=self._revisions[family], status="ACTIVE")
+        self._task_definitions[arn] = task_definition
+        return {"taskDefinition": dict(task_definition)}
+
+    def _ecs_describe_task_definition(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params["taskDefinition"]
+        if ":" not in name.rsplit("/", 1)[-1]:
+            name = f"{name}:{self._revisions[name.rsplit('/', 1)[-1]]}"
+        if not name.startswith("arn:"):
+            name = f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:task-definition/{name}"
+        if name not in self._task_definitions:
+            raise _error("DescribeTaskDefinition", "ClientException", "Unable to describe task definition.")
+        return {"taskDefinition": dict(self._task_definitions[name])}
+
+    def _ecs_create_service(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = (params["cluster"], params["serviceName"])
+        if params["cluster"] not in self._clusters:
+            raise _error("CreateService", "ClusterNotFoundException", "Cluster not found.")
+        if key in self._services and self._services[key]["status"] == "ACTIVE":
+            raise _error("CreateService", "InvalidParameterException", "Creation of service was not idempotent.")
+        self._services[key] = {
+            "serviceName": params["serviceName"],
+            "serviceArn": f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:service/{params['cluster']}/{params['serviceName']}",
+            "clusterArn": self._clusters[params["cluster"]]["clusterArn"],
+            "status": "ACTIVE",
+            "taskDefinition": params["taskDefinition"],
+            "desiredCount": params.get("desiredCount", 1),
+        }
+        if "capacityProviderStrategy" in params:
+            self._services[key]["capacityProviderStrategy"] = params["capacityProviderStrategy"]
+        else:
+            self._services[key]["launchType"] = params.get("launchType", "EC2")
+        self._start_rollout(key)
+        return {"service": self._describe_service(key)}
+
+    def _ecs_update_service(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = (params["cluster"], params["service"])
+        if key not in self._services:
+            raise _error("UpdateService", "ServiceNotFoundException", "Service not found.")
+        service = self._services[key]
+        if "desiredCount" in params:
+            service["desiredCount"] = params["desiredCount"]
+        if "taskDefinition" in params:
+            service["taskDefinition"] = params["taskDefinition"]
+        if "capacityProviderStrategy" in params:
+            service.pop("launchType", None)
+            service["capacityProviderStrategy"] = params["capacityProviderStrategy"]
+        self._start_rollout(key)
+        return {"service": self._describe_service(key)}
+
+    def _ecs_describe_services(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        services, failures = [], []
+        for name in params["services"]:
+            key = (params["cluster"], name.rsplit("/", 1)[-1])
+            if key in self._services:
+                services.append(self._describe_service(key))
+            else:
+                failures.append({"arn": name, "reason": "MISSING"})
+        return {"services": services, "failures": failures}
+
+    def _ecs_list_services(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "serviceArns": [
+                service["serviceArn"] for (cluster, _), service in self._services.items() if cluster == params["cluster"]
+            ]
+        }
+
+    def _start_rollout(self, key: tuple) -> None:
+        delay = self.rollout_seconds * self.time_scale
+        self._services[key]["_rollout_done_at"] = self.clock() + delay
+        if self.on_event is not None:
+            service = self._services[key]
+            timer = threading.Timer(
+                delay, self.on_event, [ecs_deployment_event(service["serviceArn"], service["clusterArn"])]
+            )
+            timer.daemon = True
+            timer.start()
+
+    def _describe_service(self, key: tuple) -> Dict[str, Any]:
+        service = self._services[key]
+        done = self.clock() >= service["_rollout_done_at"]
+        desired = service["desiredCount"]
+        running = desired if done else 0
+        described = {k: v for k, v in service.items() if not k.startswith("_")}
+        described.update(
+            runningCount=running,
+            pendingCount=desired - running,
+            deployments=[
+                {
+                    "status": "PRIMARY",
+                    "taskDefinition": service["taskDefinition"],
+                    "desiredCount": desired,
+                    "runningCount": running,
+                    "rolloutState": "COMPLETED" if done else "IN_PROGRESS",
+                }
+            ],
+        )
+        return described
+
+
+def ecs_deployment_event(
+    service_arn: str, cluster_arn: str, event_name: str = "SERVICE_DEPLOYMENT_COMPLETED"
+) -> Dict[str, Any]:
+    """An 'ECS Deployment State Change' event as EventBridge delivers it."""
+    return {
+        "version": "0",
+        "source": "aws.ecs",
+        "account": ACCOUNT_ID,
+        "region": REGION,
+        "detail-type": "ECS Deployment State Change",
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "resources": [service_arn],
+        "detail": {"eventType": "INFO", "eventName": event_name, "clusterArn": cluster_arn},
+    }
+
+
+def _filter_values(params: Dict[str, Any], name: str) -> Optional[List[str]]:
+    for f in params.get("Filters", []):
+        if f["Name"] == name:
+            return f["Values"]
+    return None
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _error(operation: str, code: str, message: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
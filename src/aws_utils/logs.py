@@ -0,0 +1,48 @@
+from . import AWSUtils
+from typing import Dict, Any, List, Optional
+
+
+class LogsUtils(AWSUtils):
+    def __init__(self, profile_name=None, **kwargs):
+        super().__init__(profile_name, **kwargs)
+
+    @property
+    def logs_client(self):
+        return self.client("logs")
+
+    def filter_log_events(
+        self,
+        log_group: str,
+        start_time: Optional[int] = None,
+        filter_pattern: Optional[str] = None,
+        log_stream_names: Optional[List[str]] = None,
+        log_stream_name_prefix: Optional[str] = None,
+        next_token: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get one page of log events from a log group, across all its streams.
+
+        :param log_group: Name of the log group
+        :param start_time: Only events at or after this time (milliseconds since the epoch)
+        :param filter_pattern: CloudWatch Logs filter pattern, applied by the service
+        :param log_stream_names: Only these streams (up to 100)
+        :param log_stream_name_prefix: Only streams with this prefix
+        :param next_token: Token from the previous page
+        :param limit: Maximum events in the page
+        :return: Dictionary with 'events' and, if there are more, 'nextToken'
+        """
+        kwargs: Dict[str, Any] = {"logGroupName": log_group}
+        if start_time is not None:
+            kwargs["startTime"] = start_time
+        if filter_pattern:
+            kwargs["filterPattern"] = filter_pattern
+        if log_stream_names:
+            kwargs["logStreamNames"] = log_stream_names
+        if log_stream_name_prefix:
+            kwargs["logStreamNamePrefix"] = log_stream_name_prefix
+        if next_token:
+            kwargs["nextToken"] = next_token
+        if limit:
+            kwargs["limit"] = limit
+        return self.aws_cmd("logs", "filter_log_events", **kwargs)
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # optional: without it SecureStrings are only cached in memory
+    Fernet = None
+    InvalidToken = Exception
+
+
+class ParameterCache:
+    """
+    Local cache of SSM parameter values keyed by scope, name and version.
+    The scope is the account and region the values were read from (see
+    SSMUtils.cache_scope), so profiles sharing a cache file never see each
+    other's values.
+
+    Values are held in memory for the life of the process and, if ``path``
+    is given, persisted between runs. SecureString values are written to
+    disk encrypted with Fernet (from the optional ``cryptography`` package)
+    using the key in $MIDSERVER_CACHE_KEY or ``<path>.key``; without the
+    package they are never written to disk. A key file next to the cache
+    only protects a copy of the cache on its own (a backup, a CI artifact):
+    anyone who can read the directory can read both. Set
+    $MIDSERVER_CACHE_KEY from a secret store to keep the key elsewhere.
+
+    The file is replaced atomically, so several processes can share it;
+    the last one to save wins. A file that can't be parsed is treated as
+    an empty cache, and entries written before caches were scoped are
+    dropped.
+
+    The cache doesn't decide whether a value is current. SSMUtils checks
+    versions against DescribeParameters before serving cached values.
+    """
+
+    KEY_ENV_VAR = "MIDSERVER_CACHE_KEY"
+
+    def __init__(self, path: Optional[str] = None, key: Optional[bytes] = None):
+        """
+        :param path: JSON file to persist the cache to, or None for memory only
+        :param key: Fernet key for SecureStrings; defaults to $MIDSERVER_CACHE_KEY or a key file next to path
+        """
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # (scope, name) -> (version, value, secure)
+        self._entries: Dict[Tuple[str, str], Tuple[int, str, bool]] = {}
+        self._fernet = self._load_fernet(key) if path and Fernet is not None else None
+        if path and os.path.exists(path):
+            self._load()
+
+    def get(self, name: str, version: Optional[int] = None, scope: str = "") -> Optional[str]:
+        """The cached value of a parameter, if cached (at ``version``, when given)."""
+        entry = self._entries.get((scope, name))
+        if entry is None or (version is not None and entry[0] != version):
+            return None
+        return entry[1]
+
+    def version(self, name: str, scope: str = "") -> Optional[int]:
+        entry = self._entries.get((scope, name))
+        return entry[0] if entry is not None else None
+
+    def put(self, name: str, version: int, value: str, secure: bool = False, scope: str = "") -> None:
+        with self._lock:
+            self._entries[(scope, name)] = (version, value, secure)
+
+    def discard(self, name: str, scope: str = "") -> None:
+        with self._lock:
+            self._entries.pop((scope, name), None)
+
+    def names(self, path: str = "/", scope: str = "") -> List[str]:
+        """Cached parameter names under a path."""
+        return [name for s, name in list(self._entries) if s == scope and name.startswith(path)]
+
+    def save(self) -> None:
+        """Write the cache to ``path``, encrypting SecureString values."""
+        if not self.path:
+            return
+        with self._lock:
+            entries = dict(self._entries)
+        data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (scope, name), (version, value, secure) in entries.items():
+            if not secure:
+                data.setdefault(scope, {})[name] = {"version": version, "value": value}
+            elif self._fernet is not None:
+                data.setdefault(scope, {})[name] = {
+                    "version": version,
+                    "secure": True,
+                    "value": self._fernet.encrypt(value.encode("utf-8")).decode("ascii"),
+                }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable parameter cache {self.path}: {e}")
+            return
+        for scope, entries in data.items():
+            if scope.startswith("/"):
+                # An unscoped entry from an older cache; its account is unknown.
+                continue
+            for name, entry in entries.items():
+                value = entry["value"]
+                if entry.get("secure"):
+                    if self._fernet is None:
+                        continue
+                    try:
+                        value = self._fernet.decrypt(value.encode("ascii")).decode("utf-8")
+                    except InvalidToken:
+                        # Encrypted with a different key; refetch it.
+                        continue
+                self._entries[(scope, name)] = (entry["version"], value, bool(entry.get("secure")))
+
+    def _load_fernet(self, key: Optional[bytes]) -> Any:
+        key = key or os.environ.get(self.KEY_ENV_VAR, "").encode("ascii") or None
+        if key is None:
+            key_file = f"{self.path}.key"
+            if not os.path.exists(key_file):
+                self._create_key_file(key_file)
+            with open(key_file, "rb") as f:
+                key = f.read().strip()
+        return Fernet(key)
+
+    @staticmethod
+    def _create_key_file(key_file: str) -> None:
+        directory = os.path.dirname(key_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Written in full under a temporary name and then linked into place,
+        # so a process racing to create it reads either no file or the
+        # whole key; if another process got there first, its key is used.
+        tmp = f"{key_file}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(Fernet.generate_key())
+        try:
+            os.link(tmp, key_file)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
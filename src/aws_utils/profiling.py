@@ -0,0 +1,262 @@
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional
+from .tracing import Span, Tracer, tracer as default_tracer
+
+# Span name used by CredentialProvider for creating sessions and clients
+SESSION_SETUP = "session_setup"
+
+
+@dataclass
+class PhaseTiming:
+    """
+    Where one phase of a run spent its wall-clock time.
+
+    ``network`` is time the phase's thread spent inside AWS calls without
+    using CPU, i.e. blocked on the endpoint. ``other`` is what is left after
+    CPU and network time: sleeping between polls, waiting for rate limiter
+    tokens or worker threads.
+    """
+
+    name: str
+    wall: float
+    cpu: float = 0.0
+    network: float = 0.0
+    calls: int = 0
+
+    @property
+    def other(self) -> float:
+        return max(0.0, self.wall - self.cpu - self.network)
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(asdict(self), other=self.other)
+
+
+def phase_timings(spans: Iterable[Span]) -> List[PhaseTiming]:
+    """
+    Break finished spans down into phases, in the order they started.
+
+    The phases are the children of a root span (e.g. the steps under
+    'deploy'), or the root span itself when it has no children other than
+    AWS calls. Session and client setup is reported as its own 'session
+    setup' phase and left out of the phase it happened in. Phases with the
+    same name are added up.
+    """
+    spans = sorted((span for span in spans if span.end_ns is not None), key=lambda s: s.start_ns)
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in spans:
+        children.setdefault(span.parent_id, []).append(span)
+
+    def is_call(span: Span) -> bool:
+        return "aws.service" in span.attributes
+
+    phases: Dict[str, PhaseTiming] = {}
+    setup = PhaseTiming("session setup", 0.0)
+
+    def add_setup(span: Span) -> None:
+        # Nested setup spans (a client creating the session) are already counted.
+        setup.wall += span.duration
+        setup.cpu += span.cpu_time
+
+    def add_phase(span: Span) -> None:
+        phase = phases.setdefault(span.name, PhaseTiming(span.name, 0.0))
+        phase.wall += span.duration
+        phase.cpu += span.cpu_time
+        stack = list(children.get(span.span_id, []))
+        while stack:
+            child = stack.pop()
+            if child.name == SESSION_SETUP:
+                add_setup(child)
+                if child.thread_id == span.thread_id:
+                    phase.wall -= child.duration
+                    phase.cpu -= child.cpu_time
+                continue
+            if is_call(child):
+                phase.calls += 1
+                if child.thread_id == span.thread_id:
+                    phase.network += max(0.0, child.duration - child.cpu_time)
+            stack.extend(children.get(child.span_id, []))
+
+    for root in children.get(None, []):
+        if root.name == SESSION_SETUP:
+            add_setup(root)
+            continue
+        if is_call(root):
+            continue
+        nested = children.get(root.span_id, [])
+        if all(is_call(child) or child.name == SESSION_SETUP for child in nested):
+            add_phase(root)
+            continue
+        for child in nested:
+            if child.name == SESSION_SETUP:
+                add_setup(child)
+            elif is_call(child):
+                # Calls made directly under the root belong to no phase.
+                continue
+            else:
+                add_phase(child)
+
+    result = list(phases.values())
+    if setup.wall:
+        result.insert(0, setup)
+    return result
+
+
+class Profiler:
+    """
+    Profiles one run of a script: cProfile for the main thread, a
+    wall-clock sampler for every thread, and a phase timing table built from
+    the tracer's spans.
+
+    ``write`` saves, for diffing between releases:
+
+    - ``<prefix>.pstats``: cProfile stats (``python -m pstats``, snakeviz)
+    - ``<prefix>.collapsed``: sampled stacks, one ``thread;frame;... count``
+      line each, for flamegraph.pl, speedscope or a plain diff
+    - ``<prefix>.phases.txt`` and ``<prefix>.phases.json``: the phase table
+
+    The sampler sees threads that are blocked in socket reads or sleeping,
+    which cProfile attributes to a handful of C functions. Frames are named
+    ``module:qualname`` without line numbers so that stacks from different
+    releases line up.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "profile",
+        interval: float = 0.005,
+        started: Optional[float] = None,
+        tracer: Optional[Tracer] = None,
+    ):
+        """
+        :param directory: Directory to write the profile files to
+        :param prefix: File name prefix, e.g. 'deploy-dev-20240101T120000'
+        :param interval: Seconds between stack samples
+        :param started: time.perf_counter() when the script started, before
+            its imports; the time until start() is reported as 'import'
+        :param tracer: Tracer whose spans make up the phases; it is enabled on start()
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.interval = interval
+        self.started = started
+        self.tracer = tracer if tracer is not None else default_tracer
+        self.samples: Counter = Counter()
+        self._profile = cProfile.Profile()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._imports: Optional[PhaseTiming] = None
+        self._start = 0.0
+        self._elapsed: Optional[float] = None
+        self._cpu: Optional[float] = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        if self.started is not None:
+            # process_time() so far also includes interpreter startup.
+            self._imports = PhaseTiming("import", self._start - self.started, time.process_time())
+        self.tracer.enabled = True
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._elapsed = time.perf_counter() - (self.started if self.started is not None else self._start)
+        self._cpu = time.process_time()
+
+    def phases(self) -> List[PhaseTiming]:
+        """The phase table: imports, session setup, one row per step, and the remainder."""
+        phases = [self._imports] if self._imports is not None else []
+        phases += phase_timings(self.tracer.spans)
+        if self._elapsed is not None:
+            rest = self._elapsed - sum(phase.wall for phase in phases)
+            if rest > 0.0005:
+                phases.append(PhaseTiming("unattributed", rest))
+        return phases
+
+    def render(self) -> str:
+        """Render the phase table as plain text."""
+        phases = self.phases()
+        rows = [("PHASE", "WALL", "CPU", "NETWORK", "OTHER", "CALLS")]
+        rows += [
+            (p.name, f"{p.wall:.3f}", f"{p.cpu:.3f}", f"{p.network:.3f}", f"{p.other:.3f}", str(p.calls))
+            for p in phases
+        ]
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = []
+        for row in rows:
+            cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append("  ".join(cells))
+        if self._elapsed is not None:
+            lines.append(f"Total: {self._elapsed:.3f}s wall, {self._cpu:.3f}s CPU (all threads)")
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """Sampled stacks in collapsed format, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def write(self) -> List[str]:
+        """
+        Write the profile files to the directory.
+
+        :return: Paths of the written files
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.prefix)
+        self._profile.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", "w") as f:
+            f.write(self.collapsed())
+        with open(f"{base}.phases.txt", "w") as f:
+            f.write(self.render() + "\n")
+        with open(f"{base}.phases.json", "w") as f:
+            json.dump(
+                {"phases": [phase.to_dict() for phase in self.phases()], "wall": self._elapsed, "cpu": self._cpu},
+                f,
+                indent=2,
+            )
+        return [f"{base}.{suffix}" for suffix in ("pstats", "collapsed", "phases.txt", "phases.json")]
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: _thread_label(thread.name) for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, "thread"))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}".replace(";", ",").replace(" ", "_")
+
+
+def _thread_label(name: str) -> str:
+    # Pool threads are numbered in start order, which varies between runs.
+    return re.sub(r"[-_]?\d+", "", name).replace(";", ",").replace(" ", "_") or "thread"
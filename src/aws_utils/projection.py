@@ -0,0 +1,120 @@
+import functools
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+import jmespath
+from botocore.loaders import create_loader
+
+# A JMESPath expression, or field paths such as ["VpcId", "Cidr=CidrBlock"]
+ProjectionSpec = Union[str, Sequence[str]]
+
+
+class Record:
+    """
+    Base class of the compact records a projection produces.
+
+    Records keep only the projected fields, in ``__slots__`` (no per-item
+    dict), and can also be read like the response dicts they replace:
+    ``record.VpcId``, ``record["VpcId"]`` and ``record.get("VpcId")``.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values: Any):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default)
+
+    def _asdict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self._asdict() == other._asdict()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Record({fields})"
+
+
+@functools.lru_cache(maxsize=None)
+def record_type(fields: Tuple[str, ...]) -> type:
+    """The Record subclass with these fields (one class per field tuple)."""
+    for name in fields:
+        if not name.isidentifier():
+            raise ValueError(f"Invalid record field name: {name}")
+    return type("Record", (Record,), {"__slots__": fields})
+
+
+class Projection:
+    """
+    Reduces response items to the fields a caller uses.
+
+    A list of field paths (dotted for nested keys, ``alias=path`` to rename)
+    yields a Record per item. A JMESPath expression is evaluated against each
+    item: a multi-select hash (``{id: VpcId, cidr: CidrBlock}``) yields a
+    Record, any other result is returned as is.
+    """
+
+    def __init__(self, spec: ProjectionSpec):
+        self.spec = spec
+        if isinstance(spec, str):
+            self._expression = jmespath.compile(spec)
+            self._paths: Optional[Tuple[Tuple[str, ...], ...]] = None
+            return
+        self._expression = None
+        names, paths = [], []
+        for field in spec:
+            name, _, path = field.partition("=") if "=" in field else (field.rsplit(".", 1)[-1], "", field)
+            names.append(name)
+            paths.append(tuple(path.split(".")))
+        self._record = record_type(tuple(names))
+        self._paths = tuple(paths)
+
+    def __call__(self, item: Dict[str, Any]) -> Any:
+        if self._expression is not None:
+            value = self._expression.search(item)
+            if isinstance(value, dict):
+                return record_type(tuple(value))(*value.values())
+            return value
+        return self._record(*(_lookup(item, path) for path in self._paths))
+
+
+def as_projection(spec: Optional[Union[ProjectionSpec, Projection]]) -> Optional[Callable[[Dict[str, Any]], Any]]:
+    if spec is None or isinstance(spec, Projection):
+        return spec
+    return Projection(spec)
+
+
+def _lookup(item: Any, path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(item, dict):
+            return None
+        item = item.get(key)
+    return item
+
+
+@functools.lru_cache(maxsize=None)
+def paginator_config(service: str, operation: str) -> Dict[str, Any]:
+    """
+    botocore's pagination settings for an operation (input/output token,
+    limit key, result key), read from its bundled data without a client.
+
+    :param operation: Python operation name, e.g. 'describe_subnets'
+    """
+    model = _loader().load_service_model(service, "paginators-1")
+    name = "".join(part.capitalize() for part in operation.split("_"))
+    try:
+        return dict(model["pagination"][name])
+    except KeyError:
+        raise ValueError(f"{service}:{operation} is not paginated") from None
+
+
+@functools.lru_cache(maxsize=1)
+def _loader() -> Any:
+    return create_loader()
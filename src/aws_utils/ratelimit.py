@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from . import cancellation
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``rate`` tokens per second, holding at most
+    ``burst``. Used to keep bulk writes under per-API throughput caps so they
+    don't spend their time in throttling retries.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        :param rate: Tokens added per second
+        :param burst: Bucket size; defaults to ``rate`` (one second of calls)
+        :param clock: Time source, for tests
+        :param sleep: Sleep function, for tests
+        """
+        if rate <= 0:
+            raise ValueError(f"Invalid rate: {rate}. Must be greater than 0")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take ``tokens`` if available.
+
+        :return: 0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until ``tokens`` are available and take them.
+
+        :return: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return waited
+            self.sleep(delay)
+            waited += delay
+
+
+# Default calls per second admitted per service across all deployments on a
+# host, kept under the standard account quotas for the APIs the deployer uses.
+DEFAULT_SERVICE_RATES = {
+    "ec2": 20.0,
+    "ecs": 20.0,
+    "ecr": 10.0,
+    "iam": 10.0,
+    "logs": 5.0,
+    "ssm": 10.0,
+    "sts": 20.0,
+}
+
+# Shared state of the cross-process buckets, one file per service
+RATE_LIMIT_DIR = os.path.join(".midserver", "ratelimit")
+
+
+class SharedRateLimiter:
+    """
+    Admits AWS calls per service for every deployer process on the host.
+
+    Each service has one token bucket kept in ``<directory>/<service>.json``
+    and updated under an exclusive file lock, so concurrent deploy.py runs
+    share the account's throughput instead of throttling each other into
+    retry storms. Calls are admitted by start-time fair queuing: a
+    deployment waiting for a token is tagged with a virtual start time
+    (advanced by 1/weight per call), and the waiting deployment with the
+    lowest tag gets the next token. Backlogged deployments therefore share
+    the rate in proportion to their weights, and one that was idle gets no
+    credit for it. Waiters that stop polling for ``stale_after`` seconds
+    (e.g. a killed process) are dropped from the queue.
+
+    Without fcntl (Windows) the file is only locked within the process.
+    """
+
+    def __init__(
+        self,
+        deployment: str,
+        weight: float = 1.0,
+        rates: Optional[Dict[str, float]] = None,
+        directory: str = RATE_LIMIT_DIR,
+        poll_interval: float = 0.05,
+        stale_after: float = 2.0,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = cancellation.sleep,
+    ):
+        """
+        :param deployment: Name of this deployment in the queue, unique per process
+        :param weight: Share of each service's rate relative to other deployments
+        :param rates: Calls per second per service; services not listed aren't limited
+        :param directory: Directory of the shared state files
+        :param poll_interval: Longest sleep between checks while waiting for a turn
+        :param stale_after: Seconds after which a silent waiter is dropped
+        :param clock: Wall-clock time source (shared between processes), for tests
+        :param sleep: Sleep function, for tests
+        """
+        if weight <= 0:
+            raise ValueError(f"Invalid weight: {weight}. Must be greater than 0")
+        self.deployment = deployment
+        self.weight = weight
+        self.rates = dict(DEFAULT_SERVICE_RATES if rates is None else rates)
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.clock = clock
+        self.sleep = sleep
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def acquire(self, service: str, tokens: float = 1.0) -> float:
+        """
+        Block until this deployment may make a call to ``service``.
+
+        :return: Seconds spent waiting
+        """
+        if service not in self.rates:
+            return 0.0
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(service, tokens)
+            if not delay:
+                return waited
+            delay = min(delay, self.poll_interval)
+            self.sleep(delay)
+            waited += delay
+
+    def try_acquire(self, service: str, tokens: float = 1.0) -> float:
+        """
+        Take a token if it is this deployment's turn and one is available;
+        otherwise join (or stay in) the queue.
+
+        :return: 0 if admitted, otherwise seconds to wait before trying again
+        """
+        rate = self.rates.get(service)
+        if rate is None:
+            return 0.0
+        with self._locked(service) as state:
+            now = self.clock()
+            bucket = state.setdefault("bucket", {"tokens": max(rate, 1.0), "updated": now})
+            bucket["tokens"] = min(max(rate, 1.0), bucket["tokens"] + max(now - bucket["updated"], 0) * rate)
+            bucket["updated"] = now
+            waiting = state.setdefault("waiting", {})
+            finished = state.setdefault("finished", {})
+            for name in [n for n, w in waiting.items() if now - w["seen"] > self.stale_after]:
+                del waiting[name]
+            for name in [n for n, f in finished.items() if now - f["at"] > 60 and n not in waiting]:
+                del finished[name]
+
+            me = waiting.get(self.deployment)
+            if me is None:
+                # Start where this deployment's previous call finished, but
+                # never behind the call being served now.
+                start = max(state.get("virtual_time", 0.0), finished.get(self.deployment, {}).get("tag", 0.0))
+                me = waiting[self.deployment] = {"start": start, "seen": now}
+            me["seen"] = now
+            head = min(waiting, key=lambda name: (waiting[name]["start"], name))
+            if head == self.deployment and bucket["tokens"] >= tokens:
+                bucket["tokens"] -= tokens
+                state["virtual_time"] = me["start"]
+                finished[self.deployment] = {"tag": me["start"] + tokens / self.weight, "at": now}
+                del waiting[self.deployment]
+                return 0.0
+            if bucket["tokens"] < tokens:
+                return (tokens - bucket["tokens"]) / rate
+            return self.poll_interval
+
+    @contextmanager
+    def _locked(self, service: str) -> Iterator[Dict[str, Any]]:
+        with self._locks_lock:
+            thread_lock = self._locks.setdefault(service, threading.Lock())
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{service}.json")
+        with thread_lock, open(f"{path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state: Dict[str, Any] = {}
+                if os.path.exists(path):
+                    with open(path) as f:
+                        try:
+                            state = json.load(f)
+                        except ValueError:
+                            state = {}
+                yield state
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp, path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def parse_rates(spec: str, defaults: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    'ecs=20,iam=5' -> {'ecs': 20.0, 'iam': 5.0}, on top of ``defaults``.
+
+    :param spec: Comma-separated service=calls_per_second pairs
+    :param defaults: Rates for services the spec doesn't name; defaults to DEFAULT_SERVICE_RATES
+    """
+    rates = dict(DEFAULT_SERVICE_RATES if defaults is None else defaults)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        service, _, value = item.partition("=")
+        try:
+            rates[service.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid rate: {item}. Use service=calls_per_second") from None
+    return rates
@@ -0,0 +1,49 @@
+from . import AWSUtils
+from typing import Dict, Any, List
+
+
+class SQSUtils(AWSUtils):
+    def __init__(self, profile_name=None, **kwargs):
+        super().__init__(profile_name, **kwargs)
+
+    @property
+    def sqs_client(self):
+        return self.client("sqs")
+
+    def receive_messages(self, queue_url: str, max_messages: int = 10, wait_time: int = 20) -> List[Dict[str, Any]]:
+        """
+        Receive messages from a queue, long polling until one arrives.
+
+        :param queue_url: URL of the queue
+        :param max_messages: Messages per call (at most 10)
+        :param wait_time: Seconds to wait for a message (at most 20); must be below the transport's read timeout
+        :return: Messages, each with a Body and ReceiptHandle; empty if none arrived in time
+        """
+        response = self.aws_cmd(
+            "sqs",
+            "receive_message",
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=wait_time,
+        )
+        return response.get("Messages", [])
+
+    def delete_messages(self, queue_url: str, receipt_handles: List[str]) -> List[str]:
+        """
+        Delete received messages, 10 per call.
+
+        :param queue_url: URL of the queue
+        :param receipt_handles: Receipt handles of the messages
+        :return: Receipt handles of the messages that couldn't be deleted
+        """
+        failed = []
+        for start in range(0, len(receipt_handles), 10):
+            batch = receipt_handles[start:start + 10]
+            response = self.aws_cmd(
+                "sqs",
+                "delete_message_batch",
+                QueueUrl=queue_url,
+                Entries=[{"Id": str(i), "ReceiptHandle": handle} for i, handle in enumerate(batch)],
+            )
+            failed += [batch[int(failure["Id"])] for failure in response.get("Failed", [])]
+        return failed
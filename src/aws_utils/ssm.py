@@ -1,11 +1,25 @@
-from . import AWSUtils
+import time
+from . import AWSUtils, error_code
+from .parameter_cache import ParameterCache
+from botocore.exceptions import ClientError
 from typing import Dict, Any, List, Optional
 
 
 class SSMUtils(AWSUtils):
-    def __init__(self, profile_name=None):
-        super().__init__(profile_name)
-        self.ssm_client = self.session.client("ssm")
+    def __init__(self, profile_name=None, cache: Optional[ParameterCache] = None, cache_max_age: float = 60,
+                 **kwargs):
+        """
+        :param cache: Cache for decrypted parameter reads, or None to always call SSM
+        :param cache_max_age: Seconds before cached values under a path are checked against SSM again
+        """
+        super().__init__(profile_name, **kwargs)
+        self.cache = cache
+        self.cache_max_age = cache_max_age
+        self._validated: Dict[str, float] = {}
+
+    @property
+    def ssm_client(self):
+        return self.client("ssm")
 
     def put_parameter(
         self,
@@ -43,13 +57,67 @@ class SSMUtils(AWSUtils):
         :param with_decryption: Whether to decrypt the parameter value
         :return: Parameter value, or None if the parameter doesn't exist
         """
+        if self.cache is not None and with_decryption:
+            path = name.rsplit("/", 1)[0] + "/"
+            if time.monotonic() - self._validated.get(path, float("-inf")) > self.cache_max_age:
+                self.refresh_cache(path)
+            value = self.cache.get(name, scope=self.cache_scope)
+            if value is not None:
+                return value
         try:
             response = self.aws_cmd(
                 "ssm", "get_parameter", Name=name, WithDecryption=with_decryption
             )
-            return response["Parameter"]["Value"]
-        except self.ssm_client.exceptions.ParameterNotFound:
-            return None
+            parameter = response["Parameter"]
+            if self.cache is not None and with_decryption:
+                self.cache.put(
+                    name,
+                    parameter["Version"],
+                    parameter["Value"],
+                    parameter.get("Type") == "SecureString",
+                    scope=self.cache_scope,
+                )
+            return parameter["Value"]
+        except ClientError as e:
+            if error_code(e) == "ParameterNotFound":
+                return None
+            raise
+
+    def refresh_cache(self, path: str) -> int:
+        """
+        Bring the cached values under a path up to date. One DescribeParameters
+        pass finds the current versions; only parameters whose version differs
+        from the cached one are fetched (and decrypted), 10 per call, and
+        parameters that no longer exist are dropped.
+
+        :param path: Path to refresh, e.g. '/midserver/dev/'
+        :return: Number of parameters fetched
+        """
+        if self.cache is None:
+            return 0
+        scope = self.cache_scope
+        current = {
+            p["Name"]: p for p in self.describe_parameters(path, recursive=False)
+        }
+        for name in self.cache.names(path, scope=scope):
+            if name not in current and "/" not in name[len(path):]:
+                self.cache.discard(name, scope=scope)
+        stale = [name for name, p in current.items() if self.cache.version(name, scope=scope) != p["Version"]]
+        if stale:
+            response_values = self.get_parameters(stale, with_decryption=True)
+            for name in stale:
+                if name in response_values:
+                    self.cache.put(
+                        name,
+                        current[name]["Version"],
+                        response_values[name],
+                        current[name].get("Type") == "SecureString",
+                        scope=scope,
+                    )
+            self.cache.save()
+        self._validated[path] = time.monotonic()
+        self.logger.debug(f"Refreshed parameter cache for {path}: {len(stale)} of {len(current)} parameters fetched")
+        return len(stale)
 
     def delete_parameter(self, name: str) -> None:
         """
@@ -59,9 +127,24 @@ class SSMUtils(AWSUtils):
         """
         try:
             self.aws_cmd("ssm", "delete_parameter", Name=name)
-        except self.ssm_client.exceptions.ParameterNotFound:
+        except ClientError as e:
+            if error_code(e) != "ParameterNotFound":
+                raise
             self.logger.warning(f"Parameter {name} not found, skipping deletion.")
 
+    def delete_parameters(self, names: List[str]) -> List[str]:
+        """
+        Delete parameters from SSM Parameter Store, 10 per call.
+
+        :param names: Names of the parameters to delete
+        :return: Names that didn't exist
+        """
+        invalid: List[str] = []
+        for i in range(0, len(names), 10):
+            response = self.aws_cmd("ssm", "delete_parameters", Names=names[i:i + 10])
+            invalid.extend(response.get("InvalidParameters", []))
+        return invalid
+
     def get_parameters_by_path(
         self, path: str, recursive: bool = True, with_decryption: bool = True
     ) -> List[Dict[str, Any]]:
@@ -82,6 +165,50 @@ class SSMUtils(AWSUtils):
         )
         return response["Parameters"]
 
+    def describe_parameters(self, path: str, recursive: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get the metadata (name, type, version, description) of the parameters
+        under a path, without reading or decrypting their values.
+
+        :param path: Path to describe, e.g. '/midserver/dev/'
+        :param recursive: Whether to include parameters in nested paths
+        :return: List of parameter metadata dictionaries
+        """
+        parameters: List[Dict[str, Any]] = []
+        kwargs: Dict[str, Any] = {
+            "ParameterFilters": [
+                {
+                    "Key": "Path",
+                    "Option": "Recursive" if recursive else "OneLevel",
+                    "Values": [path.rstrip("/") or "/"],
+                }
+            ],
+            "MaxResults": 50,
+        }
+        while True:
+            response = self.aws_cmd("ssm", "describe_parameters", **kwargs)
+            parameters.extend(response["Parameters"])
+            if not response.get("NextToken"):
+                return parameters
+            kwargs["NextToken"] = response["NextToken"]
+
+    def get_parameters(self, names: List[str], with_decryption: bool = True) -> Dict[str, str]:
+        """
+        Get several parameters, 10 per call (the GetParameters limit).
+
+        :param names: Names of the parameters
+        :param with_decryption: Whether to decrypt the parameter values
+        :return: Values by parameter name; parameters that don't exist are left out
+        """
+        values: Dict[str, str] = {}
+        for i in range(0, len(names), 10):
+            response = self.aws_cmd(
+                "ssm", "get_parameters", Names=names[i:i + 10], WithDecryption=with_decryption
+            )
+            for parameter in response["Parameters"]:
+                values[parameter["Name"]] = parameter["Value"]
+        return values
+
 
 # Example usage
 if __name__ == "__main__":
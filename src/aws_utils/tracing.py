@@ -0,0 +1,227 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation. Spans nest through the current execution context."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "thread_id",
+        "cpu_start_ns",
+        "cpu_ns",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.thread_id = threading.get_ident()
+        self.cpu_start_ns = time.thread_time_ns()
+        self.cpu_ns: Optional[int] = None
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds (up to now if the span is still open)."""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    @property
+    def cpu_time(self) -> float:
+        """CPU seconds the span's own thread used while it was open (0 until it ends)."""
+        return (self.cpu_ns or 0) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class Tracer:
+    """
+    Collects spans for deploy steps and AWS calls and exports them as
+    OTLP/JSON (for tracing backends) or Chrome trace events (for flame chart
+    viewers such as Perfetto or speedscope).
+
+    A disabled tracer still yields spans so callers don't need to check, but
+    doesn't keep them.
+    """
+
+    def __init__(self, service_name: str = "midserver-deployer", enabled: bool = True):
+        self.service_name = service_name
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Time a block of code as a span nested under the current span.
+
+        :param name: Span name, e.g. '_setup_network' or 'ecs.describe_services'
+        :param attributes: Extra attributes recorded on the span
+        """
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            span.cpu_ns = time.thread_time_ns() - span.cpu_start_ns
+            _current_span.reset(token)
+            if self.enabled:
+                with self._lock:
+                    self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        """Finished spans, in order of completion."""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def critical_path(self, root: Optional[Span] = None) -> List[Span]:
+        """
+        Follow the child that finished last at each level, starting from the
+        longest root span. These are the spans that determined the total
+        duration.
+        """
+        spans = self.spans
+        children: Dict[Optional[str], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+        if root is None:
+            roots = children.get(None, [])
+            if not roots:
+                return []
+            root = max(roots, key=lambda s: s.duration)
+        path = [root]
+        while children.get(path[-1].span_id):
+            path.append(max(children[path[-1].span_id], key=lambda s: s.end_ns))
+        return path
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Spans in the OTLP/JSON ExportTraceServiceRequest format."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [_otlp_span(span) for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Spans as Chrome trace 'complete' events, one track per thread."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "cat": span.attributes.get("aws.service", "deploy"),
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": dict(span.attributes, **({"error": span.error} if span.error else {})),
+            }
+            for span in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, directory: str, prefix: str = "trace") -> List[str]:
+        """
+        Write <prefix>.otlp.json and <prefix>.chrome.json to a directory.
+
+        :return: Paths of the written files
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for suffix, data in (("otlp", self.to_otlp()), ("chrome", self.to_chrome_trace())):
+            path = os.path.join(directory, f"{prefix}.{suffix}.json")
+            with open(path, "w") as f:
+                json.dump(data, f, default=str)
+            paths.append(path)
+        return paths
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def propagate(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Bind ``fn`` to a copy of the caller's context so spans opened in a worker
+    thread nest under the span that submitted the work. Each call runs in its
+    own copy, so the wrapped function can be used from several threads at
+    once (e.g. with ``executor.map``).
+    """
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        result.append({"key": key, "value": encoded})
+    return result
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 3 if "aws.service" in span.attributes else 1,  # CLIENT for AWS calls, else INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _otlp_attributes(dict(span.attributes, **{"thread.id": span.thread_id})),
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    return data
+
+
+# Shared by every AWSUtils instance that isn't given its own tracer. Disabled
+# until a caller (e.g. deploy.py --trace) turns it on.
+tracer = Tracer(enabled=False)
@@ -0,0 +1,134 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+from botocore.config import Config
+
+
+@dataclass(frozen=True)
+class TransportProfile:
+    """
+    HTTP settings applied to every boto3 client created by AWSUtils.
+
+    The defaults match botocore's own, so a plain TransportProfile() changes
+    nothing. Use for_concurrency() when calls are made from several threads.
+    """
+
+    max_pool_connections: int = 10
+    connect_timeout: float = 60
+    read_timeout: float = 60
+    tcp_keepalive: bool = False
+    region_name: Optional[str] = None
+    use_fips_endpoint: bool = False
+    max_attempts: Optional[int] = None
+    retry_mode: Optional[str] = None
+    endpoint_urls: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def for_concurrency(cls, concurrency: int, **overrides: Any) -> "TransportProfile":
+        """
+        A profile sized for ``concurrency`` threads sharing each client: one
+        pooled connection per thread plus headroom for retries, keep-alive on
+        and shorter connect timeouts so a dead endpoint fails fast.
+
+        :param concurrency: Number of threads expected to call AWS at once
+        :param overrides: Any other TransportProfile fields
+        """
+        settings: Dict[str, Any] = {
+            "max_pool_connections": max(10, concurrency + concurrency // 4 + 1),
+            "connect_timeout": 5,
+            "read_timeout": 30,
+            "tcp_keepalive": True,
+            "max_attempts": 5,
+            "retry_mode": "standard",
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    def botocore_config(self) -> Config:
+        settings: Dict[str, Any] = {
+            "max_pool_connections": self.max_pool_connections,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "tcp_keepalive": self.tcp_keepalive,
+        }
+        # Only override the region, FIPS and retry settings from the AWS
+        # config file / environment when explicitly asked to.
+        if self.region_name:
+            settings["region_name"] = self.region_name
+        if self.use_fips_endpoint:
+            settings["use_fips_endpoint"] = True
+        if self.max_attempts or self.retry_mode:
+            retries: Dict[str, Any] = {}
+            if self.max_attempts:
+                retries["max_attempts"] = self.max_attempts
+            if self.retry_mode:
+                retries["mode"] = self.retry_mode
+            settings["retries"] = retries
+        return Config(**settings)
+
+    def client_kwargs(self, service: str) -> Dict[str, Any]:
+        """Keyword arguments for boto3 Session.client(service, ...)."""
+        kwargs: Dict[str, Any] = {"config": self.botocore_config()}
+        if service in self.endpoint_urls:
+            kwargs["endpoint_url"] = self.endpoint_urls[service]
+        return kwargs
+
+
+class PoolMetrics:
+    """
+    Limits in-flight calls per service to the size of the client's
+    connection pool and records how long callers waited for a free slot.
+
+    urllib3 doesn't block when a pool is exhausted; it opens throwaway
+    connections instead, losing keep-alive. Gating here keeps every call on
+    a pooled connection and makes the queueing visible.
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def slot(self, service: str) -> Iterator[None]:
+        """Hold one pooled connection for ``service`` for the duration of a call."""
+        with self._lock:
+            semaphore = self._slots.get(service)
+            if semaphore is None:
+                semaphore = self._slots[service] = threading.BoundedSemaphore(self.max_connections)
+                self._stats[service] = {
+                    "in_use": 0,
+                    "peak_in_use": 0,
+                    "calls": 0,
+                    "waits": 0,
+                    "wait_seconds": 0.0,
+                    "max_wait_seconds": 0.0,
+                }
+        waited = 0.0
+        if not semaphore.acquire(blocking=False):
+            start = time.perf_counter()
+            semaphore.acquire()
+            waited = time.perf_counter() - start
+        with self._lock:
+            stats = self._stats[service]
+            stats["calls"] += 1
+            stats["in_use"] += 1
+            stats["peak_in_use"] = max(stats["peak_in_use"], stats["in_use"])
+            if waited:
+                stats["waits"] += 1
+                stats["wait_seconds"] += waited
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stats[service]["in_use"] -= 1
+            semaphore.release()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-service pool usage and wait statistics."""
+        with self._lock:
+            return {service: dict(stats) for service, stats in self._stats.items()}
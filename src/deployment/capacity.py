@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+FARGATE = "FARGATE"
+FARGATE_SPOT = "FARGATE_SPOT"
+
+
+@dataclass(frozen=True)
+class CapacityStrategy:
+    """
+    Where the MID server tasks run: the first ``base`` tasks always on
+    FARGATE, and tasks beyond that split between FARGATE and FARGATE_SPOT in
+    the ratio ``on_demand_weight:spot_weight``. The default keeps one MID
+    server on on-demand capacity and runs every extra worker on Spot.
+
+    Spot tasks can be stopped with two minutes' notice. The task definition
+    gives the container that long to stop, and the image's entrypoint lets
+    the MID agent use it to finish its work and shut down cleanly; ECS then
+    starts a replacement task.
+    """
+
+    base: int = 1
+    on_demand_weight: int = 0
+    spot_weight: int = 1
+
+    def __post_init__(self):
+        if self.base < 0 or self.on_demand_weight < 0 or self.spot_weight < 0:
+            raise ValueError("Capacity provider base and weights must not be negative")
+        if not self.on_demand_weight and not self.spot_weight:
+            raise ValueError("At least one capacity provider weight must be positive")
+
+    @property
+    def providers(self) -> List[str]:
+        """Capacity providers the cluster must have."""
+        return [FARGATE, FARGATE_SPOT]
+
+    def to_api(self) -> List[Dict[str, Any]]:
+        """The strategy as ECS capacityProviderStrategy items."""
+        return [
+            {"capacityProvider": FARGATE, "base": self.base, "weight": self.on_demand_weight},
+            {"capacityProvider": FARGATE_SPOT, "base": 0, "weight": self.spot_weight},
+        ]
+
+    def matches(self, strategy: Optional[List[Dict[str, Any]]]) -> bool:
+        """Whether a service's (or task set's) capacityProviderStrategy is this one."""
+        return _normalize(strategy) == _normalize(self.to_api())
+
+    def describe(self) -> str:
+        return f"{FARGATE} base {self.base}, {FARGATE}:{FARGATE_SPOT} {self.on_demand_weight}:{self.spot_weight}"
+
+
+def _normalize(strategy: Optional[List[Dict[str, Any]]]) -> List[tuple]:
+    # ECS leaves out base and weight when they are 0.
+    return sorted(
+        (item["capacityProvider"], item.get("base", 0), item.get("weight", 0)) for item in strategy or []
+    )
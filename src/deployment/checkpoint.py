@@ -0,0 +1,130 @@
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# One file per environment, holding the checkpoints of its recent deploys
+CHECKPOINT_DIR = os.path.join(".midserver", "deploys")
+
+
+class DeployCheckpoint:
+    """
+    The completed steps of one deploy and their outputs.
+
+    Every ``record`` rewrites the environment's state file atomically, so a
+    deploy that dies at any point leaves the steps that finished before it.
+    """
+
+    def __init__(self, store: "CheckpointStore", environment: str, deploy_id: str, entry: Dict[str, Any]):
+        self.store = store
+        self.environment = environment
+        self.deploy_id = deploy_id
+        self.entry = entry
+
+    @property
+    def steps(self) -> Dict[str, Dict[str, Any]]:
+        return self.entry["steps"]
+
+    @property
+    def completed(self) -> bool:
+        return self.entry.get("completed_at") is not None
+
+    def outputs(self, step: str) -> Optional[Any]:
+        """The outputs recorded for a step, or None if it hasn't completed."""
+        recorded = self.steps.get(step)
+        return recorded["outputs"] if recorded is not None else None
+
+    def record(self, step: str, outputs: Any) -> None:
+        self.steps[step] = {"outputs": outputs, "completed_at": _now()}
+        self.store.save(self)
+
+    def discard_from(self, step: str) -> None:
+        """Forget a step and every step recorded after it."""
+        names = list(self.steps)
+        if step in names:
+            for name in names[names.index(step):]:
+                del self.steps[name]
+            self.store.save(self)
+
+    def complete(self) -> None:
+        self.entry["completed_at"] = _now()
+        self.store.save(self)
+
+
+class CheckpointStore:
+    """
+    Deploy checkpoints in ``<directory>/<environment>.json``, by deploy ID.
+
+    ``start`` resumes the newest unfinished deploy of the environment whose
+    inputs (image, strategy) match, so a rerun after a failure continues
+    where the failed run stopped; a deploy with different inputs starts
+    from scratch. Only the newest ``keep`` deploys are kept.
+    """
+
+    def __init__(self, directory: str = CHECKPOINT_DIR, keep: int = 10):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def path(self, environment: str) -> str:
+        return os.path.join(self.directory, f"{environment}.json")
+
+    def load(self, environment: str) -> Dict[str, Dict[str, Any]]:
+        path = self.path(environment)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def start(
+        self,
+        environment: str,
+        inputs: Dict[str, Any],
+        deploy_id: Optional[str] = None,
+        resume: bool = True,
+    ) -> DeployCheckpoint:
+        """
+        Resume or begin a deploy.
+
+        :param environment: Environment being deployed
+        :param inputs: Values that must match for a deploy to be resumed
+        :param deploy_id: Resume this deploy (or begin one with this ID)
+        :param resume: Resume the newest unfinished deploy with the same inputs
+        :return: The deploy's checkpoint
+        """
+        deploys = self.load(environment)
+        if deploy_id is not None and deploy_id in deploys:
+            return DeployCheckpoint(self, environment, deploy_id, deploys[deploy_id])
+        if deploy_id is None and resume:
+            for candidate_id, entry in reversed(list(deploys.items())):
+                if entry.get("completed_at") is None and entry.get("inputs") == inputs:
+                    return DeployCheckpoint(self, environment, candidate_id, entry)
+        deploy_id = deploy_id or f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{uuid.uuid4().hex[:6]}"
+        entry = {"started_at": _now(), "completed_at": None, "inputs": inputs, "steps": {}}
+        checkpoint = DeployCheckpoint(self, environment, deploy_id, entry)
+        self.save(checkpoint)
+        return checkpoint
+
+    def save(self, checkpoint: DeployCheckpoint) -> None:
+        with self._lock:
+            deploys = self.load(checkpoint.environment)
+            deploys[checkpoint.deploy_id] = checkpoint.entry
+            # Deploys are kept in the order they started; drop the oldest.
+            deploys = dict(list(deploys.items())[-self.keep:])
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(checkpoint.environment)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(deploys, f, indent=2)
+            os.replace(tmp, path)
+
+    def deploys(self, environment: str) -> List[str]:
+        """Deploy IDs of an environment, oldest first."""
+        return list(self.load(environment))
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
@@ -0,0 +1,424 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+from botocore.exceptions import ClientError
+from ..aws_utils import error_code
+from ..aws_utils.credentials import CredentialProvider
+from ..aws_utils.ec2 import EC2Utils
+from ..aws_utils.ecs import ECSUtils
+from ..aws_utils.iam import IAMUtils
+from ..aws_utils.tracing import propagate
+from ..aws_utils.transport import TransportProfile
+from .mid_server import MIDServerDeployer
+from .plan import ENVIRONMENT_PARAMETERS
+from .terraform import TerraformOutputs
+
+
+def structural_diff(expected: Any, actual: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    Compare an expected structure to an actual one.
+
+    Only keys present in ``expected`` are compared, so fields AWS adds
+    (ARNs, timestamps, defaults) don't count as drift. Lists of the same
+    length are compared item by item; otherwise the whole list differs.
+
+    :return: One {'path', 'expected', 'actual'} entry per difference
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key, value in expected.items():
+            differences += structural_diff(value, actual.get(key), f"{path}.{key}" if path else key)
+        return differences
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        differences = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            differences += structural_diff(e, a, f"{path}[{i}]")
+        return differences
+    if expected != actual:
+        return [{"path": path, "expected": expected, "actual": actual}]
+    return []
+
+
+def desired_spec(
+    environment: str, region: str, ecr_repo: Optional[str] = None, terraform: Optional[TerraformOutputs] = None,
+    desired_count: int = 1,
+) -> Dict[str, Any]:
+    """
+    The state MIDServerDeployer leaves an environment in, in the normalized
+    form the scanner compares against.
+
+    The security group and roles that Terraform provides are expected by
+    ID and ARN instead of by the deployer's names. Their rules and policies
+    are Terraform's to manage, so only their presence is checked.
+    """
+    terraform = terraform or TerraformOutputs()
+    name = f"midserver-{environment}"
+    service: Dict[str, Any] = {
+        "status": "ACTIVE",
+        "desiredCount": desired_count,
+        "taskDefinitionFamily": f"{name}-task",
+    }
+    security_group: Dict[str, Any]
+    sg_id = terraform.get("security_group_id")
+    if sg_id:
+        service["securityGroupIds"] = [sg_id]
+        security_group = {"groupId": sg_id}
+    else:
+        service["securityGroupNames"] = [f"{name}-sg"]
+        security_group = {"groupName": f"{name}-sg", "ingress": _normalize_ingress(MIDServerDeployer.INGRESS_RULES)}
+    task_definition: Dict[str, Any] = {}
+    roles: Dict[str, Any] = {}
+    for kind, policy_arn in (
+        ("task", MIDServerDeployer.TASK_ROLE_POLICY_ARN),
+        ("execution", MIDServerDeployer.EXECUTION_ROLE_POLICY_ARN),
+    ):
+        role_arn = terraform.get(f"{kind}_role_arn")
+        if role_arn:
+            task_definition[f"{kind}RoleArn"] = role_arn
+            roles[_role_name(role_arn)] = {}
+        else:
+            task_definition[f"{kind}RoleName"] = f"{name}-{kind}-role"
+            roles[f"{name}-{kind}-role"] = {"attachedPolicies": [policy_arn]}
+    task_definition["containers"] = [
+        {
+            "name": name,
+            "imageRepository": ecr_repo or os.environ.get("ECR_REPO"),
+            "cpu": 256,
+            "memory": 512,
+            "essential": True,
+            "environmentNames": sorted(ENVIRONMENT_PARAMETERS),
+            "logGroup": f"/ecs/{name}",
+            "logRegion": region,
+        }
+    ]
+    return {
+        "cluster": {"status": "ACTIVE"},
+        "service": service,
+        "taskDefinition": task_definition,
+        "securityGroup": security_group,
+        "roles": roles,
+    }
+
+
+@dataclass
+class DriftFinding:
+    """One resource and how it compares to the desired spec."""
+
+    environment: str
+    region: str
+    resource: str
+    name: str
+    status: str  # "in-sync", "drifted", "missing" or "error"
+    differences: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class DriftReport:
+    findings: List[DriftFinding] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def has_drift(self) -> bool:
+        return any(f.status != "in-sync" for f in self.findings)
+
+    def summary(self) -> Dict[str, int]:
+        counts = {"in-sync": 0, "drifted": 0, "missing": 0, "error": 0}
+        for finding in self.findings:
+            counts[finding.status] += 1
+        return counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "summary": self.summary(),
+            "duration_seconds": round(self.duration, 3),
+            "findings": [asdict(f) for f in self.findings],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    def render(self) -> str:
+        """Render the findings that aren't in sync as plain text."""
+        lines = []
+        for f in self.findings:
+            if f.status == "in-sync":
+                continue
+            lines.append(f"{f.environment}/{f.region} {f.resource} {f.name}: {f.status}")
+            for d in f.differences:
+                lines.append(f"    {d['path']}: expected {d['expected']!r}, found {d['actual']!r}")
+        counts = self.summary()
+        lines.append(
+            f"{counts['in-sync']} in sync, {counts['drifted']} drifted, {counts['missing']} missing, "
+            f"{counts['error']} errors ({self.duration:.1f}s)"
+        )
+        return "\n".join(lines)
+
+
+class DriftScanner:
+    """
+    Compares live MID server resources to the deployer's spec for many
+    environments and regions at once.
+
+    Each region is scanned concurrently. Within a region, security groups
+    and clusters for every environment are fetched with one batched call
+    each, then services, task definitions and IAM role attachments are
+    described concurrently. IAM is global, so each role is read once per
+    scan however many regions are scanned.
+    """
+
+    def __init__(
+        self,
+        environments: List[str],
+        regions: List[str],
+        profile_name: Optional[str] = None,
+        credentials: Optional[CredentialProvider] = None,
+        max_workers: int = 16,
+        ecr_repo: Optional[str] = None,
+        backend: Optional[Any] = None,
+        terraform: Optional[Dict[str, TerraformOutputs]] = None,
+        desired_count: int = 1,
+    ):
+        """
+        :param environments: Environments to scan, e.g. ['dev', 'prod']
+        :param regions: Regions to scan
+        :param profile_name: AWS profile
+        :param credentials: Credential provider, e.g. from an AssumedRoleSessionPool
+        :param max_workers: Concurrent describe calls per region
+        :param ecr_repo: Expected image repository; defaults to $ECR_REPO
+        :param backend: aws_cmd backend, e.g. a Cassette
+        :param terraform: Terraform outputs by environment; their security group and roles are expected
+        :param desired_count: Tasks each service should run, as passed to deploy.py --desired-count
+        """
+        self.environments = environments
+        self.regions = regions
+        self.max_workers = max_workers
+        self.ecr_repo = ecr_repo
+        self.terraform = terraform or {}
+        self.desired_count = desired_count
+        for environment, outputs in self.terraform.items():
+            outputs.check_environment(environment)
+        self.logger = logging.getLogger(__name__)
+        self.aws_options: Dict[str, Any] = {
+            "credentials": credentials or CredentialProvider.for_profile(profile_name),
+            "read_only": True,
+            "backend": backend,
+        }
+        self.iam_utils = IAMUtils(
+            profile_name, transport=TransportProfile.for_concurrency(max_workers), **self.aws_options
+        )
+        self._roles: Dict[str, Any] = {}
+
+    def scan(self) -> DriftReport:
+        start = time.perf_counter()
+        report = DriftReport()
+        role_names = sorted(
+            {role for env in self.environments for role in self._spec(env, "")["roles"]}
+        )
+        with ThreadPoolExecutor(max_workers=len(self.regions) + 1) as executor:
+            roles_future = executor.submit(propagate(self._collect_roles), role_names)
+            region_futures = [executor.submit(propagate(self._scan_region), region) for region in self.regions]
+            self._roles = roles_future.result()
+            for future in region_futures:
+                report.findings.extend(future.result())
+        # IAM is global, so roles are reported once per environment.
+        for environment in self.environments:
+            report.findings.extend(self._compare_roles(environment))
+        report.findings.sort(key=lambda f: (f.environment, f.region, f.resource, f.name))
+        report.duration = time.perf_counter() - start
+        return report
+
+    def _spec(self, environment: str, region: str) -> Dict[str, Any]:
+        return desired_spec(
+            environment, region, self.ecr_repo, self.terraform.get(environment), self.desired_count
+        )
+
+    def _collect_roles(self, role_names: List[str]) -> Dict[str, Any]:
+        def attached(role_name: str) -> Any:
+            try:
+                return sorted(self.iam_utils.list_attached_role_policies(role_name, projection="PolicyArn"))
+            except ClientError as e:
+                if error_code(e) == "NoSuchEntity":
+                    return None
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(propagate(attached), role_names)
+            return dict(zip(role_names, results))
+
+    def _compare_roles(self, environment: str) -> List[DriftFinding]:
+        findings = []
+        for role_name, expected in self._spec(environment, "")["roles"].items():
+            actual = self._roles.get(role_name)
+            if isinstance(actual, Exception):
+                findings.append(DriftFinding(environment, "global", "iam-role", role_name, "error",
+                                             [{"path": "", "expected": None, "actual": str(actual)}]))
+            elif actual is None:
+                findings.append(DriftFinding(environment, "global", "iam-role", role_name, "missing"))
+            else:
+                findings.append(self._finding(
+                    environment, "global", "iam-role", role_name, expected, {"attachedPolicies": actual}
+                ))
+        return findings
+
+    def _scan_region(self, region: str) -> List[DriftFinding]:
+        transport = TransportProfile.for_concurrency(self.max_workers, region_name=region)
+        ec2 = EC2Utils(transport=transport, **self.aws_options)
+        ecs = ECSUtils(transport=transport, **self.aws_options)
+        specs = {env: self._spec(env, region) for env in self.environments}
+        findings: List[DriftFinding] = []
+
+        # Batched: every environment's security group and cluster in one call each
+        # (security groups from Terraform are fetched by ID in a second call).
+        sg_names = [specs[env]["securityGroup"]["groupName"] for env in self.environments
+                    if "groupName" in specs[env]["securityGroup"]]
+        sg_ids = [specs[env]["securityGroup"]["groupId"] for env in self.environments
+                  if "groupId" in specs[env]["securityGroup"]]
+        groups: List[Dict[str, Any]] = []
+        for i in range(0, len(sg_names), 200):
+            groups += ec2.describe_security_groups(sg_names[i:i + 200])
+        for i in range(0, len(sg_ids), 200):
+            groups += ec2.describe_security_groups(group_ids=sg_ids[i:i + 200])
+        groups_by_key = {key: g for g in groups for key in (g["GroupName"], g["GroupId"])}
+        group_names_by_id = {g["GroupId"]: g["GroupName"] for g in groups}
+        clusters: Dict[str, Dict[str, Any]] = {}
+        cluster_names = [f"midserver-{env}-cluster" for env in self.environments]
+        for i in range(0, len(cluster_names), 100):
+            for cluster in ecs.describe_clusters(cluster_names[i:i + 100]):
+                clusters[cluster["clusterName"]] = cluster
+
+        for env in self.environments:
+            expected = specs[env]["securityGroup"]
+            sg_key = expected.get("groupId") or expected["groupName"]
+            group = groups_by_key.get(sg_key)
+            if group is None:
+                findings.append(DriftFinding(env, region, "security-group", sg_key, "missing"))
+            else:
+                actual = {
+                    "groupId": group["GroupId"],
+                    "groupName": group["GroupName"],
+                    "ingress": _normalize_ingress(group.get("IpPermissions", [])),
+                }
+                findings.append(self._finding(env, region, "security-group", sg_key, expected, actual))
+
+        def scan_service(env: str) -> List[DriftFinding]:
+            cluster_name = f"midserver-{env}-cluster"
+            service_name = f"midserver-{env}-service"
+            cluster = clusters.get(cluster_name)
+            if cluster is None or cluster.get("status") == "INACTIVE":
+                return [DriftFinding(env, region, "ecs-cluster", cluster_name, "missing")]
+            result = [self._finding(env, region, "ecs-cluster", cluster_name, specs[env]["cluster"], cluster)]
+            services = ecs.describe_services(cluster_name, [service_name])["services"]
+            service = next((s for s in services if s.get("status") != "INACTIVE"), None)
+            if service is None:
+                return result + [DriftFinding(env, region, "ecs-service", service_name, "missing")]
+            result.append(self._finding(
+                env, region, "ecs-service", service_name, specs[env]["service"],
+                _normalize_service(service, group_names_by_id),
+            ))
+            task_definition_arn = _service_task_definition(service)
+            if task_definition_arn:
+                task_definition = ecs.describe_task_definition(task_definition_arn)
+                if task_definition is None:
+                    result.append(DriftFinding(env, region, "task-definition", task_definition_arn, "missing"))
+                else:
+                    result.append(self._finding(
+                        env, region, "task-definition", task_definition_arn,
+                        specs[env]["taskDefinition"], _normalize_task_definition(task_definition),
+                    ))
+            return result
+
+        def guarded(env: str) -> List[DriftFinding]:
+            try:
+                return scan_service(env)
+            except ClientError as e:
+                return [DriftFinding(env, region, "ecs-service", f"midserver-{env}-service", "error",
+                                     [{"path": "", "expected": None, "actual": str(e)}])]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for result in executor.map(propagate(guarded), self.environments):
+                findings.extend(result)
+        return findings
+
+    @staticmethod
+    def _finding(environment: str, region: str, resource: str, name: str, expected: Any, actual: Any) -> DriftFinding:
+        differences = structural_diff(expected, actual)
+        return DriftFinding(environment, region, resource, name, "drifted" if differences else "in-sync", differences)
+
+
+def _normalize_ingress(rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    normalized = [
+        {
+            "protocol": rule.get("IpProtocol"),
+            "fromPort": rule.get("FromPort"),
+            "toPort": rule.get("ToPort"),
+            "cidrs": sorted(r["CidrIp"] for r in rule.get("IpRanges", [])),
+        }
+        for rule in rules
+    ]
+    return sorted(normalized, key=lambda r: (str(r["protocol"]), r["fromPort"] or 0, r["toPort"] or 0))
+
+
+def _service_task_definition(service: Dict[str, Any]) -> Optional[str]:
+    if service.get("taskDefinition"):
+        return service["taskDefinition"]
+    # EXTERNAL (blue-green) services run their primary task set's definition.
+    for task_set in service.get("taskSets", []):
+        if task_set.get("status") == "PRIMARY":
+            return task_set.get("taskDefinition")
+    return None
+
+
+def _normalize_service(service: Dict[str, Any], group_names_by_id: Dict[str, str]) -> Dict[str, Any]:
+    task_definition = _service_task_definition(service) or ""
+    network = service.get("networkConfiguration", {}).get("awsvpcConfiguration", {})
+    if not network:
+        primary = [t for t in service.get("taskSets", []) if t.get("status") == "PRIMARY"]
+        if primary:
+            network = primary[0].get("networkConfiguration", {}).get("awsvpcConfiguration", {})
+    return {
+        "status": service.get("status"),
+        "desiredCount": service.get("desiredCount"),
+        "taskDefinitionFamily": task_definition.rsplit("/", 1)[-1].rsplit(":", 1)[0],
+        "securityGroupIds": sorted(network.get("securityGroups", [])),
+        "securityGroupNames": sorted(group_names_by_id.get(g, g) for g in network.get("securityGroups", [])),
+    }
+
+
+def _role_name(arn: Optional[str]) -> Optional[str]:
+    return arn.rsplit("/", 1)[-1] if arn else None
+
+
+def _normalize_task_definition(task_definition: Dict[str, Any]) -> Dict[str, Any]:
+    containers = []
+    for container in task_definition.get("containerDefinitions", []):
+        log_options = container.get("logConfiguration", {}).get("options", {})
+        containers.append({
+            "name": container.get("name"),
+            "imageRepository": _image_repository(container.get("image", "")),
+            "cpu": container.get("cpu"),
+            "memory": container.get("memory"),
+            "essential": container.get("essential"),
+            "environmentNames": sorted(e["name"] for e in container.get("environment", [])),
+            "logGroup": log_options.get("awslogs-group"),
+            "logRegion": log_options.get("awslogs-region"),
+        })
+    return {
+        "taskRoleArn": task_definition.get("taskRoleArn"),
+        "taskRoleName": _role_name(task_definition.get("taskRoleArn")),
+        "executionRoleArn": task_definition.get("executionRoleArn"),
+        "executionRoleName": _role_name(task_definition.get("executionRoleArn")),
+        "containers": containers,
+    }
+
+
+def _image_repository(image: str) -> str:
+    """'repo:tag' or 'repo@sha256:...' -> 'repo'."""
+    image = image.split("@", 1)[0]
+    last = image.rsplit("/", 1)[-1]
+    if ":" in last:
+        image = image[: len(image) - len(last)] + last.split(":", 1)[0]
+    return image
@@ -0,0 +1,266 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from ..aws_utils import cancellation
+from ..aws_utils.sqs import SQSUtils
+
+# Detail types the EventBridge rule forwards to the queue
+ECS_DETAIL_TYPES = ("ECS Deployment State Change", "ECS Service Action", "ECS Task State Change")
+
+ServiceKey = Tuple[str, str]
+
+
+def event_service(event: Dict[str, Any]) -> Optional[ServiceKey]:
+    """
+    The (cluster, service) names an ECS event is about, or None.
+
+    Deployment state changes and service actions name the service ARN in
+    ``resources`` ('.../service/<cluster>/<service>', or
+    '.../service/<service>' in the old ARN format, with the cluster in
+    ``detail.clusterArn``); task state changes name it in ``detail.group``
+    ('service:<service>').
+    """
+    if event.get("source") != "aws.ecs" or event.get("detail-type") not in ECS_DETAIL_TYPES:
+        return None
+    detail = event.get("detail") or {}
+    cluster = detail.get("clusterArn", "").rsplit("/", 1)[-1]
+    for resource in event.get("resources", []):
+        if ":service/" not in resource:
+            continue
+        parts = resource.split(":service/", 1)[1].split("/")
+        if len(parts) == 2:
+            return parts[0], parts[1]
+        if cluster:
+            return cluster, parts[0]
+    group = detail.get("group", "")
+    if group.startswith("service:") and cluster:
+        return cluster, group[len("service:"):]
+    return None
+
+
+class RolloutWatch:
+    """
+    Wakes a waiting deployment when an event arrives for its service.
+
+    Created by RolloutEvents.watch() before the first status check, so an
+    event that arrives between a check and the next wait isn't lost.
+    """
+
+    def __init__(self, events: "RolloutEvents", key: ServiceKey):
+        self.events = events
+        self.key = key
+        self._event = threading.Event()
+
+    def wait(self, timeout: float, slice_seconds: float = 0.5) -> bool:
+        """
+        Wait until an event arrives for the service or ``timeout`` passes.
+        Cancelling the current cancel scope stops the wait.
+
+        :return: True if an event arrived
+        """
+        end = time.monotonic() + timeout
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._event.wait(min(remaining, slice_seconds)):
+                self._event.clear()
+                return True
+            cancellation.check_cancelled()
+
+    def close(self) -> None:
+        self.events._unwatch(self)
+
+    def __enter__(self) -> "RolloutWatch":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class RolloutEvents:
+    """
+    Demultiplexes ECS events from an EventBridge->SQS queue to the
+    deployments waiting on them.
+
+    One background thread long-polls the queue, deletes every message it
+    receives and wakes the watches of the service each event is about, so
+    any number of deployments in the process share one receive call per
+    ``wait_time`` seconds instead of each calling describe_services every
+    poll interval. The queue should be read by this process only: messages
+    another consumer receives never reach it.
+
+    ``healthy`` is False while receiving fails, so that waiting strategies
+    go back to polling at their normal interval.
+    """
+
+    def __init__(
+        self,
+        sqs_utils: SQSUtils,
+        queue_url: str,
+        wait_time: int = 20,
+        retry_interval: float = 5.0,
+    ):
+        """
+        :param sqs_utils: SQSUtils (or one backed by LocalEventQueue)
+        :param queue_url: URL of the queue the EventBridge rule targets
+        :param wait_time: Seconds each receive call long-polls
+        :param retry_interval: Seconds to wait after a failed receive
+        """
+        self.sqs_utils = sqs_utils
+        self.queue_url = queue_url
+        self.wait_time = wait_time
+        self.retry_interval = retry_interval
+        self.healthy = True
+        self.received = 0
+        self.logger = logging.getLogger(__name__)
+        self._watches: Dict[ServiceKey, Set[RolloutWatch]] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start receiving; called by the first watch() if not before."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Each thread gets its own flag, so a thread still finishing a
+            # receive after stop() ends even if start() is called again.
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stopping,), name="rollout-events", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop receiving. A receive call in flight isn't waited for; messages
+        it returns are left on the queue.
+        """
+        self._stopping.set()
+        with self._lock:
+            self._thread = None
+
+    def __enter__(self) -> "RolloutEvents":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def watch(self, cluster: str, service: str) -> RolloutWatch:
+        """Start watching a service; close the watch when done waiting."""
+        self.start()
+        watch = RolloutWatch(self, (cluster, service))
+        with self._lock:
+            self._watches.setdefault(watch.key, set()).add(watch)
+        return watch
+
+    def _unwatch(self, watch: RolloutWatch) -> None:
+        with self._lock:
+            watches = self._watches.get(watch.key)
+            if watches is not None:
+                watches.discard(watch)
+                if not watches:
+                    del self._watches[watch.key]
+
+    def dispatch(self, event: Dict[str, Any]) -> bool:
+        """
+        Wake the watches of the service an event is about.
+
+        :return: True if any deployment was waiting on it
+        """
+        key = event_service(event)
+        if key is None:
+            return False
+        with self._lock:
+            watches = list(self._watches.get(key, ()))
+        for watch in watches:
+            watch._event.set()
+        return bool(watches)
+
+    def _run(self, stopping: threading.Event) -> None:
+        while not stopping.is_set():
+            try:
+                messages = self.sqs_utils.receive_messages(self.queue_url, wait_time=self.wait_time)
+            except Exception as e:
+                if self.healthy:
+                    self.logger.warning(f"Receiving ECS events failed, polling instead: {e}")
+                self.healthy = False
+                stopping.wait(self.retry_interval)
+                continue
+            if not self.healthy:
+                self.logger.info("Receiving ECS events again")
+            self.healthy = True
+            if stopping.is_set() or not messages:
+                continue
+            for message in messages:
+                self.received += 1
+                try:
+                    event = json.loads(message["Body"])
+                except ValueError:
+                    self.logger.warning(f"Ignoring message that isn't an event: {message['Body'][:100]}")
+                    continue
+                if isinstance(event, dict):
+                    self.dispatch(event)
+            try:
+                self.sqs_utils.delete_messages(self.queue_url, [message["ReceiptHandle"] for message in messages])
+            except Exception as e:
+                # They come back after the visibility timeout and wake the watches again, which is harmless.
+                self.logger.warning(f"Deleting received ECS events failed: {e}")
+
+
+class LocalEventQueue:
+    """
+    Offline stand-in for the SQS queue, used as an AWSUtils backend.
+
+    publish() queues an event as EventBridge would deliver it, and
+    ReceiveMessage long-polls up to its WaitTimeSeconds (multiplied by
+    ``time_scale``). Received messages leave the queue at once rather than
+    after DeleteMessageBatch, so there is no redelivery. ``calls`` counts
+    the calls made, as LocalAWS does.
+    """
+
+    def __init__(self, time_scale: float = 1.0):
+        self.time_scale = time_scale
+        self.calls: Counter = Counter()
+        self._messages: Deque[Dict[str, Any]] = deque()
+        self._condition = threading.Condition()
+        self._next_id = 0
+
+    def call(self, service: str, operation: str, params: Dict[str, Any], invoke: Callable[[], Any]) -> Dict[str, Any]:
+        with self._condition:
+            self.calls[f"{service}:{operation}"] += 1
+        if (service, operation) == ("sqs", "receive_message"):
+            return self.receive_message(**params)
+        if (service, operation) == ("sqs", "delete_message_batch"):
+            return self.delete_message_batch(**params)
+        raise NotImplementedError(f"LocalEventQueue doesn't support {service}:{operation}")
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Queue an event, as the EventBridge rule would."""
+        with self._condition:
+            self._next_id += 1
+            self._messages.append({
+                "MessageId": str(self._next_id),
+                "ReceiptHandle": f"receipt-{self._next_id}",
+                "Body": json.dumps(event, default=str),
+            })
+            self._condition.notify_all()
+
+    def receive_message(
+        self, QueueUrl: str, MaxNumberOfMessages: int = 1, WaitTimeSeconds: int = 0
+    ) -> Dict[str, Any]:
+        with self._condition:
+            self._condition.wait_for(lambda: self._messages, timeout=WaitTimeSeconds * self.time_scale)
+            messages: List[Dict[str, Any]] = []
+            while self._messages and len(messages) < MaxNumberOfMessages:
+                messages.append(self._messages.popleft())
+        return {"Messages": messages} if messages else {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[Dict[str, str]]) -> Dict[str, Any]:
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
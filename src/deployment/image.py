@@ -0,0 +1,282 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..aws_utils.ecr import ECRUtils, parse_repository_uri
+
+# Content hashes of previous builds and the images they produced
+MANIFEST_FILE = os.path.join(".midserver", "images.json")
+
+DOCKERFILE = os.path.join("docker", "Dockerfile")
+
+
+def dockerfile_sources(dockerfile: str, context: str = ".") -> List[str]:
+    """
+    Files a Dockerfile copies from the build context (COPY/ADD sources,
+    excluding copies from other stages and URLs), relative to the context.
+    """
+    with open(dockerfile) as f:
+        lines = f.read().replace("\\\n", " ").splitlines()
+    sources = set()
+    for line in lines:
+        words = shlex.split(line, comments=True)
+        if not words or words[0].upper() not in ("COPY", "ADD"):
+            continue
+        args = [w for w in words[1:] if not w.startswith("--")]
+        if any(w.startswith("--from") for w in words[1:]):
+            continue
+        for pattern in args[:-1]:
+            if "://" in pattern:
+                continue
+            for path in sorted(glob.glob(os.path.join(context, pattern))):
+                if os.path.isdir(path):
+                    for root, _, files in os.walk(path):
+                        sources.update(os.path.relpath(os.path.join(root, name), context) for name in files)
+                else:
+                    sources.add(os.path.relpath(path, context))
+    return sorted(sources)
+
+
+def content_hash(dockerfile: str, context: str = ".", build_args: Optional[Dict[str, str]] = None) -> str:
+    """
+    SHA-256 over everything that determines the image: the Dockerfile, the
+    files it copies from the context and the build arguments (MID version
+    and installer URL).
+    """
+    digest = hashlib.sha256()
+    with open(dockerfile, "rb") as f:
+        digest.update(b"dockerfile\0" + f.read() + b"\0")
+    for path in dockerfile_sources(dockerfile, context):
+        with open(os.path.join(context, path), "rb") as f:
+            digest.update(b"file\0" + path.replace(os.sep, "/").encode("utf-8") + b"\0" + f.read() + b"\0")
+    for name, value in sorted((build_args or {}).items()):
+        digest.update(f"arg\0{name}={value}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ImageManifest:
+    """Local record of content hash -> image, so unchanged inputs aren't rebuilt."""
+
+    def __init__(self, path: Optional[str] = MANIFEST_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, repository: str, source_hash: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(f"{repository}#{source_hash}")
+
+    def put(self, repository: str, source_hash: str, image: str, digest: Optional[str]) -> None:
+        self.entries[f"{repository}#{source_hash}"] = {
+            "image": image,
+            "digest": digest,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+
+@dataclass
+class BuildResult:
+    image: str
+    source_hash: str
+    digest: Optional[str] = None
+    skipped: bool = False
+    reason: str = ""
+    commands: List[List[str]] = field(default_factory=list)
+
+    @property
+    def tag(self) -> str:
+        """The content tag, 'src-<hash prefix>'."""
+        return self.image.rsplit(":", 1)[-1]
+
+
+class ImageBuilder:
+    """
+    Builds and pushes the MID server image only when its inputs change.
+
+    The image is tagged with a prefix of its content hash. If the local
+    manifest, or the registry when ``ecr_utils`` is given (CI runners start
+    with an empty manifest), already has an image for the hash, nothing is
+    built or pushed, but ``latest`` is moved to that image so that it
+    always names the image of the current inputs, even after they are
+    reverted to an earlier build's. Otherwise BuildKit rebuilds from the first changed
+    layer, reusing the previous image's layers via ``--cache-from``.
+    """
+
+    def __init__(
+        self,
+        repository: str,
+        dockerfile: str = DOCKERFILE,
+        context: str = ".",
+        build_args: Optional[Dict[str, str]] = None,
+        manifest: Optional[ImageManifest] = None,
+        ecr_utils: Optional[ECRUtils] = None,
+        runner: Callable[..., Any] = subprocess.run,
+    ):
+        """
+        :param repository: Image repository, e.g. the ECR repository URI
+        :param dockerfile: Path to the Dockerfile
+        :param context: Build context directory
+        :param build_args: Docker build arguments, e.g. MID_VERSION
+        :param manifest: Manifest of previous builds
+        :param ecr_utils: ECRUtils to check the registry for an existing image
+        :param runner: Runs docker commands (subprocess.run by default)
+        """
+        self.repository = repository
+        self.dockerfile = dockerfile
+        self.context = context
+        self.build_args = {k: v for k, v in (build_args or {}).items() if v is not None}
+        self.manifest = manifest if manifest is not None else ImageManifest()
+        self.ecr_utils = ecr_utils
+        self.runner = runner
+        self.logger = logging.getLogger(__name__)
+
+    def source_hash(self) -> str:
+        return content_hash(self.dockerfile, self.context, self.build_args)
+
+    def build(self, push: bool = True, dry_run: bool = False) -> BuildResult:
+        """
+        Build (and push) the image unless an image for the same inputs exists.
+
+        :param push: Push the image after building
+        :param dry_run: Only work out whether a build is needed
+        :return: The image and whether it was skipped
+        """
+        source_hash = self.source_hash()
+        tag = f"src-{source_hash[:16]}"
+        image = f"{self.repository}:{tag}"
+        result = BuildResult(image, source_hash)
+
+        latest = f"{self.repository}:latest"
+        existing = self.manifest.get(self.repository, source_hash)
+        if existing is not None and (self.ecr_utils is None or not push):
+            result.skipped, result.reason, result.digest = True, "in local manifest", existing.get("digest")
+            if push and not dry_run:
+                # Copies the manifest within the registry; nothing is pulled.
+                retag = ["docker", "buildx", "imagetools", "create", "--tag", latest, image]
+                result.commands.append(retag)
+                self._run(retag)
+            return result
+        if self.ecr_utils is not None:
+            detail = self.ecr_utils.describe_image(self.repository, tag)
+            if detail is not None:
+                result.skipped, result.reason, result.digest = True, "in registry", detail["imageDigest"]
+                self.manifest.put(self.repository, source_hash, image, result.digest)
+                self.manifest.save()
+                if push and not dry_run and self.ecr_utils.tag_image(self.repository, result.digest, "latest"):
+                    self.logger.info(f"Moved {latest} to {result.digest}")
+                return result
+        if dry_run:
+            result.reason = "inputs changed"
+            return result
+
+        build = ["docker", "build", "--file", self.dockerfile, "--tag", image, "--tag", latest,
+                 "--cache-from", latest, "--build-arg", "BUILDKIT_INLINE_CACHE=1"]
+        for name, value in sorted(self.build_args.items()):
+            build += ["--build-arg", f"{name}={value}"]
+        build.append(self.context)
+        result.commands.append(build)
+        self._run(build)
+        if push:
+            for target in (image, latest):
+                result.commands.append(["docker", "push", target])
+                self._run(["docker", "push", target])
+            inspect = ["docker", "image", "inspect", "--format", "{{index .RepoDigests 0}}", image]
+            output = self._run(inspect, capture=True)
+            result.digest = output.strip().rsplit("@", 1)[-1] or None
+        self.manifest.put(self.repository, source_hash, image, result.digest)
+        self.manifest.save()
+        result.reason = "built"
+        return result
+
+    def _run(self, command: List[str], capture: bool = False) -> str:
+        self.logger.info(f"Running: {' '.join(command)}")
+        completed = self.runner(
+            command,
+            check=True,
+            env={**os.environ, "DOCKER_BUILDKIT": "1"},
+            stdout=subprocess.PIPE if capture else None,
+            text=True,
+        )
+        return (completed.stdout or "") if capture else ""
+
+
+class ImageResolver:
+    """
+    Resolves image tags to immutable ``repo@sha256:...`` references.
+
+    Each tag is looked up in ECR once and cached for ``ttl`` seconds, and
+    concurrent lookups of the same tag wait for the first one, so a fleet
+    deploy of one image resolves the tag exactly once. Task definitions
+    registered with a digest always run the image that was resolved,
+    identical deploys produce identical task definitions, and Fargate
+    doesn't have to resolve the tag again at every task launch.
+    """
+
+    def __init__(self, ttl: float = 600, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._digests: Dict[str, Tuple[str, float]] = {}
+
+    def resolve(self, image: str, ecr_utils: ECRUtils) -> str:
+        """
+        :param image: 'repo:tag' (or 'repo', meaning 'repo:latest'); 'repo@sha256:...' is returned as is
+        :param ecr_utils: ECRUtils used for the lookup on a cache miss
+        :return: 'repo@sha256:...'
+        """
+        if "@" in image:
+            return image
+        repository, tag = split_image(image)
+        registry_id, _ = parse_repository_uri(repository)
+        if registry_id is None:
+            # Only ECR repositories can be resolved through the registry API.
+            self.logger.warning(f"Not an ECR repository, deploying {image} by tag")
+            return image
+        key = f"{repository}:{tag}"
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = self._digests.get(key)
+            if cached is not None and self.clock() - cached[1] < self.ttl:
+                return f"{repository}@{cached[0]}"
+            detail = ecr_utils.describe_image(repository, tag)
+            if detail is None:
+                raise ValueError(f"Image not found: {key}")
+            self._digests[key] = (detail["imageDigest"], self.clock())
+            self.logger.info(f"Resolved {key} to {detail['imageDigest']}")
+            return f"{repository}@{detail['imageDigest']}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._digests.clear()
+
+
+def split_image(image: str) -> Tuple[str, str]:
+    """'repo:tag' -> ('repo', 'tag'); a missing tag means 'latest'."""
+    last = image.rsplit("/", 1)[-1]
+    if ":" in last:
+        return image[: len(image) - len(last) + last.index(":")], last.split(":", 1)[1]
+    return image, "latest"
+
+
+# Shared by every deployer in the process, so fleet deploys resolve each tag once
+image_resolver = ImageResolver()
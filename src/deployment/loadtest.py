@@ -0,0 +1,376 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from botocore.exceptions import ClientError
+from ..aws_utils import error_code
+from ..aws_utils.credentials import CredentialProvider
+from ..aws_utils.local_aws import LocalAWS
+from ..aws_utils.ratelimit import DEFAULT_SERVICE_RATES, SharedRateLimiter
+from ..aws_utils.sqs import SQSUtils
+from ..aws_utils.transport import TransportProfile
+from .events import LocalEventQueue, RolloutEvents
+from .image import ImageResolver
+from .mid_server import MIDServerDeployer
+from .strategies import RollingStrategy
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Concurrent deploys a load test ramps through by default
+DEFAULT_LEVELS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# Parameters every deployer reads from SSM
+PARAMETER_NAMES = ("MID_INSTANCE_URL", "MID_INSTANCE_USERNAME", "MID_INSTANCE_PASSWORD", "MID_SERVER_NAME")
+
+
+@dataclass
+class LoadLevel:
+    """Results of running ``concurrency`` deploys at once."""
+
+    concurrency: int
+    deploys: int
+    failures: int
+    duration: float  # wall seconds for the whole level
+    deploy_p50: float
+    deploy_p95: float
+    deploy_p99: float
+    call_p50: float
+    call_p99: float
+    api_calls: int
+    throttles: int
+    pool_wait: float  # seconds callers waited for a pooled connection, summed
+    cpu: float  # CPU seconds used per wall second (1.0 = one core busy)
+    rss_mb: float  # peak resident memory during the level
+    errors: Dict[str, int] = field(default_factory=dict)  # failed deploys per error code
+
+    @property
+    def throughput(self) -> float:
+        """Successful deploys per second."""
+        return (self.deploys - self.failures) / self.duration if self.duration else 0.0
+
+    @property
+    def bottleneck(self) -> str:
+        """The resource that most likely limits this level, or '-'."""
+        if self.api_calls and self.throttles / self.api_calls > 0.05:
+            return "api throttling"
+        if self.pool_wait > 0.1 * self.duration * self.concurrency:
+            return "connection pool"
+        if self.cpu > 0.85:
+            return "cpu (gil)"
+        return "-"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(asdict(self), throughput=self.throughput, bottleneck=self.bottleneck)
+
+
+@dataclass
+class LoadReport:
+    levels: List[LoadLevel] = field(default_factory=list)
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+    def efficiency(self, level: LoadLevel) -> float:
+        """Throughput relative to perfect scaling from the first level."""
+        base = self.levels[0]
+        if not base.throughput:
+            return 0.0
+        return level.throughput / (base.throughput * level.concurrency / base.concurrency)
+
+    def knee(self) -> Optional[LoadLevel]:
+        """The first level whose scaling efficiency drops below 50%, if any."""
+        for level in self.levels[1:]:
+            if self.efficiency(level) < 0.5:
+                return level
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        knee = self.knee()
+        return {
+            "settings": self.settings,
+            "levels": [dict(level.to_dict(), efficiency=self.efficiency(level)) for level in self.levels],
+            "knee": knee.concurrency if knee else None,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def render(self) -> str:
+        """Render the levels as a plain-text table followed by the scaling curve."""
+        rows = [(
+            "N", "DEPLOYS/S", "EFF", "P50", "P95", "P99", "CALL P99", "CALLS", "THROTTLED", "POOL WAIT", "CPU", "RSS MB",
+            "FAILED", "BOTTLENECK",
+        )]
+        for level in self.levels:
+            rows.append((
+                str(level.concurrency),
+                f"{level.throughput:.2f}",
+                f"{self.efficiency(level):.0%}",
+                f"{level.deploy_p50:.2f}",
+                f"{level.deploy_p95:.2f}",
+                f"{level.deploy_p99:.2f}",
+                f"{level.call_p99 * 1000:.0f}ms",
+                str(level.api_calls),
+                str(level.throttles),
+                f"{level.pool_wait:.1f}s",
+                f"{level.cpu:.2f}",
+                f"{level.rss_mb:.0f}",
+                str(level.failures),
+                level.bottleneck,
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+
+        lines.append("")
+        lines.append("Throughput (deploys/s) by concurrency:")
+        peak = max((level.throughput for level in self.levels), default=0.0)
+        for level in self.levels:
+            bar = "#" * max(1, round(40 * level.throughput / peak)) if level.throughput else ""
+            lines.append(f"{level.concurrency:>5}  {bar} {level.throughput:.2f}")
+        knee = self.knee()
+        if knee is not None:
+            lines.append(f"Scaling falls below 50% efficiency at {knee.concurrency} concurrent deploys "
+                         f"(likely limit: {knee.bottleneck})")
+        return "\n".join(lines)
+
+
+class LoadTest:
+    """
+    Ramps up the number of concurrent MIDServerDeployer runs against a
+    LocalAWS stand-in and records throughput, tail latencies, CPU and memory
+    at each level, to find where orchestration stops scaling.
+
+    Each level gets a fresh LocalAWS, so every deploy creates its own
+    security group, roles, cluster and service. Deployers in one level share
+    a CredentialProvider (and so the connection pool limits of ``transport``)
+    and an ImageResolver, as they would in one deploy.py process. With
+    ``shared_rate_limit`` each deployer also takes its calls from a
+    SharedRateLimiter, like separate processes on one host. With ``events``
+    the stand-in publishes rollout events to a LocalEventQueue and the
+    deployers wait on those instead of polling describe_services.
+
+    The deployers and the stand-in run in this process, so CPU and memory
+    include the stand-in's own (small) overhead.
+    """
+
+    def __init__(
+        self,
+        levels: Sequence[int] = DEFAULT_LEVELS,
+        deploys_per_worker: int = 1,
+        time_scale: float = 0.1,
+        rollout_seconds: float = 30.0,
+        poll_interval: float = 15.0,
+        transport: Optional[TransportProfile] = None,
+        shared_rate_limit: bool = False,
+        events: bool = False,
+        backend_options: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None,
+        image: str = "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver",
+    ):
+        """
+        :param levels: Numbers of concurrent deploys to run, in order
+        :param deploys_per_worker: Deploys each worker runs back to back at every level
+        :param time_scale: Factor applied to the stand-in's latencies, backoff and rollout time,
+            and to the strategy's poll interval and health timeout
+        :param rollout_seconds: Time for a service rollout to complete, before scaling
+        :param poll_interval: Seconds between rollout status polls, before scaling
+        :param transport: Transport profile of the deployers (sets the connection pool size)
+        :param shared_rate_limit: Give each deployer a SharedRateLimiter
+        :param events: Track rollouts from events on a LocalEventQueue, shared by the level's deployers
+        :param backend_options: Extra LocalAWS arguments, e.g. {"quotas": {"ecs": 20}}
+        :param seed: Seed for the stand-in, for repeatable runs
+        :param image: ECR repository deployed by every deployer ($ECR_REPO)
+        """
+        self.levels = list(levels)
+        self.deploys_per_worker = deploys_per_worker
+        self.time_scale = time_scale
+        self.rollout_seconds = rollout_seconds
+        self.poll_interval = poll_interval
+        self.transport = transport or TransportProfile()
+        self.shared_rate_limit = shared_rate_limit
+        self.events = events
+        self.backend_options = backend_options or {}
+        self.seed = seed
+        self.image = image
+
+    def run(self, on_level: Optional[Callable[[LoadLevel], None]] = None) -> LoadReport:
+        """
+        Run every level in turn.
+
+        :param on_level: Called with each level's results as it finishes
+        """
+        report = LoadReport(settings={
+            "time_scale": self.time_scale,
+            "deploys_per_worker": self.deploys_per_worker,
+            "max_pool_connections": self.transport.max_pool_connections,
+            "shared_rate_limit": self.shared_rate_limit,
+            "events": self.events,
+        })
+        for concurrency in self.levels:
+            level = self.run_level(concurrency)
+            report.levels.append(level)
+            if on_level is not None:
+                on_level(level)
+        return report
+
+    def run_level(self, concurrency: int) -> LoadLevel:
+        """Run ``concurrency`` workers, each deploying its own environment."""
+        queue = LocalEventQueue(time_scale=self.time_scale) if self.events else None
+        backend = LocalAWS(
+            rollout_seconds=self.rollout_seconds,
+            time_scale=self.time_scale,
+            seed=self.seed,
+            on_event=queue.publish if queue is not None else None,
+            **self.backend_options,
+        )
+        environments = [f"load{i}" for i in range(concurrency)]
+        for environment in environments:
+            for name in PARAMETER_NAMES:
+                backend.put_parameter(f"/midserver/{environment}/{name}", f"{name.lower()}-{environment}")
+        credentials = CredentialProvider(auto_refresh=False)
+        resolver = ImageResolver()
+        events = None
+        if queue is not None:
+            events = RolloutEvents(SQSUtils(None, backend=queue, credentials=credentials), "local")
+        durations: List[float] = []
+        errors: Counter = Counter()
+        results_lock = threading.Lock()
+        start_line = threading.Barrier(concurrency)
+
+        with tempfile.TemporaryDirectory() as rate_dir:
+            deployers = [
+                MIDServerDeployer(
+                    None,
+                    environment,
+                    strategy=RollingStrategy(
+                        poll_interval=self.poll_interval * self.time_scale,
+                        health_timeout=600 * self.time_scale,
+                        events=events,
+                        event_poll_interval=120 * self.time_scale,
+                    ),
+                    backend=backend,
+                    transport=self.transport,
+                    credentials=credentials,
+                    image_resolver=resolver,
+                    rate_limiter=self._rate_limiter(environment, rate_dir),
+                )
+                for environment in environments
+            ]
+
+            def worker(deployer: MIDServerDeployer) -> None:
+                start_line.wait()
+                for _ in range(self.deploys_per_worker):
+                    start = time.perf_counter()
+                    error = None
+                    try:
+                        deployer.deploy()
+                    except ClientError as e:
+                        error = error_code(e)
+                    except Exception as e:
+                        error = type(e).__name__
+                    with results_lock:
+                        durations.append(time.perf_counter() - start)
+                        if error:
+                            errors[error] += 1
+
+            memory = _PeakMemory()
+            with memory, _environ("ECR_REPO", self.image):
+                cpu_start, wall_start = time.process_time(), time.perf_counter()
+                try:
+                    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest") as executor:
+                        for future in [executor.submit(worker, deployer) for deployer in deployers]:
+                            future.result()
+                finally:
+                    if events is not None:
+                        events.stop()
+                wall = time.perf_counter() - wall_start
+                cpu = time.process_time() - cpu_start
+
+        pools = credentials.pool_metrics(self.transport).snapshot()
+        return LoadLevel(
+            concurrency=concurrency,
+            deploys=len(durations),
+            failures=sum(errors.values()),
+            duration=wall,
+            deploy_p50=percentile(durations, 50),
+            deploy_p95=percentile(durations, 95),
+            deploy_p99=percentile(durations, 99),
+            call_p50=percentile(backend.latencies, 50),
+            call_p99=percentile(backend.latencies, 99),
+            api_calls=sum(backend.calls.values()) + (sum(queue.calls.values()) if queue is not None else 0),
+            throttles=sum(backend.throttles.values()),
+            pool_wait=sum(stats["wait_seconds"] for stats in pools.values()),
+            cpu=cpu / wall if wall else 0.0,
+            rss_mb=memory.peak / 2 ** 20,
+            errors=dict(errors),
+        )
+
+    def _rate_limiter(self, environment: str, directory: str) -> Optional[SharedRateLimiter]:
+        if not self.shared_rate_limit:
+            return None
+        rates = {service: rate / self.time_scale for service, rate in DEFAULT_SERVICE_RATES.items()}
+        return SharedRateLimiter(environment, rates=rates, directory=directory)
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile, 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * p / 100) - 1)]
+
+
+class _PeakMemory:
+    """Samples the process's resident memory in the background and keeps the peak."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loadtest-memory", daemon=True)
+
+    def __enter__(self) -> "_PeakMemory":
+        self.peak = _rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        # Peak rather than current; ru_maxrss is in KiB on Linux (bytes on macOS).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def _environ(name: str, value: str) -> Iterator[None]:
+    """Set an environment variable for the duration of a block, unless it is already set."""
+    if name in os.environ:
+        yield
+        return
+    os.environ[name] = value
+    try:
+        yield
+    finally:
+        del os.environ[name]
@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import queue
+import shlex
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from ..aws_utils import error_code
+from ..aws_utils.logs import LogsUtils
+from ..aws_utils.tracing import propagate
+
+
+def log_group_name(environment: str) -> str:
+    """Log group the MID server task definition writes to."""
+    return f"/ecs/midserver-{environment}"
+
+
+class LogFollower:
+    """
+    Reads the events of one log group with FilterLogEvents.
+
+    Each poll pages through everything since the last event seen, letting
+    CloudWatch apply the filter pattern, and yields events as each page
+    arrives, so memory use is one page however much the agent logs. Events
+    can be ingested slightly out of order, so each poll starts
+    ``lookback_ms`` before the newest event seen and drops events already
+    yielded, remembering at most ``dedupe_window`` event IDs.
+
+    When following, the poll interval halves towards ``min_interval`` while
+    events keep arriving and doubles towards ``max_interval`` while the
+    group is quiet.
+    """
+
+    def __init__(
+        self,
+        logs_utils: LogsUtils,
+        log_group: str,
+        filter_pattern: Optional[str] = None,
+        stream_prefix: Optional[str] = None,
+        start_time: Optional[int] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 15.0,
+        page_size: int = 1000,
+        lookback_ms: int = 5000,
+        dedupe_window: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        :param logs_utils: LogsUtils (or one backed by LocalLogs)
+        :param log_group: Log group to read
+        :param filter_pattern: CloudWatch Logs filter pattern
+        :param stream_prefix: Only read streams with this prefix
+        :param start_time: Start here (milliseconds since the epoch); defaults to now
+        :param min_interval: Shortest seconds between polls while following
+        :param max_interval: Longest seconds between polls while following
+        :param page_size: Events per FilterLogEvents call
+        :param lookback_ms: How far before the newest event seen each poll starts
+        :param dedupe_window: Event IDs remembered to drop repeats
+        :param clock: Time source, for tests
+        """
+        self.logs_utils = logs_utils
+        self.log_group = log_group
+        self.filter_pattern = filter_pattern
+        self.stream_prefix = stream_prefix
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.page_size = page_size
+        self.lookback_ms = lookback_ms
+        self.dedupe_window = dedupe_window
+        self.interval = min_interval
+        self.logger = logging.getLogger(__name__)
+        self._cursor = start_time if start_time is not None else int(clock() * 1000)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    def poll(self) -> Iterator[Dict[str, Any]]:
+        """Yield the events that arrived since the previous poll, oldest first per page."""
+        next_token = None
+        start_time = max(self._cursor - self.lookback_ms, 0) if self._seen else self._cursor
+        while True:
+            try:
+                page = self.logs_utils.filter_log_events(
+                    self.log_group,
+                    start_time=start_time,
+                    filter_pattern=self.filter_pattern,
+                    log_stream_name_prefix=self.stream_prefix,
+                    next_token=next_token,
+                    limit=self.page_size,
+                )
+            except ClientError as e:
+                if error_code(e) == "ResourceNotFoundException":
+                    self.logger.debug(f"Log group {self.log_group} doesn't exist yet")
+                    return
+                raise
+            for event in page.get("events", []):
+                event_id = event.get("eventId") or f"{event.get('logStreamName')}:{event['timestamp']}:{event['message']}"
+                if event_id in self._seen:
+                    continue
+                self._seen[event_id] = None
+                if len(self._seen) > self.dedupe_window:
+                    self._seen.popitem(last=False)
+                self._cursor = max(self._cursor, event["timestamp"])
+                yield event
+            next_token = page.get("nextToken")
+            if not next_token:
+                return
+
+    def follow(self, stop: Optional[threading.Event] = None) -> Iterator[Dict[str, Any]]:
+        """Poll until ``stop`` is set, sleeping adaptively between polls."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            found = 0
+            for event in self.poll():
+                found += 1
+                yield event
+            if found:
+                self.interval = max(self.min_interval, self.interval / 2)
+            else:
+                self.interval = min(self.max_interval, self.interval * 2)
+            stop.wait(self.interval)
+
+
+def follow_many(
+    followers: Dict[str, LogFollower],
+    follow: bool = True,
+    stop: Optional[threading.Event] = None,
+    max_queued: int = 1000,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Read several log groups concurrently, one thread per follower.
+
+    Events are handed over through a queue of at most ``max_queued`` events;
+    a follower blocks while it is full, so a slow consumer slows the polling
+    rather than growing memory.
+
+    :param followers: Followers by label (e.g. environment)
+    :param follow: Keep polling until ``stop`` is set; otherwise read once
+    :param stop: Event that stops following
+    :return: (label, event) pairs as they arrive
+    """
+    stop = stop or threading.Event()
+    events: "queue.Queue[Any]" = queue.Queue(maxsize=max_queued)
+    done = object()
+
+    def run(label: str, follower: LogFollower) -> None:
+        try:
+            for event in (follower.follow(stop) if follow else follower.poll()):
+                while not stop.is_set():
+                    try:
+                        events.put((label, event), timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            follower.logger.error(f"Reading {follower.log_group} failed: {e}")
+        finally:
+            events.put(done)
+
+    threads = [
+        threading.Thread(target=propagate(run), args=(label, follower), daemon=True, name=f"logs-{label}")
+        for label, follower in followers.items()
+    ]
+    for thread in threads:
+        thread.start()
+    remaining = len(threads)
+    try:
+        while remaining:
+            item = events.get()
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        stop.set()
+
+
+class LocalLogs:
+    """
+    Offline stand-in for CloudWatch Logs, used as an AWSUtils backend.
+
+    Each log group is a directory under ``root`` (the group name with '/'
+    replaced by '_', e.g. ``_ecs_midserver-dev``) holding one
+    ``<stream>.jsonl`` file per stream (URL-quoted, since awslogs stream
+    names contain '/'), with one {"timestamp", "message"}
+    object per line. FilterLogEvents supports startTime, stream names and
+    prefixes, paging and the term subset of filter patterns: every term
+    (or "quoted phrase") must appear, and terms prefixed with '?' match
+    when any of them appears.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def call(self, service: str, operation: str, params: Dict[str, Any], invoke: Callable[[], Any]) -> Dict[str, Any]:
+        if (service, operation) != ("logs", "filter_log_events"):
+            raise NotImplementedError(f"LocalLogs doesn't support {service}:{operation}")
+        return self.filter_log_events(**params)
+
+    def append(self, log_group: str, stream: str, message: str, timestamp: Optional[int] = None) -> None:
+        """Write an event, as the awslogs driver would."""
+        directory = os.path.join(self.root, log_group.replace("/", "_"))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{urllib.parse.quote(stream, safe='')}.jsonl"), "a") as f:
+            f.write(json.dumps({"timestamp": timestamp or int(time.time() * 1000), "message": message}) + "\n")
+
+    def filter_log_events(
+        self,
+        logGroupName: str,
+        startTime: int = 0,
+        filterPattern: str = "",
+        logStreamNames: Optional[List[str]] = None,
+        logStreamNamePrefix: str = "",
+        nextToken: Optional[str] = None,
+        limit: int = 10000,
+    ) -> Dict[str, Any]:
+        directory = os.path.join(self.root, logGroupName.replace("/", "_"))
+        if not os.path.isdir(directory):
+            raise ClientError(
+                {"Error": {"Code": "ResourceNotFoundException", "Message": "The specified log group does not exist."}},
+                "FilterLogEvents",
+            )
+        matches = _pattern_matcher(filterPattern)
+        events = []
+        for filename in sorted(os.listdir(directory)):
+            stream = urllib.parse.unquote(filename[: -len(".jsonl")])
+            if logStreamNames and stream not in logStreamNames:
+                continue
+            if not stream.startswith(logStreamNamePrefix or ""):
+                continue
+            with open(os.path.join(directory, filename)) as f:
+                for line_number, line in enumerate(f):
+                    record = json.loads(line)
+                    if record["timestamp"] >= startTime and matches(record["message"]):
+                        events.append({
+                            "logStreamName": stream,
+                            "timestamp": record["timestamp"],
+                            "message": record["message"],
+                            "eventId": f"{stream}/{line_number}",
+                        })
+        events.sort(key=lambda e: (e["timestamp"], e["eventId"]))
+        offset = int(nextToken or 0)
+        page = {"events": events[offset:offset + limit]}
+        if offset + limit < len(events):
+            page["nextToken"] = str(offset + limit)
+        return page
+
+
+def _pattern_matcher(pattern: Optional[str]) -> Callable[[str], bool]:
+    terms = shlex.split(pattern or "")
+    required = [t for t in terms if not t.startswith("?")]
+    optional = [t[1:] for t in terms if t.startswith("?")]
+
+    def matches(message: str) -> bool:
+        if any(term not in message for term in required):
+            return False
+        return not optional or any(term in message for term in optional)
+
+    return matches
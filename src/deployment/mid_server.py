@@ -1,66 +1,288 @@
 import os
 import json
+import time
 import logging
+from dataclasses import dataclass
 from typing import Dict, Any, List, Optional
+from ..aws_utils import cancellation
 from ..aws_utils.ec2 import EC2Utils
 from ..aws_utils.ecs import ECSUtils
 from ..aws_utils.iam import IAMUtils
 from ..aws_utils.ssm import SSMUtils
+from ..aws_utils.ecr import ECRUtils
+from ..aws_utils.parameter_cache import ParameterCache
+from ..aws_utils.credentials import CredentialProvider
+from ..aws_utils.tracing import Tracer, tracer as default_tracer
+from ..aws_utils.transport import TransportProfile
+from .capacity import CapacityStrategy
+from .checkpoint import CheckpointStore, DeployCheckpoint
+from .image import ImageResolver, image_resolver as default_image_resolver
+from .plan import DeploymentPlan, DeploymentPlanner
+from .strategies import DeploymentStrategy, RollingStrategy
+from .terraform import TerraformOutputs
+
+
+@dataclass
+class StepOutcome:
+    """How one deployment step ended: completed, resumed, failed, timed out or aborted."""
+
+    name: str
+    status: str
+    duration: float = 0.0
+    detail: str = ""
+
 
 class MIDServerDeployer:
-    def __init__(self, profile_name: str, environment: str):
+    TASK_ROLE_POLICY_ARN = "arn:aws:iam::aws:policy/CloudWatchLogsFullAccess"
+    EXECUTION_ROLE_POLICY_ARN = "arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy"
+    INGRESS_RULES = [
+        {'IpProtocol': 'tcp', 'FromPort': 443, 'ToPort': 443, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]},
+        {'IpProtocol': 'tcp', 'FromPort': 80, 'ToPort': 80, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}
+    ]
+    STEPS = (
+        "_setup_network",
+        "_setup_security_group",
+        "_setup_iam_roles",
+        "_setup_ecs_cluster",
+        "_register_task_definition",
+        "_setup_ecs_service",
+    )
+
+    def __init__(self, profile_name: str, environment: str, strategy: Optional[DeploymentStrategy] = None,
+                 read_only: bool = False, tracer: Optional[Tracer] = None, backend: Optional[Any] = None,
+                 transport: Optional[TransportProfile] = None, credentials: Optional[CredentialProvider] = None,
+                 parameter_cache: Optional[ParameterCache] = None, image_resolver: Optional[ImageResolver] = None,
+                 checkpoints: Optional[CheckpointStore] = None, step_timeout: Optional[float] = None,
+                 deploy_timeout: Optional[float] = None, rate_limiter: Optional[Any] = None,
+                 capacity: Optional[CapacityStrategy] = None, desired_count: int = 1,
+                 terraform: Optional[TerraformOutputs] = None):
         self.profile_name = profile_name
         self.environment = environment
-        self.ec2_utils = EC2Utils(profile_name)
-        self.ecs_utils = ECSUtils(profile_name)
-        self.iam_utils = IAMUtils(profile_name)
-        self.ssm_utils = SSMUtils(profile_name)
+        self.strategy = strategy or RollingStrategy()
+        self.capacity = capacity
+        self.desired_count = desired_count
+        # The VPC, subnets, security group and roles Terraform gives are used as they are.
+        self.terraform = terraform if terraform is not None else TerraformOutputs()
+        self.terraform.check_environment(environment)
+        self.tracer = tracer if tracer is not None else default_tracer
+        self.credentials = credentials or CredentialProvider.for_profile(profile_name)
+        aws_options = {
+            "read_only": read_only,
+            "tracer": self.tracer,
+            "backend": backend,
+            "transport": transport,
+            "credentials": self.credentials,
+            "rate_limiter": rate_limiter,
+        }
+        self.ec2_utils = EC2Utils(profile_name, **aws_options)
+        self.ecs_utils = ECSUtils(profile_name, **aws_options)
+        self.iam_utils = IAMUtils(profile_name, **aws_options)
+        self.ssm_utils = SSMUtils(profile_name, cache=parameter_cache, **aws_options)
+        self.ecr_utils = ECRUtils(profile_name, **aws_options)
+        self.image_resolver = image_resolver if image_resolver is not None else default_image_resolver
+        self.checkpoints = checkpoints
+        self.checkpoint: Optional[DeployCheckpoint] = None
+        self._resuming = False
+        self.step_timeout = step_timeout
+        self.deploy_timeout = deploy_timeout
+        self.cancel_scope: Optional[cancellation.CancelScope] = None
+        self.outcomes: Dict[str, StepOutcome] = {}
+        # Handlers are configured by the caller (see src/scripts/deploy.py) so
+        # that fleet runs with many deployers don't duplicate every line.
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.INFO)
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
 
-    def deploy(self):
+    def deploy(self, deploy_id: Optional[str] = None, resume: bool = True):
         """
         Main method to deploy the MID server.
+
+        With a checkpoint store, each step's outputs are recorded as it
+        completes, and a rerun after a failure skips the steps whose
+        recorded resources still exist.
+
+        Each step must finish within ``step_timeout`` and the whole deploy
+        within ``deploy_timeout``. The deploy stops at the next AWS call or
+        poll once a deadline passes or cancel() is called (or the caller's
+        cancel scope is cancelled), and ``outcomes`` records how each step
+        ended. Steps are only checkpointed once they complete.
+
+        :param deploy_id: Resume (or start) this deploy instead of the newest unfinished one
+        :param resume: Resume an unfinished deploy with the same image and strategy
         """
         self.logger.info(f"Starting MID server deployment for environment: {self.environment}")
 
-        try:
-            # Step 1: Create or get existing VPC and security group
-            vpc_id, subnet_ids = self._setup_network()
-            sg_id = self._setup_security_group(vpc_id)
+        if self.checkpoints is not None:
+            inputs = {"image": self.image(), "strategy": self.strategy.name}
+            if self.capacity is not None:
+                inputs["capacity"] = self.capacity.describe()
+            self.checkpoint = self.checkpoints.start(self.environment, inputs, deploy_id, resume)
+            self._resuming = bool(self.checkpoint.steps)
+            if self._resuming:
+                self.logger.info(f"Resuming deploy {self.checkpoint.deploy_id}")
+            else:
+                self.logger.info(f"Deploy ID: {self.checkpoint.deploy_id}")
+
+        self.outcomes = {}
+        with cancellation.scope(self.deploy_timeout, name=f"deploy {self.environment}") as cancel_scope, \
+                self.tracer.span("deploy", environment=self.environment, strategy=self.strategy.name) as span:
+            self.cancel_scope = cancel_scope
+            try:
+                # Step 1: Create or get existing VPC and security group
+                vpc_id, subnet_ids = self._run_step(self._setup_network)
+                sg_id = self._run_step(self._setup_security_group, vpc_id)
 
-            # Step 2: Create or get existing IAM roles
-            task_role_arn, execution_role_arn = self._setup_iam_roles()
+                # Step 2: Create or get existing IAM roles
+                task_role_arn, execution_role_arn = self._run_step(self._setup_iam_roles)
 
-            # Step 3: Create or get existing ECS cluster
-            cluster_name = self._setup_ecs_cluster()
+                # Step 3: Create or get existing ECS cluster
+                cluster_name = self._run_step(self._setup_ecs_cluster)
 
-            # Step 4: Register task definition
-            task_definition_arn = self._register_task_definition(task_role_arn, execution_role_arn)
+                # Step 4: Register task definition
+                task_definition_arn = self._run_step(self._register_task_definition, task_role_arn, execution_role_arn)
 
-            # Step 5: Create or update ECS service
-            self._setup_ecs_service(cluster_name, task_definition_arn, subnet_ids, [sg_id])
+                # Step 5: Create or update ECS service
+                self._run_step(self._setup_ecs_service, cluster_name, task_definition_arn, subnet_ids, [sg_id])
 
-            self.logger.info(f"MID server deployment completed for environment: {self.environment}")
+                if self.checkpoint is not None:
+                    self.checkpoint.complete()
+                self.logger.info(
+                    f"MID server deployment completed for environment: {self.environment} in {span.duration:.1f}s"
+                )
+            except Exception as e:
+                self.logger.error(f"Error during MID server deployment: {str(e)}")
+                self.logger.error(f"Deployment steps:\n{self.report()}")
+                raise
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Stop a running deploy at its next AWS call or poll (safe to call from another thread)."""
+        if self.cancel_scope is not None:
+            self.cancel_scope.cancel(reason)
+
+    def report(self) -> str:
+        """One line per deployment step with how it ended."""
+        lines = []
+        for name in self.STEPS:
+            outcome = self.outcomes.get(name, StepOutcome(name, "not started"))
+            line = f"  {name}: {outcome.status}"
+            if outcome.status != "not started":
+                line += f" ({outcome.duration:.1f}s)"
+            if outcome.detail:
+                line += f" - {outcome.detail}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def _run_step(self, step, *args):
+        """Run one deployment step inside its own trace span and cancel scope, or reuse its checkpointed outputs."""
+        name = step.__name__
+        start = time.monotonic()
+        try:
+            with cancellation.scope(self.step_timeout, name=name):
+                if self.checkpoint is not None and self._resuming:
+                    recorded = self.checkpoint.steps.get(name)
+                    if recorded is not None and self._checkpoint_valid(name, recorded["outputs"]):
+                        self.logger.info(f"Skipping {name}, completed by deploy {self.checkpoint.deploy_id}")
+                        self.outcomes[name] = StepOutcome(name, "resumed", time.monotonic() - start)
+                        return recorded["outputs"]
+                    # Later steps depend on this one's outputs, so they all run again.
+                    self._resuming = False
+                    self.checkpoint.discard_from(name)
+                with self.tracer.span(name, environment=self.environment) as span:
+                    result = step(*args)
+        except cancellation.DeadlineExceeded as e:
+            self.outcomes[name] = StepOutcome(name, "timed out", time.monotonic() - start, str(e))
+            raise
+        except cancellation.Cancelled as e:
+            self.outcomes[name] = StepOutcome(name, "aborted", time.monotonic() - start, str(e))
+            raise
         except Exception as e:
-            self.logger.error(f"Error during MID server deployment: {str(e)}")
+            self.outcomes[name] = StepOutcome(name, "failed", time.monotonic() - start, str(e))
             raise
+        self.logger.debug(f"{name} finished in {span.duration:.2f}s")
+        # Recorded only after the step completed, so a cancelled step is rerun on resume.
+        if self.checkpoint is not None:
+            self.checkpoint.record(name, result)
+        self.outcomes[name] = StepOutcome(name, "completed", time.monotonic() - start)
+        return result
+
+    def _checkpoint_valid(self, step_name: str, outputs: Any) -> bool:
+        """Check with one or two read calls that a checkpointed step's resources still exist."""
+        with self.tracer.span("validate_checkpoint", step=step_name):
+            if step_name == "_setup_network":
+                vpc_id, subnet_ids = outputs
+                if self.terraform.network() is not None:
+                    return self.terraform.network() == (vpc_id, list(subnet_ids))
+                current = self.ec2_utils.describe_subnet_records(vpc_id, projection="SubnetId")
+                return bool(current) and set(current) == set(subnet_ids)
+            if step_name == "_setup_security_group":
+                if self.terraform.get("security_group_id") is not None:
+                    return outputs == self.terraform.get("security_group_id")
+                groups = self.ec2_utils.describe_security_groups([self.resource_name("sg")])
+                return any(g["GroupId"] == outputs for g in groups)
+            if step_name == "_setup_iam_roles":
+                return [self._current_role_arn(kind) for kind in ("task-role", "execution-role")] == list(outputs)
+            if step_name == "_setup_ecs_cluster":
+                return any(
+                    c.get("status") == "ACTIVE" and self.has_capacity_providers(c)
+                    for c in self.ecs_utils.describe_clusters([outputs])
+                )
+            if step_name == "_register_task_definition":
+                # A moved image tag needs a new revision.
+                task_definition = self.ecs_utils.describe_task_definition(outputs)
+                image = self.image_resolver.resolve(self.image(), self.ecr_utils)
+                return (
+                    task_definition is not None
+                    and task_definition.get("status", "ACTIVE") == "ACTIVE"
+                    and task_definition["containerDefinitions"][0]["image"] == image
+                )
+            return True
+
+    def plan(self) -> DeploymentPlan:
+        """
+        Work out what deploy() would do without changing anything.
+
+        :return: The ordered create/update/no-op actions and predicted API calls
+        """
+        return DeploymentPlanner(self).plan()
+
+    def pool_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Connection pool usage and wait statistics per AWS service (shared by all utils)."""
+        return self.ec2_utils.pool_metrics.snapshot()
+
+    def image(self) -> str:
+        """The image to deploy by tag: $ECR_REPO:$IMAGE_TAG (default 'latest')."""
+        return f"{os.environ.get('ECR_REPO')}:{os.environ.get('IMAGE_TAG', 'latest')}"
+
+    def resource_name(self, suffix: str) -> str:
+        """Name of a resource owned by this environment, e.g. resource_name('cluster')."""
+        return f"midserver-{self.environment}-{suffix}"
+
+    def _terraform_role_arn(self, kind: str) -> Optional[str]:
+        """ARN of the 'task-role' or 'execution-role' from the Terraform outputs."""
+        return self.terraform.get(f"{kind.replace('-', '_')}_arn")
+
+    def _current_role_arn(self, kind: str) -> Optional[str]:
+        arn = self._terraform_role_arn(kind)
+        if arn is None:
+            role = self.iam_utils.get_role(self.resource_name(kind))
+            arn = role["Role"]["Arn"] if role else None
+        return arn
 
     def _setup_network(self) -> tuple:
         """Set up VPC and subnets."""
         try:
-            vpcs = self.ec2_utils.describe_vpcs()
-            if not vpcs['Vpcs']:
-                self.logger.error("No VPCs found. Please create a VPC before deploying.")
-                raise ValueError("No VPCs found")
-            
-            vpc_id = vpcs['Vpcs'][0]['VpcId']
-            subnets = self.ec2_utils.describe_subnets(vpc_id)
-            subnet_ids = [subnet['SubnetId'] for subnet in subnets['Subnets']]
+            network = self.terraform.network()
+            if network is not None:
+                self.logger.info(f"Using VPC from Terraform: {network[0]} with subnets: {', '.join(network[1])}")
+                return network
+
+            vpc_id = self.terraform.get("vpc_id")
+            if vpc_id is None:
+                vpc_ids = self.ec2_utils.describe_vpc_records(projection="VpcId")
+                if not vpc_ids:
+                    self.logger.error("No VPCs found. Please create a VPC before deploying.")
+                    raise ValueError("No VPCs found")
+                vpc_id = vpc_ids[0]
+
+            subnet_ids = self.ec2_utils.describe_subnet_records(vpc_id, projection="SubnetId")
             
             self.logger.info(f"Using VPC: {vpc_id} with subnets: {', '.join(subnet_ids)}")
             return vpc_id, subnet_ids
@@ -71,12 +293,18 @@ class MIDServerDeployer:
     def _setup_security_group(self, vpc_id: str) -> str:
         """Set up security group."""
         try:
-            sg_name = f"midserver-{self.environment}-sg"
+            sg_id = self.terraform.get("security_group_id")
+            if sg_id is not None:
+                self.logger.info(f"Using security group from Terraform: {sg_id}")
+                return sg_id
+            sg_name = self.resource_name("sg")
+            existing = self.ec2_utils.describe_security_groups([sg_name], vpc_id)
+            if existing:
+                sg_id = existing[0]['GroupId']
+                self.logger.info(f"Using existing security group: {sg_id}")
+                return sg_id
             sg_id = self.ec2_utils.create_security_group(sg_name, f"Security group for MID server {self.environment}", vpc_id)
-            self.ec2_utils.authorize_security_group_ingress(sg_id, [
-                {'IpProtocol': 'tcp', 'FromPort': 443, 'ToPort': 443, 'CidrIp': '0.0.0.0/0'},
-                {'IpProtocol': 'tcp', 'FromPort': 80, 'ToPort': 80, 'CidrIp': '0.0.0.0/0'}
-            ])
+            self.ec2_utils.authorize_security_group_ingress(sg_id, self.INGRESS_RULES)
             self.logger.info(f"Created security group: {sg_id}")
             return sg_id
         except Exception as e:
@@ -86,17 +314,19 @@ class MIDServerDeployer:
     def _setup_iam_roles(self) -> tuple:
         """Set up IAM roles for ECS tasks."""
         try:
-            task_role_name = f"midserver-{self.environment}-task-role"
-            execution_role_name = f"midserver-{self.environment}-execution-role"
-
-            task_role = self._create_or_get_role(task_role_name, "ecs-tasks.amazonaws.com")
-            execution_role = self._create_or_get_role(execution_role_name, "ecs-tasks.amazonaws.com")
+            # Roles from Terraform are used as they are; Terraform manages their policies.
+            arns = {kind: self._terraform_role_arn(kind) for kind in ("task-role", "execution-role")}
+            policies = {"task-role": self.TASK_ROLE_POLICY_ARN, "execution-role": self.EXECUTION_ROLE_POLICY_ARN}
+            managed = [kind for kind, arn in arns.items() if arn is None]
 
-            self.iam_utils.attach_role_policy(task_role_name, "arn:aws:iam::aws:policy/CloudWatchLogsFullAccess")
-            self.iam_utils.attach_role_policy(execution_role_name, "arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy")
+            for kind in managed:
+                role = self._create_or_get_role(self.resource_name(kind), "ecs-tasks.amazonaws.com")
+                arns[kind] = role['Role']['Arn']
+            for kind in managed:
+                self.iam_utils.attach_role_policy(self.resource_name(kind), policies[kind])
 
-            self.logger.info(f"Set up IAM roles: {task_role_name}, {execution_role_name}")
-            return task_role['Role']['Arn'], execution_role['Role']['Arn']
+            self.logger.info(f"Set up IAM roles: {', '.join(arns.values())}")
+            return arns["task-role"], arns["execution-role"]
         except Exception as e:
             self.logger.error(f"Error setting up IAM roles: {str(e)}")
             raise
@@ -123,25 +353,43 @@ class MIDServerDeployer:
     def _setup_ecs_cluster(self) -> str:
         """Set up ECS cluster."""
         try:
-            cluster_name = f"midserver-{self.environment}-cluster"
-            self.ecs_utils.create_cluster(cluster_name)
+            cluster_name = self.resource_name("cluster")
+            if self.capacity is None:
+                self.ecs_utils.create_cluster(cluster_name)
+            else:
+                providers, default_strategy = self.capacity.providers, self.capacity.to_api()
+                cluster = self.ecs_utils.create_cluster(cluster_name, providers, default_strategy)["cluster"]
+                # CreateCluster leaves an existing cluster's capacity providers as they are.
+                if not self.has_capacity_providers(cluster):
+                    self.ecs_utils.put_cluster_capacity_providers(cluster_name, providers, default_strategy)
+                    self.logger.info(f"Added capacity providers {', '.join(providers)} to {cluster_name}")
             self.logger.info(f"Created ECS cluster: {cluster_name}")
             return cluster_name
         except Exception as e:
             self.logger.error(f"Error setting up ECS cluster: {str(e)}")
             raise
 
+    def has_capacity_providers(self, cluster: Dict[str, Any]) -> bool:
+        """Whether a described cluster has the capacity providers this deploy uses."""
+        if self.capacity is None:
+            return True
+        return set(self.capacity.providers) <= set(cluster.get("capacityProviders", []))
+
     def _register_task_definition(self, task_role_arn: str, execution_role_arn: str) -> str:
         """Register ECS task definition."""
         try:
-            family = f"midserver-{self.environment}-task"
+            family = self.resource_name("task")
+            image = self.image_resolver.resolve(self.image(), self.ecr_utils)
             container_definitions = [
                 {
                     "name": f"midserver-{self.environment}",
-                    "image": f"{os.environ.get('ECR_REPO')}:latest",  # Ensure ECR_REPO is set in environment variables
+                    "image": image,
                     "cpu": 256,
                     "memory": 512,
                     "essential": True,
+                    # The most Fargate allows, and the notice a Spot interruption
+                    # gives: time for the agent to finish its work (see docker/entrypoint.sh).
+                    "stopTimeout": 120,
                     "portMappings": [],
                     "environment": self._get_environment_variables(),
                     "logConfiguration": {
@@ -184,51 +432,20 @@ class MIDServerDeployer:
             raise
 
     def _setup_ecs_service(self, cluster_name: str, task_definition_arn: str, subnet_ids: List[str], security_groups: List[str]):
-        """Create or update ECS service."""
+        """Create or update ECS service using the configured deployment strategy."""
         try:
-            service_name = f"midserver-{self.environment}-service"
-            
-            # Check if the service already exists
-            existing_services = self.ecs_utils.describe_services(cluster_name, [service_name])
-            
-            if existing_services['services']:
-                # Update existing service
-                self.ecs_utils.update_service(
-                    cluster=cluster_name,
-                    service=service_name,
-                    taskDefinition=task_definition_arn,
-                    desiredCount=1,
-                    networkConfiguration={
-                        'awsvpcConfiguration': {
-                            'subnets': subnet_ids,
-                            'securityGroups': security_groups,
-                            'assignPublicIp': 'ENABLED'
-                        }
-                    }
-                )
-                self.logger.info(f"Updated existing ECS service: {service_name}")
-            else:
-                # Create new service
-                self.ecs_utils.create_service(
-                    cluster=cluster_name,
-                    serviceName=service_name,
-                    taskDefinition=task_definition_arn,
-                    desiredCount=1,
-                    launchType='FARGATE',
-                    networkConfiguration={
-                        'awsvpcConfiguration': {
-                            'subnets': subnet_ids,
-                            'securityGroups': security_groups,
-                            'assignPublicIp': 'ENABLED'
-                        }
-                    }
-                )
-                self.logger.info(f"Created new ECS service: {service_name}")
+            service_name = self.resource_name("service")
+            self.logger.info(f"Rolling out {task_definition_arn} to {service_name} using the {self.strategy.name} strategy")
+            self.strategy.deploy(
+                self.ecs_utils, cluster_name, service_name, task_definition_arn, subnet_ids, security_groups,
+                desired_count=self.desired_count, capacity=self.capacity,
+            )
         except Exception as e:
             self.logger.error(f"Error setting up ECS service: {str(e)}")
             raise
 
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     deployer = MIDServerDeployer(profile_name="default", environment="dev")
     deployer.deploy()
\ No newline at end of file
@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import boto3
+import botocore.session
+from botocore.credentials import RefreshableCredentials
+from ..aws_utils.credentials import CredentialProvider
+from ..aws_utils.tracing import propagate
+from ..aws_utils.transport import TransportProfile
+from .mid_server import MIDServerDeployer
+
+
+@dataclass(frozen=True)
+class AccountTarget:
+    """One MID server environment in one AWS account."""
+
+    account_id: str
+    role_name: str
+    environment: str
+    region: Optional[str] = None
+
+    @property
+    def role_arn(self) -> str:
+        return f"arn:aws:iam::{self.account_id}:role/{self.role_name}"
+
+    @classmethod
+    def parse(cls, spec: str, environment: str, region: Optional[str] = None) -> "AccountTarget":
+        """
+        Parse '<account_id>:<role_name>'.
+
+        :param spec: Account and role, e.g. '123456789012:MidServerDeployer'
+        :param environment: Environment to deploy in that account
+        :param region: Region to deploy to, or None for the base profile's region
+        """
+        account_id, sep, role_name = spec.partition(":")
+        if not sep or not account_id.isdigit() or len(account_id) != 12 or not role_name:
+            raise ValueError(f"Invalid account spec: {spec}. Expected <12-digit account id>:<role name>")
+        return cls(account_id, role_name, environment, region)
+
+
+@dataclass
+class AccountResult:
+    target: AccountTarget
+    succeeded: bool
+    duration: float
+    error: Optional[str] = None
+
+
+class AssumedRoleSessionPool:
+    """
+    One CredentialProvider per (account, role, region), backed by
+    auto-refreshing assumed-role credentials. Roles are assumed through the
+    base provider's STS client, so each account costs a single AssumeRole
+    call until the credentials near expiry, and each account's provider keeps
+    its own cached clients.
+    """
+
+    def __init__(
+        self,
+        base: CredentialProvider,
+        session_name: str = "midserver-deployer",
+        duration_seconds: int = 3600,
+        transport: Optional[TransportProfile] = None,
+    ):
+        self.base = base
+        self.session_name = session_name
+        self.duration_seconds = duration_seconds
+        self.transport = transport or TransportProfile()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str, Optional[str]], threading.Lock] = {}
+        self._providers: Dict[Tuple[str, str, Optional[str]], CredentialProvider] = {}
+
+    def provider(self, account_id: str, role_name: str, region: Optional[str] = None) -> CredentialProvider:
+        """Get (assuming the role on first use) the provider for an account."""
+        key = (account_id, role_name, region)
+        provider = self._providers.get(key)
+        if provider is not None:
+            return provider
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            provider = self._providers.get(key)
+            if provider is None:
+                provider = self._providers[key] = self._assume(account_id, role_name, region)
+        return provider
+
+    def warm(
+        self, targets: List[AccountTarget], max_workers: int = 8
+    ) -> Dict[Tuple[str, str, Optional[str]], Exception]:
+        """
+        Assume the roles for all targets concurrently.
+
+        :return: The error for each (account, role, region) whose role couldn't be assumed
+        """
+        unique = {(t.account_id, t.role_name, t.region) for t in targets}
+        errors: Dict[Tuple[str, str, Optional[str]], Exception] = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.provider, *key): key for key in unique}
+            for future, key in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    errors[key] = e
+        return errors
+
+    def _assume(self, account_id: str, role_name: str, region: Optional[str]) -> CredentialProvider:
+        role_arn = f"arn:aws:iam::{account_id}:role/{role_name}"
+
+        def fetch_credentials() -> Dict[str, Any]:
+            response = self.base.client("sts", self.transport).assume_role(
+                RoleArn=role_arn,
+                RoleSessionName=self.session_name,
+                DurationSeconds=self.duration_seconds,
+            )
+            credentials = response["Credentials"]
+            return {
+                "access_key": credentials["AccessKeyId"],
+                "secret_key": credentials["SecretAccessKey"],
+                "token": credentials["SessionToken"],
+                "expiry_time": credentials["Expiration"].isoformat(),
+            }
+
+        credentials = RefreshableCredentials.create_from_metadata(
+            metadata=fetch_credentials(),
+            refresh_using=fetch_credentials,
+            method="sts-assume-role",
+        )
+        core_session = botocore.session.get_session()
+        # botocore has no public setter for pre-built refreshable credentials.
+        core_session._credentials = credentials
+        session = boto3.Session(
+            botocore_session=core_session,
+            region_name=region or self.base.session.region_name,
+        )
+        return CredentialProvider(f"{account_id}:{role_name}", session=session)
+
+
+class MultiAccountDeployer:
+    """
+    Deploys MID servers to many accounts in parallel, with at most
+    ``per_account_concurrency`` deployments running in any one account.
+
+    Each account's targets wait in their own queue, and a target is only
+    handed to the pool when its account has a free slot, so a busy account
+    never ties up workers that other accounts' targets could use.
+    """
+
+    def __init__(
+        self,
+        targets: List[AccountTarget],
+        base_profile: Optional[str] = None,
+        max_workers: int = 8,
+        per_account_concurrency: int = 2,
+        session_pool: Optional[AssumedRoleSessionPool] = None,
+        deployer_factory: Callable[..., Any] = MIDServerDeployer,
+        **deployer_options: Any,
+    ):
+        """
+        :param targets: Accounts and environments to deploy
+        :param base_profile: Profile used to assume the target roles
+        :param max_workers: Deployments running at once across all accounts
+        :param per_account_concurrency: Deployments running at once in one account
+        :param session_pool: Pool of assumed-role sessions; created from base_profile if omitted
+        :param deployer_factory: Builds the deployer for a target (MIDServerDeployer by default)
+        :param deployer_options: Extra keyword arguments for the deployer (strategy, transport, ...)
+        """
+        self.targets = targets
+        self.max_workers = max_workers
+        self.per_account_concurrency = per_account_concurrency
+        self.session_pool = session_pool or AssumedRoleSessionPool(
+            CredentialProvider.for_profile(base_profile)
+        )
+        self.deployer_factory = deployer_factory
+        self.deployer_options = deployer_options
+        self.logger = logging.getLogger(__name__)
+
+    def deploy_all(self) -> List[AccountResult]:
+        """
+        Deploy every target. A failure in one account doesn't stop the others.
+
+        :return: One result per target, in the order the targets were given
+        """
+        role_errors = self.session_pool.warm(self.targets, self.max_workers)
+        queues: Dict[str, Deque[int]] = {}
+        results: Dict[int, AccountResult] = {}
+        for index, target in enumerate(self.targets):
+            error = role_errors.get((target.account_id, target.role_name, target.region))
+            if error is not None:
+                results[index] = AccountResult(target, False, 0.0, f"Could not assume {target.role_arn}: {error}")
+                continue
+            queues.setdefault(target.account_id, deque()).append(index)
+        running: Dict[Future, int] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            def submit_next(account_id: str) -> None:
+                index = queues[account_id].popleft()
+                running[executor.submit(propagate(self._deploy_one), self.targets[index])] = index
+
+            for account_id, queue in queues.items():
+                for _ in range(min(self.per_account_concurrency, len(queue))):
+                    submit_next(account_id)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    results[index] = future.result()
+                    account_id = self.targets[index].account_id
+                    if queues[account_id]:
+                        submit_next(account_id)
+        results = [results[index] for index in range(len(self.targets))]
+        failed = [r for r in results if not r.succeeded]
+        self.logger.info(f"Deployed to {len(results) - len(failed)} of {len(results)} targets")
+        for result in failed:
+            self.logger.error(
+                f"Deployment to {result.target.account_id}/{result.target.environment} failed: {result.error}"
+            )
+        return results
+
+    def _deploy_one(self, target: AccountTarget) -> AccountResult:
+        start = time.monotonic()
+        try:
+            credentials = self.session_pool.provider(target.account_id, target.role_name, target.region)
+            deployer = self.deployer_factory(
+                profile_name=None,
+                environment=target.environment,
+                credentials=credentials,
+                **self.deployer_options,
+            )
+            deployer.deploy()
+            return AccountResult(target, True, time.monotonic() - start)
+        except Exception as e:
+            return AccountResult(target, False, time.monotonic() - start, str(e))
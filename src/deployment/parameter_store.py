@@ -0,0 +1,265 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+import yaml
+from dotenv import dotenv_values
+from ..aws_utils.ratelimit import TokenBucket
+from ..aws_utils.ssm import SSMUtils
+from ..aws_utils.tracing import propagate
+
+# Versions and value hashes of the parameters written by previous syncs, per
+# account and region. The hashes are keyed with a secret in <STATE_FILE>.key.
+STATE_FILE = os.path.join(".midserver", "parameters.json")
+
+# SSM's default PutParameter throughput is 3 TPS per account and region
+# (higher with the "high throughput" setting).
+DEFAULT_PUT_RATE = 3.0
+
+
+def parameter_path(environment: str) -> str:
+    """Parameter Store path holding an environment's MID server settings."""
+    return f"/midserver/{environment}/"
+
+
+def load_env_file(path: str) -> Dict[str, str]:
+    """
+    Read parameters for one environment from a .env file (the keys of
+    config/example.env). Keys without a value are skipped, since SSM doesn't
+    store empty parameters.
+    """
+    return {key: value for key, value in dotenv_values(path).items() if value}
+
+
+def load_yaml_file(path: str) -> Dict[str, Dict[str, str]]:
+    """
+    Read parameters for several environments from YAML, with one mapping per
+    environment:
+
+        dev:
+          MID_INSTANCE_URL: https://dev.service-now.com
+        prod:
+          MID_INSTANCE_URL: https://prod.service-now.com
+    """
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        raise ValueError(f"Invalid parameter file: {path}. Expected a mapping of environment to parameters")
+    return {
+        environment: {key: str(value) for key, value in values.items() if value not in (None, "")}
+        for environment, values in data.items()
+    }
+
+
+def value_hash(key: bytes, name: str, value: str) -> str:
+    """HMAC of a parameter value, so the state file can't be used to guess SecureStrings."""
+    return hmac.new(key, f"{name}\0{value}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+@dataclass
+class ParameterChange:
+    """A parameter and what the sync does to it ('create', 'update' or 'unchanged')."""
+
+    name: str
+    action: str
+    reason: str
+    version: Optional[int] = None
+
+
+class ParameterSync:
+    """
+    Brings the parameters under /midserver/<env>/ in line with local values.
+
+    Existing parameters are compared by metadata first: DescribeParameters
+    gives each parameter's version, and the state file remembers, per account
+    and region, the version and an HMAC of the value this tool last wrote. A parameter whose version
+    hasn't moved is compared by hash alone; only parameters changed outside
+    this tool (or never synced) are read back and decrypted, 10 per call.
+    Changed keys are then written concurrently, paced by a token bucket so
+    that bulk seeding stays under SSM's PutParameter throughput cap.
+    """
+
+    def __init__(
+        self,
+        ssm_utils: SSMUtils,
+        state_file: Optional[str] = STATE_FILE,
+        rate: float = DEFAULT_PUT_RATE,
+        max_workers: int = 4,
+        param_type: str = "SecureString",
+    ):
+        """
+        :param ssm_utils: SSMUtils for the target account and region
+        :param state_file: JSON file with the versions and hashes of synced parameters, or None; the hash key is kept
+            in <state_file>.key
+        :param rate: Maximum PutParameter calls per second
+        :param max_workers: Number of concurrent writers
+        :param param_type: Type of new parameters
+        """
+        self.ssm_utils = ssm_utils
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.param_type = param_type
+        self.bucket = TokenBucket(rate)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._key = self._load_key()
+        # account/region -> name -> {"version": ..., "hash": ...}
+        self._state: Dict[str, Dict[str, Dict[str, Any]]] = self._load_state()
+
+    def plan(self, environment: str, values: Dict[str, str]) -> List[ParameterChange]:
+        """
+        Work out which of an environment's parameters need writing.
+
+        :param environment: Environment, e.g. 'dev'
+        :param values: Parameter values by key, e.g. {'MID_SERVER_NAME': 'mid-dev'}
+        :return: One change per key
+        """
+        path = parameter_path(environment)
+        existing = {p["Name"]: p for p in self.ssm_utils.describe_parameters(path, recursive=False)}
+        changes: Dict[str, ParameterChange] = {}
+        unknown: List[str] = []
+        synced = self._state.get(self.ssm_utils.cache_scope, {})
+        for key, value in values.items():
+            name = path + key
+            current = existing.get(name)
+            state = synced.get(name)
+            if current is None:
+                changes[name] = ParameterChange(name, "create", "missing")
+            elif current.get("Type") != self.param_type:
+                changes[name] = ParameterChange(name, "update", f"type is {current.get('Type')}", current["Version"])
+            elif state is not None and state["version"] == current["Version"]:
+                if hmac.compare_digest(state["hash"], value_hash(self._key, name, value)):
+                    changes[name] = ParameterChange(name, "unchanged", "hash matches", current["Version"])
+                else:
+                    changes[name] = ParameterChange(name, "update", "value changed", current["Version"])
+            else:
+                unknown.append(name)
+
+        if unknown:
+            # Changed elsewhere or never synced: compare the actual values.
+            current_values = self.ssm_utils.get_parameters(unknown, with_decryption=True)
+            for name in unknown:
+                version = existing[name]["Version"]
+                desired = values[name[len(path):]]
+                if current_values.get(name) == desired:
+                    changes[name] = ParameterChange(name, "unchanged", "value matches", version)
+                    self._remember(name, version, desired)
+                else:
+                    changes[name] = ParameterChange(name, "update", "value differs", version)
+        return [changes[path + key] for key in values]
+
+    def apply(self, environment: str, values: Dict[str, str], changes: List[ParameterChange]) -> None:
+        """Write the created and updated parameters concurrently."""
+        path = parameter_path(environment)
+        pending = [c for c in changes if c.action != "unchanged"]
+
+        def write(change: ParameterChange) -> None:
+            key = change.name[len(path):]
+            self.bucket.acquire()
+            response = self.ssm_utils.put_parameter(
+                change.name,
+                values[key],
+                f"MID server {key} for {environment}",
+                param_type=self.param_type,
+                overwrite=change.action == "update",
+            )
+            change.version = response["Version"]
+            self._remember(change.name, change.version, values[key])
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for future in [executor.submit(propagate(write), change) for change in pending]:
+                    future.result()
+        finally:
+            self.save_state()
+
+    def sync(
+        self, values_by_environment: Dict[str, Dict[str, str]], dry_run: bool = False
+    ) -> Dict[str, List[ParameterChange]]:
+        """
+        Plan every environment concurrently, then write the changes.
+
+        :param values_by_environment: Parameter values by environment and key
+        :param dry_run: Only plan, don't write
+        :return: Changes by environment
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                environment: executor.submit(propagate(self.plan), environment, values)
+                for environment, values in values_by_environment.items()
+            }
+            plans = {environment: future.result() for environment, future in futures.items()}
+        if dry_run:
+            self.save_state()
+            return plans
+        for environment, changes in plans.items():
+            self.apply(environment, values_by_environment[environment], changes)
+        return plans
+
+    def save_state(self) -> None:
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.state_file, "w") as f:
+            json.dump(self._state, f, indent=2, sort_keys=True)
+
+    def _remember(self, name: str, version: int, value: str) -> None:
+        scope = self.ssm_utils.cache_scope
+        with self._lock:
+            self._state.setdefault(scope, {})[name] = {"version": version, "hash": value_hash(self._key, name, value)}
+
+    def _load_state(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file) as f:
+            state = json.load(f)
+        # Entries from before the state was kept per account (keyed by
+        # parameter name, with unkeyed hashes) are dropped; those parameters
+        # are compared by value once and remembered again.
+        return {scope: entries for scope, entries in state.items() if not scope.startswith("/")}
+
+    def _load_key(self) -> bytes:
+        if not self.state_file:
+            return os.urandom(32)
+        key_file = f"{self.state_file}.key"
+        if not os.path.exists(key_file):
+            directory = os.path.dirname(key_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Written in full under a temporary name and then linked into
+            # place, as ParameterCache does with its key.
+            tmp = f"{key_file}.{os.getpid()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(os.urandom(32).hex().encode("ascii"))
+            try:
+                os.link(tmp, key_file)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        with open(key_file, "rb") as f:
+            return f.read().strip()
+
+
+def summarize(changes: Dict[str, List[ParameterChange]]) -> Dict[str, Dict[str, int]]:
+    """Count the changes per environment and action."""
+    summary: Dict[str, Dict[str, int]] = {}
+    for environment, environment_changes in changes.items():
+        counts = summary.setdefault(environment, {"create": 0, "update": 0, "unchanged": 0})
+        for change in environment_changes:
+            counts[change.action] += 1
+    return summary
+
+
+def changes_to_json(changes: Dict[str, List[ParameterChange]]) -> str:
+    return json.dumps(
+        {environment: [asdict(c) for c in items] for environment, items in changes.items()}, indent=2
+    )
@@ -0,0 +1,303 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from botocore.exceptions import ClientError
+from ..aws_utils import error_code
+from ..aws_utils.latency import LatencyRecorder, latency_recorder
+from ..aws_utils.tracing import propagate
+
+# Typical latencies (seconds) used for operations that have never been recorded
+DEFAULT_LATENCY = 0.15
+DEFAULT_LATENCIES = {
+    "ec2:create_security_group": 0.4,
+    "ec2:authorize_security_group_ingress": 0.3,
+    "iam:create_role": 0.5,
+    "iam:attach_role_policy": 0.3,
+    "ecs:create_cluster": 0.6,
+    "ecs:put_cluster_capacity_providers": 0.5,
+    "ecr:describe_images": 0.2,
+    "ecs:register_task_definition": 0.3,
+    "ecs:create_service": 0.8,
+    "ecs:update_service": 0.5,
+    "ecs:create_task_set": 0.8,
+    "ecs:update_service_primary_task_set": 0.5,
+    "ecs:delete_task_set": 0.4,
+    "ecs:update_task_set": 0.4,
+}
+
+# Parameters read by MIDServerDeployer._get_environment_variables
+ENVIRONMENT_PARAMETERS = [
+    "MID_INSTANCE_URL",
+    "MID_INSTANCE_USERNAME",
+    "MID_INSTANCE_PASSWORD",
+    "MID_SERVER_NAME",
+]
+
+
+@dataclass
+class PlannedAction:
+    """A single resource and what deploy() would do to it."""
+
+    resource: str
+    name: str
+    action: str  # "create", "update", "no-op" or "error"
+    detail: str = ""
+    api_calls: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DeploymentPlan:
+    environment: str
+    strategy: str
+    actions: List[PlannedAction] = field(default_factory=list)
+
+    @property
+    def api_calls(self) -> List[str]:
+        return [call for action in self.actions for call in action.api_calls]
+
+    @property
+    def has_errors(self) -> bool:
+        return any(action.action == "error" for action in self.actions)
+
+    def estimate_seconds(self, latencies: Optional[LatencyRecorder] = None) -> float:
+        """
+        Estimate the time deploy() spends in API calls. Steps run one after
+        another, so this is the sum of the per-operation latencies. Time spent
+        waiting for tasks to become healthy is not included.
+
+        :param latencies: Recorded latencies; falls back to DEFAULT_LATENCIES
+        :return: Estimated seconds
+        """
+        latencies = latencies if latencies is not None else latency_recorder
+        total = 0.0
+        for call in self.api_calls:
+            service, operation = call.split(":", 1)
+            recorded = latencies.mean(service, operation)
+            total += recorded if recorded is not None else DEFAULT_LATENCIES.get(call, DEFAULT_LATENCY)
+        return total
+
+    def to_dict(self, latencies: Optional[LatencyRecorder] = None) -> Dict[str, Any]:
+        return {
+            "environment": self.environment,
+            "strategy": self.strategy,
+            "actions": [vars(action) for action in self.actions],
+            "predicted_api_calls": len(self.api_calls),
+            "estimated_seconds": round(self.estimate_seconds(latencies), 3),
+        }
+
+    def to_json(self, latencies: Optional[LatencyRecorder] = None) -> str:
+        return json.dumps(self.to_dict(latencies), indent=2)
+
+    def render(self, latencies: Optional[LatencyRecorder] = None) -> str:
+        """Render the plan as a plain-text table."""
+        rows = [("RESOURCE", "NAME", "ACTION", "CALLS", "DETAIL")]
+        rows += [
+            (a.resource, a.name, a.action, str(len(a.api_calls)), a.detail)
+            for a in self.actions
+        ]
+        widths = [max(len(row[i]) for row in rows) for i in range(4)]
+        lines = [f"Plan for environment: {self.environment} ({self.strategy} strategy)"]
+        for row in rows:
+            cells = [cell.ljust(width) for cell, width in zip(row, widths)]
+            lines.append("  ".join(cells + [row[4]]).rstrip())
+        lines.append(f"Predicted API calls: {len(self.api_calls)}")
+        lines.append(
+            f"Estimated API time: {self.estimate_seconds(latencies):.1f}s "
+            "(excludes waiting for tasks to become healthy)"
+        )
+        return "\n".join(lines)
+
+
+class DeploymentPlanner:
+    """
+    Builds a DeploymentPlan for a MIDServerDeployer using only read
+    operations. Independent resources are inspected concurrently.
+    """
+
+    def __init__(self, deployer: Any, max_workers: int = 6):
+        self.deployer = deployer
+        self.max_workers = max_workers
+
+    def plan(self) -> DeploymentPlan:
+        d = self.deployer
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(propagate(self._plan_network)),
+                executor.submit(
+                    propagate(self._plan_role),
+                    d.resource_name("task-role"),
+                    d.TASK_ROLE_POLICY_ARN,
+                    d.terraform.get("task_role_arn"),
+                ),
+                executor.submit(
+                    propagate(self._plan_role),
+                    d.resource_name("execution-role"),
+                    d.EXECUTION_ROLE_POLICY_ARN,
+                    d.terraform.get("execution_role_arn"),
+                ),
+                executor.submit(propagate(self._plan_cluster)),
+                executor.submit(propagate(self._plan_task_definition)),
+                executor.submit(propagate(self._plan_service)),
+            ]
+            plan = DeploymentPlan(d.environment, d.strategy.name)
+            for future in futures:
+                plan.actions.extend(future.result())
+        return plan
+
+    def _plan_network(self) -> List[PlannedAction]:
+        ec2 = self.deployer.ec2_utils
+        terraform = self.deployer.terraform
+        network = terraform.network()
+        if network is not None:
+            vpc_id, subnet_ids = network
+            actions = [
+                PlannedAction("network", vpc_id, "no-op", f"{len(subnet_ids)} subnets from Terraform")
+            ]
+        else:
+            calls = ["ec2:describe_subnets"]
+            vpc_id = terraform.get("vpc_id")
+            if vpc_id is None:
+                vpc_ids = ec2.describe_vpc_records(projection="VpcId")
+                if not vpc_ids:
+                    return [
+                        PlannedAction("vpc", "-", "error", "No VPCs found", ["ec2:describe_vpcs"])
+                    ]
+                vpc_id = vpc_ids[0]
+                calls.insert(0, "ec2:describe_vpcs")
+            subnet_ids = ec2.describe_subnet_records(vpc_id, projection="SubnetId")
+            actions = [
+                PlannedAction("network", vpc_id, "no-op", f"{len(subnet_ids)} subnets", calls)
+            ]
+        sg_id = terraform.get("security_group_id")
+        if sg_id is not None:
+            actions.append(PlannedAction("security-group", sg_id, "no-op", "from Terraform"))
+            return actions
+        sg_name = self.deployer.resource_name("sg")
+        existing = ec2.describe_security_groups([sg_name], vpc_id)
+        if existing:
+            actions.append(
+                PlannedAction(
+                    "security-group",
+                    sg_name,
+                    "no-op",
+                    existing[0]["GroupId"],
+                    ["ec2:describe_security_groups"],
+                )
+            )
+        else:
+            actions.append(
+                PlannedAction(
+                    "security-group",
+                    sg_name,
+                    "create",
+                    f"in {vpc_id}",
+                    [
+                        "ec2:describe_security_groups",
+                        "ec2:create_security_group",
+                        "ec2:authorize_security_group_ingress",
+                    ],
+                )
+            )
+        return actions
+
+    def _plan_role(self, role_name: str, policy_arn: str, terraform_arn: Optional[str] = None) -> List[PlannedAction]:
+        if terraform_arn is not None:
+            return [PlannedAction("iam-role", terraform_arn, "no-op", "from Terraform")]
+        iam = self.deployer.iam_utils
+        role = iam.get_role(role_name)
+        policy_name = policy_arn.rsplit("/", 1)[-1]
+        if role is None:
+            return [
+                PlannedAction("iam-role", role_name, "create", "", ["iam:get_role", "iam:create_role"]),
+                PlannedAction(
+                    "iam-policy-attachment", role_name, "create", policy_name, ["iam:attach_role_policy"]
+                ),
+            ]
+        attached = set(iam.list_attached_role_policies(role_name, projection="PolicyArn"))
+        return [
+            PlannedAction("iam-role", role_name, "no-op", "", ["iam:get_role"]),
+            PlannedAction(
+                "iam-policy-attachment",
+                role_name,
+                "no-op" if policy_arn in attached else "create",
+                policy_name,
+                ["iam:attach_role_policy"],
+            ),
+        ]
+
+    def _plan_cluster(self) -> List[PlannedAction]:
+        cluster_name = self.deployer.resource_name("cluster")
+        clusters = self.deployer.ecs_utils.describe_clusters([cluster_name])
+        active = [c for c in clusters if c.get("status") == "ACTIVE"]
+        capacity = self.deployer.capacity
+        if active and not self.deployer.has_capacity_providers(active[0]):
+            return [
+                PlannedAction(
+                    "ecs-cluster",
+                    cluster_name,
+                    "update",
+                    f"add capacity providers: {capacity.describe()}",
+                    ["ecs:create_cluster", "ecs:put_cluster_capacity_providers"],
+                )
+            ]
+        return [
+            PlannedAction(
+                "ecs-cluster",
+                cluster_name,
+                "no-op" if active else "create",
+                capacity.describe() if capacity is not None else "",
+                ["ecs:create_cluster"],
+            )
+        ]
+
+    def _plan_task_definition(self) -> List[PlannedAction]:
+        family = self.deployer.resource_name("task")
+        latest = self.deployer.ecs_utils.describe_task_definition(family)
+        calls = ["ecr:describe_images"] + self._parameter_calls() + ["ecs:register_task_definition"]
+        if latest is None:
+            return [PlannedAction("task-definition", family, "create", "revision 1", calls)]
+        return [
+            PlannedAction(
+                "task-definition",
+                family,
+                "update",
+                f"revision {latest['revision'] + 1}",
+                calls,
+            )
+        ]
+
+    def _parameter_calls(self) -> List[str]:
+        """SSM calls for the container's parameters, through the parameter cache if the deployer has one."""
+        ssm = self.deployer.ssm_utils
+        if ssm.cache is None:
+            return ["ssm:get_parameter"] * len(ENVIRONMENT_PARAMETERS)
+        # SSMUtils.refresh_cache: one DescribeParameters pass (50 per page),
+        # then GetParameters (10 per call) for versions the cache doesn't have.
+        current = ssm.describe_parameters(f"/midserver/{self.deployer.environment}/", recursive=False)
+        scope = ssm.cache_scope
+        stale = [p for p in current if ssm.cache.version(p["Name"], scope=scope) != p["Version"]]
+        return ["ssm:describe_parameters"] * max(1, -(-len(current) // 50)) + ["ssm:get_parameters"] * (
+            -(-len(stale) // 10)
+        )
+
+    def _plan_service(self) -> List[PlannedAction]:
+        d = self.deployer
+        cluster_name = d.resource_name("cluster")
+        service_name = d.resource_name("service")
+        try:
+            services = d.ecs_utils.describe_services(cluster_name, [service_name]).get("services", [])
+        except ClientError as e:
+            if error_code(e) != "ClusterNotFoundException":
+                raise
+            services = []
+        exists = any(s.get("status") != "INACTIVE" for s in services)
+        return [
+            PlannedAction(
+                "ecs-service",
+                service_name,
+                "update" if exists else "create",
+                f"{d.strategy.name} rollout",
+                d.strategy.planned_api_calls(exists),
+            )
+        ]
@@ -0,0 +1,252 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from botocore.exceptions import ClientError
+from ..aws_utils import error_code
+from ..aws_utils.ecs import ECSUtils
+from ..aws_utils.tracing import propagate
+
+# Last fleet status, reused by status commands within STATUS_MAX_AGE seconds
+STATUS_CACHE_FILE = os.path.join(".midserver", "status.json")
+STATUS_MAX_AGE = 15.0
+
+# Only the fields the status needs are kept from each described service and task
+SERVICE_PROJECTION = (
+    "{serviceName: serviceName, status: status, desiredCount: desiredCount, runningCount: runningCount, "
+    "pendingCount: pendingCount, taskDefinition: taskDefinition, "
+    "rolloutState: deployments[?status=='PRIMARY'] | [0].rolloutState}"
+)
+TASK_PROJECTION = ["group", "lastStatus", "healthStatus", "taskDefinitionArn"]
+
+
+@dataclass
+class ServiceStatus:
+    """One ECS service and the health of its tasks."""
+
+    cluster: str
+    service: str
+    status: str
+    desired: int
+    running: int
+    pending: int
+    task_definition: str  # family:revision
+    rollout_state: str = ""
+    revisions: Dict[str, int] = field(default_factory=dict)  # running tasks per family:revision
+    health: Dict[str, int] = field(default_factory=dict)  # running tasks per health status
+
+    @property
+    def healthy(self) -> bool:
+        return self.status == "ACTIVE" and self.running >= self.desired and not self.health.get("UNHEALTHY")
+
+
+@dataclass
+class FleetStatus:
+    services: List[ServiceStatus] = field(default_factory=list)
+    collected_at: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)  # cluster -> error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "collected_at": self.collected_at,
+            "services": [asdict(s) for s in self.services],
+            "errors": self.errors,
+            "summary": {
+                "services": len(self.services),
+                "healthy": sum(1 for s in self.services if s.healthy),
+                "running_tasks": sum(s.running for s in self.services),
+                "desired_tasks": sum(s.desired for s in self.services),
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FleetStatus":
+        return cls(
+            services=[ServiceStatus(**s) for s in data["services"]],
+            collected_at=data["collected_at"],
+            errors=data.get("errors", {}),
+        )
+
+    def render(self) -> str:
+        """Render the fleet as a plain-text table."""
+        rows = [("CLUSTER", "SERVICE", "STATUS", "TASKS", "TASK DEFINITION", "ROLLOUT", "HEALTH")]
+        for s in self.services:
+            health = ", ".join(f"{count} {state.lower()}" for state, count in sorted(s.health.items())) or "-"
+            if len(s.revisions) > 1:
+                health += " (" + ", ".join(f"{n} on {rev}" for rev, n in sorted(s.revisions.items())) + ")"
+            rows.append((
+                s.cluster,
+                s.service,
+                s.status,
+                f"{s.running}/{s.desired}" + (f" +{s.pending}" if s.pending else ""),
+                s.task_definition,
+                s.rollout_state or "-",
+                health,
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(6)]
+        lines = ["  ".join([cell.ljust(width) for cell, width in zip(row, widths)] + [row[6]]).rstrip() for row in rows]
+        for cluster, error in sorted(self.errors.items()):
+            lines.append(f"{cluster}: {error}")
+        summary = self.to_dict()["summary"]
+        lines.append(
+            f"{summary['healthy']} of {summary['services']} services healthy, "
+            f"{summary['running_tasks']} of {summary['desired_tasks']} tasks running"
+        )
+        return "\n".join(lines)
+
+
+class FleetStatusCollector:
+    """
+    Collects the status of every MID server service.
+
+    Clusters are read concurrently. Within a cluster, services are described
+    10 per DescribeServices call and running tasks 100 per DescribeTasks call
+    (the API limits), with the batches also issued concurrently. Results are
+    cached in memory and in ``cache_file`` for ``max_age`` seconds so that
+    dashboards polling the status don't call ECS on every refresh. The file
+    records the account and region, and is ignored by collectors for others.
+    """
+
+    def __init__(
+        self,
+        ecs_utils: ECSUtils,
+        clusters: Optional[List[str]] = None,
+        max_workers: int = 16,
+        max_age: float = STATUS_MAX_AGE,
+        cache_file: Optional[str] = STATUS_CACHE_FILE,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        :param ecs_utils: ECSUtils for the account and region
+        :param clusters: Clusters to read; defaults to every cluster named midserver-*
+        :param max_workers: Concurrent ECS calls
+        :param max_age: Seconds a collected status is reused (0 disables caching)
+        :param cache_file: File to share the cached status between processes, or None
+        :param clock: Time source, for tests
+        """
+        self.ecs_utils = ecs_utils
+        self.clusters = clusters
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self.cache_file = cache_file
+        self.clock = clock
+        self._cached: Optional[FleetStatus] = None
+
+    def status(self, refresh: bool = False) -> FleetStatus:
+        """
+        The fleet status, from the cache if it is fresh enough.
+
+        :param refresh: Ignore the cache
+        """
+        if not refresh and self.max_age > 0:
+            cached = self._cached or self._load_cache()
+            if cached is not None and self.clock() - cached.collected_at < self.max_age:
+                return cached
+        status = self.collect()
+        self._cached = status
+        self._save_cache(status)
+        return status
+
+    def collect(self) -> FleetStatus:
+        clusters = self.clusters
+        if clusters is None:
+            clusters = [
+                arn.rsplit("/", 1)[-1]
+                for arn in self.ecs_utils.list_clusters()
+                if arn.rsplit("/", 1)[-1].startswith("midserver-")
+            ]
+        fleet = FleetStatus(collected_at=self.clock())
+        # Cluster workers wait on their describe batches, so the batches get
+        # their own pool; sharing one could leave every worker waiting.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as batches, \
+                ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(clusters), 1))) as executor:
+            futures = {cluster: executor.submit(propagate(self._collect_cluster), cluster, batches) for cluster in clusters}
+            for cluster, future in futures.items():
+                try:
+                    fleet.services.extend(future.result())
+                except ClientError as e:
+                    if error_code(e) != "ClusterNotFoundException":
+                        fleet.errors[cluster] = str(e)
+        fleet.services.sort(key=lambda s: (s.cluster, s.service))
+        return fleet
+
+    def _collect_cluster(self, cluster: str, executor: ThreadPoolExecutor) -> List[ServiceStatus]:
+        # Listing services and tasks are independent; describe both in batches.
+        service_arns = self.ecs_utils.list_services(cluster)
+        task_arns = self.ecs_utils.list_tasks(cluster)
+        service_batches = [
+            executor.submit(
+                propagate(self.ecs_utils.describe_service_records), cluster, service_arns[i:i + 10], SERVICE_PROJECTION
+            )
+            for i in range(0, len(service_arns), 10)
+        ]
+        task_batches = [
+            executor.submit(propagate(self.ecs_utils.describe_tasks), cluster, task_arns[i:i + 100], TASK_PROJECTION)
+            for i in range(0, len(task_arns), 100)
+        ]
+        services = [s for batch in service_batches for s in batch.result()]
+        tasks = [t for batch in task_batches for t in batch.result()]
+
+        tasks_by_service: Dict[str, List[Any]] = {}
+        for task in tasks:
+            group = task.group or ""
+            if group.startswith("service:"):
+                tasks_by_service.setdefault(group[len("service:"):], []).append(task)
+
+        result = []
+        for service in services:
+            revisions: Dict[str, int] = {}
+            health: Dict[str, int] = {}
+            for task in tasks_by_service.get(service.serviceName, []):
+                if task.lastStatus != "RUNNING":
+                    continue
+                revision = _family_revision(task.taskDefinitionArn or "")
+                revisions[revision] = revisions.get(revision, 0) + 1
+                state = task.healthStatus or "UNKNOWN"
+                health[state] = health.get(state, 0) + 1
+            result.append(ServiceStatus(
+                cluster=cluster,
+                service=service.serviceName,
+                status=service.status or "",
+                desired=service.desiredCount or 0,
+                running=service.runningCount or 0,
+                pending=service.pendingCount or 0,
+                task_definition=_family_revision(service.taskDefinition or "") or "-",
+                rollout_state=service.rolloutState or "",
+                revisions=revisions,
+                health=health,
+            ))
+        return result
+
+    def _load_cache(self) -> Optional[FleetStatus]:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("clusters") != self.clusters or data.get("scope") != self.ecs_utils.cache_scope:
+            return None
+        return FleetStatus.from_dict(data["status"])
+
+    def _save_cache(self, status: FleetStatus) -> None:
+        if not self.cache_file or self.max_age <= 0:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"clusters": self.clusters, "scope": self.ecs_utils.cache_scope, "status": status.to_dict()}, f)
+        os.replace(tmp, self.cache_file)
+
+
+def _family_revision(task_definition_arn: str) -> str:
+    """'arn:aws:ecs:...:task-definition/midserver-dev-task:3' -> 'midserver-dev-task:3'."""
+    return task_definition_arn.rsplit("/", 1)[-1]
@@ -0,0 +1,454 @@
+import time
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..aws_utils import cancellation
+from ..aws_utils.ecs import ECSUtils
+from .capacity import CapacityStrategy
+from .events import RolloutEvents
+
+# Seconds a blue-green deploy keeps the previous task set as a warm standby
+STANDBY_SOAK_SECONDS = 3600.0
+
+
+class DeploymentHealthError(Exception):
+    """Raised when newly deployed MID server tasks fail their health gate."""
+
+
+class DeploymentStrategy:
+    """
+    Base class for the ways a new task definition can be rolled out to the
+    MID server ECS service.
+
+    Rollout status is polled every ``poll_interval`` seconds. With
+    ``events``, a strategy instead checks again when an ECS event arrives
+    for the service, and otherwise only every ``event_poll_interval``
+    seconds in case an event is lost; it goes back to ``poll_interval``
+    while the events can't be received.
+    """
+
+    name = ""
+
+    def __init__(
+        self,
+        health_timeout: float = 600,
+        poll_interval: float = 15,
+        sleep: Callable[[float], None] = cancellation.sleep,
+        events: Optional[RolloutEvents] = None,
+        event_poll_interval: float = 120,
+    ):
+        self.health_timeout = health_timeout
+        self.poll_interval = poll_interval
+        self.sleep = sleep
+        self.events = events
+        self.event_poll_interval = event_poll_interval
+        self.logger = logging.getLogger(__name__)
+
+    def deploy(
+        self,
+        ecs_utils: ECSUtils,
+        cluster: str,
+        service_name: str,
+        task_definition_arn: str,
+        subnet_ids: List[str],
+        security_groups: List[str],
+        desired_count: int = 1,
+        capacity: Optional[CapacityStrategy] = None,
+    ) -> None:
+        """
+        Roll out ``task_definition_arn`` to the service, creating it if needed.
+
+        :param capacity: Capacity providers to run the new tasks on, instead of the FARGATE launch type
+        """
+        raise NotImplementedError
+
+    def planned_api_calls(self, service_exists: bool) -> List[str]:
+        """
+        The "service:operation" calls deploy() is expected to make when the
+        new tasks pass their health gate on the first poll.
+        """
+        raise NotImplementedError
+
+    def _wait_until(
+        self, check: Callable[[], bool], description: str, service: Optional[Tuple[str, str]] = None
+    ) -> None:
+        """
+        Poll ``check`` until it returns True or the health timeout expires.
+        ``check`` may raise DeploymentHealthError to fail the gate early.
+        Cancelling the current cancel scope stops the wait between polls.
+
+        :param service: (cluster, service name) whose events trigger a check, if ``events`` is set
+        """
+        deadline = time.monotonic() + self.health_timeout
+        # Watch before the first check so an event arriving during it isn't missed.
+        watch = self.events.watch(*service) if self.events is not None and service else None
+        try:
+            while not check():
+                cancellation.check_cancelled()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeploymentHealthError(
+                        f"Timed out after {self.health_timeout}s waiting for {description}"
+                    )
+                if watch is not None and self.events.healthy:
+                    watch.wait(min(self.event_poll_interval, remaining))
+                else:
+                    self.sleep(self.poll_interval)
+        finally:
+            if watch is not None:
+                watch.close()
+
+    @staticmethod
+    def _find_service(
+        ecs_utils: ECSUtils, cluster: str, service_name: str
+    ) -> Optional[Dict[str, Any]]:
+        response = ecs_utils.describe_services(cluster, [service_name])
+        for service in response.get("services", []):
+            if service.get("status") != "INACTIVE":
+                return service
+        return None
+
+
+class RollingStrategy(DeploymentStrategy):
+    """
+    ECS rolling update. New tasks are started alongside the old ones (up to
+    ``max_percent`` of the desired count) and old tasks only drain once the
+    new ones are healthy, as long as ``min_healthy_percent`` is 100.
+    """
+
+    name = "rolling"
+
+    def __init__(
+        self, max_percent: int = 200, min_healthy_percent: int = 100, **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        if max_percent < 100:
+            raise ValueError("max_percent must be at least 100")
+        if not 0 <= min_healthy_percent <= 100:
+            raise ValueError("min_healthy_percent must be between 0 and 100")
+        self.max_percent = max_percent
+        self.min_healthy_percent = min_healthy_percent
+
+    def deployment_configuration(self) -> Dict[str, Any]:
+        return {
+            "maximumPercent": self.max_percent,
+            "minimumHealthyPercent": self.min_healthy_percent,
+            "deploymentCircuitBreaker": {"enable": True, "rollback": True},
+        }
+
+    def deploy(
+        self,
+        ecs_utils: ECSUtils,
+        cluster: str,
+        service_name: str,
+        task_definition_arn: str,
+        subnet_ids: List[str],
+        security_groups: List[str],
+        desired_count: int = 1,
+        capacity: Optional[CapacityStrategy] = None,
+    ) -> None:
+        existing = self._find_service(ecs_utils, cluster, service_name)
+        previous_task_definition = None
+
+        placement = {}
+        if existing:
+            previous_task_definition = existing.get("taskDefinition")
+            if capacity is not None and not capacity.matches(existing.get("capacityProviderStrategy")):
+                placement["capacity_provider_strategy"] = capacity.to_api()
+                self.logger.info(f"Moving {service_name} to capacity providers: {capacity.describe()}")
+            ecs_utils.update_service(
+                cluster,
+                service_name,
+                task_definition=task_definition_arn,
+                desired_count=desired_count,
+                subnets=subnet_ids,
+                security_groups=security_groups,
+                deployment_configuration=self.deployment_configuration(),
+                **placement,
+            )
+            self.logger.info(f"Updated existing ECS service: {service_name}")
+        else:
+            if capacity is not None:
+                placement["capacity_provider_strategy"] = capacity.to_api()
+            ecs_utils.create_service(
+                cluster,
+                service_name,
+                task_definition_arn,
+                desired_count,
+                subnet_ids,
+                security_groups,
+                deployment_configuration=self.deployment_configuration(),
+                **placement,
+            )
+            self.logger.info(f"Created new ECS service: {service_name}")
+
+        try:
+            self._wait_until(
+                lambda: self._rollout_complete(ecs_utils, cluster, service_name, task_definition_arn),
+                f"service {service_name} to reach a steady state",
+                (cluster, service_name),
+            )
+        except DeploymentHealthError:
+            if previous_task_definition and previous_task_definition != task_definition_arn:
+                self.logger.error(
+                    f"Health gate failed, reverting {service_name} to {previous_task_definition}"
+                )
+                ecs_utils.update_service(
+                    cluster, service_name, task_definition=previous_task_definition
+                )
+            raise
+        except cancellation.Cancelled:
+            self.logger.warning(
+                f"Stopped waiting for {service_name}; ECS continues the rollout "
+                "and the circuit breaker rolls it back if it fails"
+            )
+            raise
+        self.logger.info(f"Rollout of {task_definition_arn} to {service_name} is healthy")
+
+    def planned_api_calls(self, service_exists: bool) -> List[str]:
+        write = "ecs:update_service" if service_exists else "ecs:create_service"
+        return ["ecs:describe_services", write, "ecs:describe_services"]
+
+    def _rollout_complete(
+        self, ecs_utils: ECSUtils, cluster: str, service_name: str, task_definition_arn: str
+    ) -> bool:
+        service = self._find_service(ecs_utils, cluster, service_name)
+        if not service:
+            raise DeploymentHealthError(f"Service {service_name} disappeared during rollout")
+        deployments = service.get("deployments", [])
+        for deployment in deployments:
+            if deployment.get("taskDefinition") == task_definition_arn and deployment.get("rolloutState") == "FAILED":
+                raise DeploymentHealthError(
+                    f"Rollout failed: {deployment.get('rolloutStateReason', 'unknown reason')}"
+                )
+        primary = next((d for d in deployments if d.get("status") == "PRIMARY"), None)
+        if primary is None:
+            return False
+        if primary.get("taskDefinition") != task_definition_arn:
+            # The circuit breaker replaced the new revision with a rollback deployment.
+            raise DeploymentHealthError(
+                f"Rollout of {task_definition_arn} was rolled back to {primary.get('taskDefinition')}"
+            )
+        return (
+            primary.get("rolloutState") == "COMPLETED"
+            and primary.get("runningCount", 0) >= primary.get("desiredCount", 0)
+        )
+
+
+class BlueGreenStrategy(DeploymentStrategy):
+    """
+    Blue/green deployment using ECS task sets. The service must use the
+    EXTERNAL deployment controller. A new (green) task set is started next to
+    the current (blue) one and only promoted once it is stable; the blue task
+    set is then drained. If the green task set never becomes healthy it is
+    removed and the blue task set keeps serving.
+
+    With ``standby_percent``, the blue task set isn't drained but scaled to
+    that percentage of the desired count and kept as a warm standby, so
+    rollback() can promote it again without launching tasks. A standby is
+    retired once it is ``soak_seconds`` old, by retire_standby() or the next
+    deploy, and replaced when a later deploy promotes a new task set.
+    """
+
+    name = "blue-green"
+
+    def __init__(
+        self,
+        standby_percent: float = 0,
+        soak_seconds: float = STANDBY_SOAK_SECONDS,
+        clock: Callable[[], float] = time.time,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        if not 0 <= standby_percent <= 100:
+            raise ValueError("standby_percent must be between 0 and 100")
+        self.standby_percent = standby_percent
+        self.soak_seconds = soak_seconds
+        self.clock = clock
+
+    def deploy(
+        self,
+        ecs_utils: ECSUtils,
+        cluster: str,
+        service_name: str,
+        task_definition_arn: str,
+        subnet_ids: List[str],
+        security_groups: List[str],
+        desired_count: int = 1,
+        capacity: Optional[CapacityStrategy] = None,
+    ) -> None:
+        existing = self._find_service(ecs_utils, cluster, service_name)
+        if not existing:
+            ecs_utils.create_service(
+                cluster,
+                service_name,
+                task_definition_arn,
+                desired_count,
+                subnet_ids,
+                security_groups,
+                deployment_controller={"type": "EXTERNAL"},
+            )
+            self.logger.info(f"Created new ECS service with EXTERNAL controller: {service_name}")
+        elif existing.get("deploymentController", {}).get("type") != "EXTERNAL":
+            raise ValueError(
+                f"Service {service_name} does not use the EXTERNAL deployment controller; "
+                "recreate it or use the rolling strategy"
+            )
+
+        task_sets = ecs_utils.describe_task_sets(cluster, service_name)
+        blue_task_sets = [task_set for task_set in task_sets if task_set.get("status") == "PRIMARY"]
+        standby_task_sets = [task_set for task_set in task_sets if task_set.get("status") == "ACTIVE"]
+        for standby in self._expired(standby_task_sets):
+            ecs_utils.delete_task_set(cluster, service_name, standby["id"], force=True)
+            standby_task_sets.remove(standby)
+            self.logger.info(f"Retired standby task set {standby['id']} after its soak period")
+
+        placement = {"capacity_provider_strategy": capacity.to_api()} if capacity is not None else {}
+        green = ecs_utils.create_task_set(
+            cluster, service_name, task_definition_arn, subnet_ids, security_groups, **placement
+        )
+        green_id = green["id"]
+        self.logger.info(f"Created task set {green_id} for {task_definition_arn}")
+
+        try:
+            self._wait_until(
+                lambda: self._task_set_healthy(ecs_utils, cluster, service_name, green_id),
+                f"task set {green_id} to reach a steady state",
+                (cluster, service_name),
+            )
+        except DeploymentHealthError:
+            self.logger.error(
+                f"Health gate failed, removing task set {green_id} and keeping the current one"
+            )
+            ecs_utils.delete_task_set(cluster, service_name, green_id, force=True)
+            raise
+        except cancellation.Cancelled:
+            # Leave the service as it was: blue keeps serving, green is removed.
+            self.logger.warning(f"Deploy cancelled, removing task set {green_id}")
+            with cancellation.shield():
+                ecs_utils.delete_task_set(cluster, service_name, green_id, force=True)
+            raise
+
+        ecs_utils.update_service_primary_task_set(cluster, service_name, green_id)
+        self.logger.info(f"Promoted task set {green_id} to primary")
+        for standby in standby_task_sets:
+            # Only the task set that was serving until now is kept warm.
+            ecs_utils.delete_task_set(cluster, service_name, standby["id"], force=True)
+            self.logger.info(f"Retired standby task set {standby['id']}")
+        for blue in blue_task_sets:
+            if self.standby_percent:
+                ecs_utils.update_task_set(cluster, service_name, blue["id"], self.standby_percent)
+                self.logger.info(
+                    f"Keeping previous task set {blue['id']} at {self.standby_percent:g}% "
+                    f"as a warm standby for {self.soak_seconds:g}s"
+                )
+            else:
+                ecs_utils.delete_task_set(cluster, service_name, blue["id"], force=True)
+                self.logger.info(f"Draining previous task set {blue['id']}")
+
+    def rollback(self, ecs_utils: ECSUtils, cluster: str, service_name: str) -> Optional[str]:
+        """
+        Promote the warm standby task set back to primary and remove the
+        current one. The standby is scaled to the full desired count first;
+        its tasks are already running, so this takes seconds rather than a
+        task launch.
+
+        :return: ID of the promoted task set, or None if the service has no standby
+        """
+        task_sets = ecs_utils.describe_task_sets(cluster, service_name)
+        standby_task_sets = [task_set for task_set in task_sets if task_set.get("status") == "ACTIVE"]
+        if not standby_task_sets:
+            return None
+        standby = max(standby_task_sets, key=lambda task_set: _timestamp(task_set.get("updatedAt")))
+        standby_id = standby["id"]
+        ecs_utils.update_task_set(cluster, service_name, standby_id, 100)
+        self._wait_until(
+            lambda: self._task_set_healthy(ecs_utils, cluster, service_name, standby_id),
+            f"standby task set {standby_id} to reach a steady state",
+            (cluster, service_name),
+        )
+        ecs_utils.update_service_primary_task_set(cluster, service_name, standby_id)
+        self.logger.info(f"Promoted standby task set {standby_id} to primary")
+        for task_set in task_sets:
+            if task_set["id"] != standby_id and task_set.get("status") in ("PRIMARY", "ACTIVE"):
+                ecs_utils.delete_task_set(cluster, service_name, task_set["id"], force=True)
+                self.logger.info(f"Draining task set {task_set['id']}")
+        return standby_id
+
+    def retire_standby(self, ecs_utils: ECSUtils, cluster: str, service_name: str) -> List[str]:
+        """
+        Delete standby task sets that are past their soak period.
+
+        :return: IDs of the retired task sets
+        """
+        retired = []
+        for standby in self._expired(ecs_utils.describe_task_sets(cluster, service_name)):
+            ecs_utils.delete_task_set(cluster, service_name, standby["id"], force=True)
+            self.logger.info(f"Retired standby task set {standby['id']} after its soak period")
+            retired.append(standby["id"])
+        return retired
+
+    def _expired(self, task_sets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # A standby's updatedAt is when it was scaled down to standby.
+        now = self.clock()
+        return [
+            task_set
+            for task_set in task_sets
+            if task_set.get("status") == "ACTIVE" and now - _timestamp(task_set.get("updatedAt")) >= self.soak_seconds
+        ]
+
+    def planned_api_calls(self, service_exists: bool) -> List[str]:
+        calls = ["ecs:describe_services"]
+        if not service_exists:
+            calls.append("ecs:create_service")
+        calls += [
+            "ecs:describe_task_sets",
+            "ecs:create_task_set",
+            "ecs:describe_task_sets",
+            "ecs:update_service_primary_task_set",
+        ]
+        if service_exists:
+            calls.append("ecs:update_task_set" if self.standby_percent else "ecs:delete_task_set")
+        return calls
+
+    def _task_set_healthy(
+        self, ecs_utils: ECSUtils, cluster: str, service_name: str, task_set_id: str
+    ) -> bool:
+        task_sets = ecs_utils.describe_task_sets(cluster, service_name, [task_set_id])
+        if not task_sets:
+            raise DeploymentHealthError(f"Task set {task_set_id} disappeared during rollout")
+        task_set = task_sets[0]
+        return (
+            task_set.get("stabilityStatus") == "STEADY_STATE"
+            and task_set.get("runningCount", 0) >= task_set.get("computedDesiredCount", 1)
+        )
+
+
+def _timestamp(value: Any) -> float:
+    """A task set time (datetime from boto3, or epoch seconds) as epoch seconds; 0 if missing."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value or 0)
+
+
+STRATEGIES = {
+    RollingStrategy.name: RollingStrategy,
+    BlueGreenStrategy.name: BlueGreenStrategy,
+}
+
+
+def get_strategy(name: str, **kwargs: Any) -> DeploymentStrategy:
+    """
+    Build a deployment strategy by name.
+
+    :param name: One of the keys of STRATEGIES ('rolling' or 'blue-green')
+    :param kwargs: Options passed to the strategy constructor
+    :return: Configured deployment strategy
+    """
+    try:
+        strategy_cls = STRATEGIES[name]
+    except KeyError:
+        raise ValueError(
+            f"Invalid deployment strategy: {name}. Must be one of {sorted(STRATEGIES)}"
+        )
+    return strategy_cls(**kwargs)
@@ -0,0 +1,326 @@
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from ..aws_utils import cancellation, error_code
+from ..aws_utils.credentials import CredentialProvider
+from ..aws_utils.ec2 import EC2Utils
+from ..aws_utils.ecs import ECSUtils
+from ..aws_utils.iam import IAMUtils
+from ..aws_utils.ssm import SSMUtils
+from ..aws_utils.tracing import Tracer, propagate, tracer as default_tracer
+from ..aws_utils.transport import TransportProfile
+from .events import RolloutEvents, RolloutWatch
+
+# What each resource must wait for before it can be deleted. Tasks hold
+# network interfaces in the security group and run with the roles and
+# parameters, and a cluster can only be deleted once its services have
+# drained, so everything but the task definitions waits for the service.
+DEPENDENCIES: Dict[str, List[str]] = {
+    "ecs-service": [],
+    "task-definitions": [],
+    "ecs-cluster": ["ecs-service"],
+    "security-group": ["ecs-service"],
+    "task-role": ["ecs-service"],
+    "execution-role": ["ecs-service"],
+    "parameters": ["ecs-service"],
+}
+
+# Errors that only mean a dependency is still going away
+CLUSTER_BUSY = ("ClusterContainsServicesException", "ClusterContainsTasksException", "UpdateInProgressException")
+SECURITY_GROUP_BUSY = ("DependencyViolation",)
+
+
+@dataclass
+class TeardownAction:
+    """One resource and what happened to it."""
+
+    resource: str
+    name: str
+    status: str  # "deleted", "absent", "failed" or "skipped"
+    detail: str = ""
+    duration: float = 0.0
+
+
+@dataclass
+class TeardownReport:
+    environment: str
+    actions: List[TeardownAction] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def has_errors(self) -> bool:
+        return any(a.status in ("failed", "skipped") for a in self.actions)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "environment": self.environment,
+            "duration_seconds": round(self.duration, 3),
+            "actions": [asdict(a) for a in self.actions],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    def render(self) -> str:
+        """Render the actions as plain text."""
+        width = max((len(a.resource) for a in self.actions), default=0)
+        lines = []
+        for a in self.actions:
+            detail = f" ({a.detail})" if a.detail else ""
+            lines.append(f"{a.resource:<{width}}  {a.status:<8} {a.duration:6.1f}s  {a.name}{detail}")
+        deleted = sum(a.status == "deleted" for a in self.actions)
+        problems = sum(a.status in ("failed", "skipped") for a in self.actions)
+        lines.append(f"{deleted} deleted, {problems} not deleted ({self.duration:.1f}s)")
+        return "\n".join(lines)
+
+
+class EnvironmentTeardown:
+    """
+    Deletes everything MIDServerDeployer created for an environment: the
+    ECS service, every task definition revision, the cluster, the security
+    group and the IAM roles. The VPC and subnets are looked up, not
+    created, by the deployer and are left alone. The environment's SSM
+    parameters are written by setup_params.py and Terraform (which owns
+    MID_INSTANCE_PASSWORD), not the deployer, so they are only deleted with
+    ``delete_parameters``.
+
+    Resources are deleted as soon as what they depend on (DEPENDENCIES) is
+    gone, up to ``max_workers`` at once. The service is deleted without
+    scaling down first and its drain is polled with a backoff from
+    ``poll_interval`` to ``max_poll_interval`` seconds, or, with
+    ``events``, checked when an ECS event arrives for it. Deletions that
+    fail only because a dependency is still going away (a cluster with
+    stopping tasks, a security group with detaching network interfaces) are
+    retried with the same backoff for up to ``drain_timeout`` seconds. Task
+    definition revisions are deregistered concurrently and then deleted 10
+    per call.
+
+    Resources that don't exist count as done, so a teardown that failed
+    part-way can be run again.
+    """
+
+    def __init__(
+        self,
+        profile_name: Optional[str],
+        environment: str,
+        max_workers: int = 8,
+        drain_timeout: float = 600,
+        poll_interval: float = 2.0,
+        max_poll_interval: float = 15.0,
+        delete_parameters: bool = False,
+        events: Optional[RolloutEvents] = None,
+        tracer: Optional[Tracer] = None,
+        backend: Optional[Any] = None,
+        transport: Optional[TransportProfile] = None,
+        credentials: Optional[CredentialProvider] = None,
+        rate_limiter: Optional[Any] = None,
+        sleep: Callable[[float], None] = cancellation.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param profile_name: AWS profile
+        :param environment: Environment to tear down
+        :param max_workers: Resources (and task definition revisions) deleted at once
+        :param drain_timeout: Seconds to wait for the service to drain, and to retry busy deletions
+        :param poll_interval: First wait between drain checks and retries
+        :param max_poll_interval: Longest wait between drain checks and retries
+        :param delete_parameters: Also delete every parameter under /midserver/<environment>/
+        :param events: ECS events that wake the drain wait early
+        :param backend: aws_cmd backend, e.g. a Cassette
+        """
+        self.environment = environment
+        self.max_workers = max_workers
+        self.drain_timeout = drain_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.delete_parameters = delete_parameters
+        self.events = events
+        self.sleep = sleep
+        self.clock = clock
+        self.tracer = tracer if tracer is not None else default_tracer
+        self.logger = logging.getLogger(__name__)
+        aws_options = {
+            "tracer": self.tracer,
+            "backend": backend,
+            "transport": transport or TransportProfile.for_concurrency(max_workers),
+            "credentials": credentials or CredentialProvider.for_profile(profile_name),
+            "rate_limiter": rate_limiter,
+        }
+        self.ec2_utils = EC2Utils(profile_name, **aws_options)
+        self.ecs_utils = ECSUtils(profile_name, **aws_options)
+        self.iam_utils = IAMUtils(profile_name, **aws_options)
+        self.ssm_utils = SSMUtils(profile_name, **aws_options)
+
+    def resource_name(self, suffix: str) -> str:
+        """Same names as MIDServerDeployer.resource_name."""
+        return f"midserver-{self.environment}-{suffix}"
+
+    def targets(self) -> Dict[str, Tuple[str, Callable[[], Tuple[str, str]]]]:
+        """Resource -> (name, delete function returning (status, detail))."""
+        task_role, execution_role = self.resource_name("task-role"), self.resource_name("execution-role")
+        targets = {
+            "ecs-service": (self.resource_name("service"), self._delete_service),
+            "task-definitions": (self.resource_name("task"), self._delete_task_definitions),
+            "ecs-cluster": (self.resource_name("cluster"), self._delete_cluster),
+            "security-group": (self.resource_name("sg"), self._delete_security_group),
+            "task-role": (task_role, lambda: self._delete_role(task_role)),
+            "execution-role": (execution_role, lambda: self._delete_role(execution_role)),
+            "parameters": (f"/midserver/{self.environment}/", self._delete_parameters),
+        }
+        if not self.delete_parameters:
+            del targets["parameters"]
+        return targets
+
+    def run(self) -> TeardownReport:
+        """Delete the environment's resources in dependency order."""
+        start = time.perf_counter()
+        report = TeardownReport(self.environment)
+        targets = self.targets()
+        results: Dict[str, TeardownAction] = {}
+        pending = {resource: [d for d in DEPENDENCIES[resource] if d in targets] for resource in targets}
+        running: Dict[Future, str] = {}
+
+        self.logger.info(f"Tearing down environment {self.environment}")
+        with self.tracer.span("teardown", environment=self.environment), \
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="teardown") as executor:
+            while pending or running:
+                for resource in [r for r, deps in pending.items() if all(d in results for d in deps)]:
+                    blocked = [d for d in pending.pop(resource) if results[d].status in ("failed", "skipped")]
+                    name = targets[resource][0]
+                    if blocked:
+                        detail = f"{', '.join(blocked)} not deleted"
+                        results[resource] = TeardownAction(resource, name, "skipped", detail)
+                        continue
+                    running[executor.submit(propagate(self._delete), resource, name, targets[resource][1])] = resource
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+
+        report.actions = [results[resource] for resource in targets]
+        report.duration = time.perf_counter() - start
+        return report
+
+    def _delete(self, resource: str, name: str, delete: Callable[[], Tuple[str, str]]) -> TeardownAction:
+        start = time.perf_counter()
+        try:
+            with self.tracer.span(f"delete_{resource.replace('-', '_')}", resource=name):
+                status, detail = delete()
+        except Exception as e:
+            self.logger.error(f"Error deleting {resource} {name}: {str(e)}")
+            status, detail = "failed", str(e)
+        else:
+            self.logger.info(f"{resource} {name}: {status}" + (f" ({detail})" if detail else ""))
+        return TeardownAction(resource, name, status, detail, time.perf_counter() - start)
+
+    def _delete_service(self) -> Tuple[str, str]:
+        cluster, service_name = self.resource_name("cluster"), self.resource_name("service")
+        # Watch before deleting so a drain that finishes at once isn't missed.
+        watch = self.events.watch(cluster, service_name) if self.events is not None else None
+        try:
+            if self.ecs_utils.delete_service(cluster, service_name, force=True) is None:
+                return "absent", ""
+            start = self.clock()
+            self._backoff(
+                lambda: self._service_drained(cluster, service_name), f"service {service_name} to drain", watch
+            )
+            return "deleted", f"drained in {self.clock() - start:.0f}s"
+        finally:
+            if watch is not None:
+                watch.close()
+
+    def _service_drained(self, cluster: str, service_name: str) -> bool:
+        try:
+            services = self.ecs_utils.describe_services(cluster, [service_name]).get("services", [])
+        except ClientError as e:
+            if error_code(e) == "ClusterNotFoundException":
+                return True
+            raise
+        return all(service.get("status") == "INACTIVE" for service in services)
+
+    def _delete_task_definitions(self) -> Tuple[str, str]:
+        family = self.resource_name("task")
+        active = self.ecs_utils.list_task_definitions(family)
+        if active:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="deregister") as executor:
+                list(executor.map(propagate(self.ecs_utils.deregister_task_definition), active))
+        inactive = self.ecs_utils.list_task_definitions(family, status="INACTIVE")
+        if not inactive:
+            return "absent", ""
+        failures = self.ecs_utils.delete_task_definitions(inactive)
+        if failures:
+            raise RuntimeError(f"{len(failures)} revisions not deleted: {failures[0].get('reason', 'unknown reason')}")
+        return "deleted", f"{len(active)} deregistered, {len(inactive)} deleted"
+
+    def _delete_cluster(self) -> Tuple[str, str]:
+        cluster = self.resource_name("cluster")
+        if not self._retry(lambda: self.ecs_utils.delete_cluster(cluster), CLUSTER_BUSY, f"cluster {cluster}"):
+            return "absent", ""
+        return "deleted", ""
+
+    def _delete_security_group(self) -> Tuple[str, str]:
+        groups = self.ec2_utils.describe_security_groups([self.resource_name("sg")])
+        if not groups:
+            return "absent", ""
+        for group in groups:
+            group_id = group["GroupId"]
+            self._retry(
+                lambda: self.ec2_utils.delete_security_group(group_id),
+                SECURITY_GROUP_BUSY,
+                f"security group {group_id}",
+            )
+        return "deleted", ", ".join(group["GroupId"] for group in groups)
+
+    def _delete_role(self, role_name: str) -> Tuple[str, str]:
+        if self.iam_utils.get_role(role_name) is None:
+            return "absent", ""
+        policies = self.iam_utils.list_attached_role_policies(role_name, projection="PolicyArn")
+        for policy_arn in policies:
+            self.iam_utils.detach_role_policy(role_name, policy_arn)
+        if not self.iam_utils.delete_role(role_name):
+            return "absent", ""
+        return "deleted", f"{len(policies)} policies detached"
+
+    def _delete_parameters(self) -> Tuple[str, str]:
+        names = [p["Name"] for p in self.ssm_utils.describe_parameters(f"/midserver/{self.environment}/")]
+        if not names:
+            return "absent", ""
+        missing = self.ssm_utils.delete_parameters(names)
+        return "deleted", f"{len(names) - len(missing)} parameters"
+
+    def _retry(self, action: Callable[[], Any], busy_codes: Tuple[str, ...], description: str) -> Any:
+        """Run ``action``, retrying with backoff while it fails with one of ``busy_codes``."""
+        result: List[Any] = []
+
+        def attempt() -> bool:
+            try:
+                result.append(action())
+                return True
+            except ClientError as e:
+                if error_code(e) not in busy_codes:
+                    raise
+                self.logger.info(f"Waiting to delete {description}: {error_code(e)}")
+                return False
+
+        self._backoff(attempt, f"{description} to be deletable")
+        return result[0]
+
+    def _backoff(self, check: Callable[[], bool], description: str, watch: Optional[RolloutWatch] = None) -> None:
+        deadline = self.clock() + self.drain_timeout
+        interval = self.poll_interval
+        while not check():
+            cancellation.check_cancelled()
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                raise TimeoutError(f"Timed out after {self.drain_timeout:g}s waiting for {description}")
+            if watch is not None and self.events.healthy:
+                # Each task stopping sends an event, so there's no need to poll often.
+                watch.wait(min(self.max_poll_interval, remaining))
+            else:
+                self.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.max_poll_interval)
@@ -0,0 +1,88 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Resources in terraform/ the deployer's values can also be read from in a
+# state file without outputs: (type, name) -> (output name, attribute).
+STATE_RESOURCES = {
+    ("aws_vpc", "mid_server_vpc"): ("vpc_id", "id"),
+    ("aws_subnet", "mid_server_subnet"): ("subnet_ids", "id"),
+    ("aws_security_group", "mid_server_sg"): ("security_group_id", "id"),
+    ("aws_iam_role", "ecs_task_role"): ("task_role_arn", "arn"),
+    ("aws_iam_role", "ecs_execution_role"): ("execution_role_arn", "arn"),
+}
+# Resources created with count or for_each become lists
+LIST_OUTPUTS = ("subnet_ids",)
+
+
+@dataclass(frozen=True)
+class TerraformOutputs:
+    """
+    Values of the base infrastructure that terraform/ manages, so that the
+    deployer can use them instead of looking them up through the API.
+
+    Read once from the JSON that ``terraform output -json`` prints or from
+    a local state file, whose outputs take precedence over the attributes
+    of the resources in STATE_RESOURCES. Values that are missing or empty
+    are None, and the deployer discovers those as it would without
+    Terraform.
+    """
+
+    values: Dict[str, Any] = field(default_factory=dict)
+    source: str = ""
+
+    @classmethod
+    def load(cls, path: str) -> "TerraformOutputs":
+        """
+        Read a ``terraform output -json`` file, a state file, or the
+        terraform.tfstate in a directory.
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, "terraform.tfstate")
+        with open(path) as f:
+            return cls.parse(json.load(f), source=path)
+
+    @classmethod
+    def parse(cls, document: Dict[str, Any], source: str = "") -> "TerraformOutputs":
+        if "terraform_version" in document or "resources" in document:
+            values = _resource_values(document.get("resources", []))
+            values.update({name: output.get("value") for name, output in document.get("outputs", {}).items()})
+        else:
+            values = {name: output.get("value") for name, output in document.items()}
+        return cls(values, source)
+
+    def get(self, name: str) -> Any:
+        return self.values.get(name) or None
+
+    def network(self) -> Optional[Tuple[str, List[str]]]:
+        """The VPC and its subnets, only if Terraform gives both."""
+        vpc_id, subnet_ids = self.get("vpc_id"), self.get("subnet_ids")
+        if vpc_id is None or subnet_ids is None:
+            return None
+        return vpc_id, list(subnet_ids)
+
+    def check_environment(self, environment: str) -> None:
+        """Refuse outputs of another environment's workspace."""
+        other = self.get("environment")
+        if other is not None and other != environment:
+            raise ValueError(f"Terraform outputs in {self.source or 'input'} are for {other}, not {environment}")
+
+
+def _resource_values(resources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    values: Dict[str, Any] = {}
+    for resource in resources:
+        # Resources in child modules aren't the ones terraform/ declares.
+        if resource.get("mode") != "managed" or "module" in resource:
+            continue
+        target = STATE_RESOURCES.get((resource.get("type"), resource.get("name")))
+        if target is None:
+            continue
+        name, attribute = target
+        instances = sorted(resource.get("instances", []), key=lambda i: i.get("index_key", 0))
+        found = [i["attributes"][attribute] for i in instances if i.get("attributes", {}).get(attribute)]
+        if name in LIST_OUTPUTS:
+            values[name] = found
+        elif found:
+            values[name] = found[0]
+    return values
@@ -0,0 +1,81 @@
+import os
+import argparse
+import logging
+from dotenv import load_dotenv
+from src.aws_utils.ecr import ECRUtils
+from src.deployment.image import DOCKERFILE, MANIFEST_FILE, ImageBuilder, ImageManifest
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def build(repository, dockerfile=DOCKERFILE, context=".", push=True, check_registry=False,
+          manifest_file=MANIFEST_FILE, dry_run=False):
+    """Build and push the MID server image if its inputs changed."""
+    load_dotenv()
+    build_args = {
+        "MID_VERSION": os.getenv("MID_VERSION"),
+        "MID_INSTALLER_URL": os.getenv("MID_INSTALLER_URL"),
+    }
+    builder = ImageBuilder(
+        repository,
+        dockerfile=dockerfile,
+        context=context,
+        build_args=build_args,
+        manifest=ImageManifest(manifest_file),
+        ecr_utils=ECRUtils(os.getenv("AWS_PROFILE")) if check_registry else None,
+    )
+    result = builder.build(push=push, dry_run=dry_run)
+    if result.skipped:
+        logger.info(f"Image for inputs {result.source_hash[:16]} already exists ({result.reason}): {result.image}")
+    elif dry_run:
+        logger.info(f"Inputs changed; would build {result.image}")
+    else:
+        logger.info(f"Built {result.image}" + (f" ({result.digest})" if result.digest else ""))
+
+    # Expose the image to later GitHub Actions steps.
+    github_output = os.getenv("GITHUB_OUTPUT")
+    if github_output:
+        with open(github_output, "a") as f:
+            f.write(f"image={result.image}\n")
+            f.write(f"tag={result.tag}\n")
+            f.write(f"built={'false' if result.skipped else 'true'}\n")
+    print(result.image)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build and push the MID server image, skipping unchanged inputs"
+    )
+    parser.add_argument(
+        "--repository",
+        default=os.getenv("ECR_REPO"),
+        help="Image repository (default: $ECR_REPO)",
+    )
+    parser.add_argument("--dockerfile", default=DOCKERFILE, help="Path to the Dockerfile")
+    parser.add_argument("--context", default=".", help="Build context directory")
+    parser.add_argument("--no-push", action="store_true", help="Build without pushing")
+    parser.add_argument(
+        "--check-registry",
+        action="store_true",
+        help="Also look for an existing image in ECR (for CI runners without a local manifest)",
+    )
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="Local manifest of previous builds")
+    parser.add_argument("--dry-run", action="store_true", help="Only report whether a build is needed")
+    args = parser.parse_args()
+    if not args.repository:
+        parser.error("--repository or ECR_REPO is required")
+
+    build(
+        args.repository,
+        dockerfile=args.dockerfile,
+        context=args.context,
+        push=not args.no_push,
+        check_registry=args.check_registry,
+        manifest_file=args.manifest,
+        dry_run=args.dry_run,
+    )
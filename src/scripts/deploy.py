@@ -1,8 +1,27 @@
-import os
-import argparse
-import logging
-from dotenv import load_dotenv
-from src.deployment.mid_server import MIDServerDeployer
+import time
+
+# Taken before the other imports so that --profile can report their cost.
+_STARTED = time.perf_counter()
+
+import os  # noqa: E402
+import argparse  # noqa: E402
+import logging  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from src.deployment.capacity import CapacityStrategy  # noqa: E402
+from src.deployment.checkpoint import CheckpointStore  # noqa: E402
+from src.deployment.events import RolloutEvents  # noqa: E402
+from src.deployment.mid_server import MIDServerDeployer  # noqa: E402
+from src.deployment.multi_account import AccountTarget, MultiAccountDeployer  # noqa: E402
+from src.deployment.strategies import STRATEGIES, get_strategy  # noqa: E402
+from src.deployment.terraform import TerraformOutputs  # noqa: E402
+from src.aws_utils.cancellation import CancelScope, cancel_on_signals  # noqa: E402
+from src.aws_utils.latency import latency_recorder  # noqa: E402
+from src.aws_utils.parameter_cache import ParameterCache  # noqa: E402
+from src.aws_utils.profiling import Profiler  # noqa: E402
+from src.aws_utils.ratelimit import SharedRateLimiter, parse_rates  # noqa: E402
+from src.aws_utils.sqs import SQSUtils  # noqa: E402
+from src.aws_utils.tracing import Tracer, tracer  # noqa: E402
+from src.aws_utils.transport import TransportProfile  # noqa: E402
 
 # Set up logging
 logging.basicConfig(
@@ -10,6 +29,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-operation API latencies recorded by previous deploys, used by --plan
+LATENCY_FILE = os.path.join(".midserver", "latencies.json")
+
+# SSM parameter values by name and version, checked against SSM before use
+PARAMETER_CACHE_FILE = os.path.join(".midserver", "parameter-cache.json")
+
 
 def load_environment_variables():
     load_dotenv()
@@ -28,22 +53,193 @@ def validate_environment(env):
         )
 
 
-def deploy(environment):
+def build_strategy(name, max_percent=None, min_healthy_percent=None, health_timeout=None,
+                   standby_percent=None, standby_soak=None, events=None):
+    options = {}
+    if health_timeout is not None:
+        options["health_timeout"] = health_timeout
+    if events is not None:
+        options["events"] = events
+    if name == "rolling":
+        if max_percent is not None:
+            options["max_percent"] = max_percent
+        if min_healthy_percent is not None:
+            options["min_healthy_percent"] = min_healthy_percent
+    if name == "blue-green":
+        if standby_percent is not None:
+            options["standby_percent"] = standby_percent
+        if standby_soak is not None:
+            options["soak_seconds"] = standby_soak
+    return get_strategy(name, **options)
+
+
+def build_capacity(spot=False, on_demand_base=None, on_demand_weight=None, spot_weight=None):
+    """A FARGATE base plus weighted FARGATE_SPOT capacity, or None for the FARGATE launch type."""
+    if not spot:
+        return None
+    options = {}
+    if on_demand_base is not None:
+        options["base"] = on_demand_base
+    if on_demand_weight is not None:
+        options["on_demand_weight"] = on_demand_weight
+    if spot_weight is not None:
+        options["spot_weight"] = spot_weight
+    return CapacityStrategy(**options)
+
+
+def build_transport(connect_timeout=None, read_timeout=None, fips=False, concurrency=None):
+    options = {"use_fips_endpoint": fips}
+    if connect_timeout is not None:
+        options["connect_timeout"] = connect_timeout
+    if read_timeout is not None:
+        options["read_timeout"] = read_timeout
+    if concurrency:
+        return TransportProfile.for_concurrency(concurrency, **options)
+    return TransportProfile(**options)
+
+
+def build_rate_limiter(environment, weight=1.0, rates=None):
+    """
+    Share AWS API throughput with the other deploy.py processes on this host.
+
+    :param weight: This deployment's share relative to the others
+    :param rates: Calls per second per service, e.g. 'ecs=20,iam=5'
+    """
+    return SharedRateLimiter(
+        f"{environment}-{os.getpid()}", weight=weight, rates=parse_rates(rates) if rates else None
+    )
+
+
+def deploy(environment, strategy="rolling", max_percent=None, min_healthy_percent=None, health_timeout=None,
+           transport=None, deploy_id=None, resume=True, step_timeout=None, deploy_timeout=None,
+           rate_limiter=None, standby_percent=None, standby_soak=None, events_queue=None, capacity=None,
+           desired_count=1, terraform=None):
+    events = None
     try:
         validate_environment(environment)
         env_vars = load_environment_variables()
 
-        logger.info(f"Starting deployment for environment: {environment}")
+        logger.info(f"Starting {strategy} deployment for environment: {environment}")
+
+        if events_queue:
+            # Rollout progress comes from ECS events; describe calls are only a fallback.
+            # The background long polls aren't part of the deploy, so they aren't traced.
+            sqs_utils = SQSUtils(env_vars["AWS_PROFILE"], transport=transport, tracer=Tracer(enabled=False))
+            events = RolloutEvents(sqs_utils, events_queue)
+            events.start()
 
         deployer = MIDServerDeployer(
-            profile_name=env_vars["AWS_PROFILE"], environment=environment
+            profile_name=env_vars["AWS_PROFILE"],
+            environment=environment,
+            strategy=build_strategy(
+                strategy, max_percent, min_healthy_percent, health_timeout, standby_percent, standby_soak, events
+            ),
+            transport=transport,
+            parameter_cache=ParameterCache(PARAMETER_CACHE_FILE),
+            checkpoints=CheckpointStore(),
+            step_timeout=step_timeout,
+            deploy_timeout=deploy_timeout,
+            rate_limiter=rate_limiter,
+            capacity=capacity,
+            desired_count=desired_count,
+            terraform=terraform,
         )
-        deployer.deploy()
+        latency_recorder.load(LATENCY_FILE)
+        try:
+            deployer.deploy(deploy_id=deploy_id, resume=resume)
+        finally:
+            latency_recorder.save(LATENCY_FILE)
+            logger.debug(f"Connection pool metrics: {deployer.pool_metrics()}")
 
         logger.info(f"Deployment completed successfully for environment: {environment}")
     except Exception as e:
         logger.error(f"Deployment failed: {str(e)}")
         raise
+    finally:
+        if events is not None:
+            events.stop()
+
+
+def deploy_accounts(environment, accounts, strategy="rolling", account_concurrency=2, max_workers=8,
+                    transport=None, step_timeout=None, deploy_timeout=None, max_percent=None,
+                    min_healthy_percent=None, health_timeout=None, standby_percent=None, standby_soak=None,
+                    capacity=None, desired_count=1):
+    """
+    Deploy one environment to several accounts by assuming a role in each.
+
+    :param accounts: Account specs, '<account_id>:<role_name>'
+    :return: The AccountResult for each account
+    """
+    validate_environment(environment)
+    env_vars = load_environment_variables()
+    targets = [AccountTarget.parse(spec, environment) for spec in accounts]
+
+    logger.info(f"Starting {strategy} deployment for environment {environment} in {len(targets)} accounts")
+    deployer = MultiAccountDeployer(
+        targets,
+        base_profile=env_vars["AWS_PROFILE"],
+        max_workers=max_workers,
+        per_account_concurrency=account_concurrency,
+        strategy=build_strategy(
+            strategy, max_percent, min_healthy_percent, health_timeout, standby_percent, standby_soak
+        ),
+        transport=transport or build_transport(concurrency=max_workers),
+        step_timeout=step_timeout,
+        deploy_timeout=deploy_timeout,
+        capacity=capacity,
+        desired_count=desired_count,
+    )
+    latency_recorder.load(LATENCY_FILE)
+    try:
+        results = deployer.deploy_all()
+    finally:
+        latency_recorder.save(LATENCY_FILE)
+    failed = [r.target.account_id for r in results if not r.succeeded]
+    if failed:
+        raise RuntimeError(f"Deployment failed in accounts: {', '.join(failed)}")
+    return results
+
+
+def export_trace(trace_dir, environment):
+    """Write the collected spans and log the critical path of the run."""
+    prefix = f"deploy-{environment}-{time.strftime('%Y%m%dT%H%M%S')}"
+    for path in tracer.export(trace_dir, prefix):
+        logger.info(f"Wrote trace: {path}")
+    path = " > ".join(f"{span.name} ({span.duration:.2f}s)" for span in tracer.critical_path())
+    if path:
+        logger.info(f"Critical path: {path}")
+
+
+def export_profile(profiler):
+    """Stop the profiler, write its files and log the phase timing table."""
+    profiler.stop()
+    for path in profiler.write():
+        logger.info(f"Wrote profile: {path}")
+    logger.info(f"Phase timings (seconds):\n{profiler.render()}")
+
+
+def plan(environment, strategy="rolling", output_format="text", transport=None, capacity=None, terraform=None):
+    """Print what deploy() would do for an environment, using only read calls."""
+    validate_environment(environment)
+    env_vars = load_environment_variables()
+    latency_recorder.load(LATENCY_FILE)
+
+    deployer = MIDServerDeployer(
+        profile_name=env_vars["AWS_PROFILE"],
+        environment=environment,
+        strategy=build_strategy(strategy),
+        read_only=True,
+        transport=transport or build_transport(concurrency=6),
+        parameter_cache=ParameterCache(PARAMETER_CACHE_FILE),
+        capacity=capacity,
+        terraform=terraform,
+    )
+    deployment_plan = deployer.plan()
+    if output_format == "json":
+        print(deployment_plan.to_json())
+    else:
+        print(deployment_plan.render())
+    return deployment_plan
 
 
 if __name__ == "__main__":
@@ -56,6 +252,216 @@ if __name__ == "__main__":
         default="dev",
         help="Deployment environment (dev/staging/prod)",
     )
+    parser.add_argument(
+        "--strategy",
+        choices=sorted(STRATEGIES),
+        default="rolling",
+        help="Deployment strategy (rolling uses ECS rolling updates, blue-green uses task sets)",
+    )
+    parser.add_argument(
+        "--max-percent",
+        type=int,
+        help="Rolling strategy: maximum percent of desired tasks running during a deploy (surge)",
+    )
+    parser.add_argument(
+        "--min-healthy-percent",
+        type=int,
+        help="Rolling strategy: minimum percent of desired tasks kept healthy during a deploy",
+    )
+    parser.add_argument(
+        "--health-timeout",
+        type=float,
+        help="Seconds to wait for new tasks to become healthy before reverting",
+    )
+    parser.add_argument(
+        "--standby-percent",
+        type=float,
+        help="Blue-green strategy: keep the previous task set at this percent of the desired count for rollback",
+    )
+    parser.add_argument(
+        "--standby-soak",
+        type=float,
+        help="Blue-green strategy: seconds to keep the standby task set before retiring it (default 3600)",
+    )
+    parser.add_argument("--desired-count", type=int, default=1, help="Number of MID server tasks to run")
+    parser.add_argument(
+        "--spot",
+        action="store_true",
+        help="Run MID server tasks beyond the on-demand base on FARGATE_SPOT",
+    )
+    parser.add_argument(
+        "--on-demand-base",
+        type=int,
+        help="With --spot: tasks that always run on FARGATE (default 1)",
+    )
+    parser.add_argument(
+        "--on-demand-weight",
+        type=int,
+        help="With --spot: relative share of the tasks beyond the base that run on FARGATE (default 0)",
+    )
+    parser.add_argument(
+        "--spot-weight",
+        type=int,
+        help="With --spot: relative share of the tasks beyond the base that run on FARGATE_SPOT (default 1)",
+    )
+    parser.add_argument(
+        "--events-queue",
+        metavar="URL",
+        help="SQS queue that receives ECS events from EventBridge; the rollout is tracked from its events "
+        "instead of by polling",
+    )
+    parser.add_argument(
+        "--terraform",
+        metavar="PATH",
+        help="Use the VPC, subnets, security group and roles from a 'terraform output -json' file, a state file "
+        "or a directory with terraform.tfstate, looking up only what it lacks",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only show the actions, API calls and estimated time a deploy would take",
+    )
+    parser.add_argument(
+        "--plan-format",
+        choices=["text", "json"],
+        default="text",
+        help="Output format for --plan",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="DIR",
+        help="Write OTLP/JSON and Chrome trace files with a span per step and AWS call to DIR",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Write cProfile stats, sampled stacks and a phase timing table for this run to DIR",
+    )
+    parser.add_argument(
+        "--accounts",
+        nargs="+",
+        metavar="ACCOUNT_ID:ROLE",
+        help="Deploy to these accounts by assuming ROLE in each, using AWS_PROFILE as the base profile",
+    )
+    parser.add_argument(
+        "--account-concurrency",
+        type=int,
+        default=2,
+        help="With --accounts: maximum deployments running at once in one account",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="With --accounts: maximum deployments running at once across all accounts",
+    )
+    parser.add_argument(
+        "--deploy-id",
+        help="Resume this deploy (see .midserver/deploys/<env>.json) instead of the newest unfinished one",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Run every step instead of resuming an unfinished deploy",
+    )
+    parser.add_argument("--step-timeout", type=float, help="Seconds each deployment step may take")
+    parser.add_argument("--deploy-timeout", type=float, help="Seconds the whole deployment may take")
+    parser.add_argument(
+        "--api-weight",
+        type=float,
+        default=1.0,
+        help="Share of the AWS API rate this deploy gets relative to other deploys running on the host",
+    )
+    parser.add_argument(
+        "--api-rates",
+        metavar="SERVICE=RATE,...",
+        help="Calls per second shared by all deploys on the host, e.g. 'ecs=20,iam=5'",
+    )
+    parser.add_argument(
+        "--no-shared-rate-limit",
+        action="store_true",
+        help="Don't coordinate AWS API calls with other deploys on the host",
+    )
+    parser.add_argument("--connect-timeout", type=float, help="Seconds to wait for AWS API connections")
+    parser.add_argument("--read-timeout", type=float, help="Seconds to wait for AWS API responses")
+    parser.add_argument("--fips", action="store_true", help="Use FIPS AWS API endpoints")
     args = parser.parse_args()
+    if args.terraform and args.accounts:
+        parser.error("--terraform describes one account's infrastructure and can't be used with --accounts")
+    if args.events_queue and args.accounts:
+        parser.error("--events-queue receives one account's ECS events and can't be used with --accounts")
+    if args.accounts and (args.api_rates or args.api_weight != 1.0):
+        parser.error("--api-rates and --api-weight can't be used with --accounts, since each account has its own quota")
+    if args.deploy_id and args.accounts:
+        parser.error("--deploy-id resumes one account's deploy and can't be used with --accounts")
+
+    # Read once; values missing from it are looked up through the API.
+    terraform = TerraformOutputs.load(args.terraform) if args.terraform else None
+    tracer.enabled = bool(args.trace)
+    profiler = None
+    if args.profile:
+        profiler = Profiler(args.profile, f"deploy-{args.env}-{time.strftime('%Y%m%dT%H%M%S')}", started=_STARTED)
+        profiler.start()
+    # The first Ctrl-C (or SIGTERM) stops the deploy at its next AWS call or
+    # poll, leaving completed steps checkpointed; a second one exits at once.
+    with cancel_on_signals(CancelScope(name="deploy")):
+        try:
+            if args.plan:
+                deployment_plan = plan(
+                    args.env,
+                    strategy=args.strategy,
+                    output_format=args.plan_format,
+                    transport=build_transport(args.connect_timeout, args.read_timeout, args.fips, concurrency=6),
+                    capacity=build_capacity(args.spot, args.on_demand_base, args.on_demand_weight, args.spot_weight),
+                    terraform=terraform,
+                )
+                raise SystemExit(1 if deployment_plan.has_errors else 0)
+
+            if args.accounts:
+                deploy_accounts(
+                    args.env,
+                    args.accounts,
+                    strategy=args.strategy,
+                    account_concurrency=args.account_concurrency,
+                    max_workers=args.max_workers,
+                    transport=build_transport(
+                        args.connect_timeout, args.read_timeout, args.fips, concurrency=args.max_workers
+                    ),
+                    step_timeout=args.step_timeout,
+                    deploy_timeout=args.deploy_timeout,
+                    max_percent=args.max_percent,
+                    min_healthy_percent=args.min_healthy_percent,
+                    health_timeout=args.health_timeout,
+                    standby_percent=args.standby_percent,
+                    standby_soak=args.standby_soak,
+                    capacity=build_capacity(args.spot, args.on_demand_base, args.on_demand_weight, args.spot_weight),
+                    desired_count=args.desired_count,
+                )
+                raise SystemExit(0)
 
-    deploy(args.env)
+            deploy(
+                args.env,
+                strategy=args.strategy,
+                max_percent=args.max_percent,
+                min_healthy_percent=args.min_healthy_percent,
+                health_timeout=args.health_timeout,
+                transport=build_transport(args.connect_timeout, args.read_timeout, args.fips),
+                deploy_id=args.deploy_id,
+                resume=not args.fresh,
+                step_timeout=args.step_timeout,
+                deploy_timeout=args.deploy_timeout,
+                rate_limiter=None if args.no_shared_rate_limit else build_rate_limiter(
+                    args.env, args.api_weight, args.api_rates
+                ),
+                standby_percent=args.standby_percent,
+                standby_soak=args.standby_soak,
+                events_queue=args.events_queue,
+                capacity=build_capacity(args.spot, args.on_demand_base, args.on_demand_weight, args.spot_weight),
+                desired_count=args.desired_count,
+                terraform=terraform,
+            )
+        finally:
+            if profiler is not None:
+                export_profile(profiler)
+            if args.trace:
+                export_trace(args.trace, args.env)
@@ -0,0 +1,73 @@
+import os
+import argparse
+import logging
+from dotenv import load_dotenv
+from src.deployment.drift import DriftScanner
+from src.deployment.terraform import TerraformOutputs
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def load_terraform(specs):
+    """'<env>=<path>' specs -> TerraformOutputs by environment."""
+    outputs = {}
+    for spec in specs or []:
+        environment, _, path = spec.partition("=")
+        if not path:
+            raise ValueError(f"Expected <env>=<path>, got {spec!r}")
+        outputs[environment] = TerraformOutputs.load(path)
+    return outputs
+
+
+def detect_drift(environments, regions, output_format="text", max_workers=16, terraform=None, desired_count=1):
+    """Scan environments for drift and print the report."""
+    load_dotenv()
+    regions = regions or [os.getenv("AWS_REGION", "us-east-1")]
+    scanner = DriftScanner(
+        environments, regions, profile_name=os.getenv("AWS_PROFILE"), max_workers=max_workers, terraform=terraform,
+        desired_count=desired_count,
+    )
+    report = scanner.scan()
+    if output_format == "json":
+        print(report.to_json())
+    else:
+        print(report.render())
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare deployed MID server resources to the deployment spec"
+    )
+    parser.add_argument(
+        "--env",
+        nargs="+",
+        default=["dev", "staging", "prod"],
+        help="Environments to scan",
+    )
+    parser.add_argument("--regions", nargs="+", help="Regions to scan (default: $AWS_REGION)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    parser.add_argument("--max-workers", type=int, default=16, help="Concurrent describe calls per region")
+    parser.add_argument(
+        "--terraform",
+        nargs="+",
+        metavar="ENV=PATH",
+        help="Expect the security group and roles from this environment's Terraform outputs or state",
+    )
+    parser.add_argument(
+        "--desired-count", type=int, default=1, help="Tasks each service should run (deploy.py --desired-count)"
+    )
+    args = parser.parse_args()
+    try:
+        terraform_outputs = load_terraform(args.terraform)
+    except ValueError as e:
+        parser.error(str(e))
+
+    drift_report = detect_drift(
+        args.env, args.regions, args.format, args.max_workers, terraform_outputs, args.desired_count
+    )
+    raise SystemExit(1 if drift_report.has_drift else 0)
@@ -0,0 +1,99 @@
+import argparse
+import logging
+from src.aws_utils.ratelimit import parse_rates
+from src.aws_utils.transport import TransportProfile
+from src.deployment.loadtest import DEFAULT_LEVELS, LoadTest
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def load_test(levels, deploys_per_worker=1, time_scale=0.1, rollout_seconds=30.0, max_pool_connections=None,
+              shared_rate_limit=False, events=False, quotas=None, seed=None, output_format="text", output=None):
+    """Run the load test, logging each level as it finishes, and print the report."""
+    transport = TransportProfile(max_pool_connections=max_pool_connections) if max_pool_connections else None
+    test = LoadTest(
+        levels,
+        deploys_per_worker=deploys_per_worker,
+        time_scale=time_scale,
+        rollout_seconds=rollout_seconds,
+        transport=transport,
+        shared_rate_limit=shared_rate_limit,
+        events=events,
+        backend_options={"quotas": parse_rates(quotas, defaults={})} if quotas else None,
+        seed=seed,
+    )
+    report = test.run(
+        on_level=lambda level: logger.info(
+            f"{level.concurrency} concurrent deploys: {level.throughput:.2f} deploys/s, "
+            f"p99 {level.deploy_p99:.2f}s, {level.failures} failed"
+        )
+    )
+    if output:
+        with open(output, "w") as f:
+            f.write(report.to_json())
+        logger.info(f"Wrote report: {output}")
+    print(report.to_json() if output_format == "json" else report.render())
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run concurrent MID server deploys against a local AWS stand-in and report how they scale"
+    )
+    parser.add_argument(
+        "--levels",
+        default=",".join(str(n) for n in DEFAULT_LEVELS),
+        help="Comma-separated numbers of concurrent deploys to ramp through",
+    )
+    parser.add_argument("--deploys-per-worker", type=int, default=1, help="Deploys each worker runs per level")
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.1,
+        help="Factor applied to simulated API latencies, throttling backoff, rollout time and polling",
+    )
+    parser.add_argument("--rollout-seconds", type=float, default=30.0, help="Simulated time for a rollout to complete")
+    parser.add_argument("--max-pool-connections", type=int, help="Connection pool size per AWS service")
+    parser.add_argument(
+        "--quotas",
+        metavar="SERVICE=RATE,...",
+        help="Calls per second the stand-in allows per service before throttling, e.g. 'ecs=20,iam=5'",
+    )
+    parser.add_argument(
+        "--shared-rate-limit",
+        action="store_true",
+        help="Give every deployer a shared rate limiter, as deploy.py does",
+    )
+    parser.add_argument(
+        "--events",
+        action="store_true",
+        help="Track rollouts from ECS events on a local queue instead of polling, as deploy.py --events-queue does",
+    )
+    parser.add_argument("--seed", type=int, help="Random seed for repeatable latencies")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    parser.add_argument("--output", metavar="FILE", help="Also write the JSON report to FILE")
+    parser.add_argument("--verbose", action="store_true", help="Show the deployers' own log messages")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Hundreds of deployers would log every step; failures are counted in the report.
+        logging.getLogger("src.aws_utils").setLevel(logging.CRITICAL)
+        logging.getLogger("src.deployment").setLevel(logging.CRITICAL)
+
+    load_test(
+        [int(n) for n in args.levels.split(",")],
+        deploys_per_worker=args.deploys_per_worker,
+        time_scale=args.time_scale,
+        rollout_seconds=args.rollout_seconds,
+        max_pool_connections=args.max_pool_connections,
+        shared_rate_limit=args.shared_rate_limit,
+        events=args.events,
+        quotas=args.quotas,
+        seed=args.seed,
+        output_format=args.format,
+        output=args.output,
+    )
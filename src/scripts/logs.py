@@ -0,0 +1,82 @@
+import os
+import re
+import time
+import argparse
+import datetime
+import logging
+from dotenv import load_dotenv
+from src.aws_utils.logs import LogsUtils
+from src.aws_utils.transport import TransportProfile
+from src.deployment.log_follower import LocalLogs, LogFollower, follow_many, log_group_name
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_since(value):
+    """'30s', '10m', '2h' or '1d' -> milliseconds since the epoch."""
+    match = re.fullmatch(r"(\d+)([smhd])", value)
+    if not match:
+        raise ValueError(f"Invalid duration: {value}. Use e.g. 30s, 10m, 2h or 1d")
+    seconds = int(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+    return int((time.time() - seconds) * 1000)
+
+
+def format_event(label, event):
+    timestamp = datetime.datetime.fromtimestamp(event["timestamp"] / 1000, tz=datetime.timezone.utc)
+    return f"{timestamp.isoformat(timespec='milliseconds')} {label} {event.get('logStreamName', '-')} {event['message'].rstrip()}"
+
+
+def logs(environments, since="10m", filter_pattern=None, stream_prefix=None, follow=True, local_dir=None):
+    """Print MID server log events from one or more environments."""
+    load_dotenv()
+    logs_utils = LogsUtils(
+        os.getenv("AWS_PROFILE"),
+        transport=TransportProfile.for_concurrency(len(environments)),
+        backend=LocalLogs(local_dir) if local_dir else None,
+    )
+    start_time = parse_since(since)
+    followers = {
+        environment: LogFollower(
+            logs_utils,
+            log_group_name(environment),
+            filter_pattern=filter_pattern,
+            stream_prefix=stream_prefix,
+            start_time=start_time,
+        )
+        for environment in environments
+    }
+    try:
+        for label, event in follow_many(followers, follow=follow):
+            print(format_event(label, event), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Show MID server logs from CloudWatch"
+    )
+    parser.add_argument("--env", nargs="+", default=["dev"], help="Environments to read")
+    parser.add_argument("--since", default="10m", help="Start this long ago, e.g. 30s, 10m, 2h (default 10m)")
+    parser.add_argument("--filter", dest="filter_pattern", help="CloudWatch Logs filter pattern, e.g. 'ERROR ?WARN'")
+    parser.add_argument("--stream-prefix", help="Only read log streams with this prefix, e.g. ecs/midserver-dev/<task>")
+    parser.add_argument("--no-follow", action="store_true", help="Print the matching events and exit")
+    parser.add_argument(
+        "--local",
+        metavar="DIR",
+        help="Read from a directory of local log files instead of CloudWatch (see LocalLogs)",
+    )
+    args = parser.parse_args()
+
+    logs(
+        args.env,
+        since=args.since,
+        filter_pattern=args.filter_pattern,
+        stream_prefix=args.stream_prefix,
+        follow=not args.no_follow,
+        local_dir=args.local,
+    )
@@ -1,47 +1,77 @@
-import boto3
-import argparse
-from config import Config
+import time
+
+# Taken before the other imports so that --profile can report their cost.
+_STARTED = time.perf_counter()
+
+import os  # noqa: E402
+import argparse  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from src.aws_utils.ecs import ECSUtils  # noqa: E402
+from src.aws_utils.profiling import Profiler  # noqa: E402
+from src.aws_utils.tracing import tracer  # noqa: E402
+from src.deployment.strategies import STANDBY_SOAK_SECONDS, BlueGreenStrategy  # noqa: E402
+
+def rollback_ecs_service(cluster_name, service_name, previous_task_definition, ecs_utils=None):
+    ecs_utils = ecs_utils or ECSUtils(os.getenv('AWS_PROFILE'))
 
-def rollback_ecs_service(cluster_name, service_name, previous_task_definition):
-    ecs_client = boto3.client('ecs', region_name=Config.AWS_REGION)
-    
     try:
-        response = ecs_client.update_service(
-            cluster=cluster_name,
-            service=service_name,
-            taskDefinition=previous_task_definition
-        )
+        with tracer.span('rollback_service', cluster=cluster_name, service=service_name):
+            ecs_utils.update_service(cluster_name, service_name, task_definition=previous_task_definition)
         print(f"Rolled back service {service_name} to task definition {previous_task_definition}")
         return True
     except Exception as e:
         print(f"Rollback failed: {str(e)}")
         return False
 
-def get_previous_task_definition(cluster_name, service_name):
-    ecs_client = boto3.client('ecs', region_name=Config.AWS_REGION)
-    
-    response = ecs_client.describe_services(cluster=cluster_name, services=[service_name])
+def get_previous_task_definition(cluster_name, service_name, ecs_utils=None):
+    ecs_utils = ecs_utils or ECSUtils(os.getenv('AWS_PROFILE'))
+
+    with tracer.span('find_previous_task_definition', cluster=cluster_name, service=service_name):
+        response = ecs_utils.describe_services(cluster_name, [service_name])
     current_task_definition = response['services'][0]['taskDefinition']
-    
+
     task_definition_parts = current_task_definition.split(':')
     previous_revision = int(task_definition_parts[-1]) - 1
-    
+
     if previous_revision < 1:
         return None
-    
+
     return ':'.join(task_definition_parts[:-1] + [str(previous_revision)])
 
-def main():
-    parser = argparse.ArgumentParser(description='Rollback ECS service to previous task definition')
-    parser.add_argument('--cluster', required=True, help='ECS cluster name')
-    parser.add_argument('--service', required=True, help='ECS service name')
-    
-    args = parser.parse_args()
-    
-    previous_task_definition = get_previous_task_definition(args.cluster, args.service)
-    
+def uses_task_sets(cluster_name, service_name, ecs_utils):
+    services = ecs_utils.describe_services(cluster_name, [service_name])['services']
+    return bool(services) and services[0].get('deploymentController', {}).get('type') == 'EXTERNAL'
+
+def promote_standby(cluster_name, service_name, ecs_utils):
+    with tracer.span('promote_standby', cluster=cluster_name, service=service_name):
+        standby_id = BlueGreenStrategy().rollback(ecs_utils, cluster_name, service_name)
+    if standby_id:
+        print(f"Rolled back service {service_name} to standby task set {standby_id}")
+        print("Rollback completed successfully")
+    else:
+        print("No warm standby task set found (deploy with --standby-percent). Rollback not possible.")
+
+def retire_standby(cluster_name, service_name, soak_seconds=STANDBY_SOAK_SECONDS, ecs_utils=None):
+    ecs_utils = ecs_utils or ECSUtils(os.getenv('AWS_PROFILE'))
+    if not uses_task_sets(cluster_name, service_name, ecs_utils):
+        # Run on a schedule for every environment, including rolling ones.
+        print(f"Service {service_name} has no task sets, nothing to retire")
+        return []
+    retired = BlueGreenStrategy(soak_seconds=soak_seconds).retire_standby(ecs_utils, cluster_name, service_name)
+    print(f"Retired standby task sets: {', '.join(retired)}" if retired else "No standby task set is past its soak period")
+    return retired
+
+def rollback(cluster_name, service_name):
+    ecs_utils = ECSUtils(os.getenv('AWS_PROFILE'))
+    if uses_task_sets(cluster_name, service_name, ecs_utils):
+        # Blue-green services roll back by promoting their warm standby task set.
+        promote_standby(cluster_name, service_name, ecs_utils)
+        return
+
+    previous_task_definition = get_previous_task_definition(cluster_name, service_name, ecs_utils)
+
     if previous_task_definition:
-        success = rollback_ecs_service(args.cluster, args.service, previous_task_definition)
+        success = rollback_ecs_service(cluster_name, service_name, previous_task_definition, ecs_utils)
         if success:
             print("Rollback completed successfully")
         else:
@@ -49,7 +79,36 @@ def main():
     else:
         print("No previous task definition found. Rollback not possible.")
 
+def main():
+    parser = argparse.ArgumentParser(description='Rollback ECS service to previous task definition')
+    parser.add_argument('--cluster', required=True, help='ECS cluster name')
+    parser.add_argument('--service', required=True, help='ECS service name')
+    parser.add_argument('--retire-standby', action='store_true',
+                        help='Only delete standby task sets that are past their soak period')
+    parser.add_argument('--standby-soak', type=float, default=STANDBY_SOAK_SECONDS,
+                        help=f'Seconds a standby task set is kept (default {STANDBY_SOAK_SECONDS:g})')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Write cProfile stats, sampled stacks and a phase timing table for this run to DIR')
+
+    args = parser.parse_args()
+    load_dotenv()
+
+    if args.retire_standby:
+        retire_standby(args.cluster, args.service, args.standby_soak)
+        return
+
+    if not args.profile:
+        rollback(args.cluster, args.service)
+        return
+
+    profiler = Profiler(args.profile, f"rollback-{args.service}-{time.strftime('%Y%m%dT%H%M%S')}", started=_STARTED)
+    with profiler:
+        rollback(args.cluster, args.service)
+    for path in profiler.write():
+        print(f"Wrote profile: {path}")
+    print(f"Phase timings (seconds):\n{profiler.render()}")
+
 if __name__ == "__main__":
     main()
 
-# Usage: python rollback.py --cluster your-cluster-name --service your-service-name
\ No newline at end of file
+# Usage: python rollback.py --cluster your-cluster-name --service your-service-name [--retire-standby] [--profile DIR]
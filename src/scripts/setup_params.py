@@ -0,0 +1,91 @@
+import os
+import argparse
+import logging
+from dotenv import load_dotenv
+from src.aws_utils.ssm import SSMUtils
+from src.aws_utils.transport import TransportProfile
+from src.deployment.parameter_store import (
+    DEFAULT_PUT_RATE,
+    STATE_FILE,
+    ParameterSync,
+    changes_to_json,
+    load_env_file,
+    load_yaml_file,
+    summarize,
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def load_values(env_file=None, yaml_file=None, environment=None):
+    """
+    Read parameter values by environment, from a .env file for a single
+    environment or a YAML file for several.
+    """
+    if yaml_file:
+        values = load_yaml_file(yaml_file)
+        if environment:
+            values = {environment: values.get(environment, {})}
+        return values
+    if not environment:
+        raise ValueError("--env is required with --env-file")
+    return {environment: load_env_file(env_file)}
+
+
+def setup_params(values_by_environment, rate=DEFAULT_PUT_RATE, workers=4, state_file=STATE_FILE, dry_run=False,
+                 output_format="text"):
+    load_dotenv()
+    ssm_utils = SSMUtils(
+        os.getenv("AWS_PROFILE"), transport=TransportProfile.for_concurrency(workers)
+    )
+    sync = ParameterSync(ssm_utils, state_file=state_file, rate=rate, max_workers=workers)
+    changes = sync.sync(values_by_environment, dry_run=dry_run)
+
+    if output_format == "json":
+        print(changes_to_json(changes))
+    else:
+        for environment, counts in summarize(changes).items():
+            verb = "would write" if dry_run else "wrote"
+            logger.info(
+                f"{environment}: {verb} {counts['create']} new and {counts['update']} changed parameters, "
+                f"{counts['unchanged']} unchanged"
+            )
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Seed MID server parameters in SSM Parameter Store"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--env-file", help="A .env file with the parameters for one environment (see config/example.env)")
+    source.add_argument("--yaml", help="A YAML file mapping each environment to its parameters")
+    parser.add_argument("--env", type=str, help="Environment to seed (required with --env-file)")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_PUT_RATE,
+        help="Maximum PutParameter calls per second (SSM allows 3 by default)",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent writers")
+    parser.add_argument(
+        "--state-file",
+        default=STATE_FILE,
+        help="File remembering the versions and hashes of synced parameters",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only show which parameters would be written")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    args = parser.parse_args()
+
+    setup_params(
+        load_values(args.env_file, args.yaml, args.env),
+        rate=args.rate,
+        workers=args.workers,
+        state_file=args.state_file,
+        dry_run=args.dry_run,
+        output_format=args.format,
+    )
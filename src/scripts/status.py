@@ -0,0 +1,50 @@
+import os
+import argparse
+import logging
+from dotenv import load_dotenv
+from src.aws_utils.ecs import ECSUtils
+from src.aws_utils.transport import TransportProfile
+from src.deployment.status import STATUS_CACHE_FILE, STATUS_MAX_AGE, FleetStatusCollector
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def fleet_status(environments=None, output_format="text", max_age=STATUS_MAX_AGE, refresh=False, max_workers=16):
+    """Print the status of the MID server services."""
+    load_dotenv()
+    ecs_utils = ECSUtils(
+        os.getenv("AWS_PROFILE"), transport=TransportProfile.for_concurrency(max_workers)
+    )
+    clusters = [f"midserver-{env}-cluster" for env in environments] if environments else None
+    collector = FleetStatusCollector(
+        ecs_utils, clusters=clusters, max_workers=max_workers, max_age=max_age, cache_file=STATUS_CACHE_FILE
+    )
+    status = collector.status(refresh=refresh)
+    if output_format == "json":
+        print(status.to_json())
+    else:
+        print(status.render())
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Show the status of the MID server ECS services"
+    )
+    parser.add_argument("--env", nargs="+", help="Environments to show (default: every midserver-* cluster)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=STATUS_MAX_AGE,
+        help=f"Reuse a status collected within this many seconds (default {STATUS_MAX_AGE:g})",
+    )
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cached status")
+    parser.add_argument("--max-workers", type=int, default=16, help="Concurrent ECS calls")
+    args = parser.parse_args()
+
+    fleet_status(args.env, args.format, args.max_age, args.refresh, args.max_workers)
@@ -0,0 +1,100 @@
+import os
+import argparse
+import logging
+from dotenv import load_dotenv
+from src.deployment.checkpoint import CheckpointStore
+from src.deployment.events import RolloutEvents
+from src.deployment.teardown import EnvironmentTeardown
+from src.aws_utils.cancellation import CancelScope, cancel_on_signals
+from src.aws_utils.sqs import SQSUtils
+from src.aws_utils.tracing import Tracer
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def teardown(environment, output_format="text", max_workers=8, drain_timeout=600, delete_parameters=False,
+             events_queue=None, checkpoints=None):
+    """Delete an environment's resources and print the report."""
+    load_dotenv()
+    profile_name = os.getenv("AWS_PROFILE")
+    events = None
+    if events_queue:
+        # The background long polls aren't part of the teardown, so they aren't traced.
+        events = RolloutEvents(SQSUtils(profile_name, tracer=Tracer(enabled=False)), events_queue)
+        events.start()
+    try:
+        report = EnvironmentTeardown(
+            profile_name,
+            environment,
+            max_workers=max_workers,
+            drain_timeout=drain_timeout,
+            delete_parameters=delete_parameters,
+            events=events,
+        ).run()
+    finally:
+        if events is not None:
+            events.stop()
+
+    if not report.has_errors:
+        # Nothing is left to resume, so the deploy checkpoints go too.
+        path = (checkpoints or CheckpointStore()).path(environment)
+        if os.path.exists(path):
+            os.remove(path)
+            logger.info(f"Removed deploy checkpoints {path}")
+
+    if output_format == "json":
+        print(report.to_json())
+    else:
+        print(report.render())
+    return report
+
+
+def confirm(environment):
+    answer = input(f"This deletes every MID server resource in {environment}. Type the environment name to go on: ")
+    return answer.strip() == environment
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete the MID server resources of an environment")
+    parser.add_argument("--env", required=True, choices=["dev", "staging", "prod"], help="Environment to tear down")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    parser.add_argument(
+        "--delete-parameters",
+        action="store_true",
+        help="Also delete the environment's SSM parameters, including any Terraform manages",
+    )
+    parser.add_argument("--max-workers", type=int, default=8, help="Resources deleted at once")
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=600,
+        help="Seconds to wait for the service to drain and for busy resources to become deletable",
+    )
+    parser.add_argument(
+        "--events-queue",
+        metavar="URL",
+        help="SQS queue that receives ECS events from EventBridge; the drain is tracked from its events",
+    )
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    args = parser.parse_args()
+
+    if not args.yes and not confirm(args.env):
+        print("Teardown cancelled")
+        raise SystemExit(1)
+
+    # The first Ctrl-C (or SIGTERM) stops the teardown at its next AWS call
+    # or poll; running it again picks up what is left.
+    with cancel_on_signals(CancelScope(name="teardown")):
+        teardown_report = teardown(
+            args.env,
+            output_format=args.format,
+            max_workers=args.max_workers,
+            drain_timeout=args.drain_timeout,
+            delete_parameters=args.delete_parameters,
+            events_queue=args.events_queue,
+        )
+    raise SystemExit(1 if teardown_report.has_errors else 0)
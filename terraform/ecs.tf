@@ -17,7 +17,7 @@ resource "aws_ecs_task_definition" "mid_server_task" {
 
   container_definitions = jsonencode([{
     name  = "mid-server-container-${var.environment}"
-    image = "${var.ecr_repo_url}:latest"
+    image = "${var.ecr_repo_url}:${var.image_tag}"
     portMappings = [{
       containerPort = 443
       hostPort      = 443
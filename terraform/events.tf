@@ -0,0 +1,46 @@
+# ECS service, deployment and task events for deploy.py --events-queue.
+# Read the queue from one deploying host only: each event is delivered to
+# whichever consumer receives it first.
+resource "aws_sqs_queue" "mid_server_events" {
+  name                       = "mid-server-ecs-events-${var.environment}"
+  message_retention_seconds  = 3600
+  visibility_timeout_seconds = 30
+}
+
+resource "aws_cloudwatch_event_rule" "mid_server_ecs_events" {
+  name        = "mid-server-ecs-events-${var.environment}"
+  description = "ECS rollout events for MID server deploys"
+
+  # Only this environment's cluster. Deployment state changes carry no
+  # detail.clusterArn and name the cluster in the service ARN instead.
+  event_pattern = jsonencode({
+    source        = ["aws.ecs"]
+    "detail-type" = ["ECS Deployment State Change", "ECS Service Action", "ECS Task State Change"]
+    "$or" = [
+      { detail = { clusterArn = [{ wildcard = "*/midserver-${var.environment}-cluster" }] } },
+      { resources = [{ wildcard = "*:service/midserver-${var.environment}-cluster/*" }] },
+    ]
+  })
+}
+
+resource "aws_cloudwatch_event_target" "mid_server_events_queue" {
+  rule = aws_cloudwatch_event_rule.mid_server_ecs_events.name
+  arn  = aws_sqs_queue.mid_server_events.arn
+}
+
+resource "aws_sqs_queue_policy" "mid_server_events" {
+  queue_url = aws_sqs_queue.mid_server_events.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect    = "Allow"
+      Principal = { Service = "events.amazonaws.com" }
+      Action    = "sqs:SendMessage"
+      Resource  = aws_sqs_queue.mid_server_events.arn
+      Condition = {
+        ArnEquals = { "aws:SourceArn" = aws_cloudwatch_event_rule.mid_server_ecs_events.arn }
+      }
+    }]
+  })
+}
@@ -0,0 +1,34 @@
+output "environment" {
+  description = "Environment these outputs belong to; deploy.py --terraform refuses another environment's"
+  value       = var.environment
+}
+
+output "vpc_id" {
+  description = "VPC the MID server tasks run in"
+  value       = aws_vpc.mid_server_vpc.id
+}
+
+output "subnet_ids" {
+  description = "Subnets the MID server tasks run in"
+  value       = aws_subnet.mid_server_subnet[*].id
+}
+
+output "security_group_id" {
+  description = "Security group of the MID server tasks"
+  value       = aws_security_group.mid_server_sg.id
+}
+
+output "task_role_arn" {
+  description = "IAM role the MID server tasks run as"
+  value       = aws_iam_role.ecs_task_role.arn
+}
+
+output "execution_role_arn" {
+  description = "IAM role ECS uses to start the MID server tasks"
+  value       = aws_iam_role.ecs_execution_role.arn
+}
+
+output "events_queue_url" {
+  description = "SQS queue receiving ECS events, for deploy.py --events-queue"
+  value       = aws_sqs_queue.mid_server_events.id
+}
@@ -20,6 +20,12 @@ variable "ecr_repo_url" {
   type        = string
 }
 
+variable "image_tag" {
+  description = "Tag of the MID server image to run, e.g. the src-<hash> tag build.py prints"
+  type        = string
+  default     = "latest"
+}
+
 variable "mid_instance_url" {
   description = "The URL of the ServiceNow instance"
   type        = string
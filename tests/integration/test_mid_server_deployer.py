@@ -1,67 +1,59 @@
+import os
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+from src.aws_utils.cassette import Cassette
 from src.deployment.mid_server import MIDServerDeployer
+from src.deployment.strategies import RollingStrategy
 
+CASSETTES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "cassettes")
 
+
+@patch.dict(
+    os.environ,
+    {
+        "ECR_REPO": "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver",
+        "AWS_REGION": "us-east-1",
+    },
+)
 class TestMIDServerDeployer(unittest.TestCase):
 
     def setUp(self):
+        # The fixture is hand-written, not recorded (see fixtures/cassettes/README.md).
+        # Set CASSETTE_MODE=record (with real credentials for test_profile) to
+        # record it against AWS.
+        self.cassette = Cassette(
+            os.path.join(CASSETTES, "deploy_new_environment.jsonl"),
+            mode=os.environ.get("CASSETTE_MODE", "replay"),
+        )
         self.deployer = MIDServerDeployer(
-            profile_name="test_profile", environment="test"
+            profile_name="test_profile",
+            environment="test",
+            strategy=RollingStrategy(poll_interval=0),
+            backend=self.cassette,
         )
 
-    @patch("src.aws_utils.ec2.EC2Utils")
-    @patch("src.aws_utils.ecs.ECSUtils")
-    @patch("src.aws_utils.iam.IAMUtils")
-    @patch("src.aws_utils.ssm.SSMUtils")
-    def test_deploy(self, mock_ssm, mock_iam, mock_ecs, mock_ec2):
-        # Arrange
-        mock_ec2.return_value.describe_vpcs.return_value = {
-            "Vpcs": [{"VpcId": "vpc-12345678"}]
-        }
-        mock_ec2.return_value.describe_subnets.return_value = {
-            "Subnets": [{"SubnetId": "subnet-12345678"}]
-        }
-        mock_ec2.return_value.create_security_group.return_value = "sg-12345678"
-
-        mock_iam.return_value.get_role.return_value = None
-        mock_iam.return_value.create_role.return_value = {
-            "Role": {"Arn": "arn:aws:iam::123456789012:role/test-role"}
-        }
-
-        mock_ecs.return_value.create_cluster.return_value = {
-            "cluster": {"clusterName": "test-cluster"}
-        }
-        mock_ecs.return_value.register_task_definition.return_value = {
-            "taskDefinition": {
-                "taskDefinitionArn": "arn:aws:ecs:us-east-1:123456789012:task-definition/test:1"
-            }
-        }
-        mock_ecs.return_value.describe_services.return_value = {"services": []}
-        mock_ecs.return_value.create_service.return_value = {
-            "service": {"serviceName": "test-service"}
-        }
-
-        mock_ssm.return_value.get_parameter.return_value = "test-value"
+    def tearDown(self):
+        self.cassette.save()
 
+    def test_deploy(self):
         # Act
         self.deployer.deploy()
 
         # Assert
-        mock_ec2.return_value.describe_vpcs.assert_called_once()
-        mock_ec2.return_value.describe_subnets.assert_called_once()
-        mock_ec2.return_value.create_security_group.assert_called_once()
+        played = self.cassette.played
+        self.assertEqual(played.count(("ec2", "describe_vpcs")), 1)
+        self.assertEqual(played.count(("ec2", "describe_subnets")), 1)
+        self.assertEqual(played.count(("ec2", "create_security_group")), 1)
 
-        mock_iam.return_value.get_role.assert_called()
-        mock_iam.return_value.create_role.assert_called()
-        mock_iam.return_value.attach_role_policy.assert_called()
+        self.assertEqual(played.count(("iam", "get_role")), 2)
+        self.assertEqual(played.count(("iam", "create_role")), 2)
+        self.assertEqual(played.count(("iam", "attach_role_policy")), 2)
 
-        mock_ecs.return_value.create_cluster.assert_called_once()
-        mock_ecs.return_value.register_task_definition.assert_called_once()
-        mock_ecs.return_value.describe_services.assert_called_once()
-        mock_ecs.return_value.create_service.assert_called_once()
+        self.assertEqual(played.count(("ecs", "create_cluster")), 1)
+        self.assertEqual(played.count(("ecs", "register_task_definition")), 1)
+        self.assertEqual(played.count(("ecs", "create_service")), 1)
 
-        mock_ssm.return_value.get_parameter.assert_called()
+        self.assertEqual(played.count(("ssm", "get_parameter")), 4)
 
 
 if __name__ == "__main__":
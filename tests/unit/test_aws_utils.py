@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from src.aws_utils import AWSUtils
+from src.aws_utils.latency import LatencyRecorder
+from src.aws_utils.transport import PoolMetrics, TransportProfile
+
+
+class TestAWSUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.latencies = LatencyRecorder()
+        self.aws_utils = AWSUtils(profile_name="test_profile", latencies=self.latencies)
+
+    @patch("src.aws_utils.AWSUtils.client")
+    def test_aws_cmd_records_latency(self, mock_client):
+        # Arrange
+        mock_client.return_value.describe_vpcs.return_value = {"Vpcs": []}
+
+        # Act
+        result = self.aws_utils.aws_cmd("ec2", "describe_vpcs")
+
+        # Assert
+        self.assertEqual(result, {"Vpcs": []})
+        self.assertIsNotNone(self.latencies.mean("ec2", "describe_vpcs"))
+
+    @patch("src.aws_utils.AWSUtils.client")
+    def test_read_only_refuses_writes(self, mock_client):
+        # Arrange
+        self.aws_utils.read_only = True
+
+        # Act / Assert
+        with self.assertRaises(PermissionError):
+            self.aws_utils.aws_cmd("ecs", "create_cluster", clusterName="test")
+        mock_client.assert_not_called()
+
+    def test_client_is_cached(self):
+        # Arrange
+        self.aws_utils.session = MagicMock()
+
+        # Act
+        first = self.aws_utils.client("ecs")
+        second = self.aws_utils.client("ecs")
+
+        # Assert
+        self.assertIs(first, second)
+        self.aws_utils.session.client.assert_called_once()
+        self.assertEqual(self.aws_utils.session.client.call_args[0], ("ecs",))
+
+    def test_transport_profile_applies_to_clients(self):
+        # Arrange
+        transport = TransportProfile.for_concurrency(
+            40, use_fips_endpoint=True, endpoint_urls={"ecs": "https://ecs.example"}
+        )
+        aws_utils = AWSUtils(profile_name="test_profile", transport=transport)
+        aws_utils.session = MagicMock()
+
+        # Act
+        aws_utils.client("ecs")
+
+        # Assert
+        kwargs = aws_utils.session.client.call_args[1]
+        self.assertEqual(kwargs["endpoint_url"], "https://ecs.example")
+        self.assertEqual(kwargs["config"].max_pool_connections, 51)
+        self.assertTrue(kwargs["config"].tcp_keepalive)
+        self.assertTrue(kwargs["config"].use_fips_endpoint)
+        self.assertEqual(kwargs["config"].connect_timeout, 5)
+
+
+class TestPoolMetrics(unittest.TestCase):
+
+    def test_waits_are_recorded_when_pool_is_exhausted(self):
+        # Arrange
+        metrics = PoolMetrics(max_connections=1)
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold_slot():
+            with metrics.slot("ecs"):
+                holding.set()
+                release.wait()
+
+        worker = threading.Thread(target=hold_slot)
+        worker.start()
+        holding.wait()
+
+        # Act
+        threading.Timer(0.05, release.set).start()
+        with metrics.slot("ecs"):
+            pass
+        worker.join()
+
+        # Assert
+        stats = metrics.snapshot()["ecs"]
+        self.assertEqual(stats["calls"], 2)
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["peak_in_use"], 1)
+        self.assertGreater(stats["max_wait_seconds"], 0)
+        self.assertEqual(stats["in_use"], 0)
+
+
+class TestLatencyRecorder(unittest.TestCase):
+
+    def test_save_and_load_round_trip(self):
+        # Arrange
+        recorder = LatencyRecorder()
+        recorder.record("ecs", "describe_services", 0.2)
+        recorder.record("ecs", "describe_services", 0.4)
+
+        # Act
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "latencies.json")
+            recorder.save(path)
+            loaded = LatencyRecorder()
+            loaded.load(path)
+
+        # Assert
+        self.assertAlmostEqual(loaded.mean("ecs", "describe_services"), 0.3)
+        self.assertIsNone(loaded.mean("ecs", "create_service"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from src.aws_utils import cancellation
+from src.aws_utils.cancellation import CancelScope, Cancelled, DeadlineExceeded
+from src.aws_utils.ecs import ECSUtils
+from src.deployment.checkpoint import CheckpointStore
+from src.deployment.mid_server import MIDServerDeployer
+
+
+class TestCancelScope(unittest.TestCase):
+
+    def test_cancel_wakes_sleep_in_nested_scope(self):
+        # Arrange
+        root = CancelScope()
+        timer = threading.Timer(0.05, root.cancel, args=("interrupted",))
+
+        # Act
+        start = time.monotonic()
+        timer.start()
+        with cancellation.scope(root=root), cancellation.scope(name="step"):
+            with self.assertRaises(Cancelled) as raised:
+                cancellation.sleep(10)
+
+        # Assert
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(str(raised.exception), "step: interrupted")
+
+    def test_nearest_deadline_applies(self):
+        with cancellation.scope(0.05, name="deploy"), cancellation.scope(10, name="step"):
+            with self.assertRaises(DeadlineExceeded) as raised:
+                cancellation.sleep(10)
+        self.assertIn("deploy: deadline of 0.05s exceeded", str(raised.exception))
+
+    def test_no_aws_calls_after_cancel(self):
+        # Arrange
+        backend = MagicMock()
+        ecs_utils = ECSUtils(backend=backend)
+
+        # Act
+        with cancellation.scope() as scope:
+            scope.cancel()
+            with self.assertRaises(Cancelled):
+                ecs_utils.list_clusters()
+            with cancellation.shield():
+                ecs_utils.list_clusters()
+
+        # Assert
+        backend.call.assert_called_once()
+
+
+@patch.dict(os.environ, {"ECR_REPO": "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver"})
+class TestDeployDeadlines(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = CheckpointStore(self.tmp.name)
+
+    def deployer(self, service_step, **kwargs):
+        deployer = MIDServerDeployer(
+            "no-such-profile", "dev", backend=MagicMock(), image_resolver=MagicMock(), checkpoints=self.store, **kwargs
+        )
+        outputs = {
+            "_setup_network": ("vpc-1", ["subnet-1"]),
+            "_setup_security_group": "sg-1",
+            "_setup_iam_roles": ("task-role", "execution-role"),
+            "_setup_ecs_cluster": "midserver-dev-cluster",
+            "_register_task_definition": "task-definition:1",
+        }
+        for name in MIDServerDeployer.STEPS:
+            step = MagicMock(side_effect=service_step) if name == "_setup_ecs_service" else MagicMock(return_value=outputs[name])
+            step.__name__ = name
+            setattr(deployer, name, step)
+        return deployer
+
+    def test_step_timeout_stops_polling(self):
+        # Arrange: the service step polls for longer than it may take
+        deployer = self.deployer(lambda *args: cancellation.sleep(10), step_timeout=0.05)
+
+        # Act
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            deployer.deploy()
+
+        # Assert
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(deployer.outcomes["_setup_ecs_cluster"].status, "completed")
+        self.assertEqual(deployer.outcomes["_setup_ecs_service"].status, "timed out")
+        steps = self.store.load("dev")[deployer.checkpoint.deploy_id]["steps"]
+        self.assertEqual(list(steps), list(MIDServerDeployer.STEPS[:-1]))
+        self.assertIn("_setup_ecs_service: timed out", deployer.report())
+
+    def test_cancel_from_another_thread(self):
+        # Arrange
+        started = threading.Event()
+
+        def service_step(*args):
+            started.set()
+            cancellation.sleep(10)
+
+        deployer = self.deployer(service_step, deploy_timeout=30)
+        thread = threading.Thread(target=lambda: started.wait(5) and deployer.cancel("interrupted by SIGINT"))
+
+        # Act
+        thread.start()
+        with self.assertRaises(Cancelled):
+            deployer.deploy()
+        thread.join()
+
+        # Assert
+        self.assertEqual(deployer.outcomes["_setup_ecs_service"].status, "aborted")
+        self.assertIn("interrupted by SIGINT", deployer.outcomes["_setup_ecs_service"].detail)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import datetime
+import os
+import tempfile
+import unittest
+from botocore.exceptions import ClientError
+from src.aws_utils import AWSUtils
+from src.aws_utils.cassette import Cassette, CassetteMiss
+
+
+def raise_not_found():
+    raise ClientError(
+        {"Error": {"Code": "NoSuchEntity", "Message": "not found"}}, "GetRole"
+    )
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cassette.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_record_then_replay(self):
+        # Arrange
+        created = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        with Cassette(self.path, mode="record") as cassette:
+            cassette.call(
+                "iam",
+                "create_role",
+                {"RoleName": "r"},
+                lambda: {"Role": {"CreateDate": created}, "ResponseMetadata": {"RequestId": "1"}},
+            )
+            with self.assertRaises(ClientError):
+                cassette.call("iam", "get_role", {"RoleName": "x"}, raise_not_found)
+
+        # Act
+        replayed = Cassette(self.path, mode="replay")
+        response = replayed.call("iam", "create_role", {"RoleName": "r"}, self.fail)
+
+        # Assert
+        self.assertEqual(response, {"Role": {"CreateDate": created}})
+        with self.assertRaises(ClientError) as ctx:
+            replayed.call("iam", "get_role", {"RoleName": "x"}, self.fail)
+        self.assertEqual(ctx.exception.response["Error"]["Code"], "NoSuchEntity")
+
+    def test_replay_serves_responses_in_order_and_repeats_last(self):
+        # Arrange
+        with Cassette(self.path, mode="record") as cassette:
+            for state in ("IN_PROGRESS", "COMPLETED"):
+                cassette.call("ecs", "describe_services", {"services": ["s"]}, lambda: {"state": state})
+
+        # Act
+        replayed = Cassette(self.path, mode="replay")
+        states = [
+            replayed.call("ecs", "describe_services", {"services": ["s"]}, self.fail)["state"]
+            for _ in range(3)
+        ]
+
+        # Assert
+        self.assertEqual(states, ["IN_PROGRESS", "COMPLETED", "COMPLETED"])
+
+    def test_unrecorded_call_raises(self):
+        # Arrange
+        with Cassette(self.path, mode="record"):
+            pass
+        replayed = Cassette(self.path, mode="replay")
+
+        # Act / Assert
+        with self.assertRaises(CassetteMiss):
+            replayed.call("ecs", "list_clusters", {}, self.fail)
+
+    def test_aws_utils_replays_without_session(self):
+        # Arrange
+        with Cassette(self.path, mode="record") as cassette:
+            cassette.call("ecs", "list_clusters", {}, lambda: {"clusterArns": ["arn"]})
+        aws_utils = AWSUtils(profile_name="no-such-profile", backend=Cassette(self.path))
+
+        # Act
+        result = aws_utils.aws_cmd("ecs", "list_clusters")
+
+        # Assert
+        self.assertEqual(result, {"clusterArns": ["arn"]})
+        self.assertIsNone(aws_utils.credentials._session)
+
+
+if __name__ == "__main__":
+    unittest.main()
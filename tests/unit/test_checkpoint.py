@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from src.deployment.checkpoint import CheckpointStore
+from src.deployment.mid_server import MIDServerDeployer
+
+IMAGE = "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver@sha256:abc"
+STEP_OUTPUTS = {
+    "_setup_network": ("vpc-1", ["subnet-1", "subnet-2"]),
+    "_setup_security_group": "sg-1",
+    "_setup_iam_roles": ("arn:aws:iam::123456789012:role/task", "arn:aws:iam::123456789012:role/execution"),
+    "_setup_ecs_cluster": "midserver-dev-cluster",
+    "_register_task_definition": "arn:aws:ecs:us-east-1:123456789012:task-definition/midserver-dev-task:7",
+    "_setup_ecs_service": None,
+}
+
+
+@patch.dict(os.environ, {"ECR_REPO": "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver"})
+class TestResumableDeploy(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = CheckpointStore(self.tmp.name)
+
+    def deployer(self):
+        resolver = MagicMock()
+        resolver.resolve.return_value = IMAGE
+        deployer = MIDServerDeployer(
+            "no-such-profile", "dev", backend=MagicMock(), image_resolver=resolver, checkpoints=self.store
+        )
+        for name, outputs in STEP_OUTPUTS.items():
+            step = MagicMock(return_value=outputs)
+            step.__name__ = name
+            setattr(deployer, name, step)
+        # Every checkpointed resource still exists.
+        deployer.ec2_utils = MagicMock()
+        deployer.ec2_utils.describe_subnet_records.return_value = ["subnet-2", "subnet-1"]
+        deployer.ec2_utils.describe_security_groups.return_value = [{"GroupId": "sg-1"}]
+        deployer.iam_utils = MagicMock()
+        deployer.iam_utils.get_role.side_effect = [
+            {"Role": {"Arn": arn}} for arn in STEP_OUTPUTS["_setup_iam_roles"]
+        ]
+        deployer.ecs_utils = MagicMock()
+        deployer.ecs_utils.describe_clusters.return_value = [{"status": "ACTIVE"}]
+        deployer.ecs_utils.describe_task_definition.return_value = {
+            "status": "ACTIVE", "containerDefinitions": [{"image": IMAGE}]
+        }
+        return deployer
+
+    def fail_service_step(self):
+        failed = self.deployer()
+        failed._setup_ecs_service.side_effect = RuntimeError("throttled")
+        with self.assertRaises(RuntimeError):
+            failed.deploy()
+        return failed
+
+    def test_rerun_resumes_at_failed_step(self):
+        # Arrange
+        failed = self.fail_service_step()
+
+        # Act
+        rerun = self.deployer()
+        rerun.deploy()
+
+        # Assert
+        self.assertEqual(rerun.checkpoint.deploy_id, failed.checkpoint.deploy_id)
+        for name in list(STEP_OUTPUTS)[:-1]:
+            getattr(rerun, name).assert_not_called()
+        rerun._setup_ecs_service.assert_called_once_with(
+            "midserver-dev-cluster", STEP_OUTPUTS["_register_task_definition"], ["subnet-1", "subnet-2"], ["sg-1"]
+        )
+        self.assertTrue(self.store.load("dev")[failed.checkpoint.deploy_id]["completed_at"])
+
+    def test_invalid_checkpoint_reruns_from_that_step(self):
+        # Arrange
+        self.fail_service_step()
+        rerun = self.deployer()
+        rerun.ecs_utils.describe_clusters.return_value = []  # cluster deleted since
+
+        # Act
+        rerun.deploy()
+
+        # Assert
+        rerun._setup_iam_roles.assert_not_called()
+        rerun._setup_ecs_cluster.assert_called_once_with()
+        rerun._register_task_definition.assert_called_once()
+        rerun.ecs_utils.describe_task_definition.assert_not_called()
+
+    def test_completed_or_changed_deploys_start_fresh(self):
+        # Arrange
+        first = self.deployer()
+        first.deploy()
+
+        # Act
+        second = self.deployer()
+        second.deploy()
+        with patch.dict(os.environ, {"IMAGE_TAG": "v2"}):
+            self.fail_service_step()
+            third = self.deployer()
+            third.deploy(resume=False)
+
+        # Assert
+        second._setup_network.assert_called_once_with()
+        third._setup_network.assert_called_once_with()
+        self.assertEqual(len({first.checkpoint.deploy_id, second.checkpoint.deploy_id, third.checkpoint.deploy_id}), 3)
+
+    def test_store_keeps_newest_deploys(self):
+        # Arrange
+        store = CheckpointStore(self.tmp.name, keep=3)
+
+        # Act
+        ids = [store.start("prod", {"image": str(i)}).deploy_id for i in range(5)]
+
+        # Assert
+        self.assertEqual(store.deploys("prod"), ids[2:])
+
+
+if __name__ == "__main__":
+    unittest.main()
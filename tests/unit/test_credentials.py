@@ -0,0 +1,100 @@
+import datetime
+import unittest
+from unittest.mock import MagicMock
+from src.aws_utils.credentials import CredentialProvider
+from src.aws_utils.ec2 import EC2Utils
+from src.aws_utils.ecs import ECSUtils
+from src.aws_utils.transport import TransportProfile
+
+NOW = 1_700_000_000.0
+
+
+def expiring_session(seconds_left):
+    session = MagicMock()
+    credentials = session.get_credentials.return_value
+    credentials._expiry_time = datetime.datetime.fromtimestamp(
+        NOW + seconds_left, tz=datetime.timezone.utc
+    )
+    return session
+
+
+class TestCredentialProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.now = NOW
+        self.fetch = MagicMock(return_value={"Account": "123456789012"})
+
+    def provider(self, session, **kwargs):
+        return CredentialProvider(
+            "test_profile", session=session, auto_refresh=False, clock=lambda: self.now, **kwargs
+        )
+
+    def test_identity_is_cached(self):
+        # Arrange
+        provider = self.provider(MagicMock(), identity_ttl=60)
+        provider.session.get_credentials.return_value = object()
+
+        # Act
+        first = provider.identity(self.fetch)
+        second = provider.identity(self.fetch)
+        self.now += 61
+        provider.identity(self.fetch)
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_identity_expires_before_credentials(self):
+        # Arrange
+        provider = self.provider(expiring_session(900), refresh_margin=600)
+
+        # Act
+        provider.identity(self.fetch)
+        self.now += 299
+        provider.identity(self.fetch)
+        self.now += 2
+        provider.identity(self.fetch)
+
+        # Assert
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_refresh_renews_credentials_and_identity(self):
+        # Arrange
+        session = expiring_session(900)
+        provider = self.provider(session)
+        provider.identity(self.fetch)
+
+        # Act
+        provider.refresh()
+        provider.identity(self.fetch)
+
+        # Assert
+        session.get_credentials.return_value.get_frozen_credentials.assert_called_once()
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_clients_are_shared_between_util_classes(self):
+        # Arrange
+        provider = self.provider(MagicMock())
+        ec2_utils = EC2Utils(credentials=provider)
+        ecs_utils = ECSUtils(credentials=provider)
+
+        # Act
+        first = ec2_utils.client("sts")
+        second = ecs_utils.client("sts")
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertIs(ec2_utils.pool_metrics, ecs_utils.pool_metrics)
+        provider.session.client.assert_called_once()
+        provider.client("sts", TransportProfile(read_timeout=5))
+        self.assertEqual(provider.session.client.call_count, 2)
+
+    def test_for_profile_returns_shared_provider(self):
+        self.assertIs(
+            CredentialProvider.for_profile("test_profile"),
+            CredentialProvider.for_profile("test_profile"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import unittest
+from unittest.mock import patch
+from src.aws_utils.cassette import Cassette
+from src.deployment.image import ImageResolver
+from src.deployment.mid_server import MIDServerDeployer
+from src.deployment.strategies import RollingStrategy
+
+CASSETTES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "cassettes")
+TEST_ENV = {
+    "ECR_REPO": "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver",
+    "AWS_REGION": "us-east-1",
+}
+
+
+def replay(name):
+    return Cassette(os.path.join(CASSETTES, name), mode="replay")
+
+
+@patch.dict(os.environ, TEST_ENV)
+class TestMIDServerDeployerReplay(unittest.TestCase):
+
+    def test_deploy_new_environment(self):
+        # Arrange
+        cassette = replay("deploy_new_environment.jsonl")
+        deployer = MIDServerDeployer(
+            profile_name="no-such-profile",
+            environment="test",
+            strategy=RollingStrategy(poll_interval=0),
+            backend=cassette,
+            image_resolver=ImageResolver(),
+        )
+
+        # Act
+        deployer.deploy()
+
+        # Assert
+        self.assertEqual(
+            cassette.played[:5],
+            [
+                ("ec2", "describe_vpcs"),
+                ("ec2", "describe_subnets"),
+                ("ec2", "describe_security_groups"),
+                ("ec2", "create_security_group"),
+                ("ec2", "authorize_security_group_ingress"),
+            ],
+        )
+        self.assertEqual(cassette.played.count(("iam", "create_role")), 2)
+        self.assertEqual(cassette.played.count(("ssm", "get_parameter")), 4)
+        self.assertEqual(cassette.played.count(("ecr", "describe_images")), 1)
+        self.assertEqual(cassette.played[-2:], [("ecs", "describe_services")] * 2)
+        self.assertIsNone(deployer.ec2_utils.credentials._session)
+
+    def test_plan_new_environment_with_read_only_calls(self):
+        # Arrange
+        cassette = replay("deploy_new_environment.jsonl")
+        deployer = MIDServerDeployer(
+            profile_name="no-such-profile", environment="test", backend=cassette, read_only=True
+        )
+
+        # Act
+        with patch.object(deployer.ecs_utils, "describe_clusters", return_value=[]), patch.object(
+            deployer.ecs_utils, "describe_task_definition", return_value=None
+        ):
+            plan = deployer.plan()
+
+        # Assert
+        self.assertEqual(
+            [a.action for a in plan.actions if a.resource in ("security-group", "ecs-service")],
+            ["create", "create"],
+        )
+        self.assertTrue(all(op.startswith(("describe_", "get_", "list_")) for _, op in cassette.played))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import unittest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from src.deployment.drift import DriftScanner, structural_diff
+from src.deployment.mid_server import MIDServerDeployer
+from src.deployment.terraform import TerraformOutputs
+
+ECR_REPO = "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver"
+
+
+class FakeAWS:
+    """aws_cmd backend answering describe calls for in-sync environments."""
+
+    def __init__(self, environments):
+        self.environments = environments
+        self.calls = []
+        self.attached = {
+            f"midserver-{env}-{kind}": [arn]
+            for env in environments
+            for kind, arn in (
+                ("task-role", MIDServerDeployer.TASK_ROLE_POLICY_ARN),
+                ("execution-role", MIDServerDeployer.EXECUTION_ROLE_POLICY_ARN),
+            )
+        }
+        self.images = {env: f"{ECR_REPO}:latest" for env in environments}
+
+    def call(self, service, operation, params, invoke):
+        self.calls.append(operation)
+        return getattr(self, operation)(**params)
+
+    def describe_security_groups(self, Filters):
+        if Filters[0]["Name"] == "group-id":
+            return {"SecurityGroups": [
+                {"GroupName": f"mid-server-sg-{group_id}", "GroupId": group_id, "IpPermissions": []}
+                for group_id in Filters[0]["Values"]
+            ]}
+        names = Filters[0]["Values"]
+        return {"SecurityGroups": [
+            {"GroupName": name, "GroupId": f"sg-{name}", "IpPermissions": MIDServerDeployer.INGRESS_RULES}
+            for name in names
+        ]}
+
+    def describe_clusters(self, clusters):
+        return {"clusters": [{"clusterName": name, "status": "ACTIVE"} for name in clusters]}
+
+    def describe_services(self, cluster, services):
+        env = cluster[len("midserver-"):-len("-cluster")]
+        return {"services": [{
+            "serviceName": services[0],
+            "status": "ACTIVE",
+            "desiredCount": 1,
+            "taskDefinition": f"arn:aws:ecs:us-east-1:123456789012:task-definition/midserver-{env}-task:3",
+            "networkConfiguration": {"awsvpcConfiguration": {"securityGroups": [f"sg-midserver-{env}-sg"]}},
+        }]}
+
+    def describe_task_definition(self, taskDefinition):
+        env = taskDefinition.rsplit("/", 1)[-1][len("midserver-"):].rsplit("-task", 1)[0]
+        role = "arn:aws:iam::123456789012:role/midserver-" + env
+        return {"taskDefinition": {
+            "taskRoleArn": f"{role}-task-role",
+            "executionRoleArn": f"{role}-execution-role",
+            "containerDefinitions": [{
+                "name": f"midserver-{env}",
+                "image": self.images[env],
+                "cpu": 256,
+                "memory": 512,
+                "essential": True,
+                "environment": [{"name": n, "value": "x"} for n in (
+                    "MID_INSTANCE_URL", "MID_INSTANCE_USERNAME", "MID_INSTANCE_PASSWORD", "MID_SERVER_NAME"
+                )],
+                "logConfiguration": {"options": {
+                    "awslogs-group": f"/ecs/midserver-{env}", "awslogs-region": "us-east-1",
+                }},
+            }],
+        }}
+
+    def list_attached_role_policies(self, RoleName):
+        if RoleName not in self.attached:
+            raise ClientError({"Error": {"Code": "NoSuchEntity", "Message": ""}}, "ListAttachedRolePolicies")
+        return {"AttachedPolicies": [{"PolicyArn": arn} for arn in self.attached[RoleName]]}
+
+
+class TestStructuralDiff(unittest.TestCase):
+
+    def test_reports_paths_of_differences(self):
+        expected = {"a": 1, "b": {"c": [1, 2]}, "d": [1]}
+        actual = {"a": 1, "b": {"c": [1, 3]}, "d": [1, 2], "extra": True}
+
+        self.assertEqual(structural_diff(expected, actual), [
+            {"path": "b.c[1]", "expected": 2, "actual": 3},
+            {"path": "d", "expected": [1], "actual": [1, 2]},
+        ])
+
+
+class TestDriftScanner(unittest.TestCase):
+
+    def scan(self, fake, environments):
+        return DriftScanner(
+            environments, ["us-east-1"], credentials=MagicMock(), ecr_repo=ECR_REPO, backend=fake
+        ).scan()
+
+    def test_in_sync_fleet_uses_batched_calls(self):
+        # Arrange
+        environments = [f"env{i}" for i in range(60)]
+        fake = FakeAWS(environments)
+
+        # Act
+        report = self.scan(fake, environments)
+
+        # Assert
+        self.assertFalse(report.has_drift, report.render())
+        self.assertEqual(report.summary()["in-sync"], 60 * 6)
+        self.assertEqual(fake.calls.count("describe_security_groups"), 1)
+        self.assertEqual(fake.calls.count("describe_clusters"), 1)
+
+    def test_reports_drift_and_missing_resources(self):
+        # Arrange
+        fake = FakeAWS(["dev", "prod"])
+        fake.images["prod"] = "docker.io/someone/midserver:latest"
+        fake.attached["midserver-dev-task-role"].append("arn:aws:iam::aws:policy/AdministratorAccess")
+        del fake.attached["midserver-prod-execution-role"]
+
+        # Act
+        report = self.scan(fake, ["dev", "prod"])
+
+        # Assert
+        problems = {(f.environment, f.resource, f.status) for f in report.findings if f.status != "in-sync"}
+        self.assertEqual(problems, {
+            ("dev", "iam-role", "drifted"),
+            ("prod", "iam-role", "missing"),
+            ("prod", "task-definition", "drifted"),
+        })
+        task_definition = next(f for f in report.findings if f.resource == "task-definition" and f.status == "drifted")
+        self.assertEqual(task_definition.differences[0]["path"], "containers[0].imageRepository")
+        self.assertIn('"drifted": 2', report.to_json())
+
+    def test_desired_count_is_an_input(self):
+        # Arrange
+        fake = FakeAWS(["dev"])
+
+        # Act
+        report = DriftScanner(
+            ["dev"], ["us-east-1"], credentials=MagicMock(), ecr_repo=ECR_REPO, backend=fake, desired_count=3
+        ).scan()
+
+        # Assert
+        service = next(f for f in report.findings if f.resource == "ecs-service")
+        self.assertEqual(service.differences, [{"path": "desiredCount", "expected": 3, "actual": 1}])
+
+    def test_terraform_security_group_and_roles_are_expected(self):
+        # Arrange
+        fake = FakeAWS(["dev"])
+        role = "arn:aws:iam::123456789012:role/midserver-dev"
+        fake.attached = {"midserver-dev-task-role": [], "midserver-dev-execution-role": []}
+        terraform = TerraformOutputs({
+            "environment": "dev",
+            "security_group_id": "sg-tf",
+            "task_role_arn": f"{role}-task-role",
+            "execution_role_arn": "arn:aws:iam::123456789012:role/ecs-execution-role-dev",
+        })
+
+        # Act
+        report = DriftScanner(
+            ["dev"], ["us-east-1"], credentials=MagicMock(), ecr_repo=ECR_REPO, backend=fake,
+            terraform={"dev": terraform},
+        ).scan()
+
+        # Assert
+        statuses = {(f.resource, f.name): f.status for f in report.findings}
+        self.assertEqual(statuses[("security-group", "sg-tf")], "in-sync")
+        self.assertEqual(statuses[("iam-role", "midserver-dev-task-role")], "in-sync")
+        self.assertEqual(statuses[("iam-role", "ecs-execution-role-dev")], "missing")
+        service = next(f for f in report.findings if f.resource == "ecs-service")
+        self.assertEqual(service.differences, [
+            {"path": "securityGroupIds[0]", "expected": "sg-tf", "actual": "sg-midserver-dev-sg"},
+        ])
+        task_definition = next(f for f in report.findings if f.resource == "task-definition")
+        self.assertEqual([d["path"] for d in task_definition.differences], ["executionRoleArn"])
+
+
+if __name__ == "__main__":
+    unittest.main()
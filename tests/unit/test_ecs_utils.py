@@ -1,120 +1,116 @@
+import os
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock
+from src.aws_utils.cassette import Cassette
 from src.aws_utils.ecs import ECSUtils
 
+# Calls are matched on their exact parameters, so a request that differs
+# from the cassette raises CassetteMiss.
+CASSETTE = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "cassettes", "ecs_utils.jsonl")
+TASK_DEFINITION = "arn:aws:ecs:us-east-1:123456789012:task-definition/test-task"
+
 
 class TestECSUtils(unittest.TestCase):
 
     def setUp(self):
-        self.ecs_utils = ECSUtils(profile_name="test_profile")
-
-    @patch("src.aws_utils.ecs.AWSUtils.aws_cmd")
-    def test_list_clusters(self, mock_aws_cmd):
-        # Arrange
-        mock_response = {
-            "clusterArns": ["arn:aws:ecs:us-east-1:123456789012:cluster/test-cluster"]
-        }
-        mock_aws_cmd.return_value = mock_response
+        self.cassette = Cassette(CASSETTE)
+        self.ecs_utils = ECSUtils(credentials=MagicMock(), backend=self.cassette)
 
+    def test_list_clusters(self):
         # Act
         result = self.ecs_utils.list_clusters()
 
         # Assert
-        mock_aws_cmd.assert_called_once_with("ecs", "list_clusters")
-        self.assertEqual(result, mock_response["clusterArns"])
-
-    @patch("src.aws_utils.ecs.AWSUtils.aws_cmd")
-    def test_create_cluster(self, mock_aws_cmd):
-        # Arrange
-        cluster_name = "test-cluster"
-        mock_response = {"cluster": {"clusterName": cluster_name, "status": "ACTIVE"}}
-        mock_aws_cmd.return_value = mock_response
+        self.assertEqual(self.cassette.played, [("ecs", "list_clusters")])
+        self.assertEqual(result, ["arn:aws:ecs:us-east-1:123456789012:cluster/test-cluster"])
 
+    def test_list_tasks_follows_pages(self):
         # Act
-        result = self.ecs_utils.create_cluster(cluster_name)
+        result = self.ecs_utils.list_tasks("test-cluster")
 
         # Assert
-        mock_aws_cmd.assert_called_once_with(
-            "ecs", "create_cluster", clusterName=cluster_name
-        )
-        self.assertEqual(result, mock_response)
+        self.assertEqual(result, ["task-1", "task-2", "task-3"])
+        self.assertEqual(self.cassette.played, [("ecs", "list_tasks")] * 2)
 
-    @patch("src.aws_utils.ecs.AWSUtils.aws_cmd")
-    def test_register_task_definition(self, mock_aws_cmd):
-        # Arrange
-        family = "test-task"
-        container_definitions = [{"name": "test-container", "image": "test-image"}]
-        task_role_arn = "arn:aws:iam::123456789012:role/test-task-role"
-        execution_role_arn = "arn:aws:iam::123456789012:role/test-execution-role"
-        mock_response = {
-            "taskDefinition": {
-                "taskDefinitionArn": "arn:aws:ecs:us-east-1:123456789012:task-definition/test-task:1"
-            }
-        }
-        mock_aws_cmd.return_value = mock_response
+    def test_create_cluster(self):
+        # Act
+        result = self.ecs_utils.create_cluster("test-cluster")
+
+        # Assert
+        self.assertEqual(self.cassette.played, [("ecs", "create_cluster")])
+        self.assertEqual(result["cluster"]["status"], "ACTIVE")
 
+    def test_register_task_definition(self):
         # Act
         result = self.ecs_utils.register_task_definition(
-            family, container_definitions, task_role_arn, execution_role_arn
+            "test-task",
+            [{"name": "test-container", "image": "test-image"}],
+            "arn:aws:iam::123456789012:role/test-task-role",
+            "arn:aws:iam::123456789012:role/test-execution-role",
         )
 
         # Assert
-        mock_aws_cmd.assert_called_once_with(
-            "ecs",
-            "register_task_definition",
-            family=family,
-            containerDefinitions=container_definitions,
-            taskRoleArn=task_role_arn,
-            executionRoleArn=execution_role_arn,
-            networkMode="awsvpc",
-            requiresCompatibilities=["FARGATE"],
-            cpu="256",
-            memory="512",
+        self.assertEqual(self.cassette.played, [("ecs", "register_task_definition")])
+        self.assertEqual(result["taskDefinition"]["taskDefinitionArn"], f"{TASK_DEFINITION}:1")
+
+    def test_create_service(self):
+        # Act
+        result = self.ecs_utils.create_service(
+            "test-cluster", "test-service", f"{TASK_DEFINITION}:1", 1, ["subnet-12345678"], ["sg-12345678"]
         )
-        self.assertEqual(result, mock_response)
 
-    @patch("src.aws_utils.ecs.AWSUtils.aws_cmd")
-    def test_create_service(self, mock_aws_cmd):
+        # Assert
+        self.assertEqual(self.cassette.played, [("ecs", "create_service")])
+        self.assertEqual(result["service"]["launchType"], "FARGATE")
+
+    def test_create_service_on_capacity_providers(self):
         # Arrange
-        cluster = "test-cluster"
-        service_name = "test-service"
-        task_definition = (
-            "arn:aws:ecs:us-east-1:123456789012:task-definition/test-task:1"
-        )
-        desired_count = 1
-        subnets = ["subnet-12345678"]
-        security_groups = ["sg-12345678"]
-        mock_response = {"service": {"serviceName": service_name, "status": "ACTIVE"}}
-        mock_aws_cmd.return_value = mock_response
+        strategy = [
+            {"capacityProvider": "FARGATE", "base": 1, "weight": 0},
+            {"capacityProvider": "FARGATE_SPOT", "base": 0, "weight": 1},
+        ]
 
         # Act
         result = self.ecs_utils.create_service(
-            cluster,
-            service_name,
-            task_definition,
-            desired_count,
-            subnets,
-            security_groups,
+            "test-cluster", "spot-service", f"{TASK_DEFINITION}:1", 3, ["subnet-12345678"], ["sg-12345678"],
+            capacity_provider_strategy=strategy,
+        )
+
+        # Assert: the recorded request has a capacity provider strategy and no launch type.
+        self.assertEqual(self.cassette.played, [("ecs", "create_service")])
+        self.assertEqual(result["service"]["capacityProviderStrategy"], strategy)
+
+    def test_update_service_capacity_providers_forces_new_deployment(self):
+        # Act
+        self.ecs_utils.update_service(
+            "test-cluster", "spot-service", capacity_provider_strategy=[{"capacityProvider": "FARGATE_SPOT", "weight": 1}]
+        )
+
+        # Assert: the recorded request sets forceNewDeployment.
+        self.assertEqual(self.cassette.played, [("ecs", "update_service")])
+
+    def test_update_service(self):
+        # Act
+        result = self.ecs_utils.update_service(
+            "test-cluster",
+            "test-service",
+            task_definition=f"{TASK_DEFINITION}:2",
+            deployment_configuration={"maximumPercent": 200, "minimumHealthyPercent": 100},
         )
 
         # Assert
-        mock_aws_cmd.assert_called_once_with(
-            "ecs",
-            "create_service",
-            cluster=cluster,
-            serviceName=service_name,
-            taskDefinition=task_definition,
-            desiredCount=desired_count,
-            launchType="FARGATE",
-            networkConfiguration={
-                "awsvpcConfiguration": {
-                    "subnets": subnets,
-                    "securityGroups": security_groups,
-                    "assignPublicIp": "ENABLED",
-                }
-            },
+        self.assertEqual(self.cassette.played, [("ecs", "update_service")])
+        self.assertEqual(result["service"]["taskDefinition"], f"{TASK_DEFINITION}:2")
+
+    def test_create_task_set(self):
+        # Act
+        result = self.ecs_utils.create_task_set(
+            "test-cluster", "test-service", f"{TASK_DEFINITION}:2", ["subnet-12345678"], ["sg-12345678"]
         )
-        self.assertEqual(result, mock_response)
+
+        # Assert
+        self.assertEqual(self.cassette.played, [("ecs", "create_task_set")])
+        self.assertEqual(result, {"id": "ecs-svc/123", "status": "ACTIVE", "taskDefinition": f"{TASK_DEFINITION}:2"})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from src.aws_utils import cancellation
+from src.aws_utils.local_aws import ecs_deployment_event
+from src.aws_utils.sqs import SQSUtils
+from src.deployment.events import LocalEventQueue, RolloutEvents, event_service
+from src.deployment.strategies import RollingStrategy
+
+CLUSTER = "midserver-test-cluster"
+SERVICE = "midserver-test-service"
+NEW_TASK_DEFINITION = "arn:aws:ecs:us-east-1:123456789012:task-definition/test:2"
+CLUSTER_ARN = f"arn:aws:ecs:us-east-1:123456789012:cluster/{CLUSTER}"
+SERVICE_ARN = f"arn:aws:ecs:us-east-1:123456789012:service/{CLUSTER}/{SERVICE}"
+
+
+def service_description(rollout_state, running_count=1):
+    deployment = {
+        "status": "PRIMARY", "taskDefinition": NEW_TASK_DEFINITION, "rolloutState": rollout_state,
+        "desiredCount": 1, "runningCount": running_count,
+    }
+    return {"services": [{"serviceName": SERVICE, "status": "ACTIVE", "deployments": [deployment]}]}
+
+
+class TestEventService(unittest.TestCase):
+
+    def test_service_from_resources_or_task_group(self):
+        # Arrange
+        task_event = {
+            "source": "aws.ecs",
+            "detail-type": "ECS Task State Change",
+            "resources": ["arn:aws:ecs:us-east-1:123456789012:task/midserver-test-cluster/abc"],
+            "detail": {"clusterArn": CLUSTER_ARN, "group": f"service:{SERVICE}", "lastStatus": "RUNNING"},
+        }
+        old_arn_event = ecs_deployment_event(f"arn:aws:ecs:us-east-1:123456789012:service/{SERVICE}", CLUSTER_ARN)
+
+        # Act / Assert
+        self.assertEqual(event_service(ecs_deployment_event(SERVICE_ARN, CLUSTER_ARN)), (CLUSTER, SERVICE))
+        self.assertEqual(event_service(old_arn_event), (CLUSTER, SERVICE))
+        self.assertEqual(event_service(task_event), (CLUSTER, SERVICE))
+        self.assertIsNone(event_service({"source": "aws.ec2", "detail-type": "EC2 Instance State-change"}))
+
+
+class TestRolloutEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = LocalEventQueue(time_scale=0.01)
+        self.events = RolloutEvents(SQSUtils(backend=self.queue), "local")
+        self.addCleanup(self.events.stop)
+
+    def test_events_wake_only_their_service(self):
+        # Arrange
+        watch = self.events.watch(CLUSTER, SERVICE)
+        other = self.events.watch(CLUSTER, "other-service")
+
+        # Act
+        self.queue.publish(ecs_deployment_event(SERVICE_ARN, CLUSTER_ARN))
+
+        # Assert
+        self.assertTrue(watch.wait(2))
+        self.assertFalse(other.wait(0.1))
+        self.assertEqual(self.queue.calls["sqs:delete_message_batch"], 1)
+
+    def test_closed_watch_is_not_woken(self):
+        # Arrange
+        watch = self.events.watch(CLUSTER, SERVICE)
+        watch.close()
+
+        # Act / Assert
+        self.assertFalse(self.events.dispatch(ecs_deployment_event(SERVICE_ARN, CLUSTER_ARN)))
+
+    def test_cancel_stops_wait(self):
+        # Arrange
+        watch = self.events.watch(CLUSTER, SERVICE)
+        scope = cancellation.CancelScope()
+        threading.Timer(0.05, scope.cancel).start()
+
+        # Act / Assert
+        with cancellation.scope(root=scope), self.assertRaises(cancellation.Cancelled):
+            watch.wait(10, slice_seconds=0.01)
+
+
+class TestEventDrivenRollout(unittest.TestCase):
+
+    def test_rollout_completes_on_event_without_polling(self):
+        # Arrange
+        queue = LocalEventQueue(time_scale=0.01)
+        events = RolloutEvents(SQSUtils(backend=queue), "local")
+        self.addCleanup(events.stop)
+        ecs_utils = MagicMock()
+        ecs_utils.describe_services.side_effect = [
+            service_description("COMPLETED"),
+            service_description("IN_PROGRESS", running_count=0),
+            service_description("COMPLETED"),
+        ]
+        ecs_utils.update_service.side_effect = lambda *args, **kwargs: threading.Timer(
+            0.1, queue.publish, [ecs_deployment_event(SERVICE_ARN, CLUSTER_ARN)]
+        ).start()
+        strategy = RollingStrategy(events=events, poll_interval=0, event_poll_interval=30)
+
+        # Act
+        start = time.monotonic()
+        strategy.deploy(ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"])
+
+        # Assert: one check after the event, not a poll every poll_interval (0s)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(ecs_utils.describe_services.call_count, 3)
+
+    def test_polls_when_events_cannot_be_received(self):
+        # Arrange
+        unreachable = MagicMock()
+        unreachable.call.side_effect = ClientError({"Error": {"Code": "AccessDenied"}}, "ReceiveMessage")
+        events = RolloutEvents(SQSUtils(backend=unreachable), "local", retry_interval=60)
+        events.healthy = False
+        ecs_utils = MagicMock()
+        ecs_utils.describe_services.side_effect = [
+            service_description("COMPLETED"),
+            service_description("IN_PROGRESS", running_count=0),
+            service_description("COMPLETED"),
+        ]
+        sleeps = []
+        strategy = RollingStrategy(events=events, poll_interval=7, sleep=sleeps.append)
+        self.addCleanup(events.stop)
+
+        # Act
+        strategy.deploy(ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"])
+
+        # Assert
+        self.assertEqual(sleeps, [7])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from src.aws_utils.ecr import parse_repository_uri
+from src.deployment.image import ImageBuilder, ImageManifest, ImageResolver, dockerfile_sources
+
+REPOSITORY = "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver"
+
+
+class TestImageBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.context = self.tmp.name
+        os.makedirs(os.path.join(self.context, "docker"))
+        self.dockerfile = os.path.join(self.context, "docker", "Dockerfile")
+        self.write("docker/Dockerfile", (
+            "FROM almalinux:9-minimal AS base\n"
+            "ARG MID_VERSION\n"
+            "COPY --chown=mid:mid docker/entrypoint.sh \\\n    /opt/entrypoint.sh\n"
+            "COPY --from=base /etc/passwd /etc/passwd\n"
+        ))
+        self.write("docker/entrypoint.sh", "#!/bin/bash\n")
+        self.manifest_file = os.path.join(self.context, "images.json")
+        self.runner = MagicMock()
+        self.runner.return_value.stdout = f"{REPOSITORY}@sha256:abc\n"
+
+    def write(self, path, content):
+        with open(os.path.join(self.context, path), "w") as f:
+            f.write(content)
+
+    def builder(self, ecr_utils=None, version="Xanadu"):
+        return ImageBuilder(
+            REPOSITORY,
+            dockerfile=self.dockerfile,
+            context=self.context,
+            build_args={"MID_VERSION": version},
+            manifest=ImageManifest(self.manifest_file),
+            ecr_utils=ecr_utils,
+            runner=self.runner,
+        )
+
+    def test_dockerfile_sources(self):
+        self.assertEqual(dockerfile_sources(self.dockerfile, self.context), ["docker/entrypoint.sh"])
+
+    def test_skips_unchanged_inputs(self):
+        # Act
+        first = self.builder().build()
+        second = self.builder().build()
+
+        # Assert
+        self.assertFalse(first.skipped)
+        self.assertEqual(first.digest, "sha256:abc")
+        self.assertTrue(second.skipped)
+        self.assertEqual(second.image, first.image)
+        self.assertEqual(self.runner.call_count, 5)  # build, push x2, inspect, retag latest
+        self.assertEqual(
+            second.commands,
+            [["docker", "buildx", "imagetools", "create", "--tag", f"{REPOSITORY}:latest", first.image]],
+        )
+        self.assertEqual(second.tag, first.image.rsplit(":", 1)[-1])
+
+    def test_rebuilds_when_an_input_changes(self):
+        # Arrange
+        first = self.builder().build()
+
+        # Act
+        self.write("docker/entrypoint.sh", "#!/bin/bash\nexec mid\n")
+        changed_file = self.builder().build()
+        changed_version = self.builder(version="Yokohama").build()
+
+        # Assert
+        self.assertEqual(len({first.image, changed_file.image, changed_version.image}), 3)
+        self.assertFalse(changed_file.skipped or changed_version.skipped)
+        build_command = changed_version.commands[0]
+        self.assertIn("--cache-from", build_command)
+        self.assertIn("MID_VERSION=Yokohama", build_command)
+
+    def test_skips_image_found_in_registry(self):
+        # Arrange
+        ecr_utils = MagicMock()
+        ecr_utils.describe_image.return_value = {"imageDigest": "sha256:def"}
+
+        # Act
+        result = self.builder(ecr_utils).build()
+
+        # Assert
+        self.assertTrue(result.skipped)
+        self.assertEqual(result.digest, "sha256:def")
+        self.runner.assert_not_called()
+        ecr_utils.tag_image.assert_called_once_with(REPOSITORY, "sha256:def", "latest")
+
+    def test_dry_run_leaves_latest_alone(self):
+        # Arrange
+        ecr_utils = MagicMock()
+        ecr_utils.describe_image.return_value = {"imageDigest": "sha256:def"}
+
+        # Act
+        result = self.builder(ecr_utils).build(dry_run=True)
+
+        # Assert
+        self.assertTrue(result.skipped)
+        ecr_utils.tag_image.assert_not_called()
+
+    def test_parse_repository_uri(self):
+        self.assertEqual(parse_repository_uri(REPOSITORY), ("123456789012", "midserver"))
+        self.assertEqual(parse_repository_uri("midserver"), (None, "midserver"))
+
+
+class TestImageResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.ecr_utils = MagicMock()
+        self.ecr_utils.describe_image.return_value = {"imageDigest": "sha256:abc"}
+        self.resolver = ImageResolver()
+
+    def test_resolves_each_tag_once(self):
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            images = list(executor.map(
+                lambda _: self.resolver.resolve(f"{REPOSITORY}:latest", self.ecr_utils), range(20)
+            ))
+
+        # Assert
+        self.assertEqual(set(images), {f"{REPOSITORY}@sha256:abc"})
+        self.ecr_utils.describe_image.assert_called_once_with(REPOSITORY, "latest")
+
+    def test_leaves_other_images_alone(self):
+        self.assertEqual(self.resolver.resolve("nginx:1.27", self.ecr_utils), "nginx:1.27")
+        self.assertEqual(
+            self.resolver.resolve(f"{REPOSITORY}@sha256:def", self.ecr_utils), f"{REPOSITORY}@sha256:def"
+        )
+        self.ecr_utils.describe_image.assert_not_called()
+
+    def test_missing_image_fails(self):
+        self.ecr_utils.describe_image.return_value = None
+
+        with self.assertRaises(ValueError):
+            self.resolver.resolve(f"{REPOSITORY}:nope", self.ecr_utils)
+
+
+if __name__ == "__main__":
+    unittest.main()
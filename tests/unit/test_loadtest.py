@@ -0,0 +1,95 @@
+import os
+import unittest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from src.aws_utils.credentials import CredentialProvider
+from src.aws_utils.ecs import ECSUtils
+from src.aws_utils.local_aws import LocalAWS
+from src.deployment.image import ImageResolver
+from src.deployment.loadtest import LoadTest, percentile
+from src.deployment.mid_server import MIDServerDeployer
+from src.deployment.strategies import RollingStrategy
+
+
+class TestLocalAWS(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.slept = []
+        self.aws = LocalAWS(
+            quotas={"ecs": 2}, jitter=0, rollout_seconds=30, sleep=self.slept.append, clock=lambda: self.now, seed=1
+        )
+        self.ecs_utils = ECSUtils(backend=self.aws, credentials=CredentialProvider(auto_refresh=False))
+
+    def test_calls_over_quota_are_retried_then_throttled(self):
+        # Act: the burst of 2 is used up and time doesn't move
+        self.ecs_utils.list_clusters()
+        self.ecs_utils.list_clusters()
+        with self.assertRaises(ClientError) as raised:
+            self.ecs_utils.list_clusters()
+
+        # Assert
+        self.assertEqual(raised.exception.response["Error"]["Code"], "ThrottlingException")
+        self.assertEqual(self.aws.throttles["ecs"], 3)
+        self.assertEqual(self.aws.calls["ecs:list_clusters"], 3)
+        self.assertEqual(len(self.slept), 4)  # two latencies, two backoffs
+
+    def test_service_rollout_completes_after_rollout_time(self):
+        # Arrange
+        self.ecs_utils.create_cluster("c")
+        self.now += 1
+        self.ecs_utils.create_service("c", "svc", "td:1", 1, ["subnet-1"], ["sg-1"])
+
+        # Act
+        before = self.ecs_utils.describe_services("c", ["svc"])["services"][0]
+        self.now += 31
+        after = self.ecs_utils.describe_services("c", ["svc"])["services"][0]
+
+        # Assert
+        self.assertEqual(before["deployments"][0]["rolloutState"], "IN_PROGRESS")
+        self.assertEqual((after["deployments"][0]["rolloutState"], after["runningCount"]), ("COMPLETED", 1))
+
+    @patch.dict(os.environ, {"ECR_REPO": "123456789012.dkr.ecr.us-east-1.amazonaws.com/midserver"})
+    def test_deployer_runs_against_stand_in(self):
+        # Arrange
+        aws = LocalAWS(time_scale=0.001, seed=1)
+        deployer = MIDServerDeployer(
+            None, "dev", strategy=RollingStrategy(poll_interval=0.001), backend=aws,
+            credentials=CredentialProvider(auto_refresh=False), image_resolver=ImageResolver(),
+        )
+
+        # Act
+        deployer.deploy()
+        deployer.deploy()
+
+        # Assert: the second deploy finds everything and registers a new revision
+        self.assertEqual(aws.calls["ec2:create_security_group"], 1)
+        self.assertEqual(aws.calls["iam:create_role"], 2)
+        self.assertEqual(aws.calls["ecs:create_service"], 1)
+        self.assertEqual(aws.calls["ecs:update_service"], 1)
+        self.assertEqual(aws.calls["ecr:describe_images"], 1)
+        self.assertEqual(aws._revisions["midserver-dev-task"], 2)
+
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_ramps_through_levels(self):
+        # Act
+        report = LoadTest(levels=(1, 3), time_scale=0.001, rollout_seconds=10, seed=1).run()
+
+        # Assert
+        self.assertEqual([level.concurrency for level in report.levels], [1, 3])
+        self.assertEqual([level.deploys for level in report.levels], [1, 3])
+        self.assertEqual(sum(level.failures for level in report.levels), 0)
+        self.assertGreater(report.levels[1].api_calls, report.levels[0].api_calls)
+        self.assertGreater(report.levels[1].rss_mb, 0)
+        self.assertIn("Throughput (deploys/s) by concurrency:", report.render())
+        self.assertEqual(len(report.to_dict()["levels"]), 2)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 99), percentile([], 99)), (50, 99, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
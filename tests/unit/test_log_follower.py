@@ -0,0 +1,93 @@
+import tempfile
+import threading
+import unittest
+from src.aws_utils.logs import LogsUtils
+from src.deployment.log_follower import LocalLogs, LogFollower, follow_many, log_group_name
+
+
+class TestLogFollower(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.local = LocalLogs(self.tmp.name)
+        self.logs_utils = LogsUtils(profile_name="test_profile", backend=self.local)
+        self.group = log_group_name("dev")
+
+    def follower(self, **kwargs):
+        return LogFollower(self.logs_utils, self.group, start_time=0, page_size=2, **kwargs)
+
+    def test_poll_pages_through_all_streams(self):
+        # Arrange
+        for i in range(5):
+            self.local.append(self.group, f"ecs/midserver-dev/task{i % 2}", f"line {i}", timestamp=1000 + i)
+
+        # Act
+        messages = [e["message"] for e in self.follower().poll()]
+
+        # Assert
+        self.assertEqual(messages, [f"line {i}" for i in range(5)])
+
+    def test_poll_only_returns_new_events(self):
+        # Arrange
+        follower = self.follower()
+        self.local.append(self.group, "ecs/a", "first", timestamp=1000)
+        list(follower.poll())
+
+        # Act
+        self.local.append(self.group, "ecs/a", "late", timestamp=999)
+        self.local.append(self.group, "ecs/a", "second", timestamp=1001)
+        messages = [e["message"] for e in follower.poll()]
+
+        # Assert
+        self.assertEqual(messages, ["late", "second"])
+
+    def test_filter_pattern(self):
+        # Arrange
+        for message in ("INFO started", "WARN slow", "ERROR failed to connect", "DEBUG noise"):
+            self.local.append(self.group, "ecs/a", message, timestamp=1000)
+
+        # Act
+        errors = [e["message"] for e in self.follower(filter_pattern='"failed to"').poll()]
+        problems = [e["message"] for e in self.follower(filter_pattern="?ERROR ?WARN").poll()]
+
+        # Assert
+        self.assertEqual(errors, ["ERROR failed to connect"])
+        self.assertEqual(problems, ["WARN slow", "ERROR failed to connect"])
+
+    def test_missing_log_group_is_empty(self):
+        self.assertEqual(list(self.follower().poll()), [])
+
+    def test_poll_interval_adapts(self):
+        # Arrange
+        follower = self.follower(min_interval=1, max_interval=8)
+        stop = threading.Event()
+        stop.wait = lambda timeout: intervals.append(timeout) or len(intervals) >= 5 and stop.set()
+        intervals = []
+        self.local.append(self.group, "ecs/a", "hello", timestamp=1000)
+
+        # Act
+        list(follower.follow(stop))
+
+        # Assert
+        self.assertEqual(intervals, [1, 2, 4, 8, 8])
+
+    def test_follow_many_reads_environments_concurrently(self):
+        # Arrange
+        prod = log_group_name("prod")
+        self.local.append(self.group, "ecs/a", "dev event", timestamp=1000)
+        self.local.append(prod, "ecs/a", "prod event", timestamp=1000)
+        followers = {
+            "dev": self.follower(),
+            "prod": LogFollower(self.logs_utils, prod, start_time=0),
+        }
+
+        # Act
+        events = sorted((label, e["message"]) for label, e in follow_many(followers, follow=False, max_queued=1))
+
+        # Assert
+        self.assertEqual(events, [("dev", "dev event"), ("prod", "prod event")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+import datetime
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from src.deployment.multi_account import AccountTarget, AssumedRoleSessionPool, MultiAccountDeployer
+
+
+def assume_role_response():
+    expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    return {
+        "Credentials": {
+            "AccessKeyId": "AKIAEXAMPLE",
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": expiration,
+        }
+    }
+
+
+class TestAccountTarget(unittest.TestCase):
+
+    def test_parse(self):
+        target = AccountTarget.parse("123456789012:MidServerDeployer", "dev")
+
+        self.assertEqual(target.role_arn, "arn:aws:iam::123456789012:role/MidServerDeployer")
+        self.assertEqual(target.environment, "dev")
+
+    def test_parse_rejects_invalid_spec(self):
+        for spec in ("123456789012", "1234:Role", "123456789012:"):
+            with self.assertRaises(ValueError):
+                AccountTarget.parse(spec, "dev")
+
+
+class TestAssumedRoleSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.base = MagicMock()
+        self.sts = self.base.client.return_value
+        self.sts.assume_role.return_value = assume_role_response()
+        self.base.session.region_name = "us-east-1"
+        self.pool = AssumedRoleSessionPool(self.base)
+
+    def test_assumes_each_role_once(self):
+        # Act
+        targets = [
+            AccountTarget("111111111111", "Deployer", "dev"),
+            AccountTarget("111111111111", "Deployer", "prod"),
+            AccountTarget("222222222222", "Deployer", "dev"),
+        ]
+        self.pool.warm(targets)
+        first = self.pool.provider("111111111111", "Deployer")
+        second = self.pool.provider("111111111111", "Deployer")
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertEqual(self.sts.assume_role.call_count, 2)
+        role_arns = {c.kwargs["RoleArn"] for c in self.sts.assume_role.call_args_list}
+        self.assertEqual(
+            role_arns,
+            {"arn:aws:iam::111111111111:role/Deployer", "arn:aws:iam::222222222222:role/Deployer"},
+        )
+
+    def test_provider_uses_assumed_credentials(self):
+        # Act
+        provider = self.pool.provider("111111111111", "Deployer")
+        credentials = provider.session.get_credentials().get_frozen_credentials()
+
+        # Assert
+        self.assertEqual(credentials.access_key, "AKIAEXAMPLE")
+        self.assertEqual(credentials.token, "token")
+        self.assertEqual(provider.session.region_name, "us-east-1")
+        self.assertIsNotNone(provider.expiry())
+
+
+class TestMultiAccountDeployer(unittest.TestCase):
+
+    def test_caps_concurrent_deploys_per_account(self):
+        # Arrange
+        lock = threading.Lock()
+        running = {}
+        peak = {}
+
+        class FakeDeployer:
+            def __init__(self, profile_name, environment, credentials, **kwargs):
+                self.account = credentials
+
+            def deploy(self):
+                with lock:
+                    running[self.account] = running.get(self.account, 0) + 1
+                    peak[self.account] = max(peak.get(self.account, 0), running[self.account])
+                time.sleep(0.02)
+                with lock:
+                    running[self.account] -= 1
+
+        pool = MagicMock()
+        pool.provider.side_effect = lambda account_id, role_name, region: account_id
+        pool.warm.return_value = {}
+        targets = [AccountTarget("111111111111", "Deployer", env) for env in ("dev", "staging", "prod")]
+        targets.append(AccountTarget("222222222222", "Deployer", "dev"))
+
+        # Act
+        results = MultiAccountDeployer(
+            targets, max_workers=4, per_account_concurrency=1, session_pool=pool, deployer_factory=FakeDeployer
+        ).deploy_all()
+
+        # Assert
+        self.assertTrue(all(r.succeeded for r in results))
+        self.assertEqual(peak, {"111111111111": 1, "222222222222": 1})
+        pool.warm.assert_called_once_with(targets, 4)
+
+    def test_capped_account_does_not_hold_workers(self):
+        # Arrange
+        lock = threading.Lock()
+        started = []
+
+        class FakeDeployer:
+            def __init__(self, profile_name, environment, credentials, **kwargs):
+                self.account = credentials
+
+            def deploy(self):
+                with lock:
+                    started.append(self.account)
+                time.sleep(0.05)
+
+        pool = MagicMock()
+        pool.provider.side_effect = lambda account_id, role_name, region: account_id
+        pool.warm.return_value = {}
+        targets = [AccountTarget("111111111111", "Deployer", env) for env in ("dev", "staging", "prod", "test")]
+        targets += [AccountTarget("222222222222", "Deployer", "dev"), AccountTarget("333333333333", "Deployer", "dev")]
+
+        # Act
+        results = MultiAccountDeployer(
+            targets, max_workers=4, per_account_concurrency=2, session_pool=pool, deployer_factory=FakeDeployer
+        ).deploy_all()
+
+        # Assert
+        self.assertEqual([r.target for r in results], targets)
+        self.assertEqual(sorted(started[:4]), ["111111111111"] * 2 + ["222222222222", "333333333333"])
+
+    def test_role_that_cannot_be_assumed_fails_only_its_account(self):
+        # Arrange
+        base = MagicMock()
+        base.session.region_name = "us-east-1"
+
+        def assume_role(RoleArn, **kwargs):
+            if RoleArn == "arn:aws:iam::222222222222:role/Deployer":
+                raise ClientError({"Error": {"Code": "AccessDenied", "Message": "not allowed"}}, "AssumeRole")
+            return assume_role_response()
+
+        base.client.return_value.assume_role.side_effect = assume_role
+        deployed = []
+
+        class FakeDeployer:
+            def __init__(self, profile_name, environment, credentials, **kwargs):
+                self.account = credentials.profile_name.split(":")[0]
+
+            def deploy(self):
+                deployed.append(self.account)
+
+        accounts = ("111111111111", "222222222222", "333333333333")
+        targets = [AccountTarget(account, "Deployer", "dev") for account in accounts]
+
+        # Act
+        results = MultiAccountDeployer(
+            targets, session_pool=AssumedRoleSessionPool(base), deployer_factory=FakeDeployer
+        ).deploy_all()
+
+        # Assert
+        self.assertEqual([r.succeeded for r in results], [True, False, True])
+        self.assertIn("AccessDenied", results[1].error)
+        self.assertEqual(sorted(deployed), ["111111111111", "333333333333"])
+
+    def test_failure_in_one_account_does_not_stop_others(self):
+        # Arrange
+        class FakeDeployer:
+            def __init__(self, profile_name, environment, credentials, **kwargs):
+                self.account = credentials
+
+            def deploy(self):
+                if self.account == "111111111111":
+                    raise RuntimeError("boom")
+
+        pool = MagicMock()
+        pool.provider.side_effect = lambda account_id, role_name, region: account_id
+        pool.warm.return_value = {}
+        targets = [AccountTarget("111111111111", "Deployer", "dev"), AccountTarget("222222222222", "Deployer", "dev")]
+
+        # Act
+        results = MultiAccountDeployer(targets, session_pool=pool, deployer_factory=FakeDeployer).deploy_all()
+
+        # Assert
+        self.assertEqual([r.succeeded for r in results], [False, True])
+        self.assertEqual(results[0].error, "boom")
+
+
+if __name__ == "__main__":
+    unittest.main()
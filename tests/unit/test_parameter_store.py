@@ -0,0 +1,171 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from src.aws_utils.ratelimit import TokenBucket
+from src.deployment.parameter_store import ParameterSync, load_env_file, load_yaml_file, value_hash
+
+SCOPE = "123456789012/us-east-1"
+KEY = b"0123456789abcdef"
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_paces_calls_after_burst(self):
+        # Arrange
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+
+        # Act
+        waits = [bucket.acquire() for _ in range(4)]
+
+        # Assert
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(sum(sleeps), 1.0)
+        self.assertAlmostEqual(now[0], 1.0)
+
+
+class TestParameterSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.tmp.name, "parameters.json")
+        self.ssm_utils = MagicMock()
+        self.ssm_utils.cache_scope = SCOPE
+        self.ssm_utils.put_parameter.return_value = {"Version": 2}
+        with open(f"{self.state_file}.key", "wb") as f:
+            f.write(KEY)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self):
+        return ParameterSync(self.ssm_utils, state_file=self.state_file, rate=100)
+
+    def write_state(self, state, scope=SCOPE):
+        with open(self.state_file, "w") as f:
+            json.dump({scope: state}, f)
+
+    def test_plan_uses_hashes_for_known_versions(self):
+        # Arrange
+        url = "/midserver/dev/MID_INSTANCE_URL"
+        name = "/midserver/dev/MID_SERVER_NAME"
+        self.write_state({
+            url: {"version": 3, "hash": value_hash(KEY, url, "https://dev.service-now.com")},
+            name: {"version": 1, "hash": value_hash(KEY, name, "mid-old")},
+        })
+        self.ssm_utils.describe_parameters.return_value = [
+            {"Name": url, "Type": "SecureString", "Version": 3},
+            {"Name": name, "Type": "SecureString", "Version": 1},
+        ]
+
+        # Act
+        changes = self.sync().plan("dev", {
+            "MID_INSTANCE_URL": "https://dev.service-now.com",
+            "MID_SERVER_NAME": "mid-dev",
+            "MID_INSTANCE_USERNAME": "admin",
+        })
+
+        # Assert
+        self.assertEqual([c.action for c in changes], ["unchanged", "update", "create"])
+        self.ssm_utils.describe_parameters.assert_called_once_with("/midserver/dev/", recursive=False)
+        self.ssm_utils.get_parameters.assert_not_called()
+
+    def test_plan_decrypts_only_unknown_versions(self):
+        # Arrange
+        url = "/midserver/dev/MID_INSTANCE_URL"
+        name = "/midserver/dev/MID_SERVER_NAME"
+        self.write_state({url: {"version": 2, "hash": value_hash(KEY, url, "https://dev.service-now.com")}})
+        self.ssm_utils.describe_parameters.return_value = [
+            {"Name": url, "Type": "SecureString", "Version": 3},
+            {"Name": name, "Type": "SecureString", "Version": 1},
+        ]
+        self.ssm_utils.get_parameters.return_value = {url: "https://other.service-now.com", name: "mid-dev"}
+
+        # Act
+        changes = self.sync().plan("dev", {"MID_INSTANCE_URL": "https://dev.service-now.com", "MID_SERVER_NAME": "mid-dev"})
+
+        # Assert
+        self.assertEqual([c.action for c in changes], ["update", "unchanged"])
+        self.ssm_utils.get_parameters.assert_called_once_with([url, name], with_decryption=True)
+
+    def test_sync_writes_only_changes_and_records_state(self):
+        # Arrange
+        self.ssm_utils.describe_parameters.return_value = []
+
+        # Act
+        sync = self.sync()
+        sync.sync({"dev": {"MID_SERVER_NAME": "mid-dev"}, "prod": {"MID_SERVER_NAME": "mid-prod"}})
+
+        # Assert
+        self.assertEqual(self.ssm_utils.put_parameter.call_count, 2)
+        self.ssm_utils.put_parameter.assert_any_call(
+            "/midserver/prod/MID_SERVER_NAME",
+            "mid-prod",
+            "MID server MID_SERVER_NAME for prod",
+            param_type="SecureString",
+            overwrite=False,
+        )
+        with open(self.state_file) as f:
+            state = json.load(f)
+        self.assertEqual(state[SCOPE]["/midserver/dev/MID_SERVER_NAME"]["version"], 2)
+
+    def test_state_of_another_account_is_not_trusted(self):
+        # Arrange: the same name and version were synced to another account.
+        url = "/midserver/dev/MID_INSTANCE_URL"
+        self.write_state(
+            {url: {"version": 3, "hash": value_hash(KEY, url, "https://dev.service-now.com")}},
+            scope="210987654321/us-east-1",
+        )
+        self.ssm_utils.describe_parameters.return_value = [{"Name": url, "Type": "SecureString", "Version": 3}]
+        self.ssm_utils.get_parameters.return_value = {url: "https://other.service-now.com"}
+
+        # Act
+        changes = self.sync().plan("dev", {"MID_INSTANCE_URL": "https://dev.service-now.com"})
+
+        # Assert
+        self.assertEqual([c.action for c in changes], ["update"])
+        self.ssm_utils.get_parameters.assert_called_once_with([url], with_decryption=True)
+
+    def test_hashes_are_keyed_with_a_local_secret(self):
+        # Arrange
+        os.remove(f"{self.state_file}.key")
+        self.ssm_utils.describe_parameters.return_value = []
+
+        # Act
+        self.sync().sync({"dev": {"MID_INSTANCE_PASSWORD": "hunter2"}})
+
+        # Assert
+        with open(f"{self.state_file}.key", "rb") as f:
+            key = f.read()
+        with open(self.state_file) as f:
+            entry = json.load(f)[SCOPE]["/midserver/dev/MID_INSTANCE_PASSWORD"]
+        self.assertEqual(entry["hash"], value_hash(key, "/midserver/dev/MID_INSTANCE_PASSWORD", "hunter2"))
+        self.assertEqual(os.stat(f"{self.state_file}.key").st_mode & 0o777, 0o600)
+
+    def test_load_files(self):
+        # Arrange
+        env_file = os.path.join(self.tmp.name, "dev.env")
+        yaml_file = os.path.join(self.tmp.name, "params.yaml")
+        with open(env_file, "w") as f:
+            f.write("MID_SERVER_NAME=mid-dev\nMID_PROXY_HOST=\n")
+        with open(yaml_file, "w") as f:
+            f.write("dev:\n  MID_SERVER_NAME: mid-dev\nprod:\n  MID_PROXY_PORT: 3128\n")
+
+        # Act / Assert
+        self.assertEqual(load_env_file(env_file), {"MID_SERVER_NAME": "mid-dev"})
+        self.assertEqual(
+            load_yaml_file(yaml_file),
+            {"dev": {"MID_SERVER_NAME": "mid-dev"}, "prod": {"MID_PROXY_PORT": "3128"}},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+from unittest.mock import MagicMock
+from src.aws_utils.latency import LatencyRecorder
+from src.aws_utils.parameter_cache import ParameterCache
+from src.deployment.capacity import CapacityStrategy
+from src.deployment.mid_server import MIDServerDeployer
+from src.deployment.plan import ENVIRONMENT_PARAMETERS, DeploymentPlanner
+from src.deployment.strategies import RollingStrategy
+from src.deployment.terraform import TerraformOutputs
+
+
+def make_deployer():
+    deployer = MagicMock()
+    deployer.environment = "test"
+    deployer.strategy = RollingStrategy()
+    deployer.capacity = None
+    deployer.terraform = TerraformOutputs()
+    deployer.ssm_utils.cache = None
+    deployer.has_capacity_providers.side_effect = lambda cluster: MIDServerDeployer.has_capacity_providers(
+        deployer, cluster
+    )
+    deployer.resource_name.side_effect = lambda suffix: f"midserver-test-{suffix}"
+    deployer.TASK_ROLE_POLICY_ARN = MIDServerDeployer.TASK_ROLE_POLICY_ARN
+    deployer.EXECUTION_ROLE_POLICY_ARN = MIDServerDeployer.EXECUTION_ROLE_POLICY_ARN
+    deployer.ec2_utils.describe_vpc_records.return_value = ["vpc-12345678"]
+    deployer.ec2_utils.describe_subnet_records.return_value = ["subnet-12345678"]
+    return deployer
+
+
+class TestDeploymentPlanner(unittest.TestCase):
+
+    def test_plan_for_new_environment(self):
+        # Arrange
+        deployer = make_deployer()
+        deployer.ec2_utils.describe_security_groups.return_value = []
+        deployer.iam_utils.get_role.return_value = None
+        deployer.ecs_utils.describe_clusters.return_value = []
+        deployer.ecs_utils.describe_task_definition.return_value = None
+        deployer.ecs_utils.describe_services.return_value = {"services": []}
+
+        # Act
+        plan = DeploymentPlanner(deployer).plan()
+
+        # Assert
+        self.assertEqual(
+            [(a.resource, a.action) for a in plan.actions],
+            [
+                ("network", "no-op"),
+                ("security-group", "create"),
+                ("iam-role", "create"),
+                ("iam-policy-attachment", "create"),
+                ("iam-role", "create"),
+                ("iam-policy-attachment", "create"),
+                ("ecs-cluster", "create"),
+                ("task-definition", "create"),
+                ("ecs-service", "create"),
+            ],
+        )
+        self.assertEqual(len(plan.api_calls), 21)
+        self.assertFalse(plan.has_errors)
+        deployer.ec2_utils.create_security_group.assert_not_called()
+        deployer.iam_utils.create_role.assert_not_called()
+
+    def test_plan_for_existing_environment(self):
+        # Arrange
+        deployer = make_deployer()
+        deployer.ec2_utils.describe_security_groups.return_value = [{"GroupId": "sg-1"}]
+        deployer.iam_utils.get_role.return_value = {"Role": {"Arn": "arn"}}
+        deployer.iam_utils.list_attached_role_policies.return_value = [
+            MIDServerDeployer.TASK_ROLE_POLICY_ARN,
+            MIDServerDeployer.EXECUTION_ROLE_POLICY_ARN,
+        ]
+        deployer.ecs_utils.describe_clusters.return_value = [{"status": "ACTIVE"}]
+        deployer.ecs_utils.describe_task_definition.return_value = {"revision": 3}
+        deployer.ecs_utils.describe_services.return_value = {
+            "services": [{"status": "ACTIVE"}]
+        }
+
+        # Act
+        plan = DeploymentPlanner(deployer).plan()
+
+        # Assert
+        actions = {(a.resource, a.action) for a in plan.actions}
+        self.assertIn(("security-group", "no-op"), actions)
+        self.assertIn(("iam-policy-attachment", "no-op"), actions)
+        self.assertIn(("task-definition", "update"), actions)
+        self.assertIn(("ecs-service", "update"), actions)
+
+    def test_plan_uses_terraform_outputs(self):
+        # Arrange
+        deployer = make_deployer()
+        deployer.terraform = TerraformOutputs({
+            "vpc_id": "vpc-tf",
+            "subnet_ids": ["subnet-a", "subnet-b"],
+            "security_group_id": "sg-tf",
+        })
+
+        # Act
+        actions = DeploymentPlanner(deployer)._plan_network()
+        roles = DeploymentPlanner(deployer)._plan_role("midserver-test-task-role", "policy", "arn:task")
+
+        # Assert
+        self.assertEqual(
+            [(a.resource, a.name, a.action, a.api_calls) for a in actions + roles],
+            [
+                ("network", "vpc-tf", "no-op", []),
+                ("security-group", "sg-tf", "no-op", []),
+                ("iam-role", "arn:task", "no-op", []),
+            ],
+        )
+        deployer.ec2_utils.describe_vpc_records.assert_not_called()
+        deployer.ec2_utils.describe_security_groups.assert_not_called()
+        deployer.iam_utils.get_role.assert_not_called()
+
+    def test_plan_reads_parameters_through_cache(self):
+        # Arrange
+        deployer = make_deployer()
+        deployer.ssm_utils.cache = ParameterCache()
+        deployer.ssm_utils.cache_scope = "123456789012/us-east-1"
+        deployer.ssm_utils.cache.put("/midserver/test/MID_SERVER_NAME", 2, "mid-test", scope="123456789012/us-east-1")
+        deployer.ssm_utils.describe_parameters.return_value = [
+            {"Name": f"/midserver/test/{name}", "Version": 2} for name in ENVIRONMENT_PARAMETERS
+        ]
+        deployer.ecs_utils.describe_task_definition.return_value = None
+
+        # Act
+        actions = DeploymentPlanner(deployer)._plan_task_definition()
+
+        # Assert
+        self.assertEqual(
+            actions[0].api_calls,
+            ["ecr:describe_images", "ssm:describe_parameters", "ssm:get_parameters", "ecs:register_task_definition"],
+        )
+        deployer.ssm_utils.get_parameters.assert_not_called()
+
+    def test_plan_adds_capacity_providers_to_existing_cluster(self):
+        # Arrange
+        deployer = make_deployer()
+        deployer.capacity = CapacityStrategy()
+        deployer.ecs_utils.describe_clusters.return_value = [{"status": "ACTIVE", "capacityProviders": []}]
+
+        # Act
+        actions = DeploymentPlanner(deployer)._plan_cluster()
+
+        # Assert
+        self.assertEqual(
+            [(a.action, a.api_calls) for a in actions],
+            [("update", ["ecs:create_cluster", "ecs:put_cluster_capacity_providers"])],
+        )
+
+    def test_estimate_uses_recorded_latencies(self):
+        # Arrange
+        deployer = make_deployer()
+        deployer.ec2_utils.describe_vpc_records.return_value = []
+        deployer.iam_utils.get_role.return_value = None
+        deployer.ecs_utils.describe_clusters.return_value = []
+        deployer.ecs_utils.describe_task_definition.return_value = None
+        deployer.ecs_utils.describe_services.return_value = {"services": []}
+        latencies = LatencyRecorder()
+        latencies.record("ec2", "describe_vpcs", 2.0)
+
+        # Act
+        plan = DeploymentPlanner(deployer).plan()
+        plan.actions = plan.actions[:1]
+
+        # Assert
+        self.assertTrue(plan.has_errors)
+        self.assertEqual(plan.estimate_seconds(latencies), 2.0)
+        self.assertIn("Predicted API calls: 1", plan.render(latencies))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import pstats
+import tempfile
+import time
+import unittest
+from src.aws_utils.profiling import Profiler, phase_timings
+from src.aws_utils.tracing import Span, Tracer
+
+
+def span(name, start, end, cpu=0.0, parent=None, **attributes):
+    result = Span(name, "trace", parent.span_id if parent else None, attributes)
+    result.start_ns, result.end_ns, result.cpu_ns = int(start * 1e9), int(end * 1e9), int(cpu * 1e9)
+    return result
+
+
+class TestPhaseTimings(unittest.TestCase):
+
+    def test_steps_under_root_are_phases(self):
+        # Arrange: the first step creates the session, then makes two calls
+        root = span("deploy", 0, 10, cpu=2)
+        network = span("_setup_network", 0, 4, cpu=1, parent=root)
+        spans = [
+            root,
+            network,
+            span("session_setup", 0, 1, cpu=0.5, parent=network),
+            span("ec2.describe_vpcs", 1, 2, cpu=0.1, parent=network, **{"aws.service": "ec2"}),
+            span("ec2.describe_subnets", 2, 3, cpu=0.1, parent=network, **{"aws.service": "ec2"}),
+            span("_setup_ecs_service", 4, 10, cpu=0.5, parent=root),
+        ]
+
+        # Act
+        phases = {phase.name: phase for phase in phase_timings(spans)}
+
+        # Assert
+        self.assertEqual(list(phases), ["session setup", "_setup_network", "_setup_ecs_service"])
+        self.assertEqual((phases["session setup"].wall, phases["session setup"].cpu), (1.0, 0.5))
+        step = phases["_setup_network"]
+        self.assertEqual((step.wall, step.cpu, step.calls), (3.0, 0.5, 2))
+        self.assertAlmostEqual(step.network, 1.8)
+        self.assertAlmostEqual(step.other, 0.7)
+        self.assertEqual(phases["_setup_ecs_service"].other, 5.5)
+
+    def test_root_spans_without_steps_are_phases(self):
+        # Arrange
+        find = span("find_previous_task_definition", 0, 1)
+        spans = [find, span("ecs.describe_services", 0, 1, parent=find, **{"aws.service": "ecs"})]
+
+        # Act
+        phases = phase_timings(spans)
+
+        # Assert
+        self.assertEqual([(p.name, p.network, p.calls) for p in phases], [("find_previous_task_definition", 1.0, 1)])
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_writes_profile_files(self):
+        # Arrange
+        tracer = Tracer(enabled=False)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        profiler = Profiler(tmp.name, "deploy-dev", interval=0.001, started=time.perf_counter(), tracer=tracer)
+
+        # Act
+        with profiler:
+            with tracer.span("_setup_ecs_cluster"):
+                time.sleep(0.05)
+        paths = profiler.write()
+
+        # Assert
+        self.assertEqual(
+            [os.path.basename(p) for p in paths],
+            ["deploy-dev.pstats", "deploy-dev.collapsed", "deploy-dev.phases.txt", "deploy-dev.phases.json"],
+        )
+        self.assertTrue(pstats.Stats(paths[0]).total_calls)
+        self.assertTrue(profiler.collapsed().startswith("MainThread;"))
+        self.assertIn(f";{__name__}:TestProfiler.test_writes_profile_files ", profiler.collapsed())
+        with open(paths[3]) as f:
+            phases = [phase["name"] for phase in json.load(f)["phases"]]
+        self.assertEqual(phases[:2], ["import", "_setup_ecs_cluster"])
+        self.assertIn("_setup_ecs_cluster", profiler.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch
+from src.aws_utils import AWSUtils
+from src.aws_utils.ec2 import EC2Utils
+from src.aws_utils.ecs import ECSUtils
+from src.aws_utils.iam import IAMUtils
+from src.aws_utils.projection import Projection
+
+
+class PagedBackend:
+    """aws_cmd backend serving items in pages of two, EC2 (NextToken) or IAM (Marker) style."""
+
+    def __init__(self, items, result_key, token="NextToken", truncated_key=None):
+        self.items = items
+        self.result_key = result_key
+        self.token = token
+        self.truncated_key = truncated_key
+        self.calls = []
+
+    def call(self, service, operation, params, invoke):
+        self.calls.append(dict(params))
+        offset = int(params.get(self.token, 0))
+        page = {self.result_key: self.items[offset:offset + 2]}
+        more = offset + 2 < len(self.items)
+        if more:
+            page[self.token] = str(offset + 2)
+        if self.truncated_key:
+            page[self.truncated_key] = more
+        return page
+
+
+class TestProjection(unittest.TestCase):
+
+    def setUp(self):
+        self.subnet = {
+            "SubnetId": "subnet-1",
+            "CidrBlock": "10.0.0.0/24",
+            "Tags": [{"Key": "Name", "Value": "private-a"}],
+            "Ipv6CidrBlockAssociationSet": [],
+            "PrivateDnsNameOptionsOnLaunch": {"HostnameType": "ip-name"},
+        }
+
+    def test_field_list_builds_slotted_records(self):
+        # Act
+        record = Projection(["SubnetId", "cidr=CidrBlock", "PrivateDnsNameOptionsOnLaunch.HostnameType"])(self.subnet)
+
+        # Assert
+        self.assertEqual(record.SubnetId, "subnet-1")
+        self.assertEqual(record["cidr"], "10.0.0.0/24")
+        self.assertEqual(record.get("HostnameType"), "ip-name")
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(record._asdict(), {"SubnetId": "subnet-1", "cidr": "10.0.0.0/24", "HostnameType": "ip-name"})
+
+    def test_jmespath_expression(self):
+        # Act
+        scalar = Projection("SubnetId")(self.subnet)
+        record = Projection("{id: SubnetId, name: Tags[?Key=='Name'] | [0].Value}")(self.subnet)
+
+        # Assert
+        self.assertEqual(scalar, "subnet-1")
+        self.assertEqual((record.id, record.name), ("subnet-1", "private-a"))
+        self.assertIs(type(record), type(Projection("{id: SubnetId, name: CidrBlock}")(self.subnet)))
+
+    def test_invalid_field_name(self):
+        with self.assertRaises(ValueError):
+            Projection(["bad-name=SubnetId"])
+
+    def test_paginate_follows_next_token(self):
+        # Arrange
+        backend = PagedBackend([{"SubnetId": f"subnet-{i}", "CidrBlock": "x"} for i in range(5)], "Subnets")
+        ec2_utils = EC2Utils(backend=backend)
+
+        # Act
+        subnet_ids = ec2_utils.describe_subnet_records("vpc-1", projection="SubnetId")
+
+        # Assert
+        self.assertEqual(subnet_ids, [f"subnet-{i}" for i in range(5)])
+        self.assertEqual(len(backend.calls), 3)
+        self.assertEqual(backend.calls[-1]["NextToken"], "4")
+
+    def test_paginate_follows_iam_markers(self):
+        # Arrange
+        backend = PagedBackend(
+            [{"PolicyArn": f"arn:{i}", "PolicyName": f"p{i}"} for i in range(3)],
+            "AttachedPolicies", token="Marker", truncated_key="IsTruncated",
+        )
+        iam_utils = IAMUtils(backend=backend)
+
+        # Act
+        arns = iam_utils.list_attached_role_policies("role", projection="PolicyArn")
+
+        # Assert
+        self.assertEqual(arns, ["arn:0", "arn:1", "arn:2"])
+        self.assertEqual(backend.calls[0], {"RoleName": "role"})
+
+    def test_paginate_sets_page_size(self):
+        backend = PagedBackend([{"VpcId": "vpc-1"}], "Vpcs")
+
+        list(AWSUtils(backend=backend).paginate("ec2", "describe_vpcs", page_size=1000))
+
+        self.assertEqual(backend.calls, [{"MaxResults": 1000}])
+
+    @patch("src.aws_utils.ecs.AWSUtils.aws_cmd")
+    def test_describe_service_records_batches(self, mock_aws_cmd):
+        # Arrange
+        mock_aws_cmd.side_effect = lambda service, operation, cluster, services: {
+            "services": [{"serviceName": name, "events": ["..."] * 100} for name in services]
+        }
+
+        # Act
+        names = ECSUtils().describe_service_records(
+            "cluster", [f"svc-{i}" for i in range(25)], projection="serviceName"
+        )
+
+        # Assert
+        self.assertEqual(len(names), 25)
+        self.assertEqual(mock_aws_cmd.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
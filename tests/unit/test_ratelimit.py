@@ -0,0 +1,97 @@
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from src.aws_utils.ecs import ECSUtils
+from src.aws_utils.ratelimit import SharedRateLimiter, parse_rates
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.now = 1000.0
+
+    def limiter(self, deployment, weight=1.0, rate=10.0):
+        # Separate instances sharing a directory behave like separate processes.
+        return SharedRateLimiter(
+            deployment, weight=weight, rates={"ecs": rate}, directory=self.tmp.name, clock=lambda: self.now
+        )
+
+    def run_backlogged(self, limiters, seconds, step=0.01):
+        admitted = {limiter.deployment: 0 for limiter in limiters}
+        for _ in range(int(seconds / step)):
+            self.now += step
+            for limiter in limiters:
+                if not limiter.try_acquire("ecs"):
+                    admitted[limiter.deployment] += 1
+        return admitted
+
+    def test_shares_rate_by_weight(self):
+        # Act
+        admitted = self.run_backlogged([self.limiter("prod", weight=2), self.limiter("dev")], seconds=15, step=0.02)
+
+        # Assert: the rate is shared 2:1
+        self.assertAlmostEqual(sum(admitted.values()), 160, delta=5)  # burst of 10 + 10/s
+        self.assertAlmostEqual(admitted["prod"] / admitted["dev"], 2.0, delta=0.2)
+
+    def test_idle_deployment_gets_no_credit(self):
+        # Arrange: prod runs alone for a while
+        prod, dev = self.limiter("prod"), self.limiter("dev")
+        self.run_backlogged([prod], seconds=10)
+
+        # Act: dev joins
+        admitted = self.run_backlogged([prod, dev], seconds=10)
+
+        # Assert
+        self.assertAlmostEqual(admitted["prod"], admitted["dev"], delta=3)
+
+    def test_stale_waiter_is_dropped(self):
+        # Arrange: a deployment joins the queue ahead of dev and then dies
+        self.limiter("crashed").try_acquire("ecs")
+        dev = self.limiter("dev")
+        self.run_backlogged([self.limiter("drain")], seconds=1)
+
+        # Act
+        self.now += 5
+        delay = dev.try_acquire("ecs")
+
+        # Assert
+        self.assertEqual(delay, 0)
+
+    def test_unlisted_services_are_not_limited(self):
+        self.assertEqual(self.limiter("dev").acquire("sts"), 0)
+
+    def test_threads_share_the_bucket(self):
+        # Arrange
+        limiter = SharedRateLimiter("dev", rates={"ecs": 50}, directory=self.tmp.name, sleep=time.sleep)
+        backend = MagicMock()
+        backend.call.return_value = {"clusterArns": []}
+        ecs_utils = ECSUtils(backend=backend, rate_limiter=limiter)
+
+        # Act: 50 burst + 25 more calls need about half a second
+        start = time.monotonic()
+        threads = [threading.Thread(target=lambda: [ecs_utils.list_clusters() for _ in range(15)]) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(backend.call.call_count, 75)
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_parse_rates(self):
+        rates = parse_rates("ecs=5, iam=2.5")
+        self.assertEqual((rates["ecs"], rates["iam"], rates["ec2"]), (5.0, 2.5, 20.0))
+        with self.assertRaises(ValueError):
+            parse_rates("ecs")
+
+    def test_parse_rates_without_defaults(self):
+        self.assertEqual(parse_rates("ecs=20,iam=5", defaults={}), {"ecs": 20.0, "iam": 5.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
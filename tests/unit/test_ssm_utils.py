@@ -1,89 +1,201 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
+from src.aws_utils import parameter_cache
+from src.aws_utils.cassette import Cassette
+from src.aws_utils.parameter_cache import ParameterCache
 from src.aws_utils.ssm import SSMUtils
 
+# Calls are matched on their exact parameters, so a request that differs
+# from the cassette raises CassetteMiss.
+CASSETTES = os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "cassettes")
+PASSWORD = "/midserver/dev/MID_INSTANCE_PASSWORD"
+
 
 class TestSSMUtils(unittest.TestCase):
 
     def setUp(self):
-        self.ssm_utils = SSMUtils(profile_name="test_profile")
+        self.cassette = Cassette(os.path.join(CASSETTES, "ssm_utils.jsonl"))
+        self.ssm_utils = SSMUtils(credentials=MagicMock(), backend=self.cassette)
+
+    def test_put_parameter(self):
+        # Act
+        result = self.ssm_utils.put_parameter("/test/parameter", "test-value", "Test parameter", "SecureString")
+
+        # Assert
+        self.assertEqual(self.cassette.played, [("ssm", "put_parameter")])
+        self.assertEqual(result["Version"], 1)
+
+    def test_get_parameter(self):
+        # Act
+        result = self.ssm_utils.get_parameter("/test/parameter")
+
+        # Assert
+        self.assertEqual(self.cassette.played, [("ssm", "get_parameter")])
+        self.assertEqual(result, "test-value")
+
+    def test_delete_parameter(self):
+        # Act
+        self.ssm_utils.delete_parameter("/test/parameter")
+
+        # Assert
+        self.assertEqual(self.cassette.played, [("ssm", "delete_parameter")])
+
+    def test_get_parameters_by_path(self):
+        # Act
+        result = self.ssm_utils.get_parameters_by_path("/test/")
+
+        # Assert
+        self.assertEqual(self.cassette.played, [("ssm", "get_parameters_by_path")])
+        self.assertEqual([p["Value"] for p in result], ["value1", "value2"])
+
+    def test_describe_parameters_follows_pages(self):
+        # Act
+        result = self.ssm_utils.describe_parameters("/test/")
+
+        # Assert
+        self.assertEqual([p["Name"] for p in result], ["/test/param1", "/test/param2"])
+        self.assertEqual(self.cassette.played, [("ssm", "describe_parameters")] * 2)
+
+
+class TestSSMParameterCache(unittest.TestCase):
+
+    def setUp(self):
+        # The password is at version 3 in the first DescribeParameters response and 4 in the second.
+        self.cassette = Cassette(os.path.join(CASSETTES, "ssm_parameter_cache.jsonl"))
+        self.ssm_utils = SSMUtils(credentials=MagicMock(), backend=self.cassette, cache=ParameterCache())
+
+    def operations(self):
+        return [operation for _, operation in self.cassette.played]
 
-    @patch("src.aws_utils.ssm.AWSUtils.aws_cmd")
-    def test_put_parameter(self, mock_aws_cmd):
+    def test_reads_are_served_from_cache(self):
+        # Act
+        first = self.ssm_utils.get_parameter("/midserver/dev/MID_SERVER_NAME")
+        second = self.ssm_utils.get_parameter("/midserver/dev/MID_INSTANCE_PASSWORD")
+
+        # Assert
+        self.assertEqual(first, "/midserver/dev/MID_SERVER_NAME@1")
+        self.assertEqual(second, "/midserver/dev/MID_INSTANCE_PASSWORD@3")
+        self.assertEqual(self.operations(), ["describe_parameters", "get_parameters"])
+
+    def test_refresh_fetches_only_changed_versions(self):
         # Arrange
-        name = "/test/parameter"
-        value = "test-value"
-        description = "Test parameter"
-        param_type = "SecureString"
-        mock_response = {"Version": 1}
-        mock_aws_cmd.return_value = mock_response
+        self.ssm_utils.refresh_cache("/midserver/dev/")
+        self.cassette.played.clear()
 
         # Act
-        result = self.ssm_utils.put_parameter(name, value, description, param_type)
+        fetched = self.ssm_utils.refresh_cache("/midserver/dev/")
 
         # Assert
-        mock_aws_cmd.assert_called_once_with(
-            "ssm",
-            "put_parameter",
-            Name=name,
-            Value=value,
-            Description=description,
-            Type=param_type,
-            Overwrite=False,
+        self.assertEqual(fetched, 1)
+        self.assertEqual(
+            self.ssm_utils.get_parameter("/midserver/dev/MID_INSTANCE_PASSWORD"),
+            "/midserver/dev/MID_INSTANCE_PASSWORD@4",
         )
-        self.assertEqual(result, mock_response)
+        self.assertEqual(self.operations(), ["describe_parameters", "get_parameters"])
+
+    def test_accounts_sharing_a_cache_read_their_own_values(self):
+        # Arrange: both accounts have the password at version 1.
+        class FakeSSM:
+            def __init__(self, account):
+                self.account = account
+
+            def call(self, service, operation, params, invoke):
+                return getattr(self, operation)(**params)
+
+            def describe_parameters(self, **kwargs):
+                return {"Parameters": [{"Name": PASSWORD, "Type": "SecureString", "Version": 1}]}
+
+            def get_parameters(self, Names, WithDecryption):
+                return {"Parameters": [{"Name": PASSWORD, "Value": f"{self.account}-password", "Version": 1}]}
+
+        def ssm_utils(account):
+            credentials = MagicMock()
+            credentials.identity.return_value = {"Account": account}
+            credentials.session.region_name = "us-east-1"
+            return SSMUtils(credentials=credentials, backend=FakeSSM(account), cache=cache)
+
+        cache = ParameterCache()
+        ssm_utils("111111111111").get_parameter(PASSWORD)
+
+        # Act
+        value = ssm_utils("222222222222").get_parameter(PASSWORD)
+
+        # Assert
+        self.assertEqual(value, "222222222222-password")
+        self.assertEqual(cache.get(PASSWORD, scope="111111111111/us-east-1"), "111111111111-password")
+
 
-    @patch("src.aws_utils.ssm.AWSUtils.aws_cmd")
-    def test_get_parameter(self, mock_aws_cmd):
+class TestParameterCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "cache.json")
+
+    def test_persists_plain_values(self):
         # Arrange
-        name = "/test/parameter"
-        mock_response = {"Parameter": {"Value": "test-value"}}
-        mock_aws_cmd.return_value = mock_response
+        cache = ParameterCache(self.path)
+        cache.put("/midserver/dev/MID_SERVER_NAME", 2, "mid-dev")
+        cache.save()
 
         # Act
-        result = self.ssm_utils.get_parameter(name)
+        loaded = ParameterCache(self.path)
 
         # Assert
-        mock_aws_cmd.assert_called_once_with(
-            "ssm", "get_parameter", Name=name, WithDecryption=True
-        )
-        self.assertEqual(result, "test-value")
+        self.assertEqual(loaded.get("/midserver/dev/MID_SERVER_NAME", version=2), "mid-dev")
+        self.assertIsNone(loaded.get("/midserver/dev/MID_SERVER_NAME", version=3))
 
-    @patch("src.aws_utils.ssm.AWSUtils.aws_cmd")
-    def test_delete_parameter(self, mock_aws_cmd):
+    def test_secure_values_never_written_in_clear(self):
         # Arrange
-        name = "/test/parameter"
+        cache = ParameterCache(self.path)
+        cache.put("/midserver/dev/MID_INSTANCE_PASSWORD", 1, "hunter2", secure=True)
 
         # Act
-        self.ssm_utils.delete_parameter(name)
+        cache.save()
+        loaded = ParameterCache(self.path)
 
         # Assert
-        mock_aws_cmd.assert_called_once_with("ssm", "delete_parameter", Name=name)
+        with open(self.path) as f:
+            self.assertNotIn("hunter2", f.read())
+        expected = "hunter2" if parameter_cache.Fernet is not None else None
+        self.assertEqual(loaded.get("/midserver/dev/MID_INSTANCE_PASSWORD"), expected)
 
-    @patch("src.aws_utils.ssm.AWSUtils.aws_cmd")
-    def test_get_parameters_by_path(self, mock_aws_cmd):
+    def test_truncated_file_is_an_empty_cache(self):
         # Arrange
-        path = "/test/"
-        mock_response = {
-            "Parameters": [
-                {"Name": "/test/param1", "Value": "value1"},
-                {"Name": "/test/param2", "Value": "value2"},
-            ]
-        }
-        mock_aws_cmd.return_value = mock_response
+        with open(self.path, "w") as f:
+            f.write('{"/midserver/dev/MID_SERVER_NAME": {"vers')
 
         # Act
-        result = self.ssm_utils.get_parameters_by_path(path)
+        cache = ParameterCache(self.path)
+        cache.put("/midserver/dev/MID_SERVER_NAME", 1, "mid-dev")
+        cache.save()
 
         # Assert
-        mock_aws_cmd.assert_called_once_with(
-            "ssm",
-            "get_parameters_by_path",
-            Path=path,
-            Recursive=True,
-            WithDecryption=True,
-        )
-        self.assertEqual(result, mock_response["Parameters"])
+        self.assertEqual(ParameterCache(self.path).get("/midserver/dev/MID_SERVER_NAME"), "mid-dev")
+        self.assertEqual(os.listdir(self.tmp.name), ["cache.json"])
+
+    @unittest.skipIf(parameter_cache.Fernet is None, "cryptography is not installed")
+    def test_key_file_created_by_another_process_is_used(self):
+        # Arrange
+        key = parameter_cache.Fernet.generate_key()
+        real_link = os.link
+
+        def lose_race(src, dst):
+            with open(dst, "wb") as f:
+                f.write(key)
+            real_link(src, dst)
+
+        # Act
+        with patch("src.aws_utils.parameter_cache.os.link", side_effect=lose_race):
+            cache = ParameterCache(self.path)
+        cache.put("/midserver/dev/MID_INSTANCE_PASSWORD", 1, "hunter2", secure=True)
+        cache.save()
+
+        # Assert
+        loaded = ParameterCache(self.path, key=key)
+        self.assertEqual(loaded.get("/midserver/dev/MID_INSTANCE_PASSWORD"), "hunter2")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from src.aws_utils.ecs import ECSUtils
+from src.deployment.status import FleetStatusCollector
+
+TASK_DEFINITION = "arn:aws:ecs:us-east-1:123456789012:task-definition/midserver-{env}-task:{revision}"
+
+
+class FakeECS:
+    """aws_cmd backend for a fleet of clusters with one service of many tasks each."""
+
+    def __init__(self, environments, tasks_per_service=3):
+        self.environments = environments
+        self.tasks_per_service = tasks_per_service
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def call(self, service, operation, params, invoke):
+        with self._lock:
+            self.calls.append((operation, params))
+        return getattr(self, operation)(**params)
+
+    def env(self, cluster):
+        env = cluster[len("midserver-"):-len("-cluster")]
+        if env not in self.environments:
+            raise ClientError({"Error": {"Code": "ClusterNotFoundException", "Message": "Cluster not found."}}, "ListServices")
+        return env
+
+    def list_clusters(self):
+        return {"clusterArns": [f"arn:aws:ecs:us-east-1:123456789012:cluster/midserver-{env}-cluster" for env in self.environments]
+                + ["arn:aws:ecs:us-east-1:123456789012:cluster/other"]}
+
+    def list_services(self, cluster, maxResults, nextToken=None):
+        env = self.env(cluster)
+        return {"serviceArns": [f"arn:aws:ecs:us-east-1:123456789012:service/{cluster}/midserver-{env}-service"]}
+
+    def list_tasks(self, cluster, desiredStatus, maxResults, nextToken=None):
+        self.env(cluster)
+        arns = [f"{cluster}/task-{i}" for i in range(self.tasks_per_service)]
+        offset = int(nextToken or 0)
+        page = {"taskArns": arns[offset:offset + maxResults]}
+        if offset + maxResults < len(arns):
+            page["nextToken"] = str(offset + maxResults)
+        return page
+
+    def describe_services(self, cluster, services):
+        env = self.env(cluster)
+        return {"services": [{
+            "serviceName": arn.rsplit("/", 1)[-1],
+            "status": "ACTIVE",
+            "desiredCount": self.tasks_per_service,
+            "runningCount": self.tasks_per_service,
+            "pendingCount": 0,
+            "taskDefinition": TASK_DEFINITION.format(env=env, revision=4),
+            "deployments": [{"status": "PRIMARY", "rolloutState": "IN_PROGRESS"}, {"status": "ACTIVE"}],
+        } for arn in services]}
+
+    def describe_tasks(self, cluster, tasks):
+        env = self.env(cluster)
+        return {"tasks": [{
+            "taskArn": arn,
+            "group": f"service:midserver-{env}-service",
+            "lastStatus": "RUNNING",
+            "healthStatus": "UNHEALTHY" if arn.endswith("-0") else "HEALTHY",
+            "taskDefinitionArn": TASK_DEFINITION.format(env=env, revision=3 if arn.endswith("-0") else 4),
+        } for arn in tasks]}
+
+
+class TestFleetStatus(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_file = os.path.join(self.tmp.name, "status.json")
+        self.now = 1000.0
+
+    def collector(self, backend, clusters=None, account="123456789012", **kwargs):
+        kwargs.setdefault("cache_file", self.cache_file)
+        credentials = MagicMock()
+        credentials.identity.return_value = {"Account": account}
+        credentials.session.region_name = "us-east-1"
+        return FleetStatusCollector(
+            ECSUtils(backend=backend, credentials=credentials), clusters=clusters, clock=lambda: self.now, **kwargs
+        )
+
+    def count(self, backend, operation):
+        return sum(1 for op, _ in backend.calls if op == operation)
+
+    def test_batches_describes_across_clusters(self):
+        # Arrange
+        backend = FakeECS([f"env{i}" for i in range(25)], tasks_per_service=250)
+
+        # Act
+        status = self.collector(backend).status()
+
+        # Assert
+        self.assertEqual(len(status.services), 25)
+        self.assertEqual(self.count(backend, "list_clusters"), 1)
+        self.assertEqual(self.count(backend, "describe_services"), 25)
+        self.assertEqual(self.count(backend, "describe_tasks"), 25 * 3)  # 100 + 100 + 50 per cluster
+        self.assertTrue(all(len(p["tasks"]) <= 100 for op, p in backend.calls if op == "describe_tasks"))
+        service = status.services[0]
+        self.assertEqual(service.cluster, "midserver-env0-cluster")
+        self.assertEqual(service.task_definition, "midserver-env0-task:4")
+        self.assertEqual(service.rollout_state, "IN_PROGRESS")
+        self.assertEqual(service.health, {"HEALTHY": 249, "UNHEALTHY": 1})
+        self.assertEqual(service.revisions, {"midserver-env0-task:3": 1, "midserver-env0-task:4": 249})
+        self.assertFalse(service.healthy)
+
+    def test_renders_table_and_json(self):
+        # Arrange
+        backend = FakeECS(["dev"])
+        status = self.collector(backend, ["midserver-dev-cluster", "midserver-gone-cluster"]).status()
+
+        # Act
+        table = status.render()
+        data = json.loads(status.to_json())
+
+        # Assert
+        self.assertIn("midserver-dev-service", table)
+        self.assertIn("3/3", table)
+        self.assertIn("1 on midserver-dev-task:3", table)
+        self.assertEqual(data["summary"], {"services": 1, "healthy": 0, "running_tasks": 3, "desired_tasks": 3})
+        self.assertEqual(data["errors"], {})
+
+    def test_reuses_recent_status(self):
+        # Arrange
+        backend = FakeECS(["dev"])
+        clusters = ["midserver-dev-cluster"]
+        self.collector(backend, clusters).status()
+        calls = len(backend.calls)
+
+        # Act: a second process within max_age reads the cache file
+        self.now += 5
+        cached = self.collector(backend, clusters).status()
+        self.now += 20
+        refreshed = self.collector(backend, clusters).status()
+
+        # Assert
+        self.assertEqual(cached.collected_at, 1000.0)
+        self.assertEqual(refreshed.collected_at, 1025.0)
+        self.assertEqual(len(backend.calls), calls * 2)
+
+    def test_cache_is_per_cluster_selection(self):
+        # Arrange
+        backend = FakeECS(["dev", "prod"])
+        self.collector(backend, ["midserver-dev-cluster"]).status()
+
+        # Act
+        status = self.collector(backend, ["midserver-prod-cluster"]).status()
+
+        # Assert
+        self.assertEqual([s.cluster for s in status.services], ["midserver-prod-cluster"])
+
+    def test_cache_is_per_account(self):
+        # Arrange: another account has a cluster of the same name.
+        clusters = ["midserver-dev-cluster"]
+        self.collector(FakeECS(["dev"]), clusters).status()
+        backend = FakeECS(["dev"], tasks_per_service=1)
+
+        # Act
+        status = self.collector(backend, clusters, account="210987654321").status()
+
+        # Assert
+        self.assertEqual(status.services[0].running, 1)
+        self.assertEqual(self.count(backend, "describe_services"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,313 @@
+import unittest
+from unittest.mock import MagicMock
+from src.aws_utils import cancellation
+from src.deployment.capacity import CapacityStrategy
+from src.deployment.strategies import (
+    BlueGreenStrategy,
+    DeploymentHealthError,
+    RollingStrategy,
+    get_strategy,
+)
+
+CLUSTER = "midserver-test-cluster"
+SERVICE = "midserver-test-service"
+OLD_TASK_DEFINITION = "arn:aws:ecs:us-east-1:123456789012:task-definition/test:1"
+NEW_TASK_DEFINITION = "arn:aws:ecs:us-east-1:123456789012:task-definition/test:2"
+
+
+def service_description(rollout_state, running_count=1, task_definition=NEW_TASK_DEFINITION, **extra):
+    service = {
+        "serviceName": SERVICE,
+        "status": "ACTIVE",
+        "taskDefinition": OLD_TASK_DEFINITION,
+        "deployments": [
+            {
+                "status": "PRIMARY",
+                "taskDefinition": task_definition,
+                "rolloutState": rollout_state,
+                "desiredCount": 1,
+                "runningCount": running_count,
+            }
+        ],
+    }
+    service.update(extra)
+    return {"services": [service]}
+
+
+class TestRollingStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.ecs_utils = MagicMock()
+        self.strategy = RollingStrategy(
+            max_percent=200, min_healthy_percent=100, poll_interval=0, sleep=lambda s: None
+        )
+
+    def test_create_service_with_deployment_configuration(self):
+        # Arrange
+        self.ecs_utils.describe_services.side_effect = [
+            {"services": []},
+            service_description("IN_PROGRESS", running_count=0),
+            service_description("COMPLETED"),
+        ]
+
+        # Act
+        self.strategy.deploy(
+            self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+        )
+
+        # Assert
+        self.ecs_utils.create_service.assert_called_once_with(
+            CLUSTER,
+            SERVICE,
+            NEW_TASK_DEFINITION,
+            1,
+            ["subnet-1"],
+            ["sg-1"],
+            deployment_configuration={
+                "maximumPercent": 200,
+                "minimumHealthyPercent": 100,
+                "deploymentCircuitBreaker": {"enable": True, "rollback": True},
+            },
+        )
+        self.assertEqual(self.ecs_utils.describe_services.call_count, 3)
+
+    def test_failed_health_gate_reverts_to_previous_task_definition(self):
+        # Arrange
+        self.ecs_utils.describe_services.side_effect = [
+            service_description("COMPLETED"),
+            service_description("FAILED", running_count=0),
+        ]
+
+        # Act / Assert
+        with self.assertRaises(DeploymentHealthError):
+            self.strategy.deploy(
+                self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+            )
+        self.assertEqual(self.ecs_utils.update_service.call_count, 2)
+        self.ecs_utils.update_service.assert_called_with(
+            CLUSTER, SERVICE, task_definition=OLD_TASK_DEFINITION
+        )
+
+    def test_circuit_breaker_rollback_fails_the_health_gate(self):
+        # Arrange: the new revision failed and ECS rolled back to the previous one.
+        rolled_back = service_description("COMPLETED", task_definition=OLD_TASK_DEFINITION)
+        rolled_back["services"][0]["deployments"].append({
+            "status": "INACTIVE",
+            "taskDefinition": NEW_TASK_DEFINITION,
+            "rolloutState": "FAILED",
+            "rolloutStateReason": "ECS deployment circuit breaker: tasks failed to start.",
+            "desiredCount": 1,
+            "runningCount": 0,
+        })
+        self.ecs_utils.describe_services.side_effect = [
+            service_description("COMPLETED", task_definition=OLD_TASK_DEFINITION),
+            rolled_back,
+        ]
+
+        # Act / Assert
+        with self.assertRaises(DeploymentHealthError) as ctx:
+            self.strategy.deploy(
+                self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+            )
+        self.assertIn("circuit breaker", str(ctx.exception))
+
+    def test_completed_rollback_deployment_is_not_healthy(self):
+        # Arrange: only the rollback deployment of the previous revision is left.
+        self.ecs_utils.describe_services.side_effect = [
+            service_description("COMPLETED", task_definition=OLD_TASK_DEFINITION),
+            service_description("COMPLETED", task_definition=OLD_TASK_DEFINITION),
+        ]
+
+        # Act / Assert
+        with self.assertRaises(DeploymentHealthError) as ctx:
+            self.strategy.deploy(
+                self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+            )
+        self.assertIn("rolled back", str(ctx.exception))
+
+    def test_invalid_surge_is_rejected(self):
+        with self.assertRaises(ValueError):
+            RollingStrategy(max_percent=50)
+
+
+    def test_moves_service_to_capacity_providers_once(self):
+        # Arrange
+        capacity = CapacityStrategy(base=1, spot_weight=3)
+        on_spot = service_description("COMPLETED", capacityProviderStrategy=[
+            {"capacityProvider": "FARGATE", "base": 1, "weight": 0},
+            {"capacityProvider": "FARGATE_SPOT", "base": 0, "weight": 3},
+        ])
+        self.ecs_utils.describe_services.side_effect = [
+            service_description("COMPLETED", launchType="FARGATE"),
+            service_description("COMPLETED"),
+            on_spot,
+            on_spot,
+        ]
+
+        # Act
+        for _ in range(2):
+            self.strategy.deploy(
+                self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"], 3, capacity
+            )
+
+        # Assert
+        first, second = self.ecs_utils.update_service.call_args_list
+        self.assertEqual(first.kwargs["capacity_provider_strategy"], capacity.to_api())
+        self.assertEqual(first.kwargs["desired_count"], 3)
+        self.assertNotIn("capacity_provider_strategy", second.kwargs)
+
+
+class TestBlueGreenStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.ecs_utils = MagicMock()
+        self.ecs_utils.describe_services.return_value = {
+            "services": [
+                {
+                    "serviceName": SERVICE,
+                    "status": "ACTIVE",
+                    "deploymentController": {"type": "EXTERNAL"},
+                }
+            ]
+        }
+        self.ecs_utils.create_task_set.return_value = {"id": "ecs-svc/green"}
+        self.strategy = BlueGreenStrategy(poll_interval=0, sleep=lambda s: None)
+
+    def test_promotes_green_task_set_once_stable(self):
+        # Arrange
+        self.ecs_utils.describe_task_sets.side_effect = [
+            [{"id": "ecs-svc/blue", "status": "PRIMARY"}],
+            [{"id": "ecs-svc/green", "stabilityStatus": "STABILIZING", "runningCount": 0}],
+            [
+                {
+                    "id": "ecs-svc/green",
+                    "stabilityStatus": "STEADY_STATE",
+                    "runningCount": 1,
+                    "computedDesiredCount": 1,
+                }
+            ],
+        ]
+
+        # Act
+        self.strategy.deploy(
+            self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+        )
+
+        # Assert
+        self.ecs_utils.update_service_primary_task_set.assert_called_once_with(
+            CLUSTER, SERVICE, "ecs-svc/green"
+        )
+        self.ecs_utils.delete_task_set.assert_called_once_with(
+            CLUSTER, SERVICE, "ecs-svc/blue", force=True
+        )
+
+    def test_unhealthy_green_task_set_is_removed(self):
+        # Arrange
+        self.strategy.health_timeout = 0
+        self.ecs_utils.describe_task_sets.side_effect = [
+            [{"id": "ecs-svc/blue", "status": "PRIMARY"}],
+            [{"id": "ecs-svc/green", "stabilityStatus": "STABILIZING", "runningCount": 0}],
+        ]
+
+        # Act / Assert
+        with self.assertRaises(DeploymentHealthError):
+            self.strategy.deploy(
+                self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+            )
+        self.ecs_utils.update_service_primary_task_set.assert_not_called()
+        self.ecs_utils.delete_task_set.assert_called_once_with(
+            CLUSTER, SERVICE, "ecs-svc/green", force=True
+        )
+
+    def test_cancelled_rollout_removes_green_task_set(self):
+        # Arrange
+        self.ecs_utils.describe_task_sets.side_effect = [
+            [{"id": "ecs-svc/blue", "status": "PRIMARY"}],
+            [{"id": "ecs-svc/green", "stabilityStatus": "STABILIZING", "runningCount": 0}],
+            [{"id": "ecs-svc/green", "stabilityStatus": "STABILIZING", "runningCount": 0}],
+        ]
+
+        # Act / Assert
+        with cancellation.scope() as scope:
+            self.strategy.sleep = lambda s: scope.cancel("interrupted")
+            with self.assertRaises(cancellation.Cancelled):
+                self.strategy.deploy(
+                    self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+                )
+        self.ecs_utils.update_service_primary_task_set.assert_not_called()
+        self.ecs_utils.delete_task_set.assert_called_once_with(
+            CLUSTER, SERVICE, "ecs-svc/green", force=True
+        )
+
+    def test_keeps_previous_task_set_as_warm_standby(self):
+        # Arrange: an expired standby from an earlier deploy, and a fresh one
+        self.strategy = BlueGreenStrategy(
+            standby_percent=50, soak_seconds=3600, poll_interval=0, sleep=lambda s: None, clock=lambda: 10000.0
+        )
+        self.ecs_utils.describe_task_sets.side_effect = [
+            [
+                {"id": "ecs-svc/blue", "status": "PRIMARY"},
+                {"id": "ecs-svc/old", "status": "ACTIVE", "updatedAt": 1000.0},
+                {"id": "ecs-svc/standby", "status": "ACTIVE", "updatedAt": 9000.0},
+            ],
+            [{"id": "ecs-svc/green", "stabilityStatus": "STEADY_STATE", "runningCount": 1, "computedDesiredCount": 1}],
+        ]
+
+        # Act
+        self.strategy.deploy(
+            self.ecs_utils, CLUSTER, SERVICE, NEW_TASK_DEFINITION, ["subnet-1"], ["sg-1"]
+        )
+
+        # Assert: blue becomes the standby and replaces the previous one
+        self.ecs_utils.update_task_set.assert_called_once_with(CLUSTER, SERVICE, "ecs-svc/blue", 50)
+        self.assertEqual(
+            [c.args[2] for c in self.ecs_utils.delete_task_set.call_args_list], ["ecs-svc/old", "ecs-svc/standby"]
+        )
+
+    def test_rollback_promotes_standby(self):
+        # Arrange
+        self.ecs_utils.describe_task_sets.side_effect = [
+            [
+                {"id": "ecs-svc/green", "status": "PRIMARY"},
+                {"id": "ecs-svc/blue", "status": "ACTIVE", "updatedAt": 9000.0},
+            ],
+            [{"id": "ecs-svc/blue", "stabilityStatus": "STEADY_STATE", "runningCount": 1, "computedDesiredCount": 1}],
+        ]
+
+        # Act
+        promoted = self.strategy.rollback(self.ecs_utils, CLUSTER, SERVICE)
+
+        # Assert
+        self.assertEqual(promoted, "ecs-svc/blue")
+        self.ecs_utils.update_task_set.assert_called_once_with(CLUSTER, SERVICE, "ecs-svc/blue", 100)
+        self.ecs_utils.update_service_primary_task_set.assert_called_once_with(CLUSTER, SERVICE, "ecs-svc/blue")
+        self.ecs_utils.delete_task_set.assert_called_once_with(CLUSTER, SERVICE, "ecs-svc/green", force=True)
+
+    def test_rollback_without_standby(self):
+        self.ecs_utils.describe_task_sets.return_value = [{"id": "ecs-svc/green", "status": "PRIMARY"}]
+
+        self.assertIsNone(self.strategy.rollback(self.ecs_utils, CLUSTER, SERVICE))
+        self.ecs_utils.update_service_primary_task_set.assert_not_called()
+
+    def test_retire_standby_after_soak(self):
+        # Arrange
+        strategy = BlueGreenStrategy(soak_seconds=600, clock=lambda: 10000.0)
+        self.ecs_utils.describe_task_sets.return_value = [
+            {"id": "ecs-svc/green", "status": "PRIMARY", "updatedAt": 1000.0},
+            {"id": "ecs-svc/blue", "status": "ACTIVE", "updatedAt": 9000.0},
+            {"id": "ecs-svc/fresh", "status": "ACTIVE", "updatedAt": 9500.0},
+        ]
+
+        # Act
+        retired = strategy.retire_standby(self.ecs_utils, CLUSTER, SERVICE)
+
+        # Assert
+        self.assertEqual(retired, ["ecs-svc/blue"])
+
+    def test_get_strategy_rejects_unknown_name(self):
+        with self.assertRaises(ValueError):
+            get_strategy("canary")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from src.deployment.teardown import EnvironmentTeardown
+
+ACCOUNT = "arn:aws:ecs:us-east-1:123456789012"
+
+
+def client_error(code, operation):
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class FakeAWS:
+    """aws_cmd backend holding one deployed environment."""
+
+    def __init__(self, environment="dev", revisions=3, drain_checks=2, busy_deletes=1):
+        prefix = f"midserver-{environment}"
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.calls = []
+        self.service = "ACTIVE"
+        self.drain_checks = drain_checks
+        self.busy_deletes = busy_deletes
+        self.cluster = True
+        self.group = True
+        self.task_definitions = {
+            f"{ACCOUNT}:task-definition/{prefix}-task:{n}": "ACTIVE" for n in range(1, revisions + 1)
+        }
+        self.roles = {
+            f"{prefix}-task-role": ["arn:aws:iam::aws:policy/AmazonSSMReadOnlyAccess"],
+            f"{prefix}-execution-role": ["arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy"],
+        }
+        self.parameters = [f"/midserver/{environment}/{name}" for name in ("instance", "username", "password")]
+
+    def call(self, service, operation, params, invoke):
+        with self.lock:
+            self.calls.append(operation)
+            return getattr(self, operation)(**params)
+
+    def delete_service(self, cluster, service, force):
+        if self.service != "ACTIVE":
+            raise client_error("ServiceNotFoundException", "DeleteService")
+        self.service = "DRAINING"
+        return {"service": {"serviceName": service, "status": "DRAINING"}}
+
+    def describe_services(self, cluster, services):
+        if self.service == "DRAINING":
+            self.drain_checks -= 1
+            if self.drain_checks < 0:
+                self.service = "INACTIVE"
+        return {"services": [{"serviceName": services[0], "status": self.service}]}
+
+    def list_task_definitions(self, familyPrefix, status):
+        return {"taskDefinitionArns": [arn for arn, s in self.task_definitions.items() if s == status]}
+
+    def deregister_task_definition(self, taskDefinition):
+        self.task_definitions[taskDefinition] = "INACTIVE"
+        return {"taskDefinition": {"taskDefinitionArn": taskDefinition, "status": "INACTIVE"}}
+
+    def delete_task_definitions(self, taskDefinitions):
+        for arn in taskDefinitions:
+            del self.task_definitions[arn]
+        return {"taskDefinitions": [{"taskDefinitionArn": arn} for arn in taskDefinitions], "failures": []}
+
+    def delete_cluster(self, cluster):
+        if not self.cluster:
+            raise client_error("ClusterNotFoundException", "DeleteCluster")
+        if self.service != "INACTIVE":
+            raise client_error("ClusterContainsServicesException", "DeleteCluster")
+        self.cluster = False
+        return {"cluster": {"clusterName": cluster, "status": "INACTIVE"}}
+
+    def describe_security_groups(self, Filters):
+        if not self.group:
+            return {"SecurityGroups": []}
+        return {"SecurityGroups": [{"GroupName": f"{self.prefix}-sg", "GroupId": "sg-0123"}]}
+
+    def delete_security_group(self, GroupId):
+        # Network interfaces of stopped tasks take a while to detach.
+        if self.busy_deletes:
+            self.busy_deletes -= 1
+            raise client_error("DependencyViolation", "DeleteSecurityGroup")
+        self.group = False
+        return {}
+
+    def get_role(self, RoleName):
+        if RoleName not in self.roles:
+            raise client_error("NoSuchEntity", "GetRole")
+        return {"Role": {"RoleName": RoleName}}
+
+    def list_attached_role_policies(self, RoleName):
+        return {"AttachedPolicies": [{"PolicyArn": arn} for arn in self.roles[RoleName]], "IsTruncated": False}
+
+    def detach_role_policy(self, RoleName, PolicyArn):
+        self.roles[RoleName].remove(PolicyArn)
+        return {}
+
+    def delete_role(self, RoleName):
+        if self.roles[RoleName]:
+            raise client_error("DeleteConflict", "DeleteRole")
+        del self.roles[RoleName]
+        return {}
+
+    def describe_parameters(self, ParameterFilters, MaxResults):
+        return {"Parameters": [{"Name": name} for name in self.parameters]}
+
+    def delete_parameters(self, Names):
+        self.parameters = [name for name in self.parameters if name not in Names]
+        return {"DeletedParameters": Names, "InvalidParameters": []}
+
+
+class TestEnvironmentTeardown(unittest.TestCase):
+
+    def make_teardown(self, fake, **kwargs):
+        return EnvironmentTeardown(
+            None, "dev", credentials=MagicMock(), backend=fake, sleep=lambda seconds: None, **kwargs
+        )
+
+    def test_deletes_everything_in_dependency_order(self):
+        # Arrange
+        fake = FakeAWS()
+
+        # Act
+        report = self.make_teardown(fake, delete_parameters=True).run()
+
+        # Assert
+        self.assertFalse(report.has_errors)
+        self.assertEqual({a.resource: a.status for a in report.actions}, {
+            "ecs-service": "deleted",
+            "task-definitions": "deleted",
+            "ecs-cluster": "deleted",
+            "security-group": "deleted",
+            "task-role": "deleted",
+            "execution-role": "deleted",
+            "parameters": "deleted",
+        })
+        self.assertEqual(fake.service, "INACTIVE")
+        self.assertFalse(fake.cluster or fake.group or fake.roles or fake.parameters or fake.task_definitions)
+        # Nothing that depends on the service is touched before it has drained.
+        drained = fake.calls.index("describe_services") + fake.calls.count("describe_services") - 1
+        for operation in ("delete_cluster", "delete_security_group", "delete_role", "delete_parameters"):
+            self.assertGreater(fake.calls.index(operation), drained)
+
+    def test_retries_security_group_while_network_interfaces_detach(self):
+        # Arrange
+        fake = FakeAWS(busy_deletes=2)
+        sleeps = []
+
+        # Act
+        report = EnvironmentTeardown(
+            None, "dev", credentials=MagicMock(), backend=fake, poll_interval=1, max_poll_interval=3,
+            sleep=sleeps.append,
+        ).run()
+
+        # Assert
+        self.assertFalse(report.has_errors)
+        self.assertEqual(fake.calls.count("delete_security_group"), 3)
+        self.assertIn(1, sleeps)
+        self.assertIn(2, sleeps)
+
+    def test_task_definitions_are_deleted_in_batches(self):
+        # Arrange
+        fake = FakeAWS(revisions=23)
+
+        # Act
+        report = self.make_teardown(fake).run()
+
+        # Assert
+        self.assertFalse(report.has_errors)
+        self.assertEqual(fake.calls.count("deregister_task_definition"), 23)
+        self.assertEqual(fake.calls.count("delete_task_definitions"), 3)
+        action = next(a for a in report.actions if a.resource == "task-definitions")
+        self.assertEqual(action.detail, "23 deregistered, 23 deleted")
+
+    def test_missing_resources_count_as_done(self):
+        # Arrange
+        fake = FakeAWS()
+        self.make_teardown(fake, delete_parameters=True).run()
+        fake.calls.clear()
+
+        # Act
+        report = self.make_teardown(fake, delete_parameters=True).run()
+
+        # Assert
+        self.assertFalse(report.has_errors)
+        self.assertEqual({a.status for a in report.actions}, {"absent"})
+        self.assertNotIn("describe_services", fake.calls)
+
+    def test_dependents_are_skipped_when_service_fails(self):
+        # Arrange
+        fake = FakeAWS()
+        fake.delete_service = MagicMock(side_effect=client_error("AccessDeniedException", "DeleteService"))
+
+        # Act
+        report = self.make_teardown(fake, delete_parameters=True).run()
+
+        # Assert
+        statuses = {a.resource: a.status for a in report.actions}
+        self.assertTrue(report.has_errors)
+        self.assertEqual(statuses["ecs-service"], "failed")
+        self.assertEqual(statuses["task-definitions"], "deleted")
+        for resource in ("ecs-cluster", "security-group", "task-role", "execution-role", "parameters"):
+            self.assertEqual(statuses[resource], "skipped")
+        self.assertTrue(fake.cluster and fake.group and fake.roles)
+
+    def test_drain_timeout(self):
+        # Arrange
+        fake = FakeAWS(drain_checks=10 ** 6)
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        # Act
+        report = EnvironmentTeardown(
+            None, "dev", credentials=MagicMock(), backend=fake, drain_timeout=60, sleep=sleep, clock=lambda: now[0],
+        ).run()
+
+        # Assert
+        service = report.actions[0]
+        self.assertEqual(service.status, "failed")
+        self.assertIn("Timed out after 60s", service.detail)
+        self.assertTrue(fake.cluster)
+
+    def test_parameters_are_kept_by_default(self):
+        # Arrange
+        fake = FakeAWS()
+
+        # Act
+        report = self.make_teardown(fake).run()
+
+        # Assert
+        self.assertNotIn("parameters", [a.resource for a in report.actions])
+        self.assertEqual(len(fake.parameters), 3)
+        self.assertNotIn("delete_parameters", fake.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from src.deployment.mid_server import MIDServerDeployer
+from src.deployment.terraform import TerraformOutputs
+
+TASK_ROLE_ARN = "arn:aws:iam::123456789012:role/ecs-task-role-dev"
+EXECUTION_ROLE_ARN = "arn:aws:iam::123456789012:role/ecs-execution-role-dev"
+
+# As printed by `terraform output -json`
+OUTPUT_JSON = {
+    "environment": {"sensitive": False, "type": "string", "value": "dev"},
+    "vpc_id": {"sensitive": False, "type": "string", "value": "vpc-tf"},
+    "subnet_ids": {"sensitive": False, "type": ["tuple", ["string", "string"]], "value": ["subnet-a", "subnet-b"]},
+    "security_group_id": {"sensitive": False, "type": "string", "value": "sg-tf"},
+    "task_role_arn": {"sensitive": False, "type": "string", "value": TASK_ROLE_ARN},
+    "execution_role_arn": {"sensitive": False, "type": "string", "value": EXECUTION_ROLE_ARN},
+}
+
+
+def resource(type_, name, *attributes):
+    return {
+        "mode": "managed",
+        "type": type_,
+        "name": name,
+        "instances": [
+            dict({"attributes": attrs}, **({"index_key": i} if len(attributes) > 1 else {}))
+            for i, attrs in enumerate(attributes)
+        ],
+    }
+
+
+# A version 4 state file from before outputs.tf exposed anything but the events queue
+STATE = {
+    "version": 4,
+    "terraform_version": "1.9.5",
+    "outputs": {"events_queue_url": {"value": "https://sqs.us-east-1.amazonaws.com/123456789012/q", "type": "string"}},
+    "resources": [
+        resource("aws_vpc", "mid_server_vpc", {"id": "vpc-state"}),
+        resource("aws_subnet", "mid_server_subnet", {"id": "subnet-1"}, {"id": "subnet-2"}),
+        resource("aws_security_group", "mid_server_sg", {"id": "sg-state"}),
+        resource("aws_iam_role", "ecs_task_role", {"arn": TASK_ROLE_ARN, "id": "ecs-task-role-dev"}),
+        dict(resource("aws_vpc", "other", {"id": "vpc-module"}), module="module.network"),
+        {"mode": "data", "type": "aws_availability_zones", "name": "available", "instances": []},
+    ],
+}
+
+
+class TestTerraformOutputs(unittest.TestCase):
+
+    def test_parse_output_json(self):
+        # Act
+        outputs = TerraformOutputs.parse(OUTPUT_JSON)
+
+        # Assert
+        self.assertEqual(outputs.network(), ("vpc-tf", ["subnet-a", "subnet-b"]))
+        self.assertEqual(outputs.get("security_group_id"), "sg-tf")
+        self.assertEqual(outputs.get("task_role_arn"), TASK_ROLE_ARN)
+
+    def test_parse_state_reads_resources_without_outputs(self):
+        # Act
+        outputs = TerraformOutputs.parse(STATE)
+
+        # Assert
+        self.assertEqual(outputs.network(), ("vpc-state", ["subnet-1", "subnet-2"]))
+        self.assertEqual(outputs.get("security_group_id"), "sg-state")
+        self.assertEqual(outputs.get("task_role_arn"), TASK_ROLE_ARN)
+        self.assertIsNone(outputs.get("execution_role_arn"))
+        self.assertTrue(outputs.get("events_queue_url").startswith("https://sqs."))
+
+    def test_state_outputs_take_precedence(self):
+        # Arrange
+        state = dict(STATE, outputs={"vpc_id": {"value": "vpc-output"}, "subnet_ids": {"value": []}})
+
+        # Act
+        outputs = TerraformOutputs.parse(state)
+
+        # Assert
+        self.assertEqual(outputs.get("vpc_id"), "vpc-output")
+        self.assertIsNone(outputs.get("subnet_ids"))
+        self.assertIsNone(outputs.network())
+
+    def test_load_state_from_directory(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "terraform.tfstate")
+            with open(path, "w") as f:
+                json.dump(STATE, f)
+
+            # Act
+            outputs = TerraformOutputs.load(directory)
+
+        # Assert
+        self.assertEqual(outputs.source, path)
+        self.assertEqual(outputs.get("vpc_id"), "vpc-state")
+
+    def test_outputs_of_another_environment_are_refused(self):
+        # Arrange
+        outputs = TerraformOutputs.parse(OUTPUT_JSON)
+
+        # Act / Assert
+        outputs.check_environment("dev")
+        with self.assertRaises(ValueError):
+            MIDServerDeployer("no-such-profile", "prod", backend=MagicMock(), terraform=outputs)
+
+
+class TestDeployerWithTerraform(unittest.TestCase):
+
+    def deployer(self, outputs):
+        deployer = MIDServerDeployer("no-such-profile", "dev", backend=MagicMock(), terraform=outputs)
+        deployer.ec2_utils = MagicMock()
+        deployer.ec2_utils.describe_vpc_records.return_value = ["vpc-api"]
+        deployer.ec2_utils.describe_subnet_records.return_value = ["subnet-api"]
+        deployer.ec2_utils.describe_security_groups.return_value = [{"GroupId": "sg-api"}]
+        deployer.iam_utils = MagicMock()
+        deployer.iam_utils.get_role.side_effect = lambda name: {
+            "Role": {"Arn": f"arn:aws:iam::123456789012:role/{name}"}
+        }
+        return deployer
+
+    def test_network_security_group_and_roles_need_no_calls(self):
+        # Arrange
+        deployer = self.deployer(TerraformOutputs.parse(OUTPUT_JSON))
+
+        # Act
+        network = deployer._setup_network()
+        sg_id = deployer._setup_security_group(network[0])
+        roles = deployer._setup_iam_roles()
+
+        # Assert
+        self.assertEqual(network, ("vpc-tf", ["subnet-a", "subnet-b"]))
+        self.assertEqual(sg_id, "sg-tf")
+        self.assertEqual(roles, (TASK_ROLE_ARN, EXECUTION_ROLE_ARN))
+        self.assertEqual(deployer.ec2_utils.method_calls, [])
+        self.assertEqual(deployer.iam_utils.method_calls, [])
+
+    def test_missing_values_are_looked_up(self):
+        # Arrange
+        deployer = self.deployer(TerraformOutputs({"vpc_id": "vpc-tf", "task_role_arn": TASK_ROLE_ARN}))
+
+        # Act
+        network = deployer._setup_network()
+        sg_id = deployer._setup_security_group(network[0])
+        roles = deployer._setup_iam_roles()
+
+        # Assert
+        self.assertEqual(network, ("vpc-tf", ["subnet-api"]))
+        deployer.ec2_utils.describe_vpc_records.assert_not_called()
+        self.assertEqual(sg_id, "sg-api")
+        self.assertEqual(roles, (TASK_ROLE_ARN, "arn:aws:iam::123456789012:role/midserver-dev-execution-role"))
+        deployer.iam_utils.get_role.assert_called_once_with("midserver-dev-execution-role")
+        deployer.iam_utils.attach_role_policy.assert_called_once_with(
+            "midserver-dev-execution-role", MIDServerDeployer.EXECUTION_ROLE_POLICY_ARN
+        )
+
+    def test_checkpointed_terraform_values_are_valid_without_calls(self):
+        # Arrange
+        deployer = self.deployer(TerraformOutputs.parse(OUTPUT_JSON))
+
+        # Act
+        valid = [
+            deployer._checkpoint_valid("_setup_network", ["vpc-tf", ["subnet-a", "subnet-b"]]),
+            deployer._checkpoint_valid("_setup_security_group", "sg-tf"),
+            deployer._checkpoint_valid("_setup_iam_roles", [TASK_ROLE_ARN, EXECUTION_ROLE_ARN]),
+        ]
+        changed = deployer._checkpoint_valid("_setup_security_group", "sg-old")
+
+        # Assert
+        self.assertEqual(valid, [True, True, True])
+        self.assertFalse(changed)
+        self.assertEqual(deployer.ec2_utils.method_calls, [])
+        self.assertEqual(deployer.iam_utils.method_calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
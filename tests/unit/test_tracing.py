@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.aws_utils.tracing import Tracer, propagate
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = Tracer()
+
+    def test_spans_nest_under_current_span(self):
+        # Act
+        with self.tracer.span("deploy") as root:
+            with self.tracer.span("_setup_network") as step:
+                with self.tracer.span("ec2.describe_vpcs", **{"aws.service": "ec2"}) as call:
+                    pass
+
+        # Assert
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(step.parent_id, root.span_id)
+        self.assertEqual(call.parent_id, step.span_id)
+        self.assertEqual({s.trace_id for s in self.tracer.spans}, {root.trace_id})
+        self.assertEqual(
+            [s.name for s in self.tracer.critical_path()],
+            ["deploy", "_setup_network", "ec2.describe_vpcs"],
+        )
+
+    def test_propagate_carries_parent_into_worker_threads(self):
+        # Act
+        with self.tracer.span("plan") as root:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [
+                    executor.submit(propagate(self._traced_work), name) for name in ("a", "b")
+                ]
+                children = [future.result() for future in futures]
+
+        # Assert
+        self.assertEqual({child.parent_id for child in children}, {root.span_id})
+
+    def test_errors_are_recorded_and_reraised(self):
+        # Act
+        with self.assertRaises(ValueError):
+            with self.tracer.span("_setup_network"):
+                raise ValueError("No VPCs found")
+
+        # Assert
+        self.assertEqual(self.tracer.spans[0].error, "ValueError: No VPCs found")
+
+    def test_disabled_tracer_keeps_nothing(self):
+        # Arrange
+        tracer = Tracer(enabled=False)
+
+        # Act
+        with tracer.span("deploy"):
+            pass
+
+        # Assert
+        self.assertEqual(tracer.spans, [])
+
+    def test_export_writes_otlp_and_chrome_files(self):
+        # Arrange
+        with self.tracer.span("deploy"):
+            with self.tracer.span("ecs.create_cluster", **{"aws.service": "ecs"}):
+                pass
+
+        # Act
+        with tempfile.TemporaryDirectory() as tmp:
+            otlp_path, chrome_path = self.tracer.export(tmp, "run")
+            with open(otlp_path) as f:
+                otlp = json.load(f)
+            with open(chrome_path) as f:
+                chrome = json.load(f)
+            self.assertEqual(os.path.basename(otlp_path), "run.otlp.json")
+
+        # Assert
+        spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual([s["name"] for s in spans], ["ecs.create_cluster", "deploy"])
+        self.assertEqual(spans[0]["kind"], 3)
+        self.assertEqual(spans[0]["parentSpanId"], spans[1]["spanId"])
+        self.assertEqual([e["cat"] for e in chrome["traceEvents"]], ["ecs", "deploy"])
+
+    def _traced_work(self, name):
+        with self.tracer.span(name) as span:
+            return span
+
+
+if __name__ == "__main__":
+    unittest.main()